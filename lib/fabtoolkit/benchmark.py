@@ -0,0 +1,192 @@
+"""
+Benchmark module for fabtoolkit.
+
+This module provides:
+- Timing of the metadata-heavy steps of a run against fake semantic models of increasing size
+- Scaling report: growth exponent of each step with the size of the model
+
+Run it with ``python -m fabtoolkit.benchmark``.
+"""
+
+from dataclasses import dataclass
+import json
+import logging
+import statistics
+import time
+from typing import Any, Callable, Iterable, Optional
+import numpy as np
+import pandas as pd
+from fabtoolkit import pipeline
+from fabtoolkit.dataset import Dataset, RelationshipIndex
+from fabtoolkit.fake import FakeFabric, FakeModel
+from fabtoolkit.utils import generate_partition_plan, Constants
+
+# Sizes of the benchmarked models as (tables, partitions)
+DEFAULT_SIZES: tuple[tuple[int, int], ...] = ((100, 1_000), (300, 10_000), (1_000, 100_000))
+
+# Pipeline progress is not reported while benchmarking
+_quiet_logger = logging.getLogger(__name__)
+_quiet_logger.addHandler(logging.NullHandler())
+_quiet_logger.propagate = False
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+@dataclass
+class Benchmark:
+    """Data class representing a benchmarked step.
+
+    Attributes:
+        name (str): Name of the step.
+        scales_with (str): Size of the model the step is expected to grow with ('tables' or 'partitions').
+        prepare (Callable[[Dataset, FakeModel], Callable[[], Any]]): Builds the timed call from a loaded
+            dataset and its model. Preparation is not timed.
+    """
+
+    name: str
+    scales_with: str
+    prepare: Callable[[Dataset, FakeModel], Callable[[], Any]]
+
+def _validate_partitions_config(dataset: Dataset, model: FakeModel) -> Callable[[], Any]:
+    config = model.partitions_config()
+    return lambda: pipeline.validate_partitions_config(dataset, config, logger=_quiet_logger)
+
+def _generate_partition_plan(dataset: Dataset, model: FakeModel) -> Callable[[], Any]:
+    config = model.partitions_config()
+    first_dates = pd.to_datetime(config["first_date"], format=Constants.DATE_FORMAT)
+    end_dates = pd.Series(pd.Timestamp.today().normalize(), index=config.index)
+    return lambda: generate_partition_plan(config["table"], first_dates, end_dates, config["interval"])
+
+def _extract_query_definition(dataset: Dataset, model: FakeModel) -> Callable[[], Any]:
+    queries = dataset.partitions["query"].tolist()
+    return lambda: [Dataset.extract_query_definition(q) for q in queries]
+
+def _build_relationship_index(dataset: Dataset, model: FakeModel) -> Callable[[], Any]:
+    relationships = dataset.relationships
+    return lambda: RelationshipIndex(relationships)
+
+def _get_related_tables(dataset: Dataset, model: FakeModel) -> Callable[[], Any]:
+    tables = model.fact_tables
+    return lambda: dataset.get_related_tables(tables)
+
+def _get_partitions(dataset: Dataset, model: FakeModel) -> Callable[[], Any]:
+    tables = pd.DataFrame({"table_name": dataset.tables["table_name"].unique()})
+    # Half of the partitions of every fact table are selected
+    facts = dataset.partitions[dataset.partitions["table_name"].isin(model.fact_tables)]
+    selected = facts.groupby("table_name")["partition_name"].agg(lambda p: ",".join(p.iloc[::2]))
+    partitions_to_refresh = json.dumps([{"table": t, "selected_partitions": p} for t, p in selected.items()])
+    return lambda: pipeline.get_partitions(dataset, tables, partitions_to_refresh, logger=_quiet_logger)
+
+BENCHMARKS: tuple[Benchmark, ...] = (
+    Benchmark("validate_partitions_config", "tables", _validate_partitions_config),
+    Benchmark("generate_partition_plan", "partitions", _generate_partition_plan),
+    Benchmark("extract_query_definition", "partitions", _extract_query_definition),
+    Benchmark("build_relationship_index", "tables", _build_relationship_index),
+    Benchmark("get_related_tables", "tables", _get_related_tables),
+    Benchmark("get_partitions", "partitions", _get_partitions),
+)
+
+# ============================================================================
+# RUNNER
+# ============================================================================
+
+def _time(call: Callable[[], Any], repeat: int) -> list[float]:
+    """Runs a call several times and returns the seconds of each run."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+def run_benchmarks(
+        sizes: Iterable[tuple[int, int]] = DEFAULT_SIZES,
+        repeat: int = 3,
+        benchmarks: Optional[Iterable[str]] = None,
+        seed: int = 0
+    ) -> pd.DataFrame:
+    """
+    Times each step against a fake semantic model of each size.
+
+    Metadata is served by FakeFabric without latency, so timings only include the work done by fabtoolkit.
+
+    Args:
+        sizes (Iterable[tuple[int, int]]): (tables, partitions) of each benchmarked model.
+        repeat (int): Number of timed runs of each step and size.
+        benchmarks (Optional[Iterable[str]]): Names of the steps to time. Defaults to all of them.
+        seed (int): Seed of the generated models.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['benchmark', 'tables', 'partitions', 'best_seconds', 'median_seconds'].
+
+    Raises:
+        ValueError: If an unknown step is requested or repeat is not positive.
+    """
+    if repeat <= 0:
+        raise ValueError("Number of repetitions must be a positive integer.")
+
+    selected = list(BENCHMARKS)
+    if benchmarks is not None:
+        names = list(benchmarks)
+        unknown = set(names) - {b.name for b in BENCHMARKS}
+        if unknown:
+            raise ValueError(f"Unknown benchmarks: {sorted(unknown)}. Expected: {[b.name for b in BENCHMARKS]}")
+        selected = [b for b in BENCHMARKS if b.name in names]
+
+    rows: list[dict[str, Any]] = []
+    for tables, partitions in sizes:
+        model = FakeModel.generate(tables=tables, partitions=partitions, seed=seed)
+        with FakeFabric(model).install():
+            dataset = Dataset("workspace", "dataset")
+            dataset.prefetch()
+            for benchmark in selected:
+                timings = _time(benchmark.prepare(dataset, model), repeat)
+                rows.append({
+                    "benchmark": benchmark.name,
+                    "tables": len(dataset.tables["table_name"].unique()),
+                    "partitions": len(dataset.partitions),
+                    "best_seconds": min(timings),
+                    "median_seconds": statistics.median(timings),
+                })
+
+    return pd.DataFrame(rows, columns=["benchmark", "tables", "partitions", "best_seconds", "median_seconds"])
+
+def scaling_report(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Estimates how each step grows with the size of the model.
+
+    The exponent is the slope of the best time against the size the step scales with, in log-log
+    scale: about 1 for linear steps and about 2 for quadratic ones.
+
+    Args:
+        results (pd.DataFrame): Results of run_benchmarks() with at least two sizes.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['benchmark', 'scales_with', 'exponent', 'seconds_at_largest',
+            'microseconds_per_item'], where items are the tables or partitions the step scales with.
+    """
+    scales_with = {b.name: b.scales_with for b in BENCHMARKS}
+    rows: list[dict[str, Any]] = []
+    for name, group in results.groupby("benchmark", sort=False):
+        size_column = scales_with[name]
+        sizes = group[size_column].to_numpy(dtype=float)
+        seconds = np.maximum(group["best_seconds"].to_numpy(dtype=float), 1e-9)
+        exponent = np.polyfit(np.log(sizes), np.log(seconds), 1)[0] if len(np.unique(sizes)) > 1 else np.nan
+
+        largest = group.loc[group[size_column].idxmax()]
+        rows.append({
+            "benchmark": name,
+            "scales_with": size_column,
+            "exponent": round(float(exponent), 2),
+            "seconds_at_largest": round(float(largest["best_seconds"]), 4),
+            "microseconds_per_item": round(float(largest["best_seconds"]) / float(largest[size_column]) * 1e6, 3),
+        })
+
+    return pd.DataFrame(rows, columns=["benchmark", "scales_with", "exponent", "seconds_at_largest", "microseconds_per_item"])
+
+if __name__ == "__main__":
+    results = run_benchmarks()
+    print(results.to_string(index=False))
+    print()
+    print(scaling_report(results).to_string(index=False))
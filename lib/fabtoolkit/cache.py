@@ -0,0 +1,196 @@
+"""
+Cache module for fabtoolkit.
+
+This module provides:
+- Metadata snapshots of semantic models
+- Persistent on-disk cache of metadata snapshots stored as Parquet
+"""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+import uuid
+import pandas as pd
+
+# ============================================================================
+# SNAPSHOT
+# ============================================================================
+
+@dataclass
+class MetadataSnapshot:
+    """Data class representing the metadata of a semantic model at a given version.
+
+    Metadata that was not loaded when the snapshot was taken is None.
+
+    Attributes:
+        workspace_name (str): Name of the workspace.
+        dataset_name (str): Name of the dataset.
+        version (str): Model version token (e.g. last structure modification and data refresh times).
+        tables (Optional[pd.DataFrame]): DataFrame containing tables and columns information.
+        partitions (Optional[pd.DataFrame]): DataFrame containing partitions information.
+        relationships (Optional[pd.DataFrame]): DataFrame containing relationships information.
+        created_at (float): Epoch time (seconds) when the snapshot was taken.
+        relationship_index (Optional[pd.DataFrame]): Serialized transitive closure of the relationships.
+    """
+
+    workspace_name: str
+    dataset_name: str
+    version: str
+    tables: Optional[pd.DataFrame]
+    partitions: Optional[pd.DataFrame]
+    relationships: Optional[pd.DataFrame]
+    created_at: float
+    relationship_index: Optional[pd.DataFrame] = None
+
+# ============================================================================
+# CACHE
+# ============================================================================
+
+class MetadataCache:
+    """
+    Persistent cache of semantic model metadata snapshots.
+
+    Snapshots are stored as Parquet files under ``<path>/<dataset_id>/<version_key>/``,
+    where ``version_key`` is derived from the model version token. A snapshot is only
+    served when the requested version token matches the stored one and, if a TTL is set,
+    the snapshot is not older than the TTL. Only the latest snapshot of each dataset is kept.
+
+    Attributes:
+        path (str): Root directory of the cache (local path or mounted lakehouse path).
+        ttl (Optional[int]): Maximum age of a snapshot in seconds. None disables expiration.
+    """
+
+    # Bump when the on-disk layout changes so stale snapshots are ignored
+    FORMAT_VERSION: int = 3
+    MANIFEST_FILE: str = "manifest.json"
+    FRAMES: tuple[str, ...] = ("tables", "partitions", "relationships", "relationship_index")
+
+    def __init__(self, path: Optional[str] = None, ttl: Optional[int] = None):
+
+        if ttl is not None and (not isinstance(ttl, int) or ttl <= 0):
+            raise ValueError("Cache TTL must be a positive integer or None.")
+
+        self.__path = path or os.path.join(tempfile.gettempdir(), "fabtoolkit", "metadata")
+        self.__ttl = ttl
+
+    @property
+    def path(self) -> str:
+        """Root directory of the cache."""
+        return self.__path
+
+    @property
+    def ttl(self) -> Optional[int]:
+        """Maximum age of a snapshot in seconds."""
+        return self.__ttl
+
+    @staticmethod
+    def _version_key(version: str) -> str:
+        """Returns a filesystem-safe key for a model version token."""
+        return hashlib.sha1(str(version).encode("utf-8")).hexdigest()[:16]
+
+    def _dataset_dir(self, dataset_id: str) -> str:
+        """Returns the directory holding the snapshots of a dataset."""
+        return os.path.join(self.__path, str(dataset_id))
+
+    def get(self, dataset_id: str, version: str) -> Optional[MetadataSnapshot]:
+        """
+        Gets the cached snapshot of a dataset for the given model version.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            version (str): Model version token the snapshot must match.
+
+        Returns:
+            Optional[MetadataSnapshot]: The cached snapshot, or None if missing, expired or unreadable.
+        """
+        snapshot_dir = os.path.join(self._dataset_dir(dataset_id), self._version_key(version))
+        manifest_path = os.path.join(snapshot_dir, self.MANIFEST_FILE)
+
+        if not os.path.isfile(manifest_path):
+            return None
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+
+            if manifest.get("format_version") != self.FORMAT_VERSION or manifest.get("version") != str(version):
+                return None
+            if self.__ttl is not None and time.time() - manifest["created_at"] > self.__ttl:
+                return None
+
+            frames = {
+                name: pd.read_parquet(os.path.join(snapshot_dir, f"{name}.parquet"))
+                if name in manifest["frames"] else None
+                for name in self.FRAMES
+            }
+        except (OSError, ValueError, KeyError):
+            # A corrupt or partially written snapshot is treated as a cache miss
+            return None
+
+        return MetadataSnapshot(
+            workspace_name=manifest["workspace_name"],
+            dataset_name=manifest["dataset_name"],
+            version=manifest["version"],
+            created_at=manifest["created_at"],
+            **frames
+        )
+
+    def put(self, dataset_id: str, snapshot: MetadataSnapshot) -> None:
+        """
+        Stores a snapshot of a dataset, replacing any previous snapshot of the same dataset.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            snapshot (MetadataSnapshot): Snapshot to store.
+
+        Returns:
+            None
+        """
+        dataset_dir = self._dataset_dir(dataset_id)
+        snapshot_dir = os.path.join(dataset_dir, self._version_key(snapshot.version))
+        staging_dir = os.path.join(dataset_dir, f".staging-{uuid.uuid4().hex}")
+        os.makedirs(staging_dir)
+
+        try:
+            frames = [name for name in self.FRAMES if getattr(snapshot, name) is not None]
+            for name in frames:
+                getattr(snapshot, name).to_parquet(os.path.join(staging_dir, f"{name}.parquet"), index=False)
+
+            manifest = {
+                "format_version": self.FORMAT_VERSION,
+                "version": str(snapshot.version),
+                "workspace_name": snapshot.workspace_name,
+                "dataset_name": snapshot.dataset_name,
+                "created_at": snapshot.created_at,
+                "frames": frames,
+            }
+            with open(os.path.join(staging_dir, self.MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+
+            # Publish the new snapshot and drop the previous ones. Staging directories of
+            # other writers caching the same dataset at the same time are left alone
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            os.replace(staging_dir, snapshot_dir)
+            for entry in os.listdir(dataset_dir):
+                if entry != os.path.basename(snapshot_dir) and not entry.startswith(".staging-"):
+                    shutil.rmtree(os.path.join(dataset_dir, entry), ignore_errors=True)
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def invalidate(self, dataset_id: Optional[str] = None) -> None:
+        """
+        Removes cached snapshots.
+
+        Args:
+            dataset_id (Optional[str]): Identifier of the dataset to invalidate. If None, the whole cache is cleared.
+
+        Returns:
+            None
+        """
+        target = self._dataset_dir(dataset_id) if dataset_id else self.__path
+        shutil.rmtree(target, ignore_errors=True)
@@ -0,0 +1,318 @@
+"""
+Checkpoint module for fabtoolkit.
+
+This module provides:
+- Persistent checkpoint of an orchestrator run: completed steps, submitted refresh requests and refreshed objects
+- Run keys, so a run started again with the same parameters resumes from its checkpoint
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Mapping, Optional
+import uuid
+import pandas as pd
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Version of the checkpoint file format. Checkpoints with another version are ignored
+CHECKPOINT_VERSION: int = 1
+
+# ============================================================================
+# RUN KEY
+# ============================================================================
+
+def run_key(params: Mapping[str, Any]) -> str:
+    """
+    Derives the key of a run from its parameters.
+
+    Runs with the same parameters, in any order, get the same key.
+
+    Args:
+        params (Mapping[str, Any]): JSON-serializable parameters that identify the run.
+
+    Returns:
+        str: Hexadecimal key of 16 characters.
+    """
+    payload = json.dumps(dict(params), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+# ============================================================================
+# OBJECTS
+# ============================================================================
+
+def _object_rows(objects: pd.DataFrame) -> list[list[Optional[str]]]:
+    """Converts refresh objects to JSON rows. Table-level objects (empty or missing partition) get a null partition."""
+    return [
+        [str(table), None if pd.isna(partition) or partition == "" else str(partition)]
+        for table, partition in zip(objects["table"], objects["partition"])
+    ]
+
+def _object_frame(rows: list[list[Optional[str]]]) -> pd.DataFrame:
+    """Converts JSON rows back to refresh objects with columns ['table', 'partition']. Null partitions are None."""
+    return pd.DataFrame(rows, columns=["table", "partition"], dtype=object)
+
+# ============================================================================
+# CHECKPOINT
+# ============================================================================
+
+class RunCheckpoint:
+    """
+    Persistent checkpoint of a run, stored as a JSON file.
+
+    The checkpoint records the steps completed by the run, any value the run wants to reuse when
+    it resumes (e.g. the objects to refresh), the refresh requests submitted and not finished yet,
+    and the objects refreshed so far. Every change is written to the file at once, through a
+    temporary file, so a run stopped at any point leaves a readable checkpoint.
+
+    Use RunCheckpoint.open() to start or resume a run, and RunCheckpoint.load() to update the
+    checkpoint of a run from a child notebook. Only one process should write the checkpoint at a time.
+
+    Attributes:
+        file (str): Path of the checkpoint file.
+        key (str): Key of the run.
+        resumed (bool): Whether the checkpoint was left by a previous run.
+
+    Args:
+        file (str): Path of the checkpoint file.
+        key (str): Key of the run.
+        state (Optional[dict[str, Any]]): Loaded state. None starts an empty checkpoint.
+    """
+
+    def __init__(self, file: str, key: str, state: Optional[dict[str, Any]] = None):
+        self.__file = file
+        self.__key = key
+        self.__resumed = state is not None
+        self.__lock = threading.Lock()
+        now = time.time()
+        self.__state: dict[str, Any] = state or {
+            "version": CHECKPOINT_VERSION,
+            "key": key,
+            "created_at": now,
+            "updated_at": now,
+            "steps": {},
+            "values": {},
+            "requests": {},
+            "completed": [],
+        }
+
+    @classmethod
+    def open(cls, path: str, params: Mapping[str, Any], max_age: Optional[float] = None) -> "RunCheckpoint":
+        """
+        Opens the checkpoint of a run, resuming the one left by a previous run with the same parameters.
+
+        A checkpoint older than max_age, unreadable or of another format version is discarded and the
+        run starts from the beginning.
+
+        Args:
+            path (str): Directory of the checkpoints (local path or mounted lakehouse path).
+            params (Mapping[str, Any]): JSON-serializable parameters that identify the run.
+            max_age (Optional[float]): Maximum age in seconds of a checkpoint to resume. None disables expiration.
+
+        Returns:
+            RunCheckpoint: Resumed or new checkpoint. New checkpoints are not written until they change.
+        """
+        key = run_key(params)
+        file = os.path.join(path, f"{key}.json")
+        state = cls._read(file)
+        if state is not None and max_age is not None and time.time() - state.get("updated_at", 0) > max_age:
+            state = None
+        return cls(file, key, state)
+
+    @classmethod
+    def load(cls, file: str) -> "RunCheckpoint":
+        """
+        Loads the checkpoint file of a run, e.g. from a child notebook of the run.
+
+        Args:
+            file (str): Path of the checkpoint file.
+
+        Returns:
+            RunCheckpoint: Loaded checkpoint, or an empty one if the file does not exist yet.
+        """
+        state = cls._read(file)
+        key = state["key"] if state is not None else os.path.splitext(os.path.basename(file))[0]
+        return cls(file, key, state)
+
+    @staticmethod
+    def _read(file: str) -> Optional[dict[str, Any]]:
+        """Reads a checkpoint file. Missing, unreadable or incompatible files are None."""
+        try:
+            with open(file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return state if isinstance(state, dict) and state.get("version") == CHECKPOINT_VERSION else None
+
+    def _save(self) -> None:
+        """Writes the checkpoint to a temporary file and publishes it, so readers never see a partially written file."""
+        self.__state["updated_at"] = time.time()
+        directory = os.path.dirname(self.__file) or "."
+        os.makedirs(directory, exist_ok=True)
+        staging_file = os.path.join(directory, f".staging-{uuid.uuid4().hex}.json")
+        try:
+            with open(staging_file, "w", encoding="utf-8") as f:
+                json.dump(self.__state, f)
+            os.replace(staging_file, self.__file)
+        finally:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+
+    @property
+    def file(self) -> str:
+        """Path of the checkpoint file."""
+        return self.__file
+
+    @property
+    def key(self) -> str:
+        """Key of the run."""
+        return self.__key
+
+    @property
+    def resumed(self) -> bool:
+        """Whether the checkpoint was left by a previous run."""
+        return self.__resumed
+
+    # ------------------------------------------------------------------------
+    # Steps and values
+    # ------------------------------------------------------------------------
+
+    def is_step_done(self, step: str) -> bool:
+        """
+        Checks whether a step of the run completed.
+
+        Args:
+            step (str): Name of the step.
+
+        Returns:
+            bool: True if the step completed.
+        """
+        with self.__lock:
+            return step in self.__state["steps"]
+
+    def complete_step(self, step: str, **details: Any) -> None:
+        """
+        Records a completed step of the run.
+
+        Args:
+            step (str): Name of the step.
+            **details: JSON-serializable details of the step (e.g. the partitioned tables).
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__state["steps"][step] = {"completed_at": time.time(), **details}
+            self._save()
+
+    def has_value(self, name: str) -> bool:
+        """Checks whether the run stored a value."""
+        with self.__lock:
+            return name in self.__state["values"]
+
+    def get_value(self, name: str, default: Any = None) -> Any:
+        """
+        Gets a value stored by the run.
+
+        Args:
+            name (str): Name of the value.
+            default (Any): Value returned if the run did not store it.
+
+        Returns:
+            Any: Stored value.
+        """
+        with self.__lock:
+            return self.__state["values"].get(name, default)
+
+    def set_value(self, name: str, value: Any) -> None:
+        """
+        Stores a value to reuse when the run resumes.
+
+        Args:
+            name (str): Name of the value.
+            value (Any): JSON-serializable value.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__state["values"][name] = value
+            self._save()
+
+    # ------------------------------------------------------------------------
+    # Refresh requests
+    # ------------------------------------------------------------------------
+
+    def add_request(self, refresh_request_id: str, objects: pd.DataFrame) -> None:
+        """
+        Records a submitted refresh request, so a resumed run can reattach to it.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            objects (pd.DataFrame): Objects of the request with columns ['table', 'partition']. Table-level
+                objects have an empty or missing partition.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__state["requests"][refresh_request_id] = {
+                "submitted_at": time.time(),
+                "objects": _object_rows(objects),
+            }
+            self._save()
+
+    def finish_request(self, refresh_request_id: str, completed: pd.DataFrame) -> None:
+        """
+        Records a finished refresh request and the objects it refreshed.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            completed (pd.DataFrame): Objects that completed, with columns ['table', 'partition'].
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__state["requests"].pop(refresh_request_id, None)
+            self.__state["completed"].extend(_object_rows(completed))
+            self._save()
+
+    def pending_requests(self) -> dict[str, pd.DataFrame]:
+        """
+        Gets the refresh requests submitted and not finished yet.
+
+        Returns:
+            dict[str, pd.DataFrame]: Objects of each request, with columns ['table', 'partition'], by refresh request identifier.
+                Table-level objects have a None partition.
+        """
+        with self.__lock:
+            return {
+                refresh_request_id: _object_frame(request["objects"])
+                for refresh_request_id, request in self.__state["requests"].items()
+            }
+
+    def completed_objects(self) -> pd.DataFrame:
+        """
+        Gets the objects refreshed so far.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['table', 'partition']. Table-level objects have a None partition.
+        """
+        with self.__lock:
+            return _object_frame(self.__state["completed"]).drop_duplicates().reset_index(drop=True)
+
+    def remove(self) -> None:
+        """
+        Removes the checkpoint file once the run completes, so the next run starts from the beginning.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            if os.path.isfile(self.__file):
+                os.remove(self.__file)
@@ -0,0 +1,1894 @@
+import asyncio
+import functools
+import pandas as pd
+import re
+import numpy as np
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, ExitStack
+from typing import Any, Callable, ContextManager, Iterable, Iterator, Optional, Union
+from fabtoolkit.cache import MetadataCache, MetadataSnapshot
+from fabtoolkit.history import RefreshHistory, parse_refresh_durations
+from fabtoolkit.plan import RunPlan
+from fabtoolkit.refresh import (
+    DEFAULT_RETRY_BACKOFF_SECONDS,
+    RefreshEvent,
+    RefreshMonitor,
+    RefreshOutcome,
+    RefreshShard,
+    RefreshStatus,
+    ShardBy,
+    ShardedRefresh,
+    run_sync,
+    split_refresh_objects
+)
+from fabtoolkit.startup import lazy_import
+from fabtoolkit.trace import in_current_context, is_enabled, payload_size, span
+from fabtoolkit.tuning import ParallelismTuner, is_auto_parallelism
+
+# Heavy dependencies are imported on first use, so code paths that never use them start faster
+fabric = lazy_import("sempy.fabric")
+tom = lazy_import("sempy_labs.tom")
+
+class PartitionCatalog:
+    """
+    Indexed, read-only catalog of the partitions of a semantic model.
+
+    Rows are grouped by table so the partitions of a table are a contiguous slice of the
+    underlying frame. Lookups by table and by (table, partition) are hash-based, and the
+    frames returned are views that share data with the catalog instead of copies.
+
+    Attributes:
+        frame (pd.DataFrame): View of all partitions, grouped by table.
+        table_names (list[str]): Names of the tables with at least one partition.
+
+    Args:
+        partitions (pd.DataFrame): Partitions information with at least columns: ['table_name', 'partition_name']
+
+    Raises:
+        ValueError: If required columns are missing from the DataFrame.
+    """
+
+    def __init__(self, partitions: pd.DataFrame):
+
+        required_columns = {'table_name', 'partition_name'}
+        missing = required_columns - set(partitions.columns)
+        if missing:
+            raise ValueError(f"Missing required columns to build the partition catalog: {missing}")
+
+        frame = partitions.sort_values("table_name", kind="stable").reset_index(drop=True)
+        tables = frame["table_name"].to_numpy()
+        names = frame["partition_name"].to_numpy()
+
+        # Row range of each table: boundaries are the positions where the table name changes
+        boundaries = np.flatnonzero(tables[1:] != tables[:-1]) + 1 if len(frame) else np.array([], dtype=int)
+        starts = np.concatenate(([0], boundaries)) if len(frame) else boundaries
+        stops = np.concatenate((boundaries, [len(frame)])) if len(frame) else boundaries
+
+        self.__frame = frame
+        self.__table_index: dict[str, tuple[int, int]] = {
+            table: (int(start), int(stop)) for table, start, stop in zip(tables[starts], starts, stops)
+        }
+        self.__partition_index: dict[tuple[str, str], int] = {
+            key: position for position, key in enumerate(zip(tables.tolist(), names.tolist()))
+        }
+
+    def __len__(self) -> int:
+        return len(self.__frame)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self.__partition_index
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """View of all partitions, grouped by table."""
+        return self.__frame.copy(deep=False)
+
+    @property
+    def table_names(self) -> list[str]:
+        """Names of the tables with at least one partition."""
+        return list(self.__table_index)
+
+    def has_table(self, table: str) -> bool:
+        """
+        Checks if a table has at least one partition.
+
+        Args:
+            table (str): The table name.
+
+        Returns:
+            bool: True if the table has partitions, False otherwise.
+        """
+        return table in self.__table_index
+
+    def get_table(self, table: str) -> pd.DataFrame:
+        """
+        Gets the partitions of a table.
+
+        Args:
+            table (str): The table name.
+
+        Returns:
+            pd.DataFrame: View of the partitions of the table. Empty if the table has no partitions.
+        """
+        start, stop = self.__table_index.get(table, (0, 0))
+        return self.__frame.iloc[start:stop]
+
+    def get_partition_names(self, table: str) -> list[str]:
+        """
+        Gets the partition names of a table.
+
+        Args:
+            table (str): The table name.
+
+        Returns:
+            list[str]: Partition names of the table.
+        """
+        return self.get_table(table)["partition_name"].tolist()
+
+    def get_row(self, table: str, partition: str) -> pd.Series:
+        """
+        Gets the information of a partition.
+
+        Args:
+            table (str): The table name.
+            partition (str): The partition name.
+
+        Returns:
+            pd.Series: Row of the partition.
+
+        Raises:
+            KeyError: If the partition does not exist.
+        """
+        try:
+            position = self.__partition_index[(table, partition)]
+        except KeyError:
+            raise KeyError(f"Partition '{partition}' not found in table '{table}'.") from None
+        return self.__frame.iloc[position]
+
+    def contains(self, tables: Iterable[str], partitions: Iterable[str]) -> np.ndarray:
+        """
+        Checks which (table, partition) pairs exist in the catalog.
+
+        Args:
+            tables (Iterable[str]): Table names.
+            partitions (Iterable[str]): Partition names, aligned with tables.
+
+        Returns:
+            np.ndarray: Boolean array, True where the partition exists.
+        """
+        index = self.__partition_index
+        return np.fromiter((key in index for key in zip(tables, partitions)), dtype=bool)
+
+    def select(self, tables: Iterable[str]) -> pd.DataFrame:
+        """
+        Gets the partitions of several tables, in the order the tables are given.
+
+        Args:
+            tables (Iterable[str]): Table names. Tables without partitions are ignored.
+
+        Returns:
+            pd.DataFrame: Partitions of the given tables.
+        """
+        ranges = [self.__table_index[t] for t in dict.fromkeys(tables) if t in self.__table_index]
+        if not ranges:
+            return self.__frame.iloc[0:0]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        return self.__frame.take(positions).reset_index(drop=True)
+
+class RelationshipIndex:
+    """
+    Precomputed transitive closure of the relationships of a semantic model.
+
+    Each table gets an integer id, and the tables it depends on (itself, the tables on the
+    'to' side of its relationships and, transitively, their own dependencies) are stored as
+    a bitset. The related tables of any set of tables are the bitwise union of their bitsets.
+
+    Attributes:
+        table_names (list[str]): Names of the tables with at least one relationship, in id order.
+
+    Args:
+        relationships (pd.DataFrame): Relationships information with at least columns: ['from_table', 'to_table']
+
+    Raises:
+        ValueError: If required columns are missing from the DataFrame.
+    """
+
+    # Columns of the serialized index
+    COLUMNS: tuple[str, ...] = ("table_name", "closure")
+
+    def __init__(self, relationships: pd.DataFrame):
+
+        required_columns = {'from_table', 'to_table'}
+        missing = required_columns - set(relationships.columns)
+        if missing:
+            raise ValueError(f"Missing required columns to build the relationship index: {missing}")
+
+        from_tables = relationships["from_table"].tolist()
+        to_tables = relationships["to_table"].tolist()
+        names = sorted(set(from_tables) | set(to_tables))
+        ids = {name: i for i, name in enumerate(names)}
+
+        dependencies: list[set[int]] = [set() for _ in names]
+        for from_table, to_table in zip(from_tables, to_tables):
+            dependencies[ids[from_table]].add(ids[to_table])
+
+        # Propagate bitsets until no table gains a dependency. Cycles are allowed
+        closures = [1 << i for i in range(len(names))]
+        changed = True
+        while changed:
+            changed = False
+            for i, targets in enumerate(dependencies):
+                merged = closures[i]
+                for j in targets:
+                    merged |= closures[j]
+                if merged != closures[i]:
+                    closures[i] = merged
+                    changed = True
+
+        self._set_state(names, closures)
+
+    def _set_state(self, names: list[str], closures: list[int]) -> None:
+        """Sets the table names and their closure bitsets."""
+        self.__names = names
+        self.__ids = {name: i for i, name in enumerate(names)}
+        self.__closures = closures
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "RelationshipIndex":
+        """
+        Loads an index serialized with to_frame().
+
+        Args:
+            frame (pd.DataFrame): DataFrame with columns ['table_name', 'closure'].
+
+        Returns:
+            RelationshipIndex: The loaded index.
+        """
+        index = cls.__new__(cls)
+        index._set_state(frame["table_name"].tolist(), [int(c, 16) for c in frame["closure"]])
+        return index
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Serializes the index, with bitsets as hexadecimal strings.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['table_name', 'closure'].
+        """
+        return pd.DataFrame({"table_name": self.__names, "closure": [format(c, "x") for c in self.__closures]})
+
+    @property
+    def table_names(self) -> list[str]:
+        """Names of the tables with at least one relationship, in id order."""
+        return list(self.__names)
+
+    def __contains__(self, table: str) -> bool:
+        return table in self.__ids
+
+    def _decode(self, mask: int) -> list[str]:
+        """Returns the names of the tables whose bits are set in a bitset."""
+        if not mask:
+            return []
+        size = (len(self.__names) + 7) // 8
+        bits = np.unpackbits(np.frombuffer(mask.to_bytes(size, "little"), dtype=np.uint8), bitorder="little")
+        return [self.__names[i] for i in np.flatnonzero(bits)]
+
+    def related(self, tables: Iterable[str]) -> list[str]:
+        """
+        Gets the given tables and all the tables they depend on.
+
+        Args:
+            tables (Iterable[str]): Table names. Tables without relationships are returned as they are.
+
+        Returns:
+            list[str]: Related tables, those with relationships first in id order.
+        """
+        mask = 0
+        unrelated: list[str] = []
+        for table in dict.fromkeys(tables):
+            i = self.__ids.get(table)
+            if i is None:
+                unrelated.append(table)
+            else:
+                mask |= self.__closures[i]
+        return self._decode(mask) + unrelated
+
+    def levels(self, tables: Iterable[str]) -> list[list[str]]:
+        """
+        Splits tables into dependency levels: each table comes after the tables it depends on.
+
+        Level 0 holds the tables that depend on none of the given tables, such as dimensions and
+        tables without relationships. Each next level holds the tables whose dependencies are all
+        in earlier levels. Tables in a relationship cycle are placed together in the same level.
+
+        Args:
+            tables (Iterable[str]): Table names.
+
+        Returns:
+            list[list[str]]: Non-empty levels, in dependency order.
+        """
+        tables = list(dict.fromkeys(tables))
+        bits = {t: 1 << self.__ids[t] for t in tables if t in self.__ids}
+        levels: list[list[str]] = []
+
+        remaining = list(bits)
+        pending = 0
+        for bit in bits.values():
+            pending |= bit
+
+        while remaining:
+            # A table is ready when its pending dependencies are none, or only tables of its own cycle
+            ready = [t for t in remaining if all(
+                self.__closures[self.__ids[u]] & bits[t]
+                for u in self._decode(self.__closures[self.__ids[t]] & pending & ~bits[t])
+            )] or remaining
+            levels.append(ready)
+            for t in ready:
+                pending &= ~bits[t]
+            remaining = [t for t in remaining if pending & bits[t]]
+
+        unrelated = [t for t in tables if t not in bits]
+        if unrelated:
+            if levels:
+                levels[0] = unrelated + levels[0]
+            else:
+                levels.append(unrelated)
+        return levels
+
+class PartitionQueryTemplate:
+    """
+    Compiled M-language query template for the partitions of a table.
+
+    The base query, last step and partition column are assembled into a format string once,
+    so rendering the query definitions of many partitions only fills in names and dates.
+
+    Args:
+        base_query (str): The base query (without 'in' clause).
+        last_step (str): The name of the last step in the base query.
+        partition_by (str): The date column used to filter each partition.
+    """
+
+    def __init__(self, base_query: str, last_step: str, partition_by: str):
+        # Literal braces in the M code are escaped so only the placeholders are formatted
+        base_query = base_query.replace("{", "{{").replace("}", "}}")
+        last_step = last_step.replace("{", "{{").replace("}", "}}")
+        partition_by = partition_by.replace("{", "{{").replace("}", "}}")
+
+        self.__template = (
+            f"{base_query},\n"
+            f"\t{{0}} = Table.SelectRows({last_step}, each "
+            f"[{partition_by}] >= #date({{1}},{{2}},{{3}}) and "
+            f"[{partition_by}] <= #date({{4}},{{5}},{{6}}))\n"
+            f"in\n"
+            f"\t{{0}}"
+        )
+
+    @classmethod
+    def from_query(cls, query: str, partition_by: str) -> "PartitionQueryTemplate":
+        """
+        Compiles a template from an existing partition query definition.
+
+        Args:
+            query (str): The partition query definition in M language.
+            partition_by (str): The date column used to filter each partition.
+
+        Returns:
+            PartitionQueryTemplate: The compiled template.
+        """
+        base_query, last_step = Dataset.extract_query_definition(query)
+        return cls(base_query, last_step, partition_by)
+
+    @staticmethod
+    def _date_parts(dates: Iterable) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Splits dates into year, month and day arrays."""
+        values = pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]")
+        years = values.astype("datetime64[Y]")
+        months = values.astype("datetime64[M]")
+        return (
+            years.astype(np.int64) + 1970,
+            (months - years).astype(np.int64) + 1,
+            (values - months).astype(np.int64) + 1,
+        )
+
+    def render(self, partition_names: Iterable[str], range_starts: Iterable, range_ends: Iterable) -> list[str]:
+        """
+        Renders the query definitions of several partitions.
+
+        Args:
+            partition_names (Iterable[str]): Partition names.
+            range_starts (Iterable): Start date of each partition.
+            range_ends (Iterable): End date of each partition.
+
+        Returns:
+            list[str]: M-language query definition of each partition.
+        """
+        start_years, start_months, start_days = self._date_parts(range_starts)
+        end_years, end_months, end_days = self._date_parts(range_ends)
+
+        return list(map(
+            self.__template.format,
+            partition_names,
+            start_years.tolist(), start_months.tolist(), start_days.tolist(),
+            end_years.tolist(), end_months.tolist(), end_days.tolist()
+        ))
+
+class Dataset:
+    """
+    Represents a semantic model in Fabric.
+
+    Tables, partitions and relationships are loaded lazily on first access. Use prefetch()
+    to load several of them concurrently.
+    
+    Attributes:
+        workspace_name (str): Name of the workspace.
+        dataset_name (str): Name of the dataset.
+        workspace_id (str): Identifier of the workspace.
+        dataset_id (str): Identifier of the dataset.
+        tables (pd.DataFrame): DataFrame containing tables and columns information.
+        partitions (pd.DataFrame): DataFrame containing partitions information.
+        relationships (pd.DataFrame): DataFrame containing relationships information.
+        partition_catalog (PartitionCatalog): Indexed catalog of partitions.
+        relationship_index (RelationshipIndex): Transitive closure of the relationships.
+
+    Frames returned by these attributes share data with the Dataset and must not be modified in place.
+
+    Args:
+        workspace_id (str): Identifier of the workspace.
+        dataset_id (str): Identifier of the dataset.
+        cache (Optional[MetadataCache]): Cache of metadata snapshots. When provided, metadata is only
+            downloaded if the model structure changed since the cached snapshot or the snapshot expired.
+        history (Optional[RefreshHistory]): History of refresh durations. When provided, the duration of
+            each completed refresh is recorded and refreshes are scheduled longest-first. The parallelism,
+            size and duration of each refresh request are recorded as well, so max_parallelism can be tuned.
+        tuner (Optional[ParallelismTuner]): Tuner of the max parallelism of refresh requests submitted with
+            max_parallelism 'AUTO'. Defaults to a tuner with the default ceiling and initial parallelism.
+    """
+
+    # Metadata attributes that can be loaded lazily
+    METADATA: tuple[str, ...] = ("tables", "partitions", "relationships")
+
+    # Partition statistics that change with every data refresh. They are left out of cached snapshots
+    VOLATILE_PARTITION_COLUMNS: tuple[str, ...] = ("record_count", "records_per_segment", "segment_count", "refreshed_time")
+
+    def __init__(
+            self,
+            workspace_id: str,
+            dataset_id: str,
+            cache: Optional[MetadataCache] = None,
+            history: Optional[RefreshHistory] = None,
+            tuner: Optional[ParallelismTuner] = None
+        ):
+
+        if not workspace_id or not dataset_id:
+            raise ValueError("Workspace and dataset identifiers must be provided.")
+        
+        # Private attributes
+        self.__workspace_id = workspace_id
+        self.__dataset_id = dataset_id
+        self.__cache = cache
+        self.__history = history
+        self.__tuner = tuner or ParallelismTuner()
+        self.__runs: dict[str, dict] = {}
+        self.__expected_durations: dict[str, float] = {}
+        self.__lock = threading.RLock()
+        self.__metadata: dict[str, Optional[pd.DataFrame]] = dict.fromkeys(self.METADATA)
+        self.__partition_catalog: Optional[PartitionCatalog] = None
+        self.__relationship_index: Optional[RelationshipIndex] = None
+        self.__batch: Optional[ExitStack] = None
+        self.__tom = None
+        self.__batch_added: list[pd.DataFrame] = []
+        self.__batch_removed: list[tuple[str, str]] = []
+        self.__version: Optional[str] = None
+        self.__record_counts: Optional[pd.DataFrame] = None
+        self.__created_at: float = time.time()
+
+        # Serve metadata from the cache when the model has not changed since the last snapshot
+        self.__version = self._get_model_version() if cache is not None else None
+        snapshot = cache.get(self.__dataset_id, self.__version) if self.__version is not None else None
+
+        if snapshot is not None:
+            self.__workspace_name = snapshot.workspace_name
+            self.__dataset_name = snapshot.dataset_name
+            self.__created_at = snapshot.created_at
+            self.__metadata.update({name: getattr(snapshot, name) for name in self.METADATA})
+            if snapshot.relationship_index is not None:
+                self.__relationship_index = RelationshipIndex.from_frame(snapshot.relationship_index)
+            return
+
+        # Resolve workspace and dataset names from their IDs
+        with span("dataset.resolve_names"), ThreadPoolExecutor(max_workers=2) as pool:
+            workspace_name = pool.submit(fabric.resolve_workspace_name, self.__workspace_id)
+            dataset_name = pool.submit(
+                fabric.resolve_dataset_name, workspace=self.__workspace_id, dataset_id=self.__dataset_id
+            )
+            self.__workspace_name = workspace_name.result()
+            self.__dataset_name = dataset_name.result()
+
+    def _get_model_version(self) -> Optional[str]:
+        """
+        Gets a token that changes whenever the structure of the semantic model changes.
+
+        Data refreshes do not change the token, so scheduled runs keep serving metadata from the cache.
+        Partition statistics that change with every data refresh are not cached (see VOLATILE_PARTITION_COLUMNS).
+
+        Returns:
+            Optional[str]: Last structure modification time of the model, or None if it cannot be resolved.
+        """
+        try:
+            with span("dataset.model_version"):
+                model = fabric.evaluate_dax(
+                    dataset=self.__dataset_id,
+                    dax_string='EVALUATE SELECTCOLUMNS(INFO.MODEL(), "StructureModifiedTime", [StructureModifiedTime])',
+                    workspace=self.__workspace_id
+                )
+        except Exception:
+            return None
+
+        if model.empty:
+            return None
+
+        return str(model.iloc[0, 0])
+
+    def _fetch_metadata(self, name: str) -> pd.DataFrame:
+        """
+        Downloads one metadata attribute of the semantic model.
+
+        Args:
+            name (str): Metadata attribute to download ('tables', 'partitions' or 'relationships').
+
+        Returns:
+            pd.DataFrame: Metadata with column names in snake case.
+
+        Raises:
+            ValueError: If the dataset contains no tables or no relationships.
+        """
+        with span("dataset.fetch_metadata", metadata=name) as s:
+            df = self._download_metadata(name)
+            s.set(rows=len(df))
+        return df
+
+    def _download_metadata(self, name: str) -> pd.DataFrame:
+        """Downloads one metadata attribute of the semantic model. See _fetch_metadata()."""
+        if name == "tables":
+            # Retrieve tables and columns
+            df = fabric.list_columns(workspace=self.__workspace_id, dataset=self.__dataset_id)
+            if df.empty:
+                raise ValueError(f"Dataset '{self.__dataset_name}' in workspace '{self.__workspace_name}' contains no tables.")
+        elif name == "partitions":
+            # Retrieve partitions
+            df = fabric.list_partitions(workspace=self.__workspace_id, dataset=self.__dataset_id)
+        else:
+            # Retrieve relationships
+            df = fabric.list_relationships(workspace=self.__workspace_id, dataset=self.__dataset_id)
+            if df.empty:
+                raise ValueError(f"Dataset '{self.__dataset_name}' in workspace '{self.__workspace_name}' contains no relationships.")
+
+        return df.rename(columns=lambda x: x.lower().replace(" ", "_"))
+
+    def prefetch(self, *names: str) -> None:
+        """
+        Loads metadata attributes that are not loaded yet, fetching them concurrently.
+
+        Args:
+            *names (str): Metadata attributes to load ('tables', 'partitions', 'relationships').
+                If none are given, all of them are loaded.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If an unknown metadata attribute is requested.
+        """
+        names = names or self.METADATA
+        invalid = set(names) - set(self.METADATA)
+        if invalid:
+            raise ValueError(f"Invalid metadata attributes: {invalid}. Available attributes: {self.METADATA}")
+
+        with self.__lock:
+            missing = [name for name in dict.fromkeys(names) if self.__metadata[name] is None]
+            if not missing:
+                return
+
+            if len(missing) == 1:
+                fetched = {missing[0]: self._fetch_metadata(missing[0])}
+            else:
+                with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+                    # Spans of the fetches are nested in the span of the caller
+                    futures = {name: pool.submit(in_current_context(self._fetch_metadata), name) for name in missing}
+                    fetched = {name: future.result() for name, future in futures.items()}
+
+            self.__metadata.update(fetched)
+            # The relationship index is compiled once and cached with the relationships it is built from
+            if "relationships" in fetched:
+                self.__relationship_index = RelationshipIndex(fetched["relationships"])
+            self._store_snapshot()
+
+    def _get_metadata(self, name: str) -> pd.DataFrame:
+        """Returns a metadata attribute, loading it on first access."""
+        if self.__metadata[name] is None:
+            self.prefetch(name)
+        return self.__metadata[name]
+
+    def _store_snapshot(self) -> None:
+        """
+        Stores the loaded metadata in the cache, if a cache is configured and the model version is known.
+
+        Storing is best-effort: the metadata is already loaded, so a cache that cannot be written only
+        makes the next run download it again.
+        """
+        if self.__cache is None or self.__version is None:
+            return
+
+        metadata = dict(self.__metadata)
+        if metadata["partitions"] is not None:
+            metadata["partitions"] = metadata["partitions"].drop(columns=list(self.VOLATILE_PARTITION_COLUMNS), errors="ignore")
+
+        try:
+            self.__cache.put(self.__dataset_id, MetadataSnapshot(
+                workspace_name=self.__workspace_name,
+                dataset_name=self.__dataset_name,
+                version=self.__version,
+                created_at=self.__created_at,
+                relationship_index=self.__relationship_index.to_frame() if self.__relationship_index is not None else None,
+                **metadata
+            ))
+        except Exception as e:
+            warnings.warn(f"Failed to store the metadata snapshot in the cache: {e}")
+
+    def invalidate_cache(self) -> None:
+        """
+        Removes the cached metadata snapshot of the dataset, if a cache is configured.
+
+        Returns:
+            None
+        """
+        if self.__cache is not None:
+            self.__cache.invalidate(self.__dataset_id)
+        # Cached snapshots are keyed by the model version, which is unknown after a local change
+        self.__version = None
+        
+    @property
+    def workspace_name(self) -> str:
+        """Workspace name."""
+        return self.__workspace_name
+    
+    @property
+    def dataset_name(self) -> str:
+        """Dataset name."""
+        return self.__dataset_name
+    
+    @property
+    def workspace_id(self) -> str:
+        """Workspace identifier."""
+        return self.__workspace_id
+    
+    @property
+    def dataset_id(self) -> str:
+        """Dataset identifier."""
+        return self.__dataset_id
+    
+    @property
+    def tables(self) -> pd.DataFrame:
+        """DataFrame with tables and columns information."""
+        return self._get_metadata("tables").copy(deep=False)
+    
+    @property
+    def partitions(self) -> pd.DataFrame:
+        """DataFrame with partitions information."""
+        return self._get_metadata("partitions").copy(deep=False)
+    
+    @property
+    def relationships(self) -> pd.DataFrame:
+        """DataFrame with relationships information."""
+        return self._get_metadata("relationships").copy(deep=False)
+
+    @property
+    def partition_catalog(self) -> PartitionCatalog:
+        """Indexed catalog of partitions."""
+        with self.__lock:
+            if self.__partition_catalog is None:
+                self.__partition_catalog = PartitionCatalog(self._get_metadata("partitions"))
+            return self.__partition_catalog
+
+    @property
+    def relationship_index(self) -> RelationshipIndex:
+        """Transitive closure of the relationships."""
+        with self.__lock:
+            if self.__relationship_index is None:
+                self.__relationship_index = RelationshipIndex(self._get_metadata("relationships"))
+            return self.__relationship_index
+    
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Groups partition writes in a single TOM session that is committed once.
+
+        Within the block, create_m_partitions() and delete_default_partition() queue their changes in the
+        same session instead of saving the model on each call. The session is opened on the first write and
+        saved when the block exits. If any error is raised inside the block or while saving, all queued
+        changes are rolled back. Nested batches join the outermost one.
+
+        Yields:
+            None
+
+        Raises:
+            RuntimeError: If the batched changes cannot be committed.
+        """
+        if self.__batch is not None:
+            yield
+            return
+
+        self.__batch = ExitStack()
+        try:
+            try:
+                yield
+            except BaseException:
+                # The session saves on close, so local changes are discarded first
+                if self.__tom is not None:
+                    self.__tom.model.UndoLocalChanges()
+                self.__batch.close()
+                raise
+
+            try:
+                with span("dataset.tom_save", added=sum(len(p) for p in self.__batch_added), removed=len(self.__batch_removed)):
+                    self.__batch.close()
+            except Exception as e:
+                if self.__batch_added or self.__batch_removed:
+                    # The save failed, so partitions are fetched again on next access
+                    self.invalidate_cache()
+                    self._set_partitions(None)
+                raise RuntimeError(f"Failed to commit batched changes: {e}") from e
+
+            if self.__batch_added or self.__batch_removed:
+                self.invalidate_cache()
+                for partitions in self.__batch_added:
+                    self._add_partitions_to_catalog(partitions)
+                self._remove_partitions_from_catalog(self.__batch_removed)
+        finally:
+            self.__batch = None
+            self.__tom = None
+            self.__batch_added = []
+            self.__batch_removed = []
+
+    def _get_tom(self):
+        """Returns the TOM session of the current batch, opening it on first use."""
+        if self.__tom is None:
+            self.__tom = self.__batch.enter_context(
+                tom.connect_semantic_model(dataset=self.__dataset_name, readonly=False, workspace=self.__workspace_name)
+            )
+        return self.__tom
+
+    def create_m_partitions(self, partitions: pd.DataFrame) -> None:
+        """
+        Creates M partitions in the semantic model.
+
+        When called inside batch(), partitions are queued in the batch session and created on commit.
+
+        Args:
+            partitions (pd.DataFrame): Partitions information with columns: ['table_name', 'partition_name', 'query_definition']
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If required columns are missing from the DataFrame.
+            RuntimeError: If partitions cannot be created.
+        """
+        required_columns = {'table_name', 'partition_name', 'query_definition'}
+        missing = required_columns - set(partitions.columns)
+        if missing:
+            raise ValueError(f"Missing required columns to create M partitions: {missing}")
+        
+        try:
+            with self.batch():
+                tom = self._get_tom()
+                for row in partitions.itertuples():
+                    tom.add_m_partition(
+                        table_name=row.table_name,
+                        partition_name=row.partition_name,
+                        expression=row.query_definition,
+                        mode="Import"
+                    )
+                self.__batch_added.append(partitions[list(required_columns)].copy())
+        except Exception as e:
+            raise RuntimeError(f"Failed to create M partitions: {e}") from e
+
+    def delete_default_partition(self, table: str) -> None:
+        """
+        Deletes the default partition for a table.
+
+        When called inside batch(), the deletion is queued in the batch session and applied on commit.
+
+        Args:
+            table (str): The table name.
+
+        Returns:
+            None
+        """
+        self.delete_partitions([(table, table)])
+
+    def delete_partitions(self, partitions: list[tuple[str, str]]) -> None:
+        """
+        Deletes partitions from the semantic model in a single operation.
+
+        When called inside batch(), the deletions are queued in the batch session and applied on commit.
+        Otherwise, they are applied in a single TMSL sequence.
+
+        Args:
+            partitions (list[tuple[str, str]]): List of (table_name, partition_name) pairs.
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: If partitions cannot be deleted.
+        """
+        partitions = list(partitions)
+        if not partitions:
+            return
+
+        if self.__batch is not None:
+            tom = self._get_tom()
+            for table, partition in partitions:
+                tom.remove_object(tom.model.Tables[table].Partitions[partition])
+            self.__batch_removed.extend(partitions)
+            return
+
+        tmsl_script = {
+            "sequence": {
+                "operations": [
+                    {
+                        "delete": {
+                            "object": {
+                                "database": self.__dataset_name,
+                                "table": table,
+                                "partition": partition
+                            }
+                        }
+                    }
+                    for table, partition in partitions
+                ]
+            }
+        }
+
+        try:
+            with span("dataset.tmsl_delete", partitions=len(partitions)) as s:
+                if is_enabled():
+                    s.set(payload_bytes=payload_size(tmsl_script))
+                fabric.execute_tmsl(workspace=self.__workspace_id, script=tmsl_script)
+        except Exception as e:
+            raise RuntimeError(f"Failed to delete partitions: {e}") from e
+        finally:
+            self.invalidate_cache()
+
+        self._remove_partitions_from_catalog(partitions)
+
+    def compact_partitions(self, compactions: pd.DataFrame, max_parallelism: Optional[int] = None) -> None:
+        """
+        Replaces partitions with merged partitions in a single transaction.
+
+        Merged partitions are created and refreshed, and the partitions they replace are deleted, in one
+        TMSL sequence. Either all changes are applied or none, so the data of the merged periods is never
+        missing or duplicated. Merged partitions that already exist are refreshed instead of created.
+
+        Args:
+            compactions (pd.DataFrame): Compactions with columns: ['table_name', 'partition_name', 'query_definition', 'originals'],
+                where 'originals' lists the names of the partitions replaced by each merged partition and
+                'query_definition' is None for merged partitions that already exist.
+            max_parallelism (Optional[int]): The maximum number of threads used to refresh the merged partitions.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If required columns are missing from the DataFrame.
+            RuntimeError: If called inside batch() or if the compaction fails.
+        """
+        required_columns = {'table_name', 'partition_name', 'query_definition', 'originals'}
+        missing = required_columns - set(compactions.columns)
+        if missing:
+            raise ValueError(f"Missing required columns to compact partitions: {missing}")
+        if self.__batch is not None:
+            raise RuntimeError("Partitions cannot be compacted inside a batch.")
+        if compactions.empty:
+            return
+
+        database = self.__dataset_name
+        created = compactions[compactions["query_definition"].notna()]
+        removed = [(row.table_name, name) for row in compactions.itertuples() for name in row.originals]
+
+        sequence = {
+            "operations": [
+                {
+                    "create": {
+                        "parentObject": {"database": database, "table": row.table_name},
+                        "partition": {
+                            "name": row.partition_name,
+                            "mode": "import",
+                            "source": {"type": "m", "expression": row.query_definition}
+                        }
+                    }
+                }
+                for row in created.itertuples()
+            ] + [
+                {
+                    "refresh": {
+                        "type": "full",
+                        "objects": [
+                            {"database": database, "table": row.table_name, "partition": row.partition_name}
+                            for row in compactions.itertuples()
+                        ]
+                    }
+                }
+            ] + [
+                {"delete": {"object": {"database": database, "table": table, "partition": partition}}}
+                for table, partition in removed
+            ]
+        }
+        if max_parallelism is not None:
+            sequence["maxParallelism"] = max_parallelism
+
+        try:
+            with span("dataset.tmsl_compact", created=len(created), removed=len(removed)) as s:
+                if is_enabled():
+                    s.set(payload_bytes=payload_size({"sequence": sequence}))
+                fabric.execute_tmsl(workspace=self.__workspace_id, script={"sequence": sequence})
+        except Exception as e:
+            raise RuntimeError(f"Failed to compact partitions: {e}") from e
+        finally:
+            self.invalidate_cache()
+
+        self._remove_partitions_from_catalog(removed)
+        self._add_partitions_to_catalog(created)
+
+    def execute_plan(self, plan: RunPlan) -> None:
+        """
+        Runs a compiled run plan with a single TMSL call.
+
+        All partition changes and the refresh are applied in one server-side transaction, so either the
+        whole plan is applied or nothing changes.
+
+        Args:
+            plan (RunPlan): Plan to run, compiled for this dataset.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If the plan was compiled for another dataset.
+            RuntimeError: If called inside batch() or if the plan fails.
+        """
+        if plan.database != self.__dataset_name:
+            raise ValueError(f"Plan compiled for dataset '{plan.database}' cannot run on '{self.__dataset_name}'.")
+        if self.__batch is not None:
+            raise RuntimeError("Plans cannot be executed inside a batch.")
+        if plan.empty:
+            return
+
+        try:
+            script = plan.to_tmsl()
+            with span(
+                "dataset.tmsl_plan",
+                operations=len(script["sequence"]["operations"]),
+                added=len(plan.changes.added),
+                removed=len(plan.changes.removed),
+                refreshed=len(plan.refresh_objects)
+            ) as s:
+                if is_enabled():
+                    s.set(payload_bytes=payload_size(script))
+                fabric.execute_tmsl(workspace=self.__workspace_id, script=script)
+        except Exception as e:
+            raise RuntimeError(f"Failed to execute run plan: {e}") from e
+        finally:
+            if not plan.changes.empty:
+                self.invalidate_cache()
+
+        if not plan.changes.empty:
+            self._remove_partitions_from_catalog(plan.changes.removed)
+            self._add_partitions_to_catalog(plan.changes.added)
+
+    def _add_partitions_to_catalog(self, partitions: pd.DataFrame) -> None:
+        """
+        Adds newly created M partitions to the in-memory partitions catalog.
+
+        Args:
+            partitions (pd.DataFrame): Partitions information with columns: ['table_name', 'partition_name', 'query_definition']
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            current = self.__metadata["partitions"]
+            if current is None:
+                return
+
+            new_rows = pd.DataFrame({
+                "table_name": partitions["table_name"].values,
+                "partition_name": partitions["partition_name"].values,
+                "query": partitions["query_definition"].values,
+                "mode": "Import",
+            })
+            new_rows = new_rows[[c for c in new_rows.columns if c in current.columns]]
+            self._set_partitions(pd.concat([current, new_rows], ignore_index=True))
+
+    def _remove_partitions_from_catalog(self, partitions: list[tuple[str, str]]) -> None:
+        """
+        Removes deleted partitions from the in-memory partitions catalog.
+
+        Args:
+            partitions (list[tuple[str, str]]): List of (table_name, partition_name) pairs.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            current = self.__metadata["partitions"]
+            if current is None:
+                return
+
+            removed = set(partitions)
+            keys = zip(current["table_name"].tolist(), current["partition_name"].tolist())
+            kept = np.fromiter((key not in removed for key in keys), dtype=bool, count=len(current))
+            self._set_partitions(current[kept].reset_index(drop=True))
+
+    def _set_partitions(self, partitions: Optional[pd.DataFrame]) -> None:
+        """Replaces the in-memory partitions, resetting the partition catalog built from them."""
+        with self.__lock:
+            self.__metadata["partitions"] = partitions
+            self.__partition_catalog = None
+
+    @staticmethod
+    def extract_query_definition(query: str) -> tuple[str, str]:
+        """
+        Extracts the base query and last step name from a partition query definition.
+
+        Args:
+            query (str): The partition query definition in M language.
+
+        Returns:
+            tuple[str, str]: Tuple of (base_query, last_step_name)
+
+        Raises:
+            ValueError: If query format is invalid or required elements not found.
+        """
+        if not query or not isinstance(query, str):
+            raise ValueError("Query must be a non-empty string.")
+
+        # Find the 'in' keyword line
+        m = re.search(r'\n[ \t]*in[ \t]*\n', query)
+        idx = m.start()
+
+        lines = query[:idx].splitlines()
+        # Regex to identify partition definition lines. The pattern matches lines like:
+        #    TableName_YYYYMMDD_YYYYMMDD =
+        partition_line_regex = r'^\s*\w+_\d{8}_\d{8}\s*='
+
+        filtered_lines = []
+        for line in lines:
+            if re.match(partition_line_regex, line):
+                # Remove comma from previous line if present
+                if filtered_lines and filtered_lines[-1].endswith(','):
+                    filtered_lines[-1] = filtered_lines[-1][:-1]
+                continue
+            filtered_lines.append(line)
+
+        base_query = '\n'.join(filtered_lines)
+        last_step = filtered_lines[-1].lstrip().split(' ')[0]
+
+        return base_query, last_step
+
+    def get_related_tables(self, tables: list[str]) -> pd.DataFrame:
+        """
+        Gets all related tables (ancestors and specified tables) for refresh.
+
+        Args:
+            tables (list[str]): List of table names to refresh.
+
+        Returns:
+            pd.DataFrame: DataFrame with all related tables for refresh.
+        """
+        return pd.DataFrame({"table_name": self.relationship_index.related(tables)})
+
+    def refresh_objects(
+            self, 
+            df: pd.DataFrame, 
+            commit_mode: Optional[str] = "transactional", 
+            max_parallelism: Optional[Union[int, str]] = 4
+        ) -> str:
+        """
+        Refresh specified objects in the dataset.
+
+        If the dataset has a refresh history, objects are submitted longest-first. This is only a hint on
+        the submission order: the service still decides which of the max_parallelism threads processes each
+        object. To balance the load across requests, use refresh_objects_sharded() with ShardBy.SIZE.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] specifying objects to refresh.
+            commit_mode (str): Determines if objects will be committed in batches or only when complete.
+            max_parallelism (Union[int, str]): The maximum number of threads on which to run parallel processing
+                commands, or 'AUTO' to let the tuner choose it from the recorded runs (see tune_parallelism()).
+
+        Returns:
+            str: Refresh request identifier (UUID string) to track refresh progress. Use this identifier with
+                 check_refresh_status() to monitor the refresh operation status.
+
+        Raises:
+            ValueError: If DataFrame is empty or missing required columns.
+            TypeError: If input is not a DataFrame.
+            RuntimeError: If max_parallelism is 'AUTO' and the dataset has no refresh history.
+        """
+        self._validate_refresh_request(df, commit_mode, max_parallelism)
+
+        if is_auto_parallelism(max_parallelism):
+            max_parallelism = self.tune_parallelism(df)
+
+        if self.__history is not None:
+            df = self._order_longest_first(df)
+
+        objects = self._refresh_payload(df)
+
+        with span("dataset.refresh_submit", objects=len(objects), max_parallelism=max_parallelism, commit_mode=commit_mode) as s:
+            if is_enabled():
+                s.set(payload_bytes=payload_size(objects))
+            refresh_request_id = fabric.refresh_dataset(
+                workspace=self.__workspace_id,
+                dataset=self.__dataset_id,
+                objects=objects,
+                refresh_type="full",
+                apply_refresh_policy=False,
+                commit_mode=commit_mode,
+                max_parallelism=max_parallelism
+            )
+            s.set(refresh_request_id=refresh_request_id)
+
+        if self.__history is not None and refresh_request_id:
+            # The run is recorded when the refresh finishes, so the tuner learns its throughput
+            run = {
+                "max_parallelism": max_parallelism,
+                "objects": len(df),
+                "size": float(self._get_object_sizes(df).sum()),
+            }
+            # Polling of the request sleeps through most of its expected duration
+            expected_duration = self._expected_request_duration(df, max_parallelism)
+            with self.__lock:
+                self.__runs[refresh_request_id] = run
+                if expected_duration is not None:
+                    self.__expected_durations[refresh_request_id] = expected_duration
+
+        return refresh_request_id
+
+    def _expected_request_duration(self, df: pd.DataFrame, max_parallelism: int) -> Optional[float]:
+        """
+        Estimates the duration of a refresh request from the refresh history.
+
+        The service refreshes max_parallelism objects at a time, so a request takes about the sum of the
+        expected durations of its objects divided by its parallelism, and never less than its longest object.
+        Objects without history take the median duration of the objects with history.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] of the objects of the request.
+            max_parallelism (int): Max parallelism of the request.
+
+        Returns:
+            Optional[float]: Expected duration in seconds, or None if no object of the request has history.
+        """
+        if self.__history is None:
+            return None
+
+        durations = self.__history.expected_durations(self.__dataset_id, df)
+        known = durations.notna()
+        if not known.any():
+            return None
+
+        durations = durations.fillna(durations[known].median())
+        return float(max(durations.sum() / max(int(max_parallelism), 1), durations.max()))
+
+    def tune_parallelism(self, df: pd.DataFrame) -> int:
+        """
+        Chooses the max parallelism of a refresh request from the runs recorded in the refresh history.
+
+        Each request moves the parallelism toward the fastest level that is not throttled, within the
+        ceiling of the tuner and the effective number of objects of the request.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] specifying objects to refresh.
+
+        Returns:
+            int: Max parallelism of the request.
+
+        Raises:
+            RuntimeError: If the dataset has no refresh history.
+        """
+        if self.__history is None:
+            raise RuntimeError("Dataset has no refresh history. Max parallelism cannot be tuned.")
+
+        return self.__tuner.choose(self.__history.load_runs(self.__dataset_id), self._get_object_costs(df))
+
+    def wait_and_retry(
+            self,
+            refresh_request_id: str,
+            commit_mode: Optional[str] = "partialBatch",
+            max_parallelism: Optional[Union[int, str]] = 4,
+            max_retries: int = 3,
+            retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+            timeout: int = 7200,
+            on_progress: Optional[Callable[[RefreshEvent], None]] = None,
+            cancel_on_failure: bool = False
+        ) -> RefreshOutcome:
+        """
+        Waits for a refresh operation and resubmits the objects that did not complete.
+
+        In partialBatch mode the objects that completed are committed even if others fail, so only the
+        objects that did not complete are resubmitted, in a new refresh request, until all of them complete
+        or max_retries is reached. The wait before each retry starts at retry_backoff seconds and doubles
+        on each retry, so transient source errors have time to clear.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to wait for.
+            commit_mode (str): Commit mode of the refresh request, also used for the retries.
+            max_parallelism (Union[int, str]): Max parallelism of the retries, or 'AUTO' to tune it.
+            max_retries (int): Maximum number of retries.
+            retry_backoff (float): Seconds to wait before the first retry, doubled on each retry.
+            timeout (int, optional): Maximum time to wait for each request in seconds. Defaults to 7200 (2 hours).
+            on_progress (Optional[Callable[[RefreshEvent], None]]): Function called with each status change of the
+                requests and their objects.
+            cancel_on_failure (bool): Whether to cancel each request as soon as one of its objects fails.
+
+        Returns:
+            RefreshOutcome: Final status and number of attempts of each object.
+
+        Raises:
+            ValueError: If max_retries is negative or retries are requested for a transactional refresh.
+            TimeoutError: If a refresh operation does not complete within the timeout period.
+            RuntimeError: If unable to retrieve refresh status from the API.
+        """
+        return run_sync(self.wait_and_retry_async(
+            refresh_request_id, commit_mode, max_parallelism, max_retries, retry_backoff,
+            timeout, on_progress, cancel_on_failure
+        ))
+
+    async def wait_and_retry_async(
+            self,
+            refresh_request_id: str,
+            commit_mode: Optional[str] = "partialBatch",
+            max_parallelism: Optional[Union[int, str]] = 4,
+            max_retries: int = 3,
+            retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+            timeout: int = 7200,
+            on_progress: Optional[Callable[[RefreshEvent], None]] = None,
+            cancel_on_failure: bool = False
+        ) -> RefreshOutcome:
+        """
+        Asynchronous version of wait_and_retry(), so several refresh requests can be waited for in one event loop.
+
+        Blocking calls to the service run in worker threads. See wait_and_retry() for the arguments.
+
+        Returns:
+            RefreshOutcome: Final status and number of attempts of each object.
+        """
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError("Max retries value must be a non-negative integer.")
+        if max_retries > 0 and str(commit_mode).lower() != "partialbatch":
+            # Nothing of a failed transactional refresh is committed, so its completed objects would be lost
+            raise ValueError("Failed objects can only be retried with the partialBatch commit mode.")
+
+        refresh_request_ids = [refresh_request_id]
+        status = await self.check_refresh_status_async(
+            refresh_request_id, timeout, on_progress=on_progress, cancel_on_failure=cancel_on_failure
+        )
+        objects = (await asyncio.to_thread(self.get_object_statuses, refresh_request_id)).assign(attempts=1).set_index(["table", "partition"])
+
+        for attempt in range(1, max_retries + 1):
+            pending = objects.index[objects["status"] != RefreshStatus.COMPLETED]
+            if status == RefreshStatus.COMPLETED or pending.empty:
+                break
+
+            await asyncio.sleep(retry_backoff * 2 ** (attempt - 1))
+            refresh_request_id = await asyncio.to_thread(
+                self.refresh_objects, pending.to_frame(index=False), commit_mode, max_parallelism
+            )
+            refresh_request_ids.append(refresh_request_id)
+            status = await self.check_refresh_status_async(
+                refresh_request_id, timeout, on_progress=on_progress, cancel_on_failure=cancel_on_failure
+            )
+
+            retried = (await asyncio.to_thread(self.get_object_statuses, refresh_request_id)).set_index(["table", "partition"])["status"]
+            objects.loc[pending, "status"] = retried.reindex(pending).fillna(status).to_numpy()
+            objects.loc[pending, "attempts"] += 1
+
+        objects = objects.reset_index()
+        if not objects.empty and (objects["status"] == RefreshStatus.COMPLETED).all():
+            status = RefreshStatus.COMPLETED
+        return RefreshOutcome(str(status), objects, refresh_request_ids)
+
+    def _record_run(self, refresh_request_id: str, status: str, details: Optional[object] = None) -> None:
+        """
+        Records a finished refresh request submitted by this dataset in the run history.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            status (str): Final status of the refresh request.
+            details (Optional[object]): Execution details of the refresh, used to get its duration.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            run = self.__runs.pop(refresh_request_id, None)
+        if run is None or self.__history is None:
+            return
+
+        start_time = pd.to_datetime(getattr(details, "start_time", None), utc=True)
+        end_time = pd.to_datetime(getattr(details, "end_time", None), utc=True)
+        duration = (end_time - start_time).total_seconds() if not (pd.isna(start_time) or pd.isna(end_time)) else np.nan
+
+        self.__history.record_run(self.__dataset_id, pd.DataFrame([{
+            "refresh_request_id": refresh_request_id,
+            **run,
+            "duration": duration,
+            "status": status,
+            "recorded_at": time.time(),
+        }]))
+
+    @staticmethod
+    def _refresh_payload(df: pd.DataFrame) -> list[dict[str, str]]:
+        """
+        Builds the objects of a refresh request.
+
+        Table-level objects (empty or missing partition, as reported by get_object_statuses()) are sent
+        without a partition key, so the service refreshes the whole table instead of a partition named ''.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'].
+
+        Returns:
+            list[dict[str, str]]: Objects of the request.
+        """
+        return [
+            {"table": table} if pd.isna(partition) or partition == "" else {"table": table, "partition": partition}
+            for table, partition in zip(df["table"], df["partition"])
+        ]
+
+    @staticmethod
+    def _validate_refresh_request(df: pd.DataFrame, commit_mode: Optional[str], max_parallelism: Optional[Union[int, str]]) -> None:
+        """
+        Validates the arguments of a refresh request.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] specifying objects to refresh.
+            commit_mode (str): Determines if objects will be committed in batches or only when complete.
+            max_parallelism (Union[int, str]): The maximum number of threads on which to run parallel processing commands, or 'AUTO'.
+
+        Returns:
+            None
+
+        Raises:
+            ValueError: If DataFrame is empty or missing required columns, or if options are invalid.
+            TypeError: If input is not a DataFrame.
+        """
+        # Validate input DataFrame
+        if not isinstance(df, pd.DataFrame):
+            raise TypeError(f"Expected pd.DataFrame, got {type(df).__name__}")
+        if df.empty:
+            raise ValueError("DataFrame cannot be empty")
+        
+        required_columns = {'table', 'partition'}
+        missing = required_columns - set(df.columns)
+        if missing:
+            raise ValueError(f"Missing required columns: {missing}")
+        
+        # Validate commit mode
+        available_commit_modes = {"transactional", "partialBatch"}
+        if commit_mode not in available_commit_modes:
+            raise ValueError(f"Invalid commit mode '{commit_mode}'. Available modes: {available_commit_modes}")
+        
+        # Validate max parallelism
+        if is_auto_parallelism(max_parallelism):
+            return
+        if not isinstance(max_parallelism, int) or max_parallelism <= 0:
+            raise ValueError("Max parallelism value must be a positive integer or 'AUTO'.")
+
+    def refresh_objects_sharded(
+            self,
+            df: pd.DataFrame,
+            shards: int,
+            shard_by: str = ShardBy.TABLE,
+            commit_mode: Optional[str] = "transactional",
+            max_parallelism: Optional[Union[int, str]] = 4,
+            max_concurrent_requests: int = 1,
+            timeout: int = 7200,
+            on_progress: Optional[Callable[[RefreshEvent], None]] = None,
+            cancel_on_failure: bool = False,
+            max_retries: int = 0,
+            retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+            on_change: Optional[Callable[[RefreshShard], None]] = None,
+            slot: Optional[Callable[[], ContextManager[Any]]] = None
+        ) -> ShardedRefresh:
+        """
+        Refresh specified objects in the dataset, split into several refresh requests.
+
+        Each shard is a separate refresh request, so a failing or slow object only affects its own shard.
+        Shards are submitted in the background. The service accepts one refresh operation at a time per
+        dataset, so shards rejected because another refresh is in progress are resubmitted when it ends.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] specifying objects to refresh.
+            shards (int): Maximum number of refresh requests.
+            shard_by (str): Strategy used to split objects ('TABLE', 'SIZE', 'COUNT'). SIZE uses the expected
+                duration of each object if the dataset has a refresh history, and its record count otherwise.
+            commit_mode (str): Determines if objects will be committed in batches or only when complete.
+            max_parallelism (Union[int, str]): The maximum number of threads on which to run parallel processing commands
+                within each refresh request, or 'AUTO' to tune it for each refresh request.
+            max_concurrent_requests (int): Maximum number of refresh requests running at the same time.
+            timeout (int, optional): Maximum time to wait for each shard in seconds. Defaults to 7200 (2 hours).
+            on_progress (Optional[Callable[[RefreshEvent], None]]): Function called with each status change of
+                the shards and their objects (see check_refresh_status()).
+            cancel_on_failure (bool): Whether to cancel a shard as soon as one of its objects fails.
+            max_retries (int): Maximum number of times the objects of a shard that did not complete are resubmitted
+                (see wait_and_retry()). Only for the partialBatch commit mode.
+            retry_backoff (float): Seconds to wait before the first retry, doubled on each retry.
+            on_change (Optional[Callable[[RefreshShard], None]]): Function called when a shard is submitted and
+                when it finishes, e.g. to checkpoint the refresh.
+            slot (Optional[Callable[[], ContextManager[Any]]]): Function that returns a context manager held while
+                each shard is submitted and runs, e.g. a slot of fanout.RefreshSlots shared with other datasets.
+
+        Returns:
+            ShardedRefresh: Aggregated handle that reports the status of each shard.
+
+        Raises:
+            ValueError: If DataFrame is empty or missing required columns, or if options are invalid.
+            TypeError: If input is not a DataFrame.
+        """
+        self._validate_refresh_request(df, commit_mode, max_parallelism)
+
+        objects = df[["table", "partition"]]
+        sizes = self._get_object_costs(objects) if str(shard_by).upper() == ShardBy.SIZE else None
+
+        return ShardedRefresh(
+            split_refresh_objects(objects, shards, shard_by, sizes),
+            submit=lambda shard: self.refresh_objects(shard, commit_mode, max_parallelism),
+            wait_for=functools.partial(
+                self._wait_for_request, commit_mode=commit_mode, max_parallelism=max_parallelism, timeout=timeout,
+                on_progress=on_progress, cancel_on_failure=cancel_on_failure, max_retries=max_retries,
+                retry_backoff=retry_backoff
+            ),
+            max_concurrent_requests=max_concurrent_requests,
+            timeout=timeout,
+            on_change=on_change,
+            slot=slot
+        )
+
+    def refresh_objects_in_waves(
+            self,
+            df: pd.DataFrame,
+            commit_mode: Optional[str] = "transactional",
+            max_parallelism: Optional[Union[int, str]] = 4,
+            max_concurrent_requests: int = 1,
+            timeout: int = 7200,
+            on_progress: Optional[Callable[[RefreshEvent], None]] = None,
+            cancel_on_failure: bool = False,
+            max_retries: int = 0,
+            retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+            on_change: Optional[Callable[[RefreshShard], None]] = None,
+            slot: Optional[Callable[[], ContextManager[Any]]] = None
+        ) -> ShardedRefresh:
+        """
+        Refresh specified objects in the dataset in dependency order, one refresh request per wave.
+
+        Tables are split into the topological levels of the relationships (dimensions before the facts
+        that reference them). Each wave is a refresh request with the full max_parallelism, and it is
+        submitted as soon as the waves holding the tables it depends on complete. If one of them fails,
+        the wave is skipped.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] specifying objects to refresh.
+            commit_mode (str): Determines if objects will be committed in batches or only when complete.
+            max_parallelism (Union[int, str]): The maximum number of threads on which to run parallel processing commands
+                within each wave, or 'AUTO' to tune it for each wave.
+            max_concurrent_requests (int): Maximum number of refresh requests running at the same time.
+            timeout (int, optional): Maximum time to wait for each wave in seconds. Defaults to 7200 (2 hours).
+            on_progress (Optional[Callable[[RefreshEvent], None]]): Function called with each status change of
+                the waves and their objects (see check_refresh_status()).
+            cancel_on_failure (bool): Whether to cancel a wave as soon as one of its objects fails. The waves
+                that depend on it are skipped.
+            max_retries (int): Maximum number of times the objects of a wave that did not complete are resubmitted
+                (see wait_and_retry()). Only for the partialBatch commit mode.
+            retry_backoff (float): Seconds to wait before the first retry, doubled on each retry.
+            on_change (Optional[Callable[[RefreshShard], None]]): Function called when a wave is submitted and
+                when it finishes, e.g. to checkpoint the refresh.
+            slot (Optional[Callable[[], ContextManager[Any]]]): Function that returns a context manager held while
+                each wave is submitted and runs, e.g. a slot of fanout.RefreshSlots shared with other datasets.
+
+        Returns:
+            ShardedRefresh: Aggregated handle that reports the status of each wave.
+
+        Raises:
+            ValueError: If DataFrame is empty or missing required columns, or if options are invalid.
+            TypeError: If input is not a DataFrame.
+        """
+        self._validate_refresh_request(df, commit_mode, max_parallelism)
+
+        objects = df[["table", "partition"]].reset_index(drop=True)
+        index = self.relationship_index
+        levels = index.levels(objects["table"])
+        wave_of = {table: wave for wave, tables in enumerate(levels) for table in tables}
+
+        # A wave waits for the waves of the tables its own tables depend on
+        prerequisites = [
+            sorted({
+                wave_of[related] for table in tables for related in index.related([table])
+                if related in wave_of and wave_of[related] < wave
+            })
+            for wave, tables in enumerate(levels)
+        ]
+        waves = [objects[objects["table"].isin(tables)].reset_index(drop=True) for tables in levels]
+
+        return ShardedRefresh(
+            waves,
+            submit=lambda wave: self.refresh_objects(wave, commit_mode, max_parallelism),
+            wait_for=functools.partial(
+                self._wait_for_request, commit_mode=commit_mode, max_parallelism=max_parallelism, timeout=timeout,
+                on_progress=on_progress, cancel_on_failure=cancel_on_failure, max_retries=max_retries,
+                retry_backoff=retry_backoff
+            ),
+            max_concurrent_requests=max_concurrent_requests,
+            timeout=timeout,
+            prerequisites=prerequisites,
+            on_change=on_change,
+            slot=slot
+        )
+
+    async def _wait_for_request(
+            self,
+            refresh_request_id: str,
+            commit_mode: Optional[str],
+            max_parallelism: Optional[Union[int, str]],
+            timeout: int,
+            on_progress: Optional[Callable[[RefreshEvent], None]],
+            cancel_on_failure: bool,
+            max_retries: int,
+            retry_backoff: float
+        ) -> Union[str, RefreshOutcome]:
+        """Waits for a refresh request of a sharded refresh, retrying its failed objects if retries are enabled."""
+        if max_retries > 0:
+            return await self.wait_and_retry_async(
+                refresh_request_id, commit_mode, max_parallelism, max_retries, retry_backoff,
+                timeout, on_progress, cancel_on_failure
+            )
+        return await self.check_refresh_status_async(
+            refresh_request_id, timeout, on_progress=on_progress, cancel_on_failure=cancel_on_failure
+        )
+
+    def _get_object_sizes(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Gets the record count of each refresh object.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'].
+
+        Returns:
+            pd.Series: Record count of each object, aligned with df. Objects of unknown size count as one record.
+        """
+        partitions = self._get_record_counts()
+        if "record_count" not in partitions.columns:
+            return pd.Series(1.0, index=df.index)
+
+        sizes = df.merge(
+            partitions[["table_name", "partition_name", "record_count"]],
+            left_on=["table", "partition"],
+            right_on=["table_name", "partition_name"],
+            how="left"
+        )["record_count"]
+        return pd.Series(pd.to_numeric(sizes, errors="coerce").to_numpy(), index=df.index).fillna(1.0)
+
+    def _get_record_counts(self) -> pd.DataFrame:
+        """
+        Gets the partitions with their current record counts.
+
+        Record counts change with every data refresh and are not cached, so partitions served from the
+        cache are downloaded again the first time their record counts are needed.
+
+        Returns:
+            pd.DataFrame: Partitions information, with column 'record_count' if the service reports it.
+        """
+        partitions = self._get_metadata("partitions")
+        if "record_count" in partitions.columns:
+            return partitions
+
+        with self.__lock:
+            if self.__record_counts is None:
+                self.__record_counts = self._fetch_metadata("partitions")
+            return self.__record_counts
+
+    def _get_object_costs(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Gets the expected refresh cost of each refresh object.
+
+        The cost is the expected duration from the refresh history. Objects without history are estimated
+        from their record count and the median seconds per record of the objects with history.
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'].
+
+        Returns:
+            pd.Series: Expected cost of each object, aligned with df.
+        """
+        sizes = self._get_object_sizes(df)
+        if self.__history is None:
+            return sizes
+
+        durations = self.__history.expected_durations(self.__dataset_id, df)
+        known = durations.notna()
+        if not known.any():
+            return sizes
+
+        seconds_per_record = (durations[known] / sizes[known]).median()
+        return durations.fillna(sizes * seconds_per_record)
+
+    def _order_longest_first(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Orders refresh objects by decreasing expected cost.
+
+        The order is a submission hint within one request, not a schedule: the service assigns objects
+        to its parallel threads on its own. Balancing across requests is done by split_refresh_objects().
+
+        Args:
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'].
+
+        Returns:
+            pd.DataFrame: The same objects, longest first. Ties keep their original order.
+        """
+        costs = self._get_object_costs(df).to_numpy()
+        return df.iloc[np.argsort(-costs, kind="stable")]
+
+    def record_refresh(self, refresh_request_id: str) -> pd.DataFrame:
+        """
+        Records the duration of each object of a completed refresh in the refresh history.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+
+        Returns:
+            pd.DataFrame: Recorded durations with columns ['table', 'partition', 'duration', 'refresh_request_id', 'recorded_at'].
+
+        Raises:
+            RuntimeError: If the dataset has no refresh history.
+        """
+        if self.__history is None:
+            raise RuntimeError("Dataset has no refresh history.")
+
+        details = fabric.get_refresh_execution_details(
+            workspace=self.__workspace_id,
+            dataset=self.__dataset_id,
+            refresh_request_id=refresh_request_id
+        )
+        objects = getattr(details, "objects", None)
+        sizes = None
+        if objects is not None and not objects.empty:
+            sizes = self._get_object_sizes(
+                pd.DataFrame({"table": objects["Table"].to_numpy(), "partition": objects["Partition"].to_numpy()})
+            )
+
+        durations = parse_refresh_durations(refresh_request_id, details, sizes)
+        self.__history.record(self.__dataset_id, durations)
+        self._record_run(refresh_request_id, getattr(details, "status", "Completed"), details)
+        return durations
+
+    def get_refresh_details(self, refresh_request_id: str) -> object:
+        """
+        Gets the execution details of a refresh operation.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to check.
+
+        Returns:
+            object: Result of fabric.get_refresh_execution_details(), with the status of the refresh operation,
+                its start and end time and an objects DataFrame with the status of each object.
+        """
+        with span("dataset.refresh_poll", refresh_request_id=refresh_request_id) as s:
+            details = fabric.get_refresh_execution_details(
+                workspace=self.__workspace_id,
+                dataset=self.__dataset_id,
+                refresh_request_id=refresh_request_id
+            )
+            s.set(status=details.status)
+        return details
+
+    def get_refresh_status(self, refresh_request_id: str) -> str:
+        """
+        Gets the current status of a refresh operation.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to check.
+
+        Returns:
+            str: Current status of the refresh operation ('Unknown' while in progress).
+        """
+        return self.get_refresh_details(refresh_request_id).status
+
+    def get_object_statuses(self, refresh_request_id: str) -> pd.DataFrame:
+        """
+        Gets the status of each object of a refresh operation.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to check.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['table', 'partition', 'status']. Table-level objects have an
+                empty partition. Objects take the status of the refresh operation if the service does not
+                report theirs.
+        """
+        details = self.get_refresh_details(refresh_request_id)
+        objects: Optional[pd.DataFrame] = getattr(details, "objects", None)
+        if objects is None or objects.empty:
+            return pd.DataFrame(columns=["table", "partition", "status"])
+
+        return pd.DataFrame({
+            "table": objects["Table"].astype(str).to_numpy(),
+            "partition": objects["Partition"].fillna("").astype(str).to_numpy(),
+            "status": objects["Status"].to_numpy() if "Status" in objects.columns else details.status,
+        })
+
+    def cancel_refresh(self, refresh_request_id: str) -> None:
+        """
+        Cancels a refresh operation in progress.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to cancel.
+
+        Returns:
+            None
+        """
+        with span("dataset.refresh_cancel", refresh_request_id=refresh_request_id):
+            fabric.cancel_dataset_refresh(
+                dataset=self.__dataset_id,
+                refresh_request_id=refresh_request_id,
+                workspace=self.__workspace_id
+            )
+
+    def refresh_monitor(self, timeout: int = 7200) -> RefreshMonitor:
+        """
+        Creates an asynchronous monitor of refresh operations of the dataset.
+
+        Args:
+            timeout (int, optional): Maximum time to wait for each refresh in seconds. Defaults to 7200 (2 hours).
+
+        Returns:
+            RefreshMonitor: Monitor able to track many refresh requests concurrently.
+        """
+        return RefreshMonitor(self.get_refresh_status, timeout=timeout, get_details=self.get_refresh_details)
+
+    def follow_refresh(
+            self,
+            refresh_request_id: str,
+            timeout: int = 7200,
+            expected_duration: Optional[float] = None,
+            cancel_on_failure: bool = False
+        ) -> Iterator[RefreshEvent]:
+        """
+        Follows a refresh operation, yielding the status changes of the request and its objects as polling finds them.
+
+        With cancel_on_failure, the refresh is cancelled as soon as one of its objects fails, and its final
+        status is 'Cancelled'. In transactional mode nothing of a refresh with a failed object is committed,
+        so the remaining objects would only keep using capacity. In partialBatch mode the objects that
+        complete are committed, so cancelling discards work that would have been kept.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to follow.
+            timeout (int, optional): Maximum time to wait for completion in seconds. Defaults to 7200 (2 hours).
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+            cancel_on_failure (bool): Whether to cancel the refresh as soon as one of its objects fails.
+
+        Yields:
+            RefreshEvent: Status changes, the final status of the request last.
+
+        Raises:
+            TimeoutError: If refresh operation does not complete within the timeout period.
+            RuntimeError: If unable to retrieve refresh execution details from the API.
+        """
+        cancelled = False
+        for event in self.refresh_monitor(timeout).follow(refresh_request_id, expected_duration):
+            if cancel_on_failure and not cancelled and event.is_failure:
+                # The refresh is cancelled before the event is handed over, so a consumer that stops early cannot skip it
+                self.cancel_refresh(refresh_request_id)
+                cancelled = True
+            yield event
+
+    def check_refresh_status(
+            self,
+            refresh_request_id: str,
+            timeout: int = 7200,
+            expected_duration: Optional[float] = None,
+            on_progress: Optional[Callable[[RefreshEvent], None]] = None,
+            cancel_on_failure: bool = False
+        ) -> str:
+        """
+        Waits for a refresh operation to finish and returns its final status.
+
+        Blocking wrapper of check_refresh_status_async(): polls quickly at first and backs off as time goes by.
+        If the expected duration is known, polling sleeps through most of it instead. Requests submitted by
+        this dataset get their expected duration from the refresh history when none is given. If the dataset
+        has a refresh history, the durations of a completed refresh are recorded in it, along with the run
+        of any refresh request submitted by this dataset.
+
+        With on_progress or cancel_on_failure, the refresh is followed object by object instead (see
+        follow_refresh()).
+
+        Args:
+            refresh_request_id (str): The refresh request identifier to check.
+            timeout (int, optional): Maximum time to wait for completion in seconds. Defaults to 7200 (2 hours).
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+            on_progress (Optional[Callable[[RefreshEvent], None]]): Function called with each status change of
+                the refresh request and its objects.
+            cancel_on_failure (bool): Whether to cancel the refresh as soon as one of its objects fails.
+
+        Returns:
+            str: Final status of the refresh operation (e.g., 'Completed', 'Failed', 'Cancelled').
+
+        Raises:
+            TimeoutError: If refresh operation does not complete within the timeout period.
+            RuntimeError: If unable to retrieve refresh status from the API.
+        """
+        return run_sync(self.check_refresh_status_async(
+            refresh_request_id, timeout, expected_duration, on_progress, cancel_on_failure
+        ))
+
+    async def check_refresh_status_async(
+            self,
+            refresh_request_id: str,
+            timeout: int = 7200,
+            expected_duration: Optional[float] = None,
+            on_progress: Optional[Callable[[RefreshEvent], None]] = None,
+            cancel_on_failure: bool = False
+        ) -> str:
+        """
+        Asynchronous version of check_refresh_status(), so several refresh requests can be waited for in one event loop.
+
+        Blocking calls to the service run in worker threads. See check_refresh_status() for the arguments.
+
+        Returns:
+            str: Final status of the refresh operation (e.g., 'Completed', 'Failed', 'Cancelled').
+        """
+        if expected_duration is None:
+            with self.__lock:
+                expected_duration = self.__expected_durations.get(refresh_request_id)
+
+        monitor = self.refresh_monitor(timeout)
+        if on_progress is None and not cancel_on_failure:
+            status = await monitor.wait(refresh_request_id, expected_duration)
+        else:
+            cancelled = False
+
+            async def on_event(event: RefreshEvent) -> None:
+                nonlocal cancelled
+                if cancel_on_failure and not cancelled and event.is_failure:
+                    await asyncio.to_thread(self.cancel_refresh, refresh_request_id)
+                    cancelled = True
+                if on_progress is not None:
+                    on_progress(event)
+
+            status = await monitor.follow_async(refresh_request_id, expected_duration, on_event)
+
+        await asyncio.to_thread(self._record_finished_refresh, refresh_request_id, status)
+        return status
+
+    def _record_finished_refresh(self, refresh_request_id: str, status: str) -> None:
+        """Records a finished refresh request in the refresh history, if the dataset has one."""
+        with self.__lock:
+            self.__expected_durations.pop(refresh_request_id, None)
+
+        if self.__history is not None and status == "Completed":
+            try:
+                self.record_refresh(refresh_request_id)
+            except Exception as e:
+                # The refresh itself succeeded, a missing sample only affects scheduling of later refreshes
+                warnings.warn(f"Failed to record refresh durations: {e}")
+        elif self.__history is not None:
+            try:
+                # Failed runs mark their parallelism as throttled for the tuner
+                self._record_run(refresh_request_id, status)
+            except Exception as e:
+                warnings.warn(f"Failed to record refresh run: {e}")
@@ -0,0 +1,498 @@
+"""
+Fake module for fabtoolkit.
+
+This module provides:
+- Synthetic semantic models of any size: tables, partitions and relationships
+- In-memory stand-in of the sempy.fabric and sempy_labs.tom calls used by Dataset, with
+  configurable latency, failures and refresh durations
+- Installation of the fake backend in place of the real one
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+import random
+import threading
+import time
+from typing import Any, Callable, Iterator, Mapping, Optional, Union
+import uuid
+import numpy as np
+import pandas as pd
+import fabtoolkit.dataset as dataset_module
+from fabtoolkit.dataset import PartitionQueryTemplate
+from fabtoolkit.utils import Constants
+
+# ============================================================================
+# SYNTHETIC MODEL
+# ============================================================================
+
+# Date column of the fact tables, used to partition them
+FACT_DATE_COLUMN: str = "Order Date"
+
+def _base_query(table: str) -> str:
+    """Returns the M query of the default partition of a table."""
+    return (
+        "let\n"
+        "    Source = Sql.Database(\"server\", \"warehouse\"),\n"
+        f"    Data = Source{{[Schema=\"dbo\",Item=\"{table}\"]}}[Data]\n"
+        "in\n"
+        "    Data"
+    )
+
+@dataclass
+class FakeModel:
+    """Data class representing the metadata of a semantic model, with the column names used by sempy.fabric.
+
+    Attributes:
+        name (str): Name of the semantic model.
+        tables (pd.DataFrame): Columns of each table with columns: ['Table Name', 'Column Name'].
+        partitions (pd.DataFrame): Partitions with columns: ['Table Name', 'Partition Name', 'Query', 'Record Count'].
+        relationships (pd.DataFrame): Relationships with columns: ['From Table', 'To Table'].
+        version (int): Counter increased on every structural change of the model.
+    """
+
+    name: str
+    tables: pd.DataFrame
+    partitions: pd.DataFrame
+    relationships: pd.DataFrame
+    version: int = 0
+
+    @classmethod
+    def generate(
+        cls,
+        tables: int = 100,
+        partitions: int = 1_000,
+        fact_share: float = 0.1,
+        columns: int = 5,
+        seed: int = 0,
+        name: str = "Model"
+    ) -> "FakeModel":
+        """
+        Generates a star-like semantic model.
+
+        A share of the tables are fact tables partitioned by month on 'Order Date'. Partitions are
+        spread evenly across them and end in the current month. The rest are dimensions with a single
+        default partition. Each fact table relates to three dimensions and some dimensions relate to
+        other dimensions, so related tables form chains of several levels.
+
+        Args:
+            tables (int): Number of tables.
+            partitions (int): Approximate number of partitions of the fact tables.
+            fact_share (float): Share of the tables that are fact tables.
+            columns (int): Number of columns of each table, besides its key and date columns.
+            seed (int): Seed of the random generator.
+            name (str): Name of the semantic model.
+
+        Returns:
+            FakeModel: The generated model.
+
+        Raises:
+            ValueError: If there are less than two tables or the number of partitions is not positive.
+        """
+        if tables < 2:
+            raise ValueError("A fake model needs at least two tables.")
+        if partitions <= 0:
+            raise ValueError("Number of partitions must be a positive integer.")
+
+        rng = np.random.default_rng(seed)
+        names = [f"Table{i:05d}" for i in range(tables)]
+        n_facts = min(max(1, round(tables * fact_share)), tables - 1)
+        facts, dimensions = names[:n_facts], names[n_facts:]
+
+        # Tables and columns
+        table_columns = pd.DataFrame({
+            "Table Name": np.repeat(names, columns + 2),
+            "Column Name": np.tile(["Id", FACT_DATE_COLUMN] + [f"Column{c}" for c in range(columns)], tables)
+        })
+
+        # Monthly partitions of the fact tables, ending in the current month
+        months_per_fact = max(1, partitions // n_facts)
+        current_month = np.datetime64(pd.Timestamp.today().strftime("%Y-%m"), "M")
+        months = current_month - np.arange(months_per_fact)[::-1]
+        starts = months.astype("datetime64[D]")
+        ends = (months + 1).astype("datetime64[D]") - 1
+        start_names = pd.Series(starts).dt.strftime(Constants.DATE_FORMAT).to_numpy()
+        end_names = pd.Series(ends).dt.strftime(Constants.DATE_FORMAT).to_numpy()
+
+        fact_frames = []
+        for table in facts:
+            partition_names = [f"{table}_{s}_{e}" for s, e in zip(start_names, end_names)]
+            template = PartitionQueryTemplate.from_query(_base_query(table), FACT_DATE_COLUMN)
+            fact_frames.append(pd.DataFrame({
+                "Table Name": table,
+                "Partition Name": partition_names,
+                "Query": template.render(partition_names, starts, ends),
+            }))
+        default_partitions = pd.DataFrame({
+            "Table Name": dimensions,
+            "Partition Name": dimensions,
+            "Query": [_base_query(t) for t in dimensions],
+        })
+        model_partitions = pd.concat(fact_frames + [default_partitions], ignore_index=True)
+        model_partitions["Record Count"] = rng.integers(1_000, 1_000_000, len(model_partitions))
+
+        # Facts relate to dimensions and a third of the dimensions relate to an earlier dimension (snowflake)
+        pairs = [(f, d) for f in facts for d in rng.choice(dimensions, size=min(3, len(dimensions)), replace=False)]
+        pairs += [
+            (dimensions[i], dimensions[rng.integers(0, i)])
+            for i in range(1, len(dimensions)) if rng.random() < 1 / 3
+        ]
+        relationships = pd.DataFrame(pairs, columns=["From Table", "To Table"])
+
+        return cls(name=name, tables=table_columns, partitions=model_partitions, relationships=relationships)
+
+    @property
+    def fact_tables(self) -> list[str]:
+        """Tables partitioned by date."""
+        partitioned = self.partitions["Table Name"] != self.partitions["Partition Name"]
+        return self.partitions.loc[partitioned, "Table Name"].unique().tolist()
+
+    def partitions_config(self, interval: str = "MONTH") -> pd.DataFrame:
+        """
+        Builds a partitions configuration that covers the current partitions of the fact tables.
+
+        Args:
+            interval (str): Interval of the partitions.
+
+        Returns:
+            pd.DataFrame: Configuration with columns: ['table', 'partition_by', 'interval', 'first_date', 'refresh_from'].
+        """
+        facts = self.partitions[self.partitions["Table Name"].isin(self.fact_tables)]
+        first_dates = facts["Partition Name"].str.rsplit("_", n=2).str[1].groupby(facts["Table Name"]).min()
+        return pd.DataFrame({
+            "table": first_dates.index.to_numpy(),
+            "partition_by": FACT_DATE_COLUMN,
+            "interval": interval,
+            "first_date": first_dates.to_numpy(),
+            "refresh_from": "TODAY",
+        })
+
+# ============================================================================
+# FAKE BACKEND
+# ============================================================================
+
+class FakeFabricError(Exception):
+    """Error raised by a fake backend call selected to fail."""
+
+@dataclass
+class FakeRefreshDetails:
+    """Data class representing the execution details of a refresh request, like fabric.get_refresh_execution_details().
+
+    Attributes:
+        status (str): 'InProgress' until the refresh duration elapses, then 'Completed' or 'Failed'.
+            'Cancelled' once the request is cancelled.
+        start_time (pd.Timestamp): Submission time of the request.
+        end_time (Optional[pd.Timestamp]): End time of the request, or None while in progress.
+        objects (pd.DataFrame): Refreshed objects with columns: ['Table', 'Partition', 'Status'].
+    """
+
+    status: str
+    start_time: pd.Timestamp
+    end_time: Optional[pd.Timestamp]
+    objects: pd.DataFrame
+
+@dataclass
+class _RefreshRequest:
+    objects: pd.DataFrame
+    submitted_at: float
+    start_time: pd.Timestamp
+    duration: float
+    failed: bool
+    cancelled_at: Optional[float] = None
+
+class FakeFabric:
+    """
+    In-memory stand-in of the sempy.fabric and sempy_labs.tom calls used by Dataset.
+
+    Calls read and change a FakeModel. Every call waits for its latency and may fail with
+    FakeFabricError, so concurrency, retries and error handling can be exercised without a
+    Fabric capacity. Refresh requests stay in progress for their refresh duration, and their objects
+    complete one after another in submission order along it. A failed request fails its middle object
+    and keeps refreshing the rest until its duration elapses, unless it is cancelled.
+
+    Failure probabilities are given per call name, e.g. {'list_partitions': 0.1}. Besides the
+    names of the fabric functions, 'save_changes' fails the commit of a TOM session and 'refresh'
+    makes submitted refresh requests end with the 'Failed' status.
+
+    Args:
+        model (FakeModel): Semantic model served by the backend.
+        workspace_name (str): Name of the workspace.
+        latency (Union[float, Mapping[str, float]]): Seconds each call takes, for all calls or per call name.
+        failures (Optional[Mapping[str, float]]): Probability of failure of each call.
+        refresh_duration (Union[float, Callable[[pd.DataFrame, int], float]]): Seconds each refresh request takes,
+            or a function of the refreshed objects (columns ['table', 'partition']) and the max parallelism
+            returning them.
+        throttle_above (Optional[int]): Refresh requests with a higher max parallelism end with the 'Failed'
+            status, like requests throttled by the capacity.
+        seed (Optional[int]): Seed of the failure draws.
+    """
+
+    def __init__(
+            self,
+            model: FakeModel,
+            workspace_name: str = "Workspace",
+            latency: Union[float, Mapping[str, float]] = 0.0,
+            failures: Optional[Mapping[str, float]] = None,
+            refresh_duration: Union[float, Callable[[pd.DataFrame, int], float]] = 0.0,
+            throttle_above: Optional[int] = None,
+            seed: Optional[int] = None
+        ):
+        self.model = model
+        self.workspace_name = workspace_name
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.refresh_duration = refresh_duration
+        self.throttle_above = throttle_above
+        self.tom = _FakeTOMModule(self)
+
+        # Private attributes
+        self.__random = random.Random(seed)
+        self.__lock = threading.RLock()
+        self.__calls: dict[str, int] = {}
+        self.__requests: dict[str, _RefreshRequest] = {}
+
+    # ------------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------------
+
+    def _call(self, name: str) -> None:
+        """Counts a call, waits for its latency and raises FakeFabricError if it is selected to fail."""
+        latency = self.latency.get(name, 0.0) if isinstance(self.latency, Mapping) else self.latency
+        with self.__lock:
+            self.__calls[name] = self.__calls.get(name, 0) + 1
+            fails = self.__random.random() < self.failures.get(name, 0.0)
+        if latency > 0:
+            time.sleep(latency)
+        if fails:
+            raise FakeFabricError(f"Injected failure in '{name}'.")
+
+    @property
+    def calls(self) -> dict[str, int]:
+        """Number of calls made to each function."""
+        with self.__lock:
+            return dict(self.__calls)
+
+    def _apply(self, added: list[tuple[str, str, str]], removed: list[tuple[str, str]]) -> None:
+        """Applies partition changes to the model, failing without changes if a removed partition does not exist."""
+        if not added and not removed:
+            return
+        with self.__lock:
+            partitions = self.model.partitions
+            keys = pd.MultiIndex.from_arrays([partitions["Table Name"], partitions["Partition Name"]])
+            missing = set(removed) - set(keys[keys.isin(removed)]) if removed else set()
+            if missing:
+                raise FakeFabricError(f"Partitions not found: {sorted(missing)}")
+
+            drop = set(removed) | {(t, p) for t, p, _ in added}
+            kept = partitions[~keys.isin(list(drop))] if drop else partitions
+            new = pd.DataFrame(added, columns=["Table Name", "Partition Name", "Query"]).assign(**{"Record Count": 0})
+            self.model.partitions = pd.concat([kept, new], ignore_index=True)
+            self.model.version += 1
+
+    # ------------------------------------------------------------------------
+    # sempy.fabric
+    # ------------------------------------------------------------------------
+
+    def resolve_workspace_name(self, workspace: str) -> str:
+        self._call("resolve_workspace_name")
+        return self.workspace_name
+
+    def resolve_dataset_name(self, workspace: str, dataset_id: str) -> str:
+        self._call("resolve_dataset_name")
+        return self.model.name
+
+    def evaluate_dax(self, dataset: str, dax_string: str, workspace: str) -> pd.DataFrame:
+        self._call("evaluate_dax")
+        return pd.DataFrame({"[StructureModifiedTime]": [f"v{self.model.version}"]})
+
+    def list_columns(self, workspace: str, dataset: str) -> pd.DataFrame:
+        self._call("list_columns")
+        return self.model.tables.copy()
+
+    def list_partitions(self, workspace: str, dataset: str) -> pd.DataFrame:
+        self._call("list_partitions")
+        with self.__lock:
+            return self.model.partitions.copy()
+
+    def list_relationships(self, workspace: str, dataset: str) -> pd.DataFrame:
+        self._call("list_relationships")
+        return self.model.relationships.copy()
+
+    def execute_tmsl(self, workspace: str, script: dict[str, Any]) -> None:
+        """Runs the create, createOrReplace, refresh and delete operations of a TMSL command as one transaction."""
+        self._call("execute_tmsl")
+        operations = script["sequence"]["operations"] if "sequence" in script else [script]
+
+        added: list[tuple[str, str, str]] = []
+        removed: list[tuple[str, str]] = []
+        for operation in operations:
+            (kind, body), = operation.items()
+            if kind == "create":
+                partition = body["partition"]
+                added.append((body["parentObject"]["table"], partition["name"], partition["source"]["expression"]))
+            elif kind == "createOrReplace":
+                partition = body["partition"]
+                added.append((body["object"]["table"], partition["name"], partition["source"]["expression"]))
+            elif kind == "delete":
+                removed.append((body["object"]["table"], body["object"]["partition"]))
+            elif kind != "refresh":
+                raise FakeFabricError(f"Unsupported TMSL operation: '{kind}'")
+
+        if "refresh" in {kind for operation in operations for kind in operation}:
+            # Refreshes inside the sequence run synchronously
+            self._call("refresh")
+        self._apply(added, removed)
+
+    def refresh_dataset(
+            self,
+            workspace: str,
+            dataset: str,
+            objects: Optional[list[dict[str, str]]] = None,
+            refresh_type: str = "full",
+            apply_refresh_policy: bool = False,
+            commit_mode: str = "transactional",
+            max_parallelism: int = 10
+        ) -> str:
+        self._call("refresh_dataset")
+        if any("partition" in o and not o["partition"] for o in objects or []):
+            # Like the service, a table is refreshed by leaving out the partition, not with an empty one
+            raise FakeFabricError("Refresh objects cannot have an empty partition name.")
+        objects_df = pd.DataFrame(objects or [], columns=["table", "partition"])
+        duration = (
+            self.refresh_duration(objects_df, max_parallelism) if callable(self.refresh_duration) else self.refresh_duration
+        )
+        throttled = self.throttle_above is not None and max_parallelism > self.throttle_above
+        with self.__lock:
+            failed = throttled or self.__random.random() < self.failures.get("refresh", 0.0)
+            request_id = str(uuid.uuid4())
+            self.__requests[request_id] = _RefreshRequest(
+                objects=objects_df,
+                submitted_at=time.monotonic(),
+                start_time=pd.Timestamp.now(tz="UTC"),
+                duration=float(duration),
+                failed=failed
+            )
+        return request_id
+
+    def get_refresh_execution_details(self, workspace: str, dataset: str, refresh_request_id: str) -> FakeRefreshDetails:
+        self._call("get_refresh_execution_details")
+        with self.__lock:
+            request = self.__requests.get(refresh_request_id)
+        if request is None:
+            raise FakeFabricError(f"Refresh request '{refresh_request_id}' not found.")
+
+        elapsed = (request.cancelled_at or time.monotonic()) - request.submitted_at
+        count = len(request.objects)
+        finished = request.duration * np.arange(1, count + 1) / max(count, 1) <= elapsed
+        statuses = np.where(finished, "Completed", "Cancelled" if request.cancelled_at else "InProgress")
+        if request.failed and count and finished[count // 2]:
+            statuses[count // 2] = "Failed"
+        objects = request.objects.rename(columns={"table": "Table", "partition": "Partition"}).assign(Status=statuses)
+
+        if request.cancelled_at is not None:
+            end_time = request.start_time + pd.Timedelta(seconds=elapsed)
+            return FakeRefreshDetails("Cancelled", request.start_time, end_time, objects)
+        if elapsed < request.duration:
+            return FakeRefreshDetails("InProgress", request.start_time, None, objects)
+        return FakeRefreshDetails(
+            "Failed" if request.failed else "Completed",
+            request.start_time,
+            request.start_time + pd.Timedelta(seconds=request.duration),
+            objects
+        )
+
+    def cancel_dataset_refresh(self, dataset: str, refresh_request_id: str, workspace: str) -> None:
+        self._call("cancel_dataset_refresh")
+        with self.__lock:
+            request = self.__requests.get(refresh_request_id)
+            if request is None:
+                raise FakeFabricError(f"Refresh request '{refresh_request_id}' not found.")
+            now = time.monotonic()
+            if request.cancelled_at is None and now - request.submitted_at < request.duration:
+                request.cancelled_at = now
+
+    # ------------------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------------------
+
+    @contextmanager
+    def install(self) -> Iterator["FakeFabric"]:
+        """
+        Serves the fabric and tom calls of Dataset from this backend inside the block.
+
+        Yields:
+            FakeFabric: This backend.
+        """
+        previous = dataset_module.fabric, dataset_module.tom
+        dataset_module.fabric, dataset_module.tom = self, self.tom
+        try:
+            yield self
+        finally:
+            dataset_module.fabric, dataset_module.tom = previous
+
+# ============================================================================
+# FAKE TOM
+# ============================================================================
+
+class _FakePartitions:
+    def __init__(self, table: str):
+        self.__table = table
+
+    def __getitem__(self, partition: str) -> tuple[str, str]:
+        return (self.__table, partition)
+
+class _FakeTable:
+    def __init__(self, table: str):
+        self.Partitions = _FakePartitions(table)
+
+class _FakeTables:
+    def __getitem__(self, table: str) -> _FakeTable:
+        return _FakeTable(table)
+
+class _FakeTOMModel:
+    def __init__(self, session: "_FakeTOMSession"):
+        self.Tables = _FakeTables()
+        self.__session = session
+
+    def UndoLocalChanges(self) -> None:
+        self.__session.undo()
+
+class _FakeTOMSession:
+    """TOM session that queues partition changes and applies them when saved."""
+
+    def __init__(self, backend: FakeFabric):
+        self.model = _FakeTOMModel(self)
+        self.__backend = backend
+        self.__added: list[tuple[str, str, str]] = []
+        self.__removed: list[tuple[str, str]] = []
+
+    def add_m_partition(self, table_name: str, partition_name: str, expression: str, mode: str = "Import") -> None:
+        self.__added.append((table_name, partition_name, expression))
+
+    def remove_object(self, object: tuple[str, str]) -> None:
+        self.__removed.append(object)
+
+    def undo(self) -> None:
+        self.__added, self.__removed = [], []
+
+    def save(self) -> None:
+        if self.__added or self.__removed:
+            self.__backend._call("save_changes")
+            self.__backend._apply(self.__added, self.__removed)
+        self.undo()
+
+class _FakeTOMModule:
+    """Stand-in of sempy_labs.tom."""
+
+    def __init__(self, backend: FakeFabric):
+        self.__backend = backend
+
+    @contextmanager
+    def connect_semantic_model(self, dataset: str, readonly: bool = True, workspace: Optional[str] = None) -> Iterator[_FakeTOMSession]:
+        self.__backend._call("connect_semantic_model")
+        session = _FakeTOMSession(self.__backend)
+        try:
+            yield session
+        finally:
+            # Like the real session, changes are saved on close unless they were undone
+            if not readonly:
+                session.save()
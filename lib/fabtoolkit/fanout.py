@@ -0,0 +1,227 @@
+"""
+Fan-out module for fabtoolkit.
+
+This module provides:
+- Constants
+- Capacity-wide and per-workspace limits on the refresh requests running at the same time
+- Concurrent runs over several datasets, consolidated into a single report
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import threading
+import time
+from typing import Any, Callable, Iterator, Mapping, Optional
+import warnings
+import pandas as pd
+from fabtoolkit.refresh import RefreshStatus
+from fabtoolkit.trace import in_current_context
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Datasets processed at the same time
+DEFAULT_MAX_CONCURRENT_DATASETS: int = 4
+
+# Refresh requests running at the same time across the capacity
+DEFAULT_MAX_CAPACITY_REFRESHES: int = 4
+
+# Refresh requests running at the same time in each workspace
+DEFAULT_MAX_WORKSPACE_REFRESHES: int = 2
+
+# ============================================================================
+# REFRESH SLOTS
+# ============================================================================
+
+class RefreshSlots:
+    """
+    Limits the refresh requests running at the same time across the capacity and in each workspace.
+
+    Each refresh request holds one slot while it runs. A caller that cannot see the requests it
+    submits (e.g. a child notebook) reserves as many slots as requests it may run at the same time.
+    The slots of a workspace and of the capacity are taken together, so a caller waiting for its
+    workspace never holds a capacity slot that a refresh of another workspace could use.
+
+    Args:
+        max_concurrent_refreshes (int): Maximum number of refresh requests running at the same time across the capacity.
+        max_per_workspace (Optional[int]): Maximum number of refresh requests running at the same time in each workspace.
+            None only applies the capacity limit.
+
+    Raises:
+        ValueError: If a limit is not a positive integer.
+    """
+
+    def __init__(self, max_concurrent_refreshes: int = DEFAULT_MAX_CAPACITY_REFRESHES, max_per_workspace: Optional[int] = DEFAULT_MAX_WORKSPACE_REFRESHES):
+
+        if not isinstance(max_concurrent_refreshes, int) or max_concurrent_refreshes <= 0:
+            raise ValueError("Max concurrent refreshes value must be a positive integer.")
+        if max_per_workspace is not None and (not isinstance(max_per_workspace, int) or max_per_workspace <= 0):
+            raise ValueError("Max concurrent refreshes per workspace value must be a positive integer.")
+
+        self.__max_concurrent_refreshes = max_concurrent_refreshes
+        self.__max_per_workspace = max_per_workspace
+        self.__condition = threading.Condition()
+        self.__running: dict[str, int] = {}
+        self.__peak = 0
+
+    def _fits(self, workspace_id: str, slots: int) -> bool:
+        """Checks whether the slots are free in the workspace and in the capacity. Called holding the condition."""
+        if sum(self.__running.values()) + slots > self.__max_concurrent_refreshes:
+            return False
+        return self.__max_per_workspace is None or self.__running.get(workspace_id, 0) + slots <= self.__max_per_workspace
+
+    @contextmanager
+    def acquire(self, workspace_id: str, slots: int = 1) -> Iterator[float]:
+        """
+        Waits for free refresh slots of the workspace and of the capacity, and holds them inside the block.
+
+        Args:
+            workspace_id (str): Workspace of the refresh.
+            slots (int): Number of slots to hold, i.e. refresh requests that may run at the same time inside
+                the block. It is capped to the limits, so a caller never waits for more slots than exist.
+
+        Yields:
+            float: Seconds waited for the slots.
+
+        Raises:
+            ValueError: If slots is not a positive integer.
+        """
+        if not isinstance(slots, int) or slots <= 0:
+            raise ValueError("Slots value must be a positive integer.")
+        slots = min(slots, self.__max_concurrent_refreshes, self.__max_per_workspace or slots)
+
+        started_at = time.monotonic()
+        with self.__condition:
+            self.__condition.wait_for(lambda: self._fits(workspace_id, slots))
+            self.__running[workspace_id] = self.__running.get(workspace_id, 0) + slots
+            self.__peak = max(self.__peak, sum(self.__running.values()))
+        try:
+            yield time.monotonic() - started_at
+        finally:
+            with self.__condition:
+                self.__running[workspace_id] -= slots
+                self.__condition.notify_all()
+
+    @property
+    def running(self) -> dict[str, int]:
+        """Number of refresh slots held in each workspace."""
+        with self.__condition:
+            return {workspace_id: count for workspace_id, count in self.__running.items() if count}
+
+    @property
+    def peak(self) -> int:
+        """Highest number of refresh slots held at the same time."""
+        with self.__condition:
+            return self.__peak
+
+# ============================================================================
+# FAN-OUT
+# ============================================================================
+
+@dataclass
+class DatasetRunResult:
+    """Data class representing the result of the run of one dataset of a fan-out.
+
+    Attributes:
+        workspace_id (str): The workspace identifier.
+        dataset_id (str): The dataset identifier.
+        status (str): Final status of the run ('Completed' or 'Failed').
+        error (Optional[str]): Error message if the run failed.
+        started_at (float): Epoch time (seconds) when the run started.
+        ended_at (float): Epoch time (seconds) when the run ended.
+        details (dict[str, Any]): Details returned by the run function (e.g. seconds waited for a refresh slot).
+    """
+
+    workspace_id: str
+    dataset_id: str
+    status: str
+    error: Optional[str]
+    started_at: float
+    ended_at: float
+    details: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration(self) -> float:
+        """Duration of the run in seconds."""
+        return self.ended_at - self.started_at
+
+def _run_dataset(config: Mapping[str, Any], run: Callable[[Mapping[str, Any]], Optional[Mapping[str, Any]]]) -> DatasetRunResult:
+    """Runs one dataset of a fan-out, capturing its error so it does not stop the other datasets."""
+    started_at = time.time()
+    try:
+        details = run(config)
+        status, error = RefreshStatus.COMPLETED, None
+    except Exception as e:
+        details, status, error = None, RefreshStatus.FAILED, str(e)
+    return DatasetRunResult(
+        str(config["workspace_id"]),
+        str(config["dataset_id"]),
+        str(status),
+        error,
+        started_at,
+        time.time(),
+        dict(details or {})
+    )
+
+def fan_out(
+        configs: list[Mapping[str, Any]],
+        run: Callable[[Mapping[str, Any]], Optional[Mapping[str, Any]]],
+        max_concurrent_datasets: int = DEFAULT_MAX_CONCURRENT_DATASETS,
+        on_result: Optional[Callable[[DatasetRunResult], None]] = None
+    ) -> pd.DataFrame:
+    """
+    Runs a function over several datasets at the same time and consolidates their results.
+
+    A failing dataset does not stop the others: its error is recorded in the report. The function
+    limits the datasets processed at the same time, while the refresh requests they submit are
+    limited by the RefreshSlots the function acquires around each of them.
+
+    Args:
+        configs (list[Mapping[str, Any]]): Configuration of each dataset, with at least 'workspace_id' and 'dataset_id'.
+        run (Callable[[Mapping[str, Any]], Optional[Mapping[str, Any]]]): Function that runs a dataset from its
+            configuration. It may return details that are added to its row of the report.
+        max_concurrent_datasets (int): Maximum number of datasets processed at the same time.
+        on_result (Optional[Callable[[DatasetRunResult], None]]): Function called with the result of each dataset
+            as soon as it finishes. Its errors are reported as warnings and do not affect the report.
+
+    Returns:
+        pd.DataFrame: Report with one row per dataset in the order of the configurations, with columns
+            ['workspace_id', 'dataset_id', 'status', 'error', 'duration'] followed by the details of the runs.
+
+    Raises:
+        ValueError: If max_concurrent_datasets is not a positive integer or a configuration lacks its identifiers.
+    """
+    if not isinstance(max_concurrent_datasets, int) or max_concurrent_datasets <= 0:
+        raise ValueError("Max concurrent datasets value must be a positive integer.")
+    missing = [i for i, config in enumerate(configs) if not config.get("workspace_id") or not config.get("dataset_id")]
+    if missing:
+        raise ValueError(f"Dataset configuration(s) {missing} must include workspace_id and dataset_id.")
+
+    def run_one(config: Mapping[str, Any]) -> DatasetRunResult:
+        result = _run_dataset(config, run)
+        if on_result is not None:
+            try:
+                on_result(result)
+            except Exception as e:
+                # The dataset already ran, so a failing callback must not lose its result
+                warnings.warn(f"Failed to report the result of dataset '{result.dataset_id}': {e}")
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_concurrent_datasets, thread_name_prefix="dataset-run") as pool:
+        # Spans opened by each run are nested in the span currently open
+        futures = [pool.submit(in_current_context(run_one), config) for config in configs]
+        results = [future.result() for future in futures]
+
+    return pd.DataFrame([
+        {
+            "workspace_id": r.workspace_id,
+            "dataset_id": r.dataset_id,
+            "status": r.status,
+            "error": r.error,
+            "duration": r.duration,
+            **r.details,
+        }
+        for r in results
+    ], columns=None if results else ["workspace_id", "dataset_id", "status", "error", "duration"])
@@ -0,0 +1,254 @@
+"""
+History module for fabtoolkit.
+
+This module provides:
+- Parsing of refresh execution details into per-object durations
+- Persistent on-disk history of refresh durations stored as Parquet
+- Persistent on-disk history of refresh runs (parallelism, size and duration of each request)
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+import uuid
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# PARSING
+# ============================================================================
+
+# Columns of the refresh history table
+HISTORY_COLUMNS: tuple[str, ...] = ("table", "partition", "duration", "refresh_request_id", "recorded_at")
+
+# Columns of the refresh run history table
+RUN_COLUMNS: tuple[str, ...] = ("refresh_request_id", "max_parallelism", "objects", "size", "duration", "status", "recorded_at")
+
+def parse_refresh_durations(
+        refresh_request_id: str,
+        details: object,
+        sizes: Optional[pd.Series] = None
+    ) -> pd.DataFrame:
+    """
+    Estimates the duration of each object of a completed refresh from its execution details.
+
+    The service only reports the start and end time of the whole refresh request, so its duration is
+    apportioned among the objects in proportion to their size. Single-object refreshes are exact.
+
+    Args:
+        refresh_request_id (str): The refresh request identifier.
+        details (object): Result of fabric.get_refresh_execution_details(), with start_time, end_time
+            and an objects DataFrame with columns ['Table', 'Partition', 'Status'].
+        sizes (Optional[pd.Series]): Size of each object, aligned with details.objects. Objects are
+            considered equally sized if not provided.
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['table', 'partition', 'duration', 'refresh_request_id', 'recorded_at'].
+    """
+    objects: Optional[pd.DataFrame] = getattr(details, "objects", None)
+    start_time = pd.to_datetime(getattr(details, "start_time", None), utc=True)
+    end_time = pd.to_datetime(getattr(details, "end_time", None), utc=True)
+
+    if objects is None or objects.empty or pd.isna(start_time) or pd.isna(end_time):
+        return pd.DataFrame(columns=list(HISTORY_COLUMNS))
+
+    weights = np.ones(len(objects)) if sizes is None else np.clip(np.asarray(sizes, dtype=float), 1.0, None)
+    duration = max((end_time - start_time).total_seconds(), 0.0)
+
+    return pd.DataFrame({
+        "table": objects["Table"].astype(str).to_numpy(),
+        # Table-level refreshes have no partition
+        "partition": objects["Partition"].fillna("").astype(str).to_numpy(),
+        "duration": duration * weights / weights.sum(),
+        "refresh_request_id": refresh_request_id,
+        "recorded_at": time.time()
+    })
+
+def _append(current: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Appends rows to a history table, leaving out empty frames so the column types come from the non-empty one."""
+    if current.empty:
+        return new.reset_index(drop=True)
+    if new.empty:
+        return current
+    return pd.concat([current, new], ignore_index=True)
+
+# ============================================================================
+# HISTORY
+# ============================================================================
+
+class RefreshHistory:
+    """
+    Persistent history of refresh durations.
+
+    Durations are stored as one Parquet file per dataset under ``<path>/<dataset_id>.parquet``.
+    Only the latest ``max_samples`` durations of each object are kept, and the expected duration
+    of an object is the median of them.
+
+    Refresh runs are stored next to them under ``<path>/<dataset_id>.runs.parquet``, keeping the
+    latest ``max_samples`` runs of each parallelism level.
+
+    Attributes:
+        path (str): Root directory of the history (local path or mounted lakehouse path).
+        max_samples (int): Number of durations kept per object.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_samples: int = 10):
+
+        if not isinstance(max_samples, int) or max_samples <= 0:
+            raise ValueError("Max samples must be a positive integer.")
+
+        self.__path = path or os.path.join(tempfile.gettempdir(), "fabtoolkit", "history")
+        self.__max_samples = max_samples
+        self.__lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        """Root directory of the history."""
+        return self.__path
+
+    @property
+    def max_samples(self) -> int:
+        """Number of durations kept per object."""
+        return self.__max_samples
+
+    def _dataset_file(self, dataset_id: str) -> str:
+        """Returns the file holding the history of a dataset."""
+        return os.path.join(self.__path, f"{dataset_id}.parquet")
+
+    def _runs_file(self, dataset_id: str) -> str:
+        """Returns the file holding the refresh runs of a dataset."""
+        return os.path.join(self.__path, f"{dataset_id}.runs.parquet")
+
+    def _write(self, frame: pd.DataFrame, target: str) -> None:
+        """Writes a frame to a temporary file and publishes it, so readers never see a partially written file."""
+        os.makedirs(self.__path, exist_ok=True)
+        staging_file = os.path.join(self.__path, f".staging-{uuid.uuid4().hex}.parquet")
+        try:
+            frame.to_parquet(staging_file, index=False)
+            os.replace(staging_file, target)
+        finally:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+
+    def load(self, dataset_id: str) -> pd.DataFrame:
+        """
+        Loads the refresh history of a dataset.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+
+        Returns:
+            pd.DataFrame: Recorded durations. Empty if there is no history or it is unreadable.
+        """
+        try:
+            return pd.read_parquet(self._dataset_file(dataset_id))
+        except (OSError, ValueError):
+            return pd.DataFrame(columns=list(HISTORY_COLUMNS))
+
+    def record(self, dataset_id: str, durations: pd.DataFrame) -> None:
+        """
+        Appends durations to the history of a dataset.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            durations (pd.DataFrame): Durations as returned by parse_refresh_durations().
+
+        Returns:
+            None
+        """
+        if durations.empty:
+            return
+
+        with self.__lock:
+            history = _append(self.load(dataset_id), durations[list(HISTORY_COLUMNS)])
+            history = (
+                history.sort_values("recorded_at", kind="stable")
+                .groupby(["table", "partition"], sort=False)
+                .tail(self.__max_samples)
+                .reset_index(drop=True)
+            )
+            self._write(history, self._dataset_file(dataset_id))
+
+    def load_runs(self, dataset_id: str) -> pd.DataFrame:
+        """
+        Loads the refresh runs of a dataset.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+
+        Returns:
+            pd.DataFrame: Recorded runs with columns ['refresh_request_id', 'max_parallelism', 'objects', 'size',
+                'duration', 'status', 'recorded_at']. Empty if there are no runs or they are unreadable.
+        """
+        try:
+            return pd.read_parquet(self._runs_file(dataset_id))
+        except (OSError, ValueError):
+            return pd.DataFrame(columns=list(RUN_COLUMNS))
+
+    def record_run(self, dataset_id: str, run: pd.DataFrame) -> None:
+        """
+        Appends refresh runs to the history of a dataset.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            run (pd.DataFrame): Runs with columns ['refresh_request_id', 'max_parallelism', 'objects', 'size',
+                'duration', 'status', 'recorded_at'], where size is the number of records refreshed and
+                duration is NaN for runs that did not complete.
+
+        Returns:
+            None
+        """
+        if run.empty:
+            return
+
+        with self.__lock:
+            runs = _append(self.load_runs(dataset_id), run[list(RUN_COLUMNS)])
+            runs = (
+                runs.sort_values("recorded_at", kind="stable")
+                .groupby("max_parallelism", sort=False)
+                .tail(self.__max_samples)
+                .reset_index(drop=True)
+            )
+            self._write(runs, self._runs_file(dataset_id))
+
+    def expected_durations(self, dataset_id: str, df: pd.DataFrame) -> pd.Series:
+        """
+        Gets the expected refresh duration of each object.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            df (pd.DataFrame): DataFrame with columns: ['table', 'partition'].
+
+        Returns:
+            pd.Series: Median recorded duration in seconds of each object, aligned with df. NaN if unknown.
+        """
+        history = self.load(dataset_id)
+        if history.empty:
+            return pd.Series(np.nan, index=df.index)
+
+        medians = history.groupby(["table", "partition"])["duration"].median()
+        keys = pd.MultiIndex.from_arrays([
+            df["table"].astype(str),
+            df["partition"].fillna("").astype(str)
+        ])
+        return pd.Series(medians.reindex(keys).to_numpy(), index=df.index)
+
+    def invalidate(self, dataset_id: Optional[str] = None) -> None:
+        """
+        Removes recorded durations and runs.
+
+        Args:
+            dataset_id (Optional[str]): Identifier of the dataset to invalidate. If None, the whole history is cleared.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            targets = [self._dataset_file(dataset_id), self._runs_file(dataset_id)] if dataset_id else (
+                [os.path.join(self.__path, f) for f in os.listdir(self.__path)] if os.path.isdir(self.__path) else []
+            )
+            for target in targets:
+                if os.path.isfile(target):
+                    os.remove(target)
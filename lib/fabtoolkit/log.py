@@ -0,0 +1,311 @@
+"""
+Log module for fabtoolkit.
+
+This module provides:
+- Console log formatter with color coding and truncation of long messages
+- Lazy log arguments: summaries of large collections and deferred calls, rendered only if the record is emitted
+- Tagged logging, so the records of work running at the same time (e.g. several datasets) can be told apart
+- Queued console logging, so writing log records never blocks the pipeline
+"""
+
+import atexit
+from contextlib import contextmanager
+from contextvars import ContextVar
+import copy
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import sys
+from typing import Any, Callable, Iterator, MutableMapping, Optional, TextIO
+import pandas as pd
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Longest message written by the console formatter (characters)
+DEFAULT_MAX_MESSAGE_LENGTH: int = 4000
+
+# Items of a collection shown by summarize()
+DEFAULT_MAX_ITEMS: int = 20
+
+# ============================================================================
+# FORMATTER
+# ============================================================================
+
+class ConsoleLogFormatter(logging.Formatter):
+    """
+    Custom log formatter for console output with color coding based on log level.
+
+    Messages longer than max_message_length are truncated, and the number of characters left
+    out is appended. Tracebacks are never truncated.
+
+    Args:
+        max_message_length (Optional[int]): Longest message written. None or 0 disables truncation.
+    """
+    # ANSI color codes
+    COLORS = {
+        logging.DEBUG: "\x1b[30m",      # black
+        logging.INFO: "\x1b[1;30m",     # bold black
+        logging.WARNING: "\x1b[33;20m", # yellow
+        logging.ERROR: "\x1b[31;20m",   # red
+        logging.CRITICAL: "\x1b[31;1m", # bold red
+    }
+    RESET = "\x1b[0m"
+    MESSAGE_FORMAT = " %(asctime)s - %(message)s"
+    DATE_FORMAT = "%H:%M:%S"
+
+    def __init__(self, max_message_length: Optional[int] = DEFAULT_MAX_MESSAGE_LENGTH):
+        super().__init__(datefmt=self.DATE_FORMAT)
+        self.__max_message_length = max_message_length or None
+        self.__formatters: dict[int, logging.Formatter] = {}
+
+    def _get_formatter(self, levelno: int, levelname: str) -> logging.Formatter:
+        """Gets the formatter of a log level, building it on first use."""
+        formatter = self.__formatters.get(levelno)
+        if formatter is None:
+            color = self.COLORS.get(levelno, self.RESET)
+            log_fmt = f"{color}[{levelname}]{self.MESSAGE_FORMAT}{self.RESET}"
+            formatter = self.__formatters[levelno] = logging.Formatter(log_fmt, datefmt=self.DATE_FORMAT)
+        return formatter
+
+    def _truncate(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Returns a copy of the record with its message rendered and truncated, or the record itself if it has
+        no arguments and fits. The copy keeps lazy arguments from being rendered again by the formatter.
+        """
+        if self.__max_message_length is None:
+            return record
+
+        message = record.getMessage()
+        if len(message) <= self.__max_message_length:
+            if not record.args:
+                return record
+        else:
+            message = (
+                f"{message[:self.__max_message_length]}... "
+                f"[{len(message) - self.__max_message_length} more characters]"
+            )
+
+        rendered = copy.copy(record)
+        rendered.msg = message
+        rendered.args = None
+        return rendered
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Format the log record with color coding based on the log level.
+
+        Args:
+            record (logging.LogRecord): The log record to format.
+
+        Returns:
+            str: The formatted log message.
+        """
+        formatter = self._get_formatter(record.levelno, record.levelname)
+        return formatter.format(self._truncate(record))
+
+# ============================================================================
+# LAZY ARGUMENTS
+# ============================================================================
+
+class _Lazy:
+    """Log argument rendered by calling a function when the record is emitted."""
+
+    __slots__ = ("_func", "_args", "_kwargs")
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> str:
+        return str(self._func(*self._args, **self._kwargs))
+
+    __repr__ = __str__
+
+def lazy(func: Callable[..., Any], *args: Any, **kwargs: Any) -> _Lazy:
+    """
+    Defers a call until the log record that uses its result is emitted.
+
+    Usage: ``logger.info("Status:\\n%s", lazy(df.to_string, index=False))``. The call is skipped
+    when the level of the record is disabled.
+
+    Args:
+        func (Callable[..., Any]): Function whose result is logged.
+        *args: Positional arguments of the function.
+        **kwargs: Keyword arguments of the function.
+
+    Returns:
+        _Lazy: Log argument that renders as str(func(*args, **kwargs)).
+    """
+    return _Lazy(func, *args, **kwargs)
+
+def _summarize(obj: Any, max_items: int) -> str:
+    """Renders the first items of a collection, followed by the number of items left out."""
+    if isinstance(obj, pd.DataFrame):
+        rendered = obj.head(max_items).to_json(orient="records")
+        hidden = len(obj) - max_items
+    elif isinstance(obj, (pd.Series, pd.Index, list, tuple, set, frozenset, dict)):
+        items = obj.items() if isinstance(obj, dict) else obj
+        head = []
+        for item in items:
+            if len(head) == max_items:
+                break
+            head.append(item)
+        rendered = str(dict(head) if isinstance(obj, dict) else head)
+        hidden = len(obj) - max_items
+    else:
+        return str(obj)
+
+    return f"{rendered} (+{hidden} more)" if hidden > 0 else rendered
+
+def summarize(obj: Any, max_items: int = DEFAULT_MAX_ITEMS) -> _Lazy:
+    """
+    Summarizes a collection in a log message.
+
+    DataFrames render as JSON records, and lists, sets, dicts, Series and indexes as lists (dicts as
+    dicts). Only the first max_items items are rendered, followed by the number of items left out.
+    Other objects render as str(obj). Rendering is deferred until the log record is emitted.
+
+    Args:
+        obj (Any): Collection to summarize.
+        max_items (int): Items rendered.
+
+    Returns:
+        _Lazy: Log argument that renders the summary.
+    """
+    return _Lazy(_summarize, obj, max_items)
+
+# ============================================================================
+# TAGGED LOGGING
+# ============================================================================
+
+# Tag of the records logged in the current context
+_log_tag: ContextVar[Optional[str]] = ContextVar("fabtoolkit_log_tag", default=None)
+
+@contextmanager
+def log_tag(tag: Optional[str]) -> Iterator[None]:
+    """
+    Tags the records logged through a TaggedLoggerAdapter inside the block.
+
+    The tag is bound to the current context, so it applies to the records of the current thread and
+    of the threads started with trace.in_current_context(), and not to work running at the same time.
+
+    Args:
+        tag (Optional[str]): Tag of the records (e.g. the dataset identifier). None removes the tag.
+    """
+    token = _log_tag.set(tag)
+    try:
+        yield
+    finally:
+        _log_tag.reset(token)
+
+class TaggedLoggerAdapter(logging.LoggerAdapter):
+    """
+    Logger adapter that prefixes each message with the tag of the current context (see log_tag()).
+
+    Messages logged without a tag are left unchanged.
+
+    Args:
+        logger (logging.Logger): Logger the records are written to.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, {})
+
+    def process(self, msg: Any, kwargs: MutableMapping[str, Any]) -> tuple[Any, MutableMapping[str, Any]]:
+        tag = _log_tag.get()
+        return (f"[{tag}] {msg}" if tag else msg), kwargs
+
+# ============================================================================
+# QUEUED LOGGING
+# ============================================================================
+
+# Listeners of the queued loggers, by logger name
+_listeners: dict[str, QueueListener] = {}
+
+class _ConsoleQueueHandler(QueueHandler):
+    """
+    Queue handler that merges the message and the traceback of a record before queuing it.
+
+    Unlike QueueHandler, it leaves truncation and color coding to the formatter of the console handler,
+    which runs in the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logger(
+        name: str,
+        level: int = logging.INFO,
+        max_message_length: Optional[int] = DEFAULT_MAX_MESSAGE_LENGTH,
+        stream: Optional[TextIO] = None,
+        queued: bool = True
+    ) -> logging.Logger:
+    """
+    Sets up a logger that writes color-coded records to the console.
+
+    With queued logging, records are put in a queue and written by a background thread, so a slow
+    console never blocks the caller. Message arguments are rendered by the caller when the record
+    is queued. The logger is only set up once: further calls return it unchanged.
+
+    Args:
+        name (str): Name of the logger.
+        level (int): Log level of the logger and its console handler.
+        max_message_length (Optional[int]): Longest message written. None or 0 disables truncation.
+        stream (Optional[TextIO]): Stream the records are written to. Defaults to sys.stdout.
+        queued (bool): Whether records are written by a background thread.
+
+    Returns:
+        logging.Logger: Configured logger.
+    """
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+
+    if not logger.handlers:
+        console_handler = logging.StreamHandler(stream or sys.stdout)
+        console_handler.setFormatter(ConsoleLogFormatter(max_message_length))
+        console_handler.setLevel(level)
+
+        if queued:
+            log_queue: queue.Queue = queue.Queue()
+            listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+            listener.start()
+            _listeners[name] = listener
+            logger.addHandler(_ConsoleQueueHandler(log_queue))
+        else:
+            logger.addHandler(console_handler)
+
+    return logger
+
+def flush_logs(name: Optional[str] = None) -> None:
+    """
+    Waits until the queued records of a logger are written.
+
+    Args:
+        name (Optional[str]): Name of the logger. Defaults to every queued logger.
+    """
+    if name is None:
+        listeners = list(_listeners.values())
+    else:
+        listeners = [_listeners[name]] if name in _listeners else []
+
+    for listener in listeners:
+        listener.queue.join()
+        for handler in listener.handlers:
+            handler.flush()
+
+@atexit.register
+def _stop_listeners() -> None:
+    """Writes the pending records of every queued logger and stops its listener."""
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
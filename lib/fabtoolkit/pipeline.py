@@ -0,0 +1,1143 @@
+"""
+Pipeline module for fabtoolkit.
+
+This module provides:
+- Partitioning of a semantic model from a partitions configuration
+- Refresh of the tables and partitions of a semantic model
+- Compilation of a whole partition and refresh run into a single TMSL sequence
+
+Both steps run in-process on a Dataset, so several steps can share the same metadata.
+"""
+
+from contextlib import nullcontext
+from datetime import datetime
+from io import StringIO
+import logging
+from typing import Any, Callable, ContextManager, Optional, Union
+import numpy as np
+import pandas as pd
+from fabtoolkit.checkpoint import RunCheckpoint
+from fabtoolkit.dataset import Dataset, PartitionCatalog, PartitionQueryTemplate
+from fabtoolkit.log import lazy, summarize
+from fabtoolkit.plan import PartitionChanges, RunPlan
+from fabtoolkit.refresh import (
+    DEFAULT_RETRY_BACKOFF_SECONDS,
+    IN_PROGRESS_STATUSES,
+    RefreshEvent,
+    RefreshOutcome,
+    RefreshShard,
+    RefreshStatus,
+    ShardBy,
+    ShardedRefresh
+)
+from fabtoolkit.trace import current_span, traced
+from fabtoolkit.tuning import is_auto_parallelism
+from fabtoolkit.utils import (
+    apply_retention,
+    compact_partition_plan,
+    generate_partition_plan,
+    get_retention_cutoff,
+    is_valid_text,
+    parse_partition_names,
+    Constants,
+    Interval
+)
+from fabtoolkit.watermark import WatermarkStore
+
+_logger = logging.getLogger(__name__)
+
+# ============================================================================
+# PARTITION
+# ============================================================================
+
+@traced("pipeline.validate_partitions_config")
+def validate_partitions_config(
+        dataset: Dataset,
+        partitions_config: Union[str, pd.DataFrame],
+        logger: Optional[logging.Logger] = None
+    ) -> pd.DataFrame:
+    """
+    Validates a partitions configuration against the dataset.
+
+    Args:
+        dataset (Dataset): Dataset object to use for validation.
+        partitions_config (Union[str, pd.DataFrame]): JSON string or DataFrame containing the partitions configuration.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        pd.DataFrame: Validated configuration dataframe.
+
+    Raises:
+        ValueError: If partition configuration references invalid tables or columns, or has invalid values.
+    """
+    logger = logger or _logger
+    available_intervals: list[str] = [i.value for i in Interval]
+
+    # Get available tables and columns from dataset
+    available_tables: pd.DataFrame = dataset.tables
+
+    partitions_config_df: pd.DataFrame = (
+        partitions_config.copy() if isinstance(partitions_config, pd.DataFrame)
+        else pd.read_json(StringIO(partitions_config))
+    )
+
+    # Find mismatches between configuration and actual dataset schema
+    invalid_entries: pd.DataFrame = partitions_config_df.merge(
+        available_tables,
+        left_on=["table", "partition_by"],
+        right_on=["table_name", "column_name"],
+        how="left",
+        indicator=True,
+    )
+
+    # Identify rows that exist in config but not in dataset
+    invalid_entries = invalid_entries[invalid_entries["_merge"] == "left_only"]
+
+    if not invalid_entries.empty:
+        raise ValueError(
+            f"Invalid partition configuration found:\n{invalid_entries[['table', 'partition_by']].to_json(orient='records')}"
+        ) from None
+
+    for first_date, interval in zip(partitions_config_df["first_date"], partitions_config_df["interval"]):
+        try:
+            datetime.strptime(str(first_date), Constants.DATE_FORMAT)
+        except ValueError as e:
+            logger.error(f"Invalid date format for first_date '{first_date}': {str(e)}")
+            raise ValueError(f"Invalid date format for first_date: {first_date}") from e
+        # Check if interval is a valid Interval enum value
+        try:
+            Interval(interval)
+        except ValueError as e:
+            raise ValueError(f"Invalid interval: {interval}. Expected: {available_intervals}") from e
+
+    # Compaction rules are optional, e.g. {"QUARTER": 6, "YEAR": 24}
+    if "compaction" in partitions_config_df.columns:
+        for table, rule in zip(partitions_config_df["table"], partitions_config_df["compaction"]):
+            if not isinstance(rule, dict) and not pd.isna(rule):
+                raise ValueError(f"Invalid compaction rule for table '{table}': {rule}. Expected an object like {{\"YEAR\": 24}}")
+
+    # Retention is optional, either a number of intervals or a cutoff date
+    get_retention_cutoffs(partitions_config_df)
+
+    current_span().set(tables=len(partitions_config_df))
+    return partitions_config_df
+
+def get_retention_cutoffs(partitions_config: pd.DataFrame) -> dict[str, Optional[pd.Timestamp]]:
+    """
+    Gets the first date kept by the retention setting of each table.
+
+    Args:
+        partitions_config (pd.DataFrame): Partitions configuration.
+
+    Returns:
+        dict[str, Optional[pd.Timestamp]]: First kept date of each table, None if it keeps all its partitions.
+
+    Raises:
+        ValueError: If a retention setting is invalid.
+    """
+    if "retention" not in partitions_config.columns:
+        return {}
+
+    today = datetime.today()
+    return {
+        row.table: get_retention_cutoff(row.retention, row.interval, today)
+        for row in partitions_config.itertuples()
+    }
+
+def generate_partition_ranges(partitions_config: pd.DataFrame, logger: Optional[logging.Logger] = None) -> pd.DataFrame:
+    """
+    Generates partition ranges for all tables in the configuration based on their interval.
+
+    Ranges go from each table's first date up to the end of the current period of its interval.
+    Old periods of tables with a compaction rule are merged into coarser periods, and periods
+    ending before the retention window of their table are left out.
+
+    Args:
+        partitions_config (pd.DataFrame): Validated partitions configuration.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        pd.DataFrame: DataFrame containing the generated partition ranges.
+
+    Raises:
+        ValueError: If the interval is invalid or date parsing fails.
+    """
+    logger = logger or _logger
+
+    # Parse date values
+    first_dates: pd.Series = pd.to_datetime(partitions_config["first_date"].astype(str), format=Constants.DATE_FORMAT)
+    today: datetime = datetime.today()
+
+    # Generate date ranges
+    try:
+        logger.info("Generating dates lists up to %s for tables: %s...", today.date(), summarize(partitions_config["table"]))
+        new_partitions: pd.DataFrame = generate_partition_plan(
+            partitions_config["table"],
+            first_dates,
+            [today] * len(partitions_config),
+            partitions_config["interval"]
+        )
+        if "compaction" in partitions_config.columns:
+            new_partitions = compact_partition_plan(
+                new_partitions,
+                dict(zip(partitions_config["table"], partitions_config["interval"])),
+                {t: r for t, r in zip(partitions_config["table"], partitions_config["compaction"]) if isinstance(r, dict)},
+                today
+            )
+        new_partitions = apply_retention(new_partitions, get_retention_cutoffs(partitions_config))
+        logger.info(f"Successfully generated {len(new_partitions)} partition(s)")
+    except Exception as e:
+        logger.error(f"Error generating date ranges: {str(e)}")
+        raise
+
+    return new_partitions[["table_name", "partition_name", "range_start", "range_end"]]
+
+def find_compactions(planned: pd.DataFrame, existing_names: list[str]) -> pd.DataFrame:
+    """
+    Finds the existing partitions of a table replaced by coarser planned partitions.
+
+    Args:
+        planned (pd.DataFrame): Planned partitions of the table, in date order.
+        existing_names (list[str]): Names of the existing partitions of the table.
+
+    Returns:
+        pd.DataFrame: Planned partitions that replace existing ones, with an 'originals' column listing them.
+    """
+    existing: pd.DataFrame = parse_partition_names(existing_names).dropna()
+    existing = existing[~existing["partition_name"].isin(planned["partition_name"])]
+    if existing.empty or planned.empty:
+        return planned.iloc[0:0].assign(originals=None)
+
+    # Planned partitions do not overlap, so an existing partition can only be inside the one starting before it
+    starts: np.ndarray = planned["range_start"].to_numpy()
+    position: np.ndarray = np.searchsorted(starts, existing["range_start"].to_numpy(), side="right") - 1
+    inside: np.ndarray = (position >= 0) & (
+        existing["range_end"].to_numpy() <= planned["range_end"].to_numpy()[np.maximum(position, 0)]
+    )
+    if not inside.any():
+        return planned.iloc[0:0].assign(originals=None)
+
+    originals: pd.Series = existing[inside].groupby(position[inside])["partition_name"].agg(list)
+    return planned.iloc[originals.index].assign(originals=originals.to_numpy())
+
+@traced("pipeline.plan_partitions")
+def plan_partitions(
+        dataset: Dataset,
+        partitions_config: Union[str, pd.DataFrame],
+        logger: Optional[logging.Logger] = None
+    ) -> PartitionChanges:
+    """
+    Plans the partition changes required by a partitions configuration, without applying them.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions_config (Union[str, pd.DataFrame]): JSON string or DataFrame containing the partitions configuration.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        PartitionChanges: Partitions to create, delete and compact.
+
+    Raises:
+        ValueError: If the partitions configuration is invalid.
+    """
+    logger = logger or _logger
+    workspace_name: str = dataset.workspace_name
+    dataset_name: str = dataset.dataset_name
+
+    # Relationships are not needed to create partitions, so they are never downloaded
+    dataset.prefetch("tables", "partitions")
+    catalog: PartitionCatalog = dataset.partition_catalog
+
+    logger.info("Validating partitions configuration parameter value...")
+    config_df = validate_partitions_config(dataset, partitions_config, logger)
+
+    # Partition ranges of all tables are generated at once
+    plan: pd.DataFrame = generate_partition_ranges(config_df, logger)
+    planned_partitions: dict[str, pd.DataFrame] = dict(tuple(plan.groupby("table_name", sort=False)))
+    empty_plan: pd.DataFrame = plan.iloc[0:0]
+    created: list[pd.DataFrame] = []
+    compactions: list[pd.DataFrame] = []
+    cutoffs: dict[str, Optional[pd.Timestamp]] = get_retention_cutoffs(config_df)
+    deleted: list[tuple[str, str]] = []
+    expired: list[tuple[str, str]] = []
+
+    for row in config_df.itertuples():
+        try:
+            logger.info(f"Planning partitions for '{row.table}' in the '{dataset_name}' dataset within the '{workspace_name}' workspace.")
+
+            new_partitions: pd.DataFrame = planned_partitions.get(row.table, empty_plan).assign(
+                partition_by=row.partition_by
+            )
+
+            # Partitions of the table being processed
+            table_partitions: pd.DataFrame = catalog.get_table(row.table)
+
+            # Extract base query and last step name, and compile the template used for all pending partitions
+            logger.info(f"Extracting query definition...")
+            base_query, last_step = dataset.extract_query_definition(table_partitions["query"].iloc[0])
+            template = PartitionQueryTemplate(base_query, last_step, row.partition_by)
+            logger.info(f"Query base:\n{base_query}\n")
+
+            # Partitions merged from existing ones are created later, together with their refresh
+            merged: pd.DataFrame = find_compactions(new_partitions, catalog.get_partition_names(row.table))
+            if not merged.empty:
+                exists: np.ndarray = catalog.contains(merged["table_name"], merged["partition_name"])
+                merged = merged.assign(query_definition=[
+                    None if e else q for e, q in zip(exists, template.render(
+                        merged["partition_name"], merged["range_start"], merged["range_end"]
+                    ))
+                ])
+                compactions.append(merged)
+                logger.info("Partitions to compact: %s", summarize(dict(zip(merged["partition_name"], merged["originals"]))))
+
+            # Partitions entirely before the retention window, unless they are being compacted
+            if cutoffs.get(row.table) is not None:
+                table_ranges: pd.DataFrame = parse_partition_names(catalog.get_partition_names(row.table)).dropna()
+                compacted: set[str] = {name for names in merged["originals"] for name in names}
+                table_expired: list[str] = table_ranges[
+                    (table_ranges["range_end"] < cutoffs[row.table])
+                    & ~table_ranges["partition_name"].isin(compacted)
+                ]["partition_name"].tolist()
+                expired.extend((row.table, name) for name in table_expired)
+                if table_expired:
+                    logger.info("Expired partitions: %s", summarize(table_expired))
+
+            # Create new partitions if needed
+            existing: np.ndarray = catalog.contains(new_partitions["table_name"], new_partitions["partition_name"])
+            existing |= new_partitions["partition_name"].isin(merged["partition_name"]).to_numpy()
+            pending_partitions: pd.DataFrame = new_partitions[~existing][
+                ["table_name", "partition_by", "partition_name", "range_start", "range_end"]
+            ]
+
+            if not pending_partitions.empty:
+                logger.info("Pending partitions: %s", summarize(pending_partitions["partition_name"]))
+                created.append(pending_partitions.assign(query_definition=template.render(
+                    pending_partitions["partition_name"],
+                    pending_partitions["range_start"],
+                    pending_partitions["range_end"]
+                )))
+            else:
+                logger.info(f"No pending partitions to create.")
+
+            # Delete default partition if present. Its name equals the table name
+            if (row.table, row.table) in catalog:
+                deleted.append((row.table, row.table))
+                logger.info(f"Default partition '{row.table}' planned for deletion.")
+            else:
+                logger.info(f"No default partition found.")
+        except Exception as e:
+            logger.error(f"Failed to plan partitions for table '{row.table}': {str(e)}")
+            raise
+
+    changes = PartitionChanges(deleted=deleted + expired)
+    if created:
+        changes.created = pd.concat(created, ignore_index=True)
+    if compactions:
+        changes.compactions = pd.concat(compactions, ignore_index=True)
+    current_span().set(created=len(changes.created), deleted=len(changes.deleted), compactions=len(changes.compactions))
+    return changes
+
+@traced("pipeline.partition")
+def partition(
+        dataset: Dataset,
+        partitions_config: Union[str, pd.DataFrame],
+        logger: Optional[logging.Logger] = None
+    ) -> None:
+    """
+    Creates partitions in a semantic model based on the provided configuration.
+
+    All tables are changed in a single TOM session, saved once and rolled back as a whole on failure.
+    Compactions run afterwards, in a single TMSL sequence.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions_config (Union[str, pd.DataFrame]): JSON string or DataFrame containing the partitions configuration.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If the partitions configuration is invalid.
+        RuntimeError: If partitions cannot be created, deleted or compacted.
+    """
+    logger = logger or _logger
+    changes: PartitionChanges = plan_partitions(dataset, partitions_config, logger)
+
+    # All tables are changed in a single TOM session, saved once and rolled back as a whole on failure
+    try:
+        with dataset.batch():
+            if not changes.created.empty:
+                dataset.create_m_partitions(changes.created)
+                logger.info("Queued partitions: %s", summarize(changes.created["partition_name"]))
+
+            # Default and expired partitions of all tables are deleted in the same session
+            if changes.deleted:
+                try:
+                    dataset.delete_partitions(changes.deleted)
+                    logger.info(f"{len(changes.deleted)} default or expired partition(s) queued for deletion.")
+                except Exception as e:
+                    logger.error(f"Failed to delete partitions: {str(e)}")
+                    raise
+    except Exception as e:
+        logger.error(f"Partition changes rolled back: {str(e)}")
+        raise
+
+    logger.info("Partition changes committed successfully.")
+
+    # Merged partitions are created, refreshed and their originals dropped in a single transaction
+    if not changes.compactions.empty:
+        try:
+            logger.info(f"Compacting {changes.compactions['originals'].map(len).sum()} partition(s) into {len(changes.compactions)}...")
+            dataset.compact_partitions(changes.compactions)
+            logger.info("Partitions compacted successfully.")
+        except Exception as e:
+            logger.error(f"Partition compaction rolled back: {str(e)}")
+            raise
+
+# ============================================================================
+# REFRESH
+# ============================================================================
+
+@traced("pipeline.get_tables")
+def get_tables(
+        dataset: Dataset,
+        tables_to_refresh: Optional[str],
+        logger: Optional[logging.Logger] = None
+    ) -> pd.DataFrame:
+    """
+    Gets the list of tables to refresh.
+    If tables parameter is provided, parse it into a list and get related tables.
+    If not provided, retrieve all tables from the dataset.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        tables_to_refresh (Optional[str]): Comma-separated string of table names to refresh.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        pd.DataFrame: DataFrame containing table names to refresh.
+
+    Raises:
+        ValueError: If no tables to refresh are found or invalid table names are provided.
+    """
+    logger = logger or _logger
+    available_tables: list[str] = dataset.tables["table_name"].unique().tolist()
+
+    if is_valid_text(tables_to_refresh):
+        table_list: list[str] = [t.strip() for t in tables_to_refresh.split(',') if t.strip()]
+        logger.info(f"Tables to refresh provided: {table_list}")
+
+        # Check if the provided tables exist in the dataset
+        invalid_tables: list[str] = list(set(table_list) - set(available_tables))
+        if invalid_tables:
+            raise ValueError(f"Invalid table names provided: {invalid_tables}")
+
+        # Get related tables
+        tables: pd.DataFrame = dataset.get_related_tables(table_list)
+        logger.info("Tables to refresh: %s", summarize(tables["table_name"]))
+        return tables
+    else:
+        logger.info("No tables to refresh provided. Retrieving all tables...")
+        return pd.DataFrame({"table_name": available_tables})
+
+@traced("pipeline.get_partitions")
+def get_partitions(
+        dataset: Dataset,
+        tables: pd.DataFrame,
+        partitions_to_refresh: Optional[str],
+        logger: Optional[logging.Logger] = None,
+        catalog: Optional[PartitionCatalog] = None
+    ) -> pd.DataFrame:
+    """
+    Gets the list of partitions to refresh.
+    If partitions parameter is provided, parse it, validate, and filter the partitions to refresh.
+    If not provided, retrieve all partitions from the dataset.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        tables (pd.DataFrame): DataFrame of tables to refresh.
+        partitions_to_refresh (Optional[str]): JSON string specifying tables and their partitions to refresh.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+        catalog (Optional[PartitionCatalog]): Partitions to choose from. Defaults to the current partitions of the dataset.
+
+    Returns:
+        pd.DataFrame: Partitions to refresh.
+
+    Raises:
+        ValueError: If invalid partitions are specified.
+    """
+    logger = logger or _logger
+    catalog = catalog or dataset.partition_catalog
+
+    # Get partitions for each table to refresh
+    available_partitions: pd.DataFrame = catalog.select(tables["table_name"])[["table_name", "partition_name"]]
+    current_span().set(tables=len(tables), available_partitions=len(available_partitions))
+
+    if not is_valid_text(partitions_to_refresh):
+        logger.info("No explicit partitions to refresh. Refreshing all partitions...")
+        return available_partitions
+    else:
+        selected_tables: pd.DataFrame = pd.read_json(StringIO(partitions_to_refresh))
+        available_tables = set(available_partitions["table_name"])
+
+        # If any of the tables with selected partitions are not available
+        is_available: pd.Series = selected_tables["table"].isin(available_tables)
+        if not is_available.all():
+            logger.warning("The following tables, for which partitions were selected, are not available: %s", summarize(selected_tables.loc[~is_available, "table"]))
+
+        # Tables with selected partitions
+        tables_with_selected_part: pd.DataFrame = selected_tables[is_available]
+
+        if tables_with_selected_part.empty:
+            return available_partitions
+
+        # Parse and explode selected partitions
+        selected_partitions: pd.DataFrame = (
+            tables_with_selected_part[["table", "selected_partitions"]]
+            .rename(columns={"table": "table_name"})
+            .assign(partition_name=lambda x: x["selected_partitions"].map(
+                lambda p: p if isinstance(p, list) else str(p).split(",")
+            ))
+            .explode("partition_name", ignore_index=True)
+            .assign(partition_name=lambda x: x["partition_name"].str.strip())
+            .drop_duplicates(["table_name", "partition_name"])
+        )
+
+        # If any of the selected partitions do not match the available partitions for the table
+        is_valid: np.ndarray = catalog.contains(selected_partitions["table_name"], selected_partitions["partition_name"])
+        if not is_valid.all():
+            raise ValueError(f"Invalid partitions found:\n{selected_partitions.loc[~is_valid, ['table_name', 'partition_name']].to_json(orient='records')}")
+
+        # Partitions to be refreshed not explicitly selected (related tables)
+        table_partitions_no_selected: pd.DataFrame = available_partitions[
+            ~available_partitions["table_name"].isin(set(selected_partitions["table_name"]))
+        ]
+
+        partitions: pd.DataFrame = pd.concat(
+            [table_partitions_no_selected, selected_partitions[["table_name", "partition_name"]]],
+            ignore_index=True
+        )
+        logger.info("Partitions to refresh: %s", summarize(partitions))
+        current_span().set(selected_partitions=len(partitions))
+        return partitions
+
+@traced("pipeline.commit_watermarks")
+def commit_watermarks(
+        dataset: Dataset,
+        partitions: pd.DataFrame,
+        watermark_store: Optional[WatermarkStore],
+        logger: Optional[logging.Logger] = None
+    ) -> None:
+    """
+    Commits the watermarks staged for the refreshed partitions, so they are skipped
+    in the next run if their source data does not change.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions (pd.DataFrame): Refreshed partitions with columns: ['table', 'partition'].
+        watermark_store (Optional[WatermarkStore]): Store of the partition watermarks. None disables change detection.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        None
+    """
+    logger = logger or _logger
+    if watermark_store is None or partitions.empty:
+        return
+
+    committed: int = watermark_store.commit(dataset.dataset_id, partitions)
+    logger.info(f"Committed {committed} partition watermark(s).")
+
+@traced("pipeline.refresh_sharded")
+def refresh_sharded(
+        dataset: Dataset,
+        partitions: pd.DataFrame,
+        refresh_shards: int,
+        refresh_shard_by: str = ShardBy.TABLE,
+        commit_mode: str = "transactional",
+        max_parallelism: Union[int, str] = 4,
+        max_concurrent_refreshes: int = 1,
+        watermark_store: Optional[WatermarkStore] = None,
+        logger: Optional[logging.Logger] = None,
+        fail_fast: bool = False,
+        max_retries: int = 0,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+        checkpoint: Optional[RunCheckpoint] = None,
+        refresh_slot: Optional[Callable[[], ContextManager[Any]]] = None
+    ) -> None:
+    """
+    Refreshes partitions split into several refresh requests and waits for all of them.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions (pd.DataFrame): Partitions to refresh with columns: ['table', 'partition'].
+        refresh_shards (int): Number of refresh requests the refresh is split into.
+        refresh_shard_by (str): Strategy used to split the refresh ('TABLE', 'SIZE', 'COUNT').
+        commit_mode (str): Commit mode used for the refresh requests.
+        max_parallelism (Union[int, str]): Maximum parallelism within each refresh request, or 'AUTO' to tune it per request.
+        max_concurrent_refreshes (int): Maximum number of refresh requests running at the same time.
+        watermark_store (Optional[WatermarkStore]): Store of the partition watermarks. None disables change detection.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+        fail_fast (bool): Whether to cancel a transactional refresh request as soon as one of its objects fails.
+        max_retries (int): Maximum number of times the objects of a partialBatch refresh request that did not
+            complete are resubmitted.
+        retry_backoff (float): Seconds to wait before the first retry, doubled on each retry.
+        checkpoint (Optional[RunCheckpoint]): Checkpoint of the run the refresh requests are recorded in.
+        refresh_slot (Optional[Callable[[], ContextManager[Any]]]): Function that returns a context manager held while
+            each refresh request is submitted and runs, e.g. a slot of fanout.RefreshSlots shared with other datasets.
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If any refresh request fails.
+    """
+    logger = logger or _logger
+    sharded_refresh: ShardedRefresh = dataset.refresh_objects_sharded(
+        partitions,
+        refresh_shards,
+        refresh_shard_by,
+        commit_mode,
+        max_parallelism,
+        max_concurrent_refreshes,
+        on_progress=_refresh_progress_logger(logger),
+        cancel_on_failure=_cancels_on_failure(commit_mode, fail_fast),
+        max_retries=_retries(commit_mode, max_retries),
+        retry_backoff=retry_backoff,
+        on_change=_checkpoint_shards(checkpoint, commit_mode, logger),
+        slot=refresh_slot
+    )
+    logger.info(f"Refresh split into {len(sharded_refresh.shards)} request(s) by {refresh_shard_by}.")
+    _wait_refresh_requests(dataset, sharded_refresh, watermark_store, logger)
+
+@traced("pipeline.refresh_in_waves")
+def refresh_in_waves(
+        dataset: Dataset,
+        partitions: pd.DataFrame,
+        commit_mode: str = "transactional",
+        max_parallelism: Union[int, str] = 4,
+        max_concurrent_refreshes: int = 1,
+        watermark_store: Optional[WatermarkStore] = None,
+        logger: Optional[logging.Logger] = None,
+        fail_fast: bool = False,
+        max_retries: int = 0,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+        checkpoint: Optional[RunCheckpoint] = None,
+        refresh_slot: Optional[Callable[[], ContextManager[Any]]] = None
+    ) -> None:
+    """
+    Refreshes partitions in dependency order, one refresh request per level of the relationships,
+    and waits for all of them.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions (pd.DataFrame): Partitions to refresh with columns: ['table', 'partition'].
+        commit_mode (str): Commit mode used for the refresh requests.
+        max_parallelism (Union[int, str]): Maximum parallelism within each wave, or 'AUTO' to tune it per wave.
+        max_concurrent_refreshes (int): Maximum number of refresh requests running at the same time.
+        watermark_store (Optional[WatermarkStore]): Store of the partition watermarks. None disables change detection.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+        fail_fast (bool): Whether to cancel a transactional wave as soon as one of its objects fails. The waves
+            that depend on it are skipped.
+        max_retries (int): Maximum number of times the objects of a partialBatch wave that did not complete
+            are resubmitted.
+        retry_backoff (float): Seconds to wait before the first retry, doubled on each retry.
+        checkpoint (Optional[RunCheckpoint]): Checkpoint of the run the waves are recorded in.
+        refresh_slot (Optional[Callable[[], ContextManager[Any]]]): Function that returns a context manager held while
+            each refresh request is submitted and runs, e.g. a slot of fanout.RefreshSlots shared with other datasets.
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If any wave fails or is skipped.
+    """
+    logger = logger or _logger
+    waves: ShardedRefresh = dataset.refresh_objects_in_waves(
+        partitions,
+        commit_mode,
+        max_parallelism,
+        max_concurrent_refreshes,
+        on_progress=_refresh_progress_logger(logger),
+        cancel_on_failure=_cancels_on_failure(commit_mode, fail_fast),
+        max_retries=_retries(commit_mode, max_retries),
+        retry_backoff=retry_backoff,
+        on_change=_checkpoint_shards(checkpoint, commit_mode, logger),
+        slot=refresh_slot
+    )
+    logger.info("Refresh split into %d wave(s): %s", len(waves.shards), lazy(lambda: [s.objects["table"].unique().tolist() for s in waves.shards]))
+    _wait_refresh_requests(dataset, waves, watermark_store, logger)
+
+def _cancels_on_failure(commit_mode: Optional[str], fail_fast: bool) -> bool:
+    """
+    Checks whether refresh requests are cancelled as soon as one of their objects fails.
+
+    Only transactional refreshes are cancelled: nothing of them is committed once an object fails, while
+    partialBatch refreshes still commit the objects that complete.
+    """
+    return fail_fast and str(commit_mode or "transactional").lower() == "transactional"
+
+def _retries(commit_mode: Optional[str], max_retries: int) -> int:
+    """
+    Gets the number of retries of the objects of a refresh request that did not complete.
+
+    Only partialBatch refreshes are retried: their completed objects are committed, while a failed
+    transactional refresh has to be refreshed again as a whole.
+    """
+    return max_retries if str(commit_mode or "transactional").lower() == "partialbatch" else 0
+
+def _log_refresh_outcome(outcome: RefreshOutcome, logger: logging.Logger) -> None:
+    """Logs the final outcome of the objects of a refresh and of the retries of its failed objects."""
+    retried = outcome.objects[outcome.objects["attempts"] > 1]
+    if retried.empty and outcome.failed.empty:
+        return
+
+    logger.info(
+        "Refresh outcome: %d object(s) completed, %d of them after retrying, and %d failed, in %d request(s).",
+        len(outcome.completed),
+        int((retried["status"] == "Completed").sum()),
+        len(outcome.failed),
+        len(outcome.refresh_request_ids)
+    )
+    if not outcome.failed.empty:
+        logger.warning("Objects not refreshed: %s", summarize(outcome.failed))
+
+def _refresh_progress_logger(logger: logging.Logger) -> Callable[[RefreshEvent], None]:
+    """Builds a callback that logs the status changes of refresh requests and their objects."""
+    def log_event(event: RefreshEvent) -> None:
+        if event.is_request:
+            logger.info("Refresh request %s: %s", event.refresh_request_id, event.status)
+            return
+
+        name = event.table if event.partition is None else f"{event.table}.{event.partition}"
+        if event.is_failure:
+            logger.warning("Refresh of '%s' failed.", name)
+        elif event.status not in IN_PROGRESS_STATUSES:
+            logger.debug("'%s': %s", name, event.status)
+
+    return log_event
+
+def _update_checkpoint(checkpoint: Optional[RunCheckpoint], logger: logging.Logger, update: Callable[[RunCheckpoint], None]) -> None:
+    """Updates the checkpoint of a run, if any. A checkpoint that cannot be written does not stop the run."""
+    if checkpoint is None:
+        return
+    try:
+        update(checkpoint)
+    except Exception as e:
+        logger.warning(f"Failed to update run checkpoint '{checkpoint.file}': {str(e)}")
+
+def _completed_objects(objects: pd.DataFrame, status: str, commit_mode: Optional[str]) -> pd.DataFrame:
+    """
+    Gets the objects of a finished refresh request whose refresh was committed.
+
+    Args:
+        objects (pd.DataFrame): Objects of the request with columns ['table', 'partition', 'status'].
+        status (str): Final status of the request.
+        commit_mode (Optional[str]): Commit mode of the request.
+
+    Returns:
+        pd.DataFrame: Committed objects with columns ['table', 'partition'].
+    """
+    if status == RefreshStatus.COMPLETED:
+        return objects[["table", "partition"]]
+    if str(commit_mode or "transactional").lower() != "partialbatch":
+        # Nothing of a failed transactional refresh is committed
+        return objects.iloc[0:0][["table", "partition"]]
+    return objects.loc[objects["status"] == RefreshStatus.COMPLETED, ["table", "partition"]]
+
+def _object_keys(objects: pd.DataFrame) -> pd.MultiIndex:
+    """Keys (table, partition) used to match refresh objects across sources. Table-level objects get an empty partition."""
+    return pd.MultiIndex.from_arrays([
+        objects["table"].astype(str).to_numpy(),
+        objects["partition"].fillna("").astype(str).to_numpy()
+    ], names=["table", "partition"])
+
+def _checkpoint_shards(
+        checkpoint: Optional[RunCheckpoint],
+        commit_mode: Optional[str],
+        logger: logging.Logger
+    ) -> Optional[Callable[[RefreshShard], None]]:
+    """Builds a callback that records the submitted and finished shards of a sharded refresh in the checkpoint of the run."""
+    if checkpoint is None:
+        return None
+
+    def record_shard(shard: RefreshShard) -> None:
+        if not shard.refresh_request_id:
+            return
+        if shard.ended_at is None:
+            _update_checkpoint(checkpoint, logger, lambda c: c.add_request(shard.refresh_request_id, shard.objects))
+            return
+
+        objects = shard.outcome.objects if shard.outcome is not None else shard.objects.assign(status=str(shard.status))
+        completed = _completed_objects(objects, str(shard.status), commit_mode)
+        _update_checkpoint(checkpoint, logger, lambda c: c.finish_request(shard.refresh_request_id, completed))
+
+    return record_shard
+
+def _resume_refresh(
+        dataset: Dataset,
+        partitions: pd.DataFrame,
+        checkpoint: RunCheckpoint,
+        commit_mode: Optional[str],
+        watermark_store: Optional[WatermarkStore],
+        logger: logging.Logger,
+        refresh_slot: Callable[[], ContextManager[Any]] = nullcontext
+    ) -> pd.DataFrame:
+    """
+    Resumes the refresh of a run from its checkpoint.
+
+    Waits for the refresh requests the previous run left running, commits the watermarks of the objects
+    they refreshed, and leaves out of the partitions to refresh every object refreshed by the previous run.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions (pd.DataFrame): Partitions to refresh with columns: ['table', 'partition'].
+        checkpoint (RunCheckpoint): Checkpoint of the run.
+        commit_mode (Optional[str]): Commit mode of the refresh requests.
+        watermark_store (Optional[WatermarkStore]): Store of the partition watermarks. None disables change detection.
+        logger (logging.Logger): Logger used to report progress.
+        refresh_slot (Callable[[], ContextManager[Any]]): Function that returns a context manager held while
+            waiting for each refresh request.
+
+    Returns:
+        pd.DataFrame: Partitions still to refresh.
+    """
+    for refresh_request_id, objects in checkpoint.pending_requests().items():
+        logger.info(f"Reattaching to refresh request {refresh_request_id} of the previous run ({len(objects)} object(s))...")
+        try:
+            with refresh_slot():
+                status: str = dataset.check_refresh_status(refresh_request_id, on_progress=_refresh_progress_logger(logger))
+            statuses: pd.DataFrame = dataset.get_object_statuses(refresh_request_id)
+            reported = pd.Series(statuses["status"].to_numpy(), index=_object_keys(statuses))
+            reported = reported[~reported.index.duplicated()]
+            objects = objects.assign(status=reported.reindex(_object_keys(objects)).fillna(status).to_numpy())
+            completed: pd.DataFrame = _completed_objects(objects, status, commit_mode)
+        except Exception as e:
+            # The objects of a request that cannot be followed are refreshed again
+            logger.warning(f"Failed to reattach to refresh request {refresh_request_id}: {str(e)}")
+            status, completed = RefreshStatus.FAILED, objects.iloc[0:0][["table", "partition"]]
+
+        logger.info(f"Refresh request {refresh_request_id} finished with status '{status}': {len(completed)} of {len(objects)} object(s) refreshed.")
+        commit_watermarks(dataset, completed, watermark_store, logger)
+        _update_checkpoint(checkpoint, logger, lambda c: c.finish_request(refresh_request_id, completed))
+
+    refreshed: pd.DataFrame = checkpoint.completed_objects()
+    if refreshed.empty:
+        return partitions
+
+    remaining = partitions[~_object_keys(partitions).isin(_object_keys(refreshed))].reset_index(drop=True)
+    logger.info(f"Skipping {len(partitions) - len(remaining)} object(s) refreshed by the previous run.")
+    return remaining
+
+def _wait_refresh_requests(
+        dataset: Dataset,
+        sharded_refresh: ShardedRefresh,
+        watermark_store: Optional[WatermarkStore],
+        logger: logging.Logger
+    ) -> None:
+    """
+    Waits for the refresh requests of a sharded refresh and commits the watermarks of the completed ones.
+
+    Raises:
+        RuntimeError: If any refresh request fails.
+    """
+    status: str = sharded_refresh.wait()
+    logger.info("Refresh requests status:\n%s", lazy(lambda: sharded_refresh.statuses().to_string(index=False)))
+
+    # Watermarks of completed objects are committed even if other objects failed
+    outcome: RefreshOutcome = sharded_refresh.outcome()
+    _log_refresh_outcome(outcome, logger)
+    commit_watermarks(dataset, outcome.completed, watermark_store, logger)
+
+    if status != "Completed":
+        raise RuntimeError("Refresh failed for one or more requests. Check refresh history for more details.")
+
+    logger.info("Refresh completed successfully.")
+
+@traced("pipeline.refresh")
+def refresh(
+        dataset: Dataset,
+        tables_to_refresh: Optional[str] = None,
+        partitions_to_refresh: Optional[str] = None,
+        commit_mode: str = "transactional",
+        max_parallelism: Union[int, str] = 4,
+        refresh_shards: int = 1,
+        refresh_shard_by: str = ShardBy.TABLE,
+        max_concurrent_refreshes: int = 1,
+        watermark_store: Optional[WatermarkStore] = None,
+        logger: Optional[logging.Logger] = None,
+        refresh_waves: bool = False,
+        fail_fast: bool = False,
+        max_retries: int = 0,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+        checkpoint: Optional[RunCheckpoint] = None,
+        refresh_slot: Optional[Callable[[], ContextManager[Any]]] = None
+    ) -> None:
+    """
+    Refresh specified tables and partitions in a semantic model.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        tables_to_refresh (Optional[str]): Comma-separated table names to refresh, along with their related tables.
+            If empty, all tables are refreshed.
+        partitions_to_refresh (Optional[str]): JSON string with the partitions to refresh of each table.
+            If empty, all partitions of the tables are refreshed.
+        commit_mode (str): Commit mode used for the refresh ('transactional', 'partialBatch').
+        max_parallelism (Union[int, str]): Maximum number of objects refreshed in parallel, or 'AUTO' to choose it
+            from the throughput of past runs. 'AUTO' requires the dataset to have a refresh history.
+        refresh_shards (int): Number of refresh requests the refresh is split into.
+        refresh_shard_by (str): Strategy used to split the refresh ('TABLE', 'SIZE', 'COUNT').
+        max_concurrent_refreshes (int): Maximum number of refresh requests running at the same time.
+        watermark_store (Optional[WatermarkStore]): Store of the partition watermarks. None disables change detection.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+        refresh_waves (bool): Whether to refresh in dependency order, one refresh request per level of the
+            relationships (dimensions before facts). Takes precedence over refresh_shards.
+        fail_fast (bool): Whether to cancel a transactional refresh request as soon as one of its objects fails,
+            instead of waiting for the rest of its objects, which would not be committed anyway.
+        max_retries (int): Maximum number of times the objects of a partialBatch refresh request that did not
+            complete are resubmitted, so a transient error only reloads the failed partitions. Ignored for
+            transactional refreshes.
+        retry_backoff (float): Seconds to wait before the first retry, doubled on each retry.
+        checkpoint (Optional[RunCheckpoint]): Checkpoint of the run. The refresh requests are recorded in it, and if
+            a previous run left it, the refresh reattaches to the requests still running and skips the
+            objects already refreshed. Retries of failed objects are not recorded.
+        refresh_slot (Optional[Callable[[], ContextManager[Any]]]): Function that returns a context manager held while
+            each refresh request is submitted and runs, e.g. a slot of fanout.RefreshSlots shared with other datasets.
+
+    Returns:
+        None
+
+    Raises:
+        ValueError: If invalid tables or partitions are specified.
+        RuntimeError: If the refresh operation fails.
+        Exception: If dataset operations fail.
+    """
+    logger = logger or _logger
+    refresh_slot = refresh_slot or nullcontext
+    logger.info(f"Refreshing the '{dataset.dataset_name}' dataset in workspace '{dataset.workspace_name}'...")
+
+    try:
+        # Relationships are only needed to resolve the related tables of the selected ones and to order waves
+        metadata: list[str] = ["tables", "partitions"]
+        if is_valid_text(tables_to_refresh) or refresh_waves:
+            metadata.append("relationships")
+        dataset.prefetch(*metadata)
+
+        logger.info("Getting tables to refresh...")
+        tables: pd.DataFrame = get_tables(dataset, tables_to_refresh, logger)
+
+        logger.info("Getting partitions to refresh...")
+        partitions: pd.DataFrame = (
+            get_partitions(dataset, tables, partitions_to_refresh, logger)
+            .rename(columns={"table_name": "table", "partition_name": "partition"})
+        )
+    except Exception as e:
+        logger.error(f"Failed to retrieve tables and partitions: {str(e)}")
+        raise
+
+    try:
+        if checkpoint is not None:
+            partitions = _resume_refresh(dataset, partitions, checkpoint, commit_mode, watermark_store, logger, refresh_slot)
+            if partitions.empty:
+                logger.info("All objects were refreshed by the previous run.")
+                return
+
+        logger.info("Requesting refresh for objects: %s", summarize(partitions))
+
+        if refresh_waves:
+            refresh_in_waves(
+                dataset,
+                partitions,
+                commit_mode,
+                max_parallelism,
+                max_concurrent_refreshes or 1,
+                watermark_store,
+                logger,
+                fail_fast,
+                max_retries,
+                retry_backoff,
+                checkpoint,
+                refresh_slot
+            )
+            return
+
+        if refresh_shards and refresh_shards > 1:
+            refresh_sharded(
+                dataset,
+                partitions,
+                refresh_shards,
+                refresh_shard_by or ShardBy.TABLE,
+                commit_mode,
+                max_parallelism,
+                max_concurrent_refreshes or 1,
+                watermark_store,
+                logger,
+                fail_fast,
+                max_retries,
+                retry_backoff,
+                checkpoint,
+                refresh_slot
+            )
+            return
+
+        if is_auto_parallelism(max_parallelism):
+            max_parallelism = dataset.tune_parallelism(partitions)
+            logger.info(f"Auto-tuned max parallelism: {max_parallelism}")
+
+        # The slot is held from the submission of the request until it finishes, retries included
+        with refresh_slot():
+            refresh_request_id: str = dataset.refresh_objects(partitions, commit_mode, max_parallelism)
+            if not refresh_request_id:
+                raise ValueError("Refresh request is invalid.")
+
+            logger.info(f"Refresh request ID: {refresh_request_id}")
+            _update_checkpoint(checkpoint, logger, lambda c: c.add_request(refresh_request_id, partitions))
+
+            retries: int = _retries(commit_mode, max_retries)
+            if retries > 0:
+                outcome: RefreshOutcome = dataset.wait_and_retry(
+                    refresh_request_id,
+                    commit_mode,
+                    max_parallelism,
+                    retries,
+                    retry_backoff,
+                    on_progress=_refresh_progress_logger(logger),
+                    cancel_on_failure=_cancels_on_failure(commit_mode, fail_fast)
+                )
+                _log_refresh_outcome(outcome, logger)
+                # Completed objects of a partialBatch refresh are committed even if others failed
+                commit_watermarks(dataset, outcome.completed, watermark_store, logger)
+                _update_checkpoint(checkpoint, logger, lambda c: c.finish_request(refresh_request_id, outcome.completed))
+                if outcome.status != "Completed":
+                    raise RuntimeError(
+                        f"Refresh failed for {len(outcome.failed)} object(s) after {retries} retries. Check refresh history for more details."
+                    )
+                logger.info("Refresh completed successfully.")
+                return
+
+            status: str = dataset.check_refresh_status(
+                refresh_request_id,
+                on_progress=_refresh_progress_logger(logger),
+                cancel_on_failure=_cancels_on_failure(commit_mode, fail_fast)
+            )
+            if status != "Completed":
+                _update_checkpoint(checkpoint, logger, lambda c: c.finish_request(refresh_request_id, partitions.iloc[0:0]))
+                raise RuntimeError("Refresh failed. Check refresh history for more details.")
+
+            logger.info("Refresh completed successfully.")
+            commit_watermarks(dataset, partitions, watermark_store, logger)
+            _update_checkpoint(checkpoint, logger, lambda c: c.finish_request(refresh_request_id, partitions))
+    except Exception as e:
+        logger.error(f"Unexpected error during refresh: {str(e)}")
+        raise
+
+# ============================================================================
+# PLAN
+# ============================================================================
+
+@traced("pipeline.compile_run")
+def compile_run(
+        dataset: Dataset,
+        partitions_config: Optional[Union[str, pd.DataFrame]] = None,
+        tables_to_refresh: Optional[str] = None,
+        partitions_to_refresh: Optional[str] = None,
+        max_parallelism: Optional[int] = 4,
+        refresh: bool = True,
+        logger: Optional[logging.Logger] = None
+    ) -> RunPlan:
+    """
+    Compiles a partition and refresh run into a single TMSL sequence, without changing the model.
+
+    Partitions to refresh are selected among the partitions the model will have once the planned
+    partition changes are applied, so new partitions can be refreshed in the same run.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        partitions_config (Optional[Union[str, pd.DataFrame]]): Partitions configuration. If empty, no partition is changed.
+        tables_to_refresh (Optional[str]): Comma-separated table names to refresh, along with their related tables.
+        partitions_to_refresh (Optional[str]): JSON string with the partitions to refresh of each table.
+        max_parallelism (Optional[int]): Maximum number of threads used by the sequence.
+        refresh (bool): Whether the run refreshes partitions.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        RunPlan: The compiled plan. Print RunPlan.describe() for a dry run, or run it with Dataset.execute_plan().
+
+    Raises:
+        ValueError: If the configuration, the tables and partitions to refresh or max_parallelism are invalid.
+    """
+    logger = logger or _logger
+    if is_auto_parallelism(max_parallelism):
+        raise ValueError("Max parallelism cannot be auto-tuned for a TMSL sequence.")
+
+    changes: PartitionChanges = (
+        plan_partitions(dataset, partitions_config, logger)
+        if isinstance(partitions_config, pd.DataFrame) or is_valid_text(partitions_config)
+        else PartitionChanges()
+    )
+    plan = RunPlan(dataset.dataset_name, changes, max_parallelism=max_parallelism)
+    if not refresh:
+        return plan
+
+    metadata: list[str] = ["tables", "partitions"]
+    if is_valid_text(tables_to_refresh):
+        metadata.append("relationships")
+    dataset.prefetch(*metadata)
+
+    # Partitions of the model after the planned changes
+    current: pd.DataFrame = dataset.partition_catalog.frame[["table_name", "partition_name"]]
+    removed: set[tuple[str, str]] = set(changes.removed)
+    kept: np.ndarray = np.fromiter(
+        (key not in removed for key in zip(current["table_name"], current["partition_name"])),
+        dtype=bool, count=len(current)
+    )
+    planned_catalog = PartitionCatalog(pd.concat(
+        [current[kept], changes.added[["table_name", "partition_name"]]], ignore_index=True
+    ))
+
+    tables: pd.DataFrame = get_tables(dataset, tables_to_refresh, logger)
+    plan.refresh_objects = (
+        get_partitions(dataset, tables, partitions_to_refresh, logger, planned_catalog)
+        .rename(columns={"table_name": "table", "partition_name": "partition"})
+        .reset_index(drop=True)
+    )
+    current_span().set(refreshed=len(plan.refresh_objects))
+    return plan
+
+@traced("pipeline.run_plan")
+def run_plan(
+        dataset: Dataset,
+        plan: RunPlan,
+        watermark_store: Optional[WatermarkStore] = None,
+        logger: Optional[logging.Logger] = None
+    ) -> None:
+    """
+    Runs a compiled plan with a single TMSL call and commits the watermarks of the refreshed partitions.
+
+    Args:
+        dataset (Dataset): Dataset object.
+        plan (RunPlan): Plan compiled with compile_run().
+        watermark_store (Optional[WatermarkStore]): Store of the partition watermarks. None disables change detection.
+        logger (Optional[logging.Logger]): Logger used to report progress.
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If the plan fails. No change is applied in that case.
+    """
+    logger = logger or _logger
+    if plan.empty:
+        logger.info("Run plan is empty. Nothing to execute.")
+        return
+
+    logger.info("Executing run plan:\n%s", lazy(lambda: plan.summary().to_string(index=False)))
+    try:
+        dataset.execute_plan(plan)
+    except Exception as e:
+        logger.error(f"Run plan rolled back: {str(e)}")
+        raise
+
+    logger.info("Run plan executed successfully.")
+    commit_watermarks(dataset, plan.refresh_objects, watermark_store, logger)
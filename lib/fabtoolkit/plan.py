@@ -0,0 +1,169 @@
+"""
+Plan module for fabtoolkit.
+
+This module provides:
+- Planned changes to the partitions of a semantic model
+- Compiled run plan: partition changes and refresh in a single TMSL sequence command
+- Dry-run description of a run plan
+"""
+
+from dataclasses import dataclass, field
+import json
+from typing import Any, Optional
+import pandas as pd
+
+# ============================================================================
+# PARTITION CHANGES
+# ============================================================================
+
+# Columns of the planned partition frames
+CREATED_COLUMNS: tuple[str, ...] = ("table_name", "partition_name", "query_definition")
+COMPACTION_COLUMNS: tuple[str, ...] = ("table_name", "partition_name", "query_definition", "originals")
+
+def _empty_created() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(CREATED_COLUMNS))
+
+def _empty_compactions() -> pd.DataFrame:
+    return pd.DataFrame(columns=list(COMPACTION_COLUMNS))
+
+@dataclass
+class PartitionChanges:
+    """Data class representing the planned changes to the partitions of a semantic model.
+
+    Attributes:
+        created (pd.DataFrame): Partitions to create with columns: ['table_name', 'partition_name', 'query_definition'].
+        deleted (list[tuple[str, str]]): (table_name, partition_name) pairs of the default and expired partitions to delete.
+        compactions (pd.DataFrame): Merged partitions with columns: ['table_name', 'partition_name', 'query_definition', 'originals'],
+            where 'originals' lists the partitions each one replaces and 'query_definition' is None if it already exists.
+    """
+
+    created: pd.DataFrame = field(default_factory=_empty_created)
+    deleted: list[tuple[str, str]] = field(default_factory=list)
+    compactions: pd.DataFrame = field(default_factory=_empty_compactions)
+
+    @property
+    def empty(self) -> bool:
+        """Whether there is no change to apply."""
+        return self.created.empty and not self.deleted and self.compactions.empty
+
+    @property
+    def removed(self) -> list[tuple[str, str]]:
+        """All partitions removed from the model: deleted partitions and compaction originals."""
+        return self.deleted + [
+            (row.table_name, name) for row in self.compactions.itertuples() for name in row.originals
+        ]
+
+    @property
+    def added(self) -> pd.DataFrame:
+        """All partitions added to the model: created partitions and new merged partitions."""
+        merged = self.compactions[self.compactions["query_definition"].notna()]
+        return pd.concat(
+            [self.created[list(CREATED_COLUMNS)], merged[list(CREATED_COLUMNS)]],
+            ignore_index=True
+        )
+
+# ============================================================================
+# RUN PLAN
+# ============================================================================
+
+@dataclass
+class RunPlan:
+    """Data class representing a whole partition and refresh run, compiled into one TMSL sequence.
+
+    The sequence creates the new partitions, refreshes the selected and merged partitions and deletes
+    the default, expired and compacted partitions, in a single server-side transaction.
+
+    Attributes:
+        database (str): Name of the semantic model.
+        changes (PartitionChanges): Planned partition changes.
+        refresh_objects (pd.DataFrame): Partitions to refresh with columns: ['table', 'partition'].
+        max_parallelism (Optional[int]): The maximum number of threads used by the sequence.
+    """
+
+    database: str
+    changes: PartitionChanges = field(default_factory=PartitionChanges)
+    refresh_objects: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=["table", "partition"]))
+    max_parallelism: Optional[int] = None
+
+    @property
+    def empty(self) -> bool:
+        """Whether the plan has no operation."""
+        return self.changes.empty and self.refresh_objects.empty
+
+    def _refreshed(self) -> list[tuple[str, str]]:
+        """Partitions refreshed by the plan: selected partitions and merged partitions. Whole tables have an empty partition."""
+        partitions = self.refresh_objects["partition"].astype(object).where(self.refresh_objects["partition"].notna(), "")
+        objects = list(zip(self.refresh_objects["table"], partitions))
+        objects += list(zip(self.changes.compactions["table_name"], self.changes.compactions["partition_name"]))
+        return list(dict.fromkeys(objects))
+
+    def to_tmsl(self) -> dict[str, Any]:
+        """
+        Compiles the plan into a TMSL sequence command.
+
+        Tables refreshed as a whole are sent without a partition, like Dataset.refresh_objects() does, so
+        the service refreshes the table instead of a partition named ''.
+
+        Returns:
+            dict[str, Any]: TMSL script with a single 'sequence' command.
+        """
+        database = self.database
+        operations: list[dict[str, Any]] = [
+            {
+                "createOrReplace": {
+                    "object": {"database": database, "table": row.table_name, "partition": row.partition_name},
+                    "partition": {
+                        "name": row.partition_name,
+                        "mode": "import",
+                        "source": {"type": "m", "expression": row.query_definition}
+                    }
+                }
+            }
+            for row in self.changes.added.itertuples()
+        ]
+
+        refreshed = self._refreshed()
+        if refreshed:
+            operations.append({
+                "refresh": {
+                    "type": "full",
+                    "objects": [
+                        {"database": database, "table": t, "partition": p} if p else {"database": database, "table": t}
+                        for t, p in refreshed
+                    ]
+                }
+            })
+
+        operations += [
+            {"delete": {"object": {"database": database, "table": table, "partition": partition}}}
+            for table, partition in self.changes.removed
+        ]
+
+        sequence: dict[str, Any] = {"operations": operations}
+        if self.max_parallelism is not None:
+            sequence["maxParallelism"] = self.max_parallelism
+        return {"sequence": sequence}
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Gets the number of partitions affected by each kind of operation.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns: ['operation', 'partitions'].
+        """
+        return pd.DataFrame({
+            "operation": ["createOrReplace", "refresh", "delete"],
+            "partitions": [len(self.changes.added), len(self._refreshed()), len(self.changes.removed)],
+        })
+
+    def describe(self) -> str:
+        """
+        Describes the plan for a dry run: the operation summary followed by the TMSL script.
+
+        Returns:
+            str: Printable description of the plan.
+        """
+        return (
+            f"Run plan for '{self.database}':\n{self.summary().to_string(index=False)}\n\n"
+            f"{json.dumps(self.to_tmsl(), indent=2)}"
+        )
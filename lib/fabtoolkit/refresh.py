@@ -0,0 +1,823 @@
+"""
+Refresh module for fabtoolkit.
+
+This module provides:
+- Constants
+- Sharding of refresh objects into several refresh requests
+- Aggregated handle to track sharded refresh requests, optionally ordered by prerequisites
+- Asynchronous monitor of refresh requests
+- Live progress of the objects of a refresh request
+- Per-object outcome of a refresh request and its retries
+"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
+from dataclasses import dataclass
+from enum import StrEnum
+import inspect
+import threading
+import time
+from typing import Any, Awaitable, Callable, ContextManager, Iterable, Iterator, Optional, Union
+import numpy as np
+import pandas as pd
+from fabtoolkit.trace import in_current_context
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+class ShardBy(StrEnum):
+    """Enum representing the strategies to split refresh objects into shards."""
+
+    TABLE = "TABLE"
+    SIZE = "SIZE"
+    COUNT = "COUNT"
+
+class RefreshStatus(StrEnum):
+    """Enum representing the status of a refresh shard."""
+
+    PENDING = "Pending"
+    RUNNING = "Running"
+    COMPLETED = "Completed"
+    FAILED = "Failed"
+    SKIPPED = "Skipped"
+
+# Seconds to wait before resubmitting a shard rejected because another refresh is in progress
+CONFLICT_RETRY_SECONDS: int = 30
+
+# Seconds to wait before the first retry of the failed objects of a refresh, doubled on each retry
+DEFAULT_RETRY_BACKOFF_SECONDS: int = 60
+
+# Statuses reported by the service while a refresh request has not finished
+IN_PROGRESS_STATUSES: frozenset[str] = frozenset({"Unknown", "NotStarted", "InProgress"})
+
+# Statuses reported by the service for an object that failed to refresh
+FAILED_OBJECT_STATUSES: frozenset[str] = frozenset({"Failed"})
+
+# ============================================================================
+# SHARDING
+# ============================================================================
+
+def split_refresh_objects(
+    df: pd.DataFrame,
+    shards: int,
+    shard_by: str = ShardBy.TABLE,
+    sizes: Optional[pd.Series] = None
+) -> list[pd.DataFrame]:
+    """
+    Splits refresh objects into shards.
+
+    Strategies:
+        - TABLE: all partitions of a table stay in the same shard. Tables are balanced across shards by
+          number of partitions.
+        - SIZE: partitions are balanced across shards by size, largest first.
+        - COUNT: partitions are split in consecutive chunks of (almost) equal number of objects.
+
+    Args:
+        df (pd.DataFrame): DataFrame with columns: ['table', 'partition'] specifying objects to refresh.
+        shards (int): Maximum number of shards.
+        shard_by (str): Strategy used to split objects ('TABLE', 'SIZE', 'COUNT').
+        sizes (Optional[pd.Series]): Size of each object (e.g. record count), aligned with df. Required for SIZE.
+
+    Returns:
+        list[pd.DataFrame]: Non-empty shards of objects.
+
+    Raises:
+        ValueError: If the number of shards or the strategy is invalid.
+    """
+    if not isinstance(shards, int) or shards <= 0:
+        raise ValueError("Number of shards must be a positive integer.")
+
+    try:
+        strategy = ShardBy(str(shard_by).upper())
+    except ValueError:
+        valid_strategies = ', '.join(str(s.value) for s in ShardBy)
+        raise ValueError(f"Invalid shard strategy: {shard_by}. Expected one of: {valid_strategies}.")
+
+    df = df.reset_index(drop=True)
+    shards = min(shards, len(df))
+    if shards <= 1:
+        return [df] if not df.empty else []
+
+    if strategy == ShardBy.COUNT:
+        return [df.iloc[positions].reset_index(drop=True) for positions in np.array_split(np.arange(len(df)), shards)]
+
+    if strategy == ShardBy.TABLE:
+        units = df.groupby("table", sort=False).indices
+        weights = {table: len(positions) for table, positions in units.items()}
+    else:
+        if sizes is None:
+            raise ValueError("Object sizes are required to split refresh objects by size.")
+        sizes = pd.Series(np.asarray(sizes, dtype=float)).fillna(0)
+        units = {position: np.array([position]) for position in range(len(df))}
+        weights = dict(enumerate(sizes.tolist()))
+
+    # Longest processing time first: assign each unit to the lightest shard
+    loads = np.zeros(shards)
+    assigned: list[list[np.ndarray]] = [[] for _ in range(shards)]
+    for unit in sorted(units, key=lambda u: weights[u], reverse=True):
+        target = int(loads.argmin())
+        assigned[target].append(units[unit])
+        loads[target] += weights[unit]
+
+    return [
+        df.iloc[np.sort(np.concatenate(positions))].reset_index(drop=True)
+        for positions in assigned if positions
+    ]
+
+# ============================================================================
+# OUTCOME
+# ============================================================================
+
+@dataclass
+class RefreshOutcome:
+    """Data class representing the final outcome of a refresh request and of the retries of its failed objects.
+
+    Attributes:
+        status (str): 'Completed' if every object completed, otherwise the final status of the last request.
+        objects (pd.DataFrame): Final status of each object with columns ['table', 'partition', 'status', 'attempts'].
+        refresh_request_ids (list[str]): Identifiers of the original request and of each retry.
+    """
+
+    status: str
+    objects: pd.DataFrame
+    refresh_request_ids: list[str]
+
+    @property
+    def completed(self) -> pd.DataFrame:
+        """Objects that completed, with columns ['table', 'partition']."""
+        return self.objects.loc[self.objects["status"] == RefreshStatus.COMPLETED, ["table", "partition"]]
+
+    @property
+    def failed(self) -> pd.DataFrame:
+        """Objects that did not complete, with columns ['table', 'partition', 'status', 'attempts']."""
+        return self.objects[self.objects["status"] != RefreshStatus.COMPLETED]
+
+# ============================================================================
+# SHARDED REFRESH
+# ============================================================================
+
+@dataclass
+class RefreshShard:
+    """Data class representing one refresh request of a sharded refresh.
+
+    Attributes:
+        index (int): Position of the shard.
+        objects (pd.DataFrame): Objects refreshed by the shard, with columns ['table', 'partition'].
+        refresh_request_id (Optional[str]): Refresh request identifier, once submitted.
+        status (str): Status of the shard ('Pending', 'Running', 'Completed', 'Failed', 'Skipped', ...).
+        error (Optional[str]): Error message if the shard could not be submitted or monitored.
+        started_at (Optional[float]): Epoch time (seconds) when the shard was submitted.
+        ended_at (Optional[float]): Epoch time (seconds) when the shard finished.
+        outcome (Optional[RefreshOutcome]): Per-object outcome of the shard, if its wait function reports it.
+    """
+
+    index: int
+    objects: pd.DataFrame
+    refresh_request_id: Optional[str] = None
+    status: str = RefreshStatus.PENDING
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    ended_at: Optional[float] = None
+    outcome: Optional[RefreshOutcome] = None
+
+class ShardedRefresh:
+    """
+    Aggregated handle of a refresh split into several refresh requests.
+
+    Shards are submitted in the background, with at most max_concurrent_requests refresh requests
+    running at the same time. All shards run as tasks of one event loop in a background thread, so a
+    request that is being waited for does not hold a thread: an asynchronous wait function (e.g. one
+    built on RefreshMonitor) polls all running requests concurrently. Blocking functions (submit, slots,
+    on_change and synchronous wait functions) run in a pool of max_concurrent_requests threads.
+
+    A shard with prerequisites is submitted as soon as all of them complete. If any of them does
+    not complete, the shard is skipped.
+
+    Args:
+        shards (list[pd.DataFrame]): Objects of each shard.
+        submit (Callable[[pd.DataFrame], str]): Function that submits a refresh request and returns its identifier.
+        wait_for (Callable[[str], Union[str, RefreshOutcome, Awaitable[Union[str, RefreshOutcome]]]]): Function that
+            waits for a refresh request and returns its final status, or its per-object outcome. Coroutine functions
+            are awaited in the event loop of the refresh.
+        max_concurrent_requests (int): Maximum number of refresh requests running at the same time.
+        timeout (int): Maximum time in seconds to wait for a shard to be accepted by the service.
+        prerequisites (Optional[list[list[int]]]): Positions of the shards each shard waits for. Prerequisites
+            must precede the shard.
+        on_change (Optional[Callable[[RefreshShard], None]]): Function called when a shard is submitted and when
+            it finishes, e.g. to checkpoint the refresh. Errors it raises are ignored.
+        slot (Optional[Callable[[], ContextManager[Any]]]): Function that returns a context manager held while each
+            shard is submitted and runs, e.g. to share a limit of concurrent refreshes with other datasets (see
+            fanout.RefreshSlots). A shard rejected because another refresh is in progress releases it while it waits.
+
+    Raises:
+        ValueError: If options are invalid or a shard depends on a later shard.
+    """
+
+    def __init__(
+        self,
+        shards: list[pd.DataFrame],
+        submit: Callable[[pd.DataFrame], str],
+        wait_for: Callable[[str], Union[str, RefreshOutcome, Awaitable[Union[str, RefreshOutcome]]]],
+        max_concurrent_requests: int = 1,
+        timeout: int = 7200,
+        prerequisites: Optional[list[list[int]]] = None,
+        on_change: Optional[Callable[[RefreshShard], None]] = None,
+        slot: Optional[Callable[[], ContextManager[Any]]] = None
+    ):
+        if not isinstance(max_concurrent_requests, int) or max_concurrent_requests <= 0:
+            raise ValueError("Max concurrent requests value must be a positive integer.")
+
+        prerequisites = prerequisites or [[] for _ in shards]
+        if len(prerequisites) != len(shards):
+            raise ValueError("Prerequisites must be given for each shard.")
+        if any(j < 0 or j >= i for i, required in enumerate(prerequisites) for j in required):
+            raise ValueError("Prerequisites of a shard must be earlier shards.")
+
+        self.__shards = [RefreshShard(index=i, objects=objects) for i, objects in enumerate(shards)]
+        self.__prerequisites = [sorted(set(required)) for required in prerequisites]
+        self.__submit = submit
+        self.__wait_for = wait_for
+        self.__max_concurrent_requests = max_concurrent_requests
+        self.__timeout = timeout
+        self.__on_change = on_change
+        self.__slot = slot or nullcontext
+        self.__lock = threading.Lock()
+
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh-shards")
+        # The event loop runs in the context of the caller, so the spans and log tags of the shards are those of the refresh
+        self.__future: Future = pool.submit(in_current_context(asyncio.run), self._run_all())
+        pool.shutdown(wait=False)
+
+    async def _run_all(self) -> None:
+        """Runs every shard as a task of the event loop of the refresh."""
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=self.__max_concurrent_requests, thread_name_prefix="refresh-shard")
+        )
+        finished = [asyncio.Event() for _ in self.__shards]
+        requests = asyncio.Semaphore(self.__max_concurrent_requests)
+        await asyncio.gather(*(self._run(shard, finished, requests) for shard in self.__shards))
+
+    async def _run(self, shard: RefreshShard, finished: list[asyncio.Event], requests: asyncio.Semaphore) -> None:
+        """Submits a shard once its prerequisites complete and waits for its completion."""
+        try:
+            for j in self.__prerequisites[shard.index]:
+                await finished[j].wait()
+            failed = [j for j in self.__prerequisites[shard.index] if self.__shards[j].status != RefreshStatus.COMPLETED]
+            if failed:
+                with self.__lock:
+                    shard.status = RefreshStatus.SKIPPED
+                    shard.error = f"Prerequisite shard(s) {failed} did not complete."
+                    shard.ended_at = time.time()
+                return
+
+            async with requests:
+                await self._refresh(shard)
+        finally:
+            await asyncio.to_thread(self._notify, shard)
+            finished[shard.index].set()
+
+    def _notify(self, shard: RefreshShard) -> None:
+        """Calls the change function of the refresh for a shard."""
+        if self.__on_change is None:
+            return
+        try:
+            self.__on_change(shard)
+        except Exception:
+            pass
+
+    async def _refresh(self, shard: RefreshShard) -> None:
+        """Submits a shard and waits for its completion."""
+        start_time = time.time()
+        try:
+            with ExitStack() as slot:
+                while True:
+                    await asyncio.to_thread(slot.enter_context, self.__slot())
+                    try:
+                        refresh_request_id = await asyncio.to_thread(self.__submit, shard.objects)
+                        break
+                    except Exception as e:
+                        # Another refresh of the dataset is in progress: wait for it to finish without holding the slot
+                        conflict = "409" in str(e) or "conflict" in str(e).lower()
+                        if not conflict or time.time() - start_time > self.__timeout:
+                            raise
+                        slot.close()
+                        await asyncio.sleep(CONFLICT_RETRY_SECONDS)
+
+                with self.__lock:
+                    shard.refresh_request_id = refresh_request_id
+                    shard.status = RefreshStatus.RUNNING
+                    shard.started_at = time.time()
+                await asyncio.to_thread(self._notify, shard)
+
+                if inspect.iscoroutinefunction(self.__wait_for):
+                    result = await self.__wait_for(refresh_request_id)
+                else:
+                    result = await asyncio.to_thread(self.__wait_for, refresh_request_id)
+
+            with self.__lock:
+                if isinstance(result, RefreshOutcome):
+                    shard.outcome = result
+                    shard.status = result.status
+                else:
+                    shard.status = result
+        except Exception as e:
+            with self.__lock:
+                shard.status = RefreshStatus.FAILED
+                shard.error = str(e)
+        finally:
+            with self.__lock:
+                shard.ended_at = time.time()
+
+    @property
+    def shards(self) -> list[RefreshShard]:
+        """Shards of the refresh."""
+        return list(self.__shards)
+
+    @property
+    def refresh_request_ids(self) -> list[str]:
+        """Identifiers of the refresh requests submitted so far."""
+        with self.__lock:
+            return [s.refresh_request_id for s in self.__shards if s.refresh_request_id]
+
+    def done(self) -> bool:
+        """Checks if all shards have finished."""
+        return self.__future.done()
+
+    @property
+    def status(self) -> str:
+        """
+        Aggregated status: 'Completed' if all shards completed, 'Failed' if any shard finished with
+        another status, otherwise 'Running'.
+        """
+        with self.__lock:
+            statuses = [s.status for s in self.__shards]
+            finished = all(s.ended_at is not None for s in self.__shards)
+
+        if any(s not in (RefreshStatus.PENDING, RefreshStatus.RUNNING, RefreshStatus.COMPLETED) for s in statuses):
+            return RefreshStatus.FAILED if finished else RefreshStatus.RUNNING
+        if finished:
+            return RefreshStatus.COMPLETED
+        return RefreshStatus.RUNNING
+
+    def statuses(self) -> pd.DataFrame:
+        """
+        Gets the status of each shard.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns: ['shard', 'after', 'tables', 'objects', 'refresh_request_id', 'status', 'error', 'duration']
+        """
+        with self.__lock:
+            return pd.DataFrame([
+                {
+                    "shard": s.index,
+                    "after": ",".join(map(str, self.__prerequisites[s.index])),
+                    "tables": ",".join(s.objects["table"].unique()),
+                    "objects": len(s.objects),
+                    "refresh_request_id": s.refresh_request_id,
+                    "status": str(s.status),
+                    "error": s.error,
+                    "duration": (s.ended_at - s.started_at) if s.started_at and s.ended_at else None,
+                }
+                for s in self.__shards
+            ])
+
+    def outcome(self) -> RefreshOutcome:
+        """
+        Gets the per-object outcome of the refresh.
+
+        Objects of shards whose wait function does not report a per-object outcome take the status of
+        their shard.
+
+        Returns:
+            RefreshOutcome: Outcome of all shards, with the identifiers of every request and retry submitted.
+        """
+        with self.__lock:
+            shards = [(s.objects, s.status, s.refresh_request_id, s.outcome) for s in self.__shards]
+
+        objects: list[pd.DataFrame] = []
+        refresh_request_ids: list[str] = []
+        for shard_objects, status, refresh_request_id, outcome in shards:
+            if outcome is not None:
+                objects.append(outcome.objects)
+                refresh_request_ids.extend(outcome.refresh_request_ids)
+                continue
+            objects.append(shard_objects[["table", "partition"]].assign(
+                status=str(status), attempts=int(refresh_request_id is not None)
+            ))
+            if refresh_request_id:
+                refresh_request_ids.append(refresh_request_id)
+
+        return RefreshOutcome(
+            self.status,
+            pd.concat(objects, ignore_index=True) if objects else pd.DataFrame(columns=["table", "partition", "status", "attempts"]),
+            refresh_request_ids
+        )
+
+    def wait(self, timeout: Optional[int] = None) -> str:
+        """
+        Waits for all shards to finish.
+
+        Args:
+            timeout (Optional[int]): Maximum time to wait in seconds. None waits indefinitely.
+
+        Returns:
+            str: Aggregated status of the refresh.
+
+        Raises:
+            TimeoutError: If shards do not finish within the timeout period.
+        """
+        _, pending = wait([self.__future], timeout=timeout)
+        if pending:
+            with self.__lock:
+                unfinished = sum(s.ended_at is None for s in self.__shards)
+            raise TimeoutError(f"{unfinished} refresh shard(s) did not complete within {timeout} seconds.")
+        return self.status
+
+# ============================================================================
+# REFRESH PROGRESS
+# ============================================================================
+
+@dataclass(frozen=True)
+class RefreshEvent:
+    """Data class representing a status change of a refresh request or of one of its objects.
+
+    Attributes:
+        refresh_request_id (str): The refresh request identifier.
+        table (Optional[str]): Table of the object, or None for a change of the refresh request itself.
+        partition (Optional[str]): Partition of the object, or None for table-level objects and the request.
+        status (str): New status.
+        previous_status (Optional[str]): Status before the change, or None the first time it is seen.
+        timestamp (float): Epoch time (seconds) when the change was seen.
+    """
+
+    refresh_request_id: str
+    table: Optional[str]
+    partition: Optional[str]
+    status: str
+    previous_status: Optional[str]
+    timestamp: float
+
+    @property
+    def is_request(self) -> bool:
+        """Whether the event is a change of the refresh request rather than of one of its objects."""
+        return self.table is None
+
+    @property
+    def is_failure(self) -> bool:
+        """Whether the event reports a failed object."""
+        return not self.is_request and self.status in FAILED_OBJECT_STATUSES
+
+class RefreshProgress:
+    """
+    Tracks the status of a refresh request and of each of its objects across polls.
+
+    Each update compares the execution details of the request with the previous ones and returns
+    the status changes. Object changes come before the change of the request, so the final status
+    of the request is always the last event.
+
+    Args:
+        refresh_request_id (str): The refresh request identifier.
+    """
+
+    def __init__(self, refresh_request_id: str):
+        self.__refresh_request_id = refresh_request_id
+        self.__status: Optional[str] = None
+        self.__objects: dict[tuple[str, Optional[str]], str] = {}
+
+    @property
+    def status(self) -> Optional[str]:
+        """Latest status of the refresh request, or None before the first update."""
+        return self.__status
+
+    @property
+    def finished(self) -> bool:
+        """Whether the refresh request has finished."""
+        return self.__status is not None and self.__status not in IN_PROGRESS_STATUSES
+
+    def update(self, details: Any) -> list[RefreshEvent]:
+        """
+        Updates the progress from the execution details of the refresh request.
+
+        Args:
+            details (Any): Result of fabric.get_refresh_execution_details(), with a status and an objects
+                DataFrame with columns ['Table', 'Partition', 'Status']. Objects without status are ignored.
+
+        Returns:
+            list[RefreshEvent]: Status changes since the previous update.
+        """
+        timestamp = time.time()
+        events: list[RefreshEvent] = []
+
+        objects: Optional[pd.DataFrame] = getattr(details, "objects", None)
+        if objects is not None and not objects.empty and "Status" in objects.columns:
+            for table, partition, status in zip(objects["Table"], objects["Partition"], objects["Status"]):
+                # Table-level objects have no partition
+                key = (str(table), None if pd.isna(partition) or partition == "" else str(partition))
+                previous = self.__objects.get(key)
+                if status != previous:
+                    self.__objects[key] = status
+                    events.append(RefreshEvent(self.__refresh_request_id, *key, status, previous, timestamp))
+
+        status = details.status
+        if status != self.__status:
+            events.append(RefreshEvent(self.__refresh_request_id, None, None, status, self.__status, timestamp))
+            self.__status = status
+
+        return events
+
+    def objects(self) -> pd.DataFrame:
+        """
+        Gets the latest status of each object.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['table', 'partition', 'status'].
+        """
+        return pd.DataFrame(
+            [(table, partition, status) for (table, partition), status in self.__objects.items()],
+            columns=["table", "partition", "status"]
+        )
+
+# ============================================================================
+# REFRESH MONITOR
+# ============================================================================
+
+def run_sync(coroutine: Awaitable[Any]) -> Any:
+    """
+    Runs a coroutine to completion from synchronous code.
+
+    Notebooks already run an event loop in the main thread, so in that case the coroutine
+    runs on its own event loop in a worker thread, within a copy of the caller's context so
+    the current span and log tag still apply.
+
+    Args:
+        coroutine (Awaitable[Any]): The coroutine to run.
+
+    Returns:
+        Any: The result of the coroutine.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(in_current_context(asyncio.run), coroutine).result()
+
+class RefreshMonitor:
+    """
+    Asynchronous monitor of refresh requests.
+
+    Tracks any number of refresh requests concurrently. Each request is polled quickly at first and
+    then with an increasing interval. If the expected duration of a request is known, polling sleeps
+    through most of it and resumes fast polling around its end.
+
+    Args:
+        get_status (Callable[[str], str]): Blocking function that returns the current status of a refresh request.
+        min_interval (float): Minimum seconds between two polls of the same request.
+        max_interval (float): Maximum seconds between two polls of the same request.
+        backoff (float): Growth factor of the polling interval.
+        timeout (int): Maximum time to wait for each refresh request in seconds.
+        get_details (Optional[Callable[[str], Any]]): Blocking function that returns the execution details of a
+            refresh request, with the status of each object. Required to follow the progress of a request.
+    """
+
+    def __init__(
+        self,
+        get_status: Callable[[str], str],
+        min_interval: float = 2,
+        max_interval: float = 60,
+        backoff: float = 1.5,
+        timeout: int = 7200,
+        get_details: Optional[Callable[[str], Any]] = None
+    ):
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Polling intervals must be positive and min_interval must not exceed max_interval.")
+        if backoff < 1:
+            raise ValueError("Backoff factor must be greater than or equal to 1.")
+
+        self.__get_status = get_status
+        self.__get_details = get_details
+        self.__min_interval = min_interval
+        self.__max_interval = max_interval
+        self.__backoff = backoff
+        self.__timeout = timeout
+
+    def _next_interval(self, elapsed: float, polls: int, expected_duration: Optional[float]) -> float:
+        """
+        Computes the seconds to wait before the next poll.
+
+        Args:
+            elapsed (float): Seconds since monitoring started.
+            polls (int): Number of polls made after the expected duration (or since the start if unknown).
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds.
+
+        Returns:
+            float: Seconds to wait.
+        """
+        if expected_duration is not None and elapsed < expected_duration:
+            # Halve the remaining expected time on each poll, so polls get denser near the expected end
+            return min(self.__max_interval, max(self.__min_interval, (expected_duration - elapsed) / 2))
+        return min(self.__max_interval, self.__min_interval * (self.__backoff ** polls))
+
+    def _pause(self, start_time: float, polls: int, expected_duration: Optional[float], status: Optional[str]) -> tuple[float, int]:
+        """
+        Computes the seconds to wait before the next poll of a request that has not finished.
+
+        Args:
+            start_time (float): Monotonic time when monitoring started.
+            polls (int): Number of polls counted so far (see _next_interval()).
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+            status (Optional[str]): Last status of the request.
+
+        Returns:
+            tuple[float, int]: Seconds to wait and updated number of polls.
+
+        Raises:
+            TimeoutError: If the refresh request did not finish within the timeout period.
+        """
+        elapsed = time.monotonic() - start_time
+        if elapsed >= self.__timeout:
+            raise TimeoutError(
+                f"Refresh operation did not complete within {self.__timeout} seconds. Last status: {status}"
+            )
+
+        if expected_duration is None or elapsed >= expected_duration:
+            polls += 1
+        return min(self._next_interval(elapsed, polls, expected_duration), self.__timeout - elapsed), polls
+
+    async def wait(
+        self,
+        refresh_request_id: str,
+        expected_duration: Optional[float] = None,
+        callback: Optional[Callable[[str, str], None]] = None
+    ) -> str:
+        """
+        Waits for a refresh request to finish.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+            callback (Optional[Callable[[str, str], None]]): Function called with (refresh_request_id, status)
+                when the refresh request finishes.
+
+        Returns:
+            str: Final status of the refresh request (e.g., 'Completed', 'Failed', 'Cancelled').
+
+        Raises:
+            TimeoutError: If the refresh request does not finish within the timeout period.
+            RuntimeError: If unable to retrieve refresh status.
+        """
+        start_time = time.monotonic()
+        status = None
+        polls = 0
+
+        while True:
+            try:
+                status = await asyncio.to_thread(self.__get_status, refresh_request_id)
+            except Exception as e:
+                raise RuntimeError(f"Failed to retrieve refresh status: {e}") from e
+
+            if status not in IN_PROGRESS_STATUSES:
+                if callback is not None:
+                    callback(refresh_request_id, status)
+                return status
+
+            wait_time, polls = self._pause(start_time, polls, expected_duration, status)
+            await asyncio.sleep(wait_time)
+
+    def watch(
+        self,
+        refresh_request_id: str,
+        expected_duration: Optional[float] = None,
+        callback: Optional[Callable[[str, str], None]] = None
+    ) -> asyncio.Task:
+        """
+        Starts monitoring a refresh request in the running event loop.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+            callback (Optional[Callable[[str, str], None]]): Function called with (refresh_request_id, status)
+                when the refresh request finishes.
+
+        Returns:
+            asyncio.Task: Awaitable task that resolves to the final status.
+        """
+        return asyncio.create_task(self.wait(refresh_request_id, expected_duration, callback))
+
+    def follow(self, refresh_request_id: str, expected_duration: Optional[float] = None) -> Iterator[RefreshEvent]:
+        """
+        Follows a refresh request, yielding the status changes of the request and its objects as polling finds them.
+
+        Polls with the same intervals as wait(). The generator ends after the final status of the request.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+
+        Yields:
+            RefreshEvent: Status changes, the final status of the request last.
+
+        Raises:
+            ValueError: If the monitor cannot get the execution details of refresh requests.
+            TimeoutError: If the refresh request does not finish within the timeout period.
+            RuntimeError: If unable to retrieve the execution details.
+        """
+        if self.__get_details is None:
+            raise ValueError("The monitor cannot get refresh execution details to follow a refresh request.")
+
+        progress = RefreshProgress(refresh_request_id)
+        start_time = time.monotonic()
+        polls = 0
+
+        while True:
+            try:
+                details = self.__get_details(refresh_request_id)
+            except Exception as e:
+                raise RuntimeError(f"Failed to retrieve refresh execution details: {e}") from e
+
+            yield from progress.update(details)
+            if progress.finished:
+                return
+
+            wait_time, polls = self._pause(start_time, polls, expected_duration, progress.status)
+            time.sleep(wait_time)
+
+    async def follow_async(
+        self,
+        refresh_request_id: str,
+        expected_duration: Optional[float] = None,
+        on_event: Optional[Callable[[RefreshEvent], Optional[Awaitable[None]]]] = None
+    ) -> str:
+        """
+        Follows a refresh request without blocking the event loop, passing the status changes of the request
+        and its objects to a function as polling finds them.
+
+        Polls with the same intervals as wait(), so any number of requests can be followed concurrently.
+
+        Args:
+            refresh_request_id (str): The refresh request identifier.
+            expected_duration (Optional[float]): Expected duration of the refresh in seconds, if known.
+            on_event (Optional[Callable[[RefreshEvent], Optional[Awaitable[None]]]]): Function called with each
+                status change, the final status of the request last. Awaitables it returns are awaited.
+
+        Returns:
+            str: Final status of the refresh request (e.g., 'Completed', 'Failed', 'Cancelled').
+
+        Raises:
+            ValueError: If the monitor cannot get the execution details of refresh requests.
+            TimeoutError: If the refresh request does not finish within the timeout period.
+            RuntimeError: If unable to retrieve the execution details.
+        """
+        if self.__get_details is None:
+            raise ValueError("The monitor cannot get refresh execution details to follow a refresh request.")
+
+        progress = RefreshProgress(refresh_request_id)
+        start_time = time.monotonic()
+        polls = 0
+
+        while True:
+            try:
+                details = await asyncio.to_thread(self.__get_details, refresh_request_id)
+            except Exception as e:
+                raise RuntimeError(f"Failed to retrieve refresh execution details: {e}") from e
+
+            for event in progress.update(details):
+                if on_event is not None:
+                    result = on_event(event)
+                    if inspect.isawaitable(result):
+                        await result
+            if progress.finished:
+                return progress.status
+
+            wait_time, polls = self._pause(start_time, polls, expected_duration, progress.status)
+            await asyncio.sleep(wait_time)
+
+    async def wait_all(
+        self,
+        refresh_request_ids: Iterable[str],
+        expected_durations: Optional[dict[str, float]] = None,
+        callback: Optional[Callable[[str, str], None]] = None
+    ) -> dict[str, Any]:
+        """
+        Waits for several refresh requests concurrently.
+
+        Args:
+            refresh_request_ids (Iterable[str]): The refresh request identifiers.
+            expected_durations (Optional[dict[str, float]]): Expected duration in seconds of each refresh request.
+            callback (Optional[Callable[[str, str], None]]): Function called with (refresh_request_id, status)
+                as each refresh request finishes.
+
+        Returns:
+            dict[str, Any]: Final status of each refresh request, or the exception raised while monitoring it.
+        """
+        expected_durations = expected_durations or {}
+        refresh_request_ids = list(dict.fromkeys(refresh_request_ids))
+        results = await asyncio.gather(
+            *(self.wait(r, expected_durations.get(r), callback) for r in refresh_request_ids),
+            return_exceptions=True
+        )
+        return dict(zip(refresh_request_ids, results))
@@ -0,0 +1,142 @@
+"""
+Startup module for fabtoolkit.
+
+This module provides:
+- Lazy imports of heavy dependencies, loaded on first use
+- Timing report of the install and import steps of a notebook run
+"""
+
+from contextlib import contextmanager
+import importlib
+import threading
+import time
+from typing import Any, Iterator
+import pandas as pd
+
+# ============================================================================
+# LAZY IMPORTS
+# ============================================================================
+
+# Seconds spent importing each lazily loaded module
+_import_timings: dict[str, float] = {}
+_import_lock = threading.Lock()
+
+class LazyModule:
+    """
+    Proxy of a module that is imported on first attribute access.
+
+    Code paths that never use the module never pay its import cost. The module is imported
+    once, even if it is first used from several threads at the same time.
+
+    Args:
+        name (str): Fully qualified name of the module, e.g. 'sempy.fabric'.
+    """
+
+    def __init__(self, name: str):
+        self.__name = name
+        self.__module = None
+
+    def _load(self) -> Any:
+        """Imports the module if it is not loaded yet and returns it."""
+        if self.__module is None:
+            with _import_lock:
+                if self.__module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self.__name)
+                    _import_timings[self.__name] = time.perf_counter() - started
+                    self.__module = module
+        return self.__module
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the module has been imported."""
+        return self.__module is not None
+
+    def __getattr__(self, attribute: str) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        return f"<lazy module '{self.__name}' ({'loaded' if self.loaded else 'not loaded'})>"
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Returns a module that is imported on first use.
+
+    Args:
+        name (str): Fully qualified name of the module.
+
+    Returns:
+        LazyModule: Proxy of the module.
+    """
+    return LazyModule(name)
+
+def import_timings() -> dict[str, float]:
+    """
+    Gets the seconds spent importing each lazily loaded module.
+
+    Returns:
+        dict[str, float]: Import time of each loaded module, in load order.
+    """
+    with _import_lock:
+        return dict(_import_timings)
+
+# ============================================================================
+# TIMING REPORT
+# ============================================================================
+
+class StartupTimer:
+    """
+    Collects the time spent in each startup step of a notebook run.
+
+    Steps are timed with the stage() context manager or added with add() when they run
+    before fabtoolkit can be imported, such as the installation of the wheel. The report
+    also includes the lazily imported modules loaded so far.
+    """
+
+    def __init__(self):
+        self.__stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        """
+        Adds the duration of a step.
+
+        Args:
+            stage (str): Name of the step.
+            seconds (float): Duration of the step in seconds.
+
+        Returns:
+            None
+        """
+        self.__stages[stage] = self.__stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """
+        Times the code run inside the context as a step.
+
+        Args:
+            stage (str): Name of the step.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def report(self) -> pd.DataFrame:
+        """
+        Builds the timing report.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['stage', 'seconds', 'share'], where share is the
+                fraction of the total startup time spent in each step.
+        """
+        stages = dict(self.__stages)
+        stages.update({f"import {name}": seconds for name, seconds in import_timings().items()})
+
+        report = pd.DataFrame({"stage": list(stages), "seconds": list(stages.values())}, columns=["stage", "seconds"])
+        total = report["seconds"].sum()
+        return report.assign(
+            seconds=report["seconds"].round(3),
+            share=(report["seconds"] / total).round(3) if total > 0 else 0.0
+        )
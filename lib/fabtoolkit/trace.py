@@ -0,0 +1,438 @@
+"""
+Trace module for fabtoolkit.
+
+This module provides:
+- Lightweight timing spans with attributes (object counts, payload sizes, statuses)
+- Export of finished spans to JSONL files, one per run, with OpenTelemetry field names
+- Loading and aggregation of the spans of many runs
+"""
+
+from contextlib import contextmanager
+import contextvars
+from dataclasses import dataclass, field
+import functools
+import glob
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Iterator, Optional, TypeVar
+import uuid
+import pandas as pd
+
+# ============================================================================
+# SPANS
+# ============================================================================
+
+# Span currently open in this thread or task, parent of the spans opened inside it
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("fabtoolkit_span", default=None)
+
+@dataclass
+class Span:
+    """Data class representing a timed phase of a run.
+
+    Attributes:
+        name (str): Name of the phase, e.g. 'dataset.refresh_submit'.
+        trace_id (str): Identifier of the run the span belongs to.
+        span_id (str): Identifier of the span.
+        parent_span_id (Optional[str]): Identifier of the enclosing span, if any.
+        start_time (float): Start time as seconds since the epoch.
+        end_time (Optional[float]): End time as seconds since the epoch, or None while open.
+        attributes (dict[str, Any]): Attributes of the phase, such as object counts or payload sizes.
+        status (str): 'OK', or 'ERROR' if the phase raised an exception.
+        error (Optional[str]): Message of the exception raised by the phase, if any.
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_time: float
+    end_time: Optional[float] = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    status: str = "OK"
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Duration of the span in seconds, or None while open."""
+        return None if self.end_time is None else self.end_time - self.start_time
+
+    def set(self, **attributes: Any) -> None:
+        """
+        Sets attributes of the span.
+
+        Args:
+            **attributes (Any): Attribute values. Values that are not JSON types are stored as strings.
+
+        Returns:
+            None
+        """
+        self.attributes.update(attributes)
+
+    def to_record(self) -> dict[str, Any]:
+        """
+        Converts the span to a JSON record with OpenTelemetry field names.
+
+        Returns:
+            dict[str, Any]: Record of the span.
+        """
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": int(self.start_time * 1e9),
+            "end_time_unix_nano": int((self.end_time or self.start_time) * 1e9),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "attributes": self.attributes,
+            "status": {"code": self.status, "message": self.error},
+        }
+
+class _NoopSpan:
+    """Span returned while tracing is disabled. Attributes are discarded."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+_NOOP_SPAN = _NoopSpan()
+
+# ============================================================================
+# TRACER
+# ============================================================================
+
+class Tracer:
+    """
+    Records spans and writes them to ``<path>/<trace_id>.jsonl``.
+
+    Finished spans are buffered and appended to the file every ``flush_every`` spans and on flush()
+    or close(), so tracing adds no file access to each phase. Several notebooks of the same run can
+    share a trace by passing the same trace_id, each one appending to the same file (see trace_context()).
+
+    Args:
+        path (str): Directory of the trace files (local path or mounted lakehouse path).
+        trace_id (Optional[str]): Identifier of the run. Defaults to a new random identifier.
+        parent_span_id (Optional[str]): Parent of the top-level spans, e.g. the span of the notebook that
+            started this one.
+        flush_every (int): Number of finished spans buffered before they are written.
+        attributes (Optional[dict[str, Any]]): Attributes added to every span, e.g. the notebook name.
+    """
+
+    def __init__(
+            self,
+            path: str,
+            trace_id: Optional[str] = None,
+            parent_span_id: Optional[str] = None,
+            flush_every: int = 100,
+            attributes: Optional[dict[str, Any]] = None
+        ):
+
+        if not path:
+            raise ValueError("Trace path must be provided.")
+        if not isinstance(flush_every, int) or flush_every <= 0:
+            raise ValueError("Flush size must be a positive integer.")
+
+        self.__path = path
+        self.__trace_id = trace_id or uuid.uuid4().hex
+        self.__parent_span_id = parent_span_id or None
+        self.__flush_every = flush_every
+        self.__attributes = dict(attributes or {})
+        self.__buffer: list[dict[str, Any]] = []
+        self.__lock = threading.Lock()
+
+    @property
+    def trace_id(self) -> str:
+        """Identifier of the run."""
+        return self.__trace_id
+
+    @property
+    def path(self) -> str:
+        """Directory of the trace files."""
+        return self.__path
+
+    @property
+    def file(self) -> str:
+        """File the spans of the run are written to."""
+        return os.path.join(self.__path, f"{self.__trace_id}.jsonl")
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Times the code run inside the context as a span, nested in the span currently open.
+
+        Args:
+            name (str): Name of the phase.
+            **attributes (Any): Initial attributes of the span.
+
+        Yields:
+            Span: The open span, to add attributes known once the phase runs.
+        """
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=self.__trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_span_id=parent.span_id if parent is not None else self.__parent_span_id,
+            start_time=time.time(),
+            attributes={**self.__attributes, **attributes}
+        )
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status, span.error = "ERROR", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_time = time.time()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def record(self, name: str, start_time: float, duration: float, **attributes: Any) -> Span:
+        """
+        Records a phase timed before tracing started, such as the installation of fabtoolkit.
+
+        Args:
+            name (str): Name of the phase.
+            start_time (float): Start time as seconds since the epoch.
+            duration (float): Duration of the phase in seconds.
+            **attributes (Any): Attributes of the span.
+
+        Returns:
+            Span: The recorded span.
+        """
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=self.__trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_span_id=parent.span_id if parent is not None else self.__parent_span_id,
+            start_time=start_time,
+            end_time=start_time + duration,
+            attributes={**self.__attributes, **attributes}
+        )
+        self._finish(span)
+        return span
+
+    def _finish(self, span: Span) -> None:
+        """Buffers a finished span and writes the buffer if it is full."""
+        with self.__lock:
+            self.__buffer.append(span.to_record())
+            full = len(self.__buffer) >= self.__flush_every
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Appends the buffered spans to the trace file.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            records, self.__buffer = self.__buffer, []
+            if not records:
+                return
+            os.makedirs(self.__path, exist_ok=True)
+            with open(self.file, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, default=str) + "\n" for record in records)
+
+    def close(self) -> None:
+        """
+        Writes the remaining spans.
+
+        Returns:
+            None
+        """
+        self.flush()
+
+# Tracer used by span() and traced(). None disables tracing.
+_tracer: Optional[Tracer] = None
+
+def set_tracer(tracer: Optional[Tracer]) -> Optional[Tracer]:
+    """
+    Sets the tracer used by fabtoolkit.
+
+    Args:
+        tracer (Optional[Tracer]): Tracer to use, or None to disable tracing.
+
+    Returns:
+        Optional[Tracer]: The previous tracer.
+    """
+    global _tracer
+    previous, _tracer = _tracer, tracer
+    return previous
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Gets the tracer used by fabtoolkit.
+
+    Returns:
+        Optional[Tracer]: The current tracer, or None if tracing is disabled.
+    """
+    return _tracer
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Times the code run inside the context with the current tracer. Does nothing if tracing is disabled.
+
+    Args:
+        name (str): Name of the phase.
+        **attributes (Any): Initial attributes of the span.
+
+    Yields:
+        Span: The open span, or a span that discards attributes if tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield _NOOP_SPAN
+        return
+    with tracer.span(name, **attributes) as s:
+        yield s
+
+def is_enabled() -> bool:
+    """
+    Checks whether tracing is enabled, to skip computing attributes that are only used by spans.
+
+    Returns:
+        bool: True if a tracer is set.
+    """
+    return _tracer is not None
+
+def payload_size(payload: Any) -> int:
+    """
+    Gets the size of a JSON payload, such as a TMSL script or the objects of a refresh request.
+
+    Args:
+        payload (Any): JSON-serializable payload.
+
+    Returns:
+        int: Size of the serialized payload in bytes.
+    """
+    return len(json.dumps(payload, default=str).encode("utf-8"))
+
+def trace_context() -> dict[str, str]:
+    """
+    Gets the parameters that let a child notebook join the current trace, nested in the span currently open.
+
+    Returns:
+        dict[str, str]: 'trace_path', 'trace_id' and 'trace_parent_id', or an empty dict if tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return {}
+    parent = _current_span.get()
+    return {
+        "trace_path": tracer.path,
+        "trace_id": tracer.trace_id,
+        "trace_parent_id": parent.span_id if parent is not None else "",
+    }
+
+def current_span() -> Any:
+    """
+    Gets the span currently open, to add attributes to it.
+
+    Returns:
+        Span: The open span, or a span that discards attributes if there is none.
+    """
+    return _current_span.get() or _NOOP_SPAN
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+def traced(name: str) -> Callable[[F], F]:
+    """
+    Decorator that times each call of a function as a span.
+
+    Args:
+        name (str): Name of the phase.
+
+    Returns:
+        Callable[[F], F]: The decorator.
+    """
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _tracer is None:
+                return function(*args, **kwargs)
+            with _tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+def in_current_context(function: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Binds a function to the current context, so spans opened by it in another thread are nested
+    in the span currently open.
+
+    Args:
+        function (Callable[..., Any]): Function to run in another thread.
+
+    Returns:
+        Callable[..., Any]: Function that runs in a copy of the current context.
+    """
+    context = contextvars.copy_context()
+    return functools.partial(context.run, function)
+
+# ============================================================================
+# ANALYSIS
+# ============================================================================
+
+def load_spans(path: str, trace_ids: Optional[list[str]] = None) -> pd.DataFrame:
+    """
+    Loads the spans written to a trace directory.
+
+    Args:
+        path (str): Directory of the trace files.
+        trace_ids (Optional[list[str]]): Runs to load. Defaults to all of them.
+
+    Returns:
+        pd.DataFrame: One row per span with columns ['trace_id', 'span_id', 'parent_span_id', 'name', 'start_time',
+            'duration', 'status', 'error'] plus one 'attributes.<name>' column per attribute. Times are in seconds.
+    """
+    files = (
+        [os.path.join(path, f"{trace_id}.jsonl") for trace_id in trace_ids] if trace_ids
+        else sorted(glob.glob(os.path.join(path, "*.jsonl")))
+    )
+    records: list[dict[str, Any]] = []
+    for file in files:
+        if not os.path.isfile(file):
+            continue
+        with open(file, encoding="utf-8") as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+
+    columns = ["trace_id", "span_id", "parent_span_id", "name", "start_time", "duration", "status", "error"]
+    if not records:
+        return pd.DataFrame(columns=columns)
+
+    spans = pd.json_normalize(records)
+    spans["start_time"] = spans["start_time_unix_nano"] / 1e9
+    spans["duration"] = spans["duration_ms"] / 1000
+    spans = spans.rename(columns={"status.code": "status", "status.message": "error"})
+    attributes = sorted(c for c in spans.columns if c.startswith("attributes."))
+    return spans[columns + attributes].sort_values("start_time", kind="stable").reset_index(drop=True)
+
+def summarize_spans(spans: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregates spans by phase, to see where the time of the runs goes.
+
+    Args:
+        spans (pd.DataFrame): Spans as returned by load_spans().
+
+    Returns:
+        pd.DataFrame: DataFrame with columns ['name', 'runs', 'count', 'errors', 'total_seconds', 'mean_seconds',
+            'p95_seconds', 'max_seconds'], sorted by total time.
+    """
+    columns = ["name", "runs", "count", "errors", "total_seconds", "mean_seconds", "p95_seconds", "max_seconds"]
+    if spans.empty:
+        return pd.DataFrame(columns=columns)
+
+    summary = spans.groupby("name").agg(
+        runs=("trace_id", "nunique"),
+        count=("span_id", "size"),
+        errors=("status", lambda s: int((s == "ERROR").sum())),
+        total_seconds=("duration", "sum"),
+        mean_seconds=("duration", "mean"),
+        p95_seconds=("duration", lambda d: d.quantile(0.95)),
+        max_seconds=("duration", "max"),
+    ).reset_index()
+    return summary.sort_values("total_seconds", ascending=False, kind="stable").reset_index(drop=True)[columns].round(3)
@@ -0,0 +1,202 @@
+"""
+Tuning module for fabtoolkit.
+
+This module provides:
+- Constants
+- Auto-tuning of the max parallelism of refresh requests from the throughput of past runs
+"""
+
+import math
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+# Value of max_parallelism that lets the tuner choose it
+AUTO_PARALLELISM: str = "AUTO"
+
+# Parallelism used when there is no recorded run yet
+DEFAULT_INITIAL_PARALLELISM: int = 4
+
+# Highest parallelism the tuner may choose
+DEFAULT_PARALLELISM_CEILING: int = 16
+
+# Runs recorded after a failed run of a level before that level is tried again
+DEFAULT_THROTTLE_EXPIRY_RUNS: int = 5
+
+def is_auto_parallelism(max_parallelism: object) -> bool:
+    """
+    Checks whether a max parallelism value asks for auto-tuning.
+
+    Args:
+        max_parallelism (object): Value to check.
+
+    Returns:
+        bool: True if the value is 'AUTO' (case-insensitive).
+    """
+    return isinstance(max_parallelism, str) and max_parallelism.strip().upper() == AUTO_PARALLELISM
+
+# ============================================================================
+# TUNER
+# ============================================================================
+
+class ParallelismTuner:
+    """
+    Chooses the max parallelism of a refresh request from the runs recorded in the refresh history.
+
+    The throughput of a run is the number of records refreshed per second (objects per second when
+    record counts are unknown). The throughput of each parallelism level is the median of its runs,
+    and a level is throttled if its latest run did not complete. The history does not tell throttling
+    apart from other failures (e.g. a data source error), so the mark expires once throttle_expiry
+    runs have been recorded after it and the level can be tried again. Across runs the tuner converges
+    on the fastest level that is not throttled:
+
+    - Without runs, it starts at the initial parallelism.
+    - If the fastest level is the highest one tried, the next run doubles it.
+    - Otherwise, the next run bisects the gap between the fastest level and the next level tried
+      above it, until the gap closes and the fastest level is kept.
+    - If every level tried is throttled, the lowest one is halved.
+
+    The choice never exceeds the ceiling, nor the effective number of objects of the request, as
+    slots beyond the objects that carry most of the work stay idle.
+
+    Args:
+        ceiling (int): Highest parallelism the tuner may choose.
+        initial (int): Parallelism used when there is no recorded run.
+        throttle_expiry (int): Runs recorded after a failed run of a level before the level is tried again.
+
+    Raises:
+        ValueError: If the ceiling, the initial parallelism or the throttle expiry is not a positive integer.
+    """
+
+    def __init__(
+            self,
+            ceiling: int = DEFAULT_PARALLELISM_CEILING,
+            initial: int = DEFAULT_INITIAL_PARALLELISM,
+            throttle_expiry: int = DEFAULT_THROTTLE_EXPIRY_RUNS
+        ):
+
+        if not isinstance(ceiling, int) or ceiling <= 0:
+            raise ValueError("Parallelism ceiling must be a positive integer.")
+        if not isinstance(initial, int) or initial <= 0:
+            raise ValueError("Initial parallelism must be a positive integer.")
+        if not isinstance(throttle_expiry, int) or throttle_expiry <= 0:
+            raise ValueError("Throttle expiry must be a positive integer.")
+
+        self.__ceiling = ceiling
+        self.__initial = min(initial, ceiling)
+        self.__throttle_expiry = throttle_expiry
+
+    @property
+    def ceiling(self) -> int:
+        """Highest parallelism the tuner may choose."""
+        return self.__ceiling
+
+    @property
+    def initial(self) -> int:
+        """Parallelism used when there is no recorded run."""
+        return self.__initial
+
+    @property
+    def throttle_expiry(self) -> int:
+        """Runs recorded after a failed run of a level before the level is tried again."""
+        return self.__throttle_expiry
+
+    @staticmethod
+    def effective_objects(costs: pd.Series) -> int:
+        """
+        Gets the number of objects that carry the work of a request.
+
+        It is the inverse Simpson index of the costs: n for n objects of equal cost, and close to one
+        when a single object dominates.
+
+        Args:
+            costs (pd.Series): Expected cost of each object.
+
+        Returns:
+            int: Effective number of objects, at least one.
+        """
+        values = np.clip(np.asarray(costs, dtype=float), 0.0, None)
+        values = values[np.isfinite(values)]
+        total = values.sum()
+        if total <= 0:
+            return max(1, len(costs))
+        return max(1, math.ceil(total ** 2 / np.square(values).sum() - 1e-9))
+
+    def _throttled(self, runs: pd.DataFrame) -> pd.Series:
+        """Flags the levels whose latest run did not complete, unless enough runs were recorded after it. Runs are sorted by time."""
+        position = pd.Series(np.arange(len(runs)), index=runs.index)
+        latest = position.groupby(runs["max_parallelism"].astype(int)).last()
+        failed = runs["status"].to_numpy()[latest.to_numpy()] != "Completed"
+        runs_after = len(runs) - 1 - latest.to_numpy()
+        return pd.Series(failed & (runs_after < self.__throttle_expiry), index=latest.index)
+
+    def _next_level(self, runs: pd.DataFrame) -> int:
+        """Chooses the parallelism of the next run from the recorded runs, before capping it to the request."""
+        if runs.empty:
+            return self.__initial
+
+        runs = runs.sort_values("recorded_at", kind="stable")
+        marks = self._throttled(runs)
+        throttled = set(marks.index[marks])
+
+        completed = runs[(runs["status"] == "Completed") & (runs["duration"] > 0)]
+        throughput = (
+            (completed["size"] / completed["duration"]).groupby(completed["max_parallelism"].astype(int)).median()
+        )
+        throughput = throughput[~throughput.index.isin(throttled)]
+
+        if throughput.empty:
+            return max(1, min(throttled) // 2) if throttled else self.__initial
+
+        best = int(throughput.idxmax())
+        tried_above = sorted(level for level in set(throughput.index) | throttled if level > best)
+        if not tried_above:
+            return min(best * 2, self.__ceiling)
+        return (best + tried_above[0]) // 2
+
+    def choose(self, runs: pd.DataFrame, costs: pd.Series) -> int:
+        """
+        Chooses the max parallelism of a refresh request.
+
+        Args:
+            runs (pd.DataFrame): Recorded runs as returned by RefreshHistory.load_runs().
+            costs (pd.Series): Expected cost of each object of the request.
+
+        Returns:
+            int: Max parallelism of the request.
+        """
+        level = min(self._next_level(runs), self.__ceiling)
+        return max(1, min(level, self.effective_objects(costs)))
+
+    def levels(self, runs: pd.DataFrame) -> pd.DataFrame:
+        """
+        Summarizes the recorded runs of each parallelism level.
+
+        Args:
+            runs (pd.DataFrame): Recorded runs as returned by RefreshHistory.load_runs().
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['max_parallelism', 'runs', 'throughput', 'median_duration', 'throttled'].
+        """
+        columns = ["max_parallelism", "runs", "throughput", "median_duration", "throttled"]
+        if runs.empty:
+            return pd.DataFrame(columns=columns)
+
+        runs = runs.sort_values("recorded_at", kind="stable").assign(
+            throughput=lambda r: (r["size"] / r["duration"]).where(
+                (r["status"] == "Completed") & (r["duration"] > 0)
+            )
+        )
+        levels = (
+            runs.groupby(runs["max_parallelism"].astype(int))
+            .agg(
+                runs=("status", "size"),
+                throughput=("throughput", "median"),
+                median_duration=("duration", "median")
+            )
+            .assign(throttled=self._throttled(runs))
+        )
+        return levels.rename_axis("max_parallelism").reset_index()[columns]
@@ -0,0 +1,516 @@
+"""
+Utilities module for fabtoolkit.
+
+This module provides:
+- Constants
+- Utilities
+"""
+
+from dataclasses import dataclass
+from datetime import date
+from enum import StrEnum
+from io import StringIO
+import json
+from typing import Any, Mapping, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# CONSTANTS
+# ============================================================================
+
+class Interval(StrEnum):
+    """Enum representing different time intervals."""
+
+    YEAR = "YEAR"
+    QUARTER = "QUARTER"
+    MONTH = "MONTH"
+
+@dataclass
+class IntervalDefinition:
+    """Data class representing the definition of a time interval.
+    
+    Attributes:
+        start_interval (str): Pandas frequency alias for start of period (e.g., 'YS', 'QS', 'MS').
+            - 'YS': Year start
+            - 'QS': Quarter start
+            - 'MS': Month start
+        end_interval (str): Pandas frequency alias for period (e.g., 'Y', 'Q', 'M').
+            - 'Y': Year end
+            - 'Q': Quarter end
+            - 'M': Month end
+        offset (pd.DateOffset): Pandas DateOffset for the interval.
+        months (int): Length of the interval in months.
+    """
+
+    start_interval: str
+    end_interval: str
+    offset: pd.DateOffset
+    months: int
+
+class Constants:
+    """Class to hold constant values.
+    
+    Pandas frequency aliases:
+        - 'YS'/'Y': Year start/end
+        - 'QS'/'Q': Quarter start/end
+        - 'MS'/'M': Month start/end
+    """
+
+    DATE_FORMAT: str = "%Y%m%d"
+    ISO_DATE_FORMAT: str = "%Y-%m-%d"
+    INTERVALS: dict[Interval, IntervalDefinition] = {
+        Interval.YEAR: IntervalDefinition(
+            start_interval='YS',  # Year start
+            end_interval='Y',     # Year end
+            offset=pd.offsets.YearBegin,
+            months=12
+        ),
+        Interval.QUARTER: IntervalDefinition(
+            start_interval='QS',  # Quarter start
+            end_interval='Q',     # Quarter end
+            offset=pd.offsets.QuarterBegin,
+            months=3
+        ),
+        Interval.MONTH: IntervalDefinition(
+            start_interval='MS',  # Month start
+            end_interval='M',     # Month end
+            offset=pd.offsets.MonthBegin,
+            months=1
+        )
+    }
+
+# ============================================================================
+# UTILITIES
+# ============================================================================
+
+def is_valid_text(value: str) -> bool:
+    """
+    Checks if the provided value is a valid non-empty string.
+
+    Args:
+        value (str): The value to check.
+    
+    Returns:
+        bool: True if the value is a non-empty string, False otherwise.
+    """
+    return isinstance(value, str) and value.strip()
+
+def validate_json(json_str: str, columns: list[str]) -> None:
+    """
+    Validates a JSON string to ensure it contains the specified columns and no empty values in them.
+
+    Columns other than the specified ones are optional and may be empty.
+    
+    Args:
+        json_str (str): JSON string to validate.
+        columns (list[str]): List of expected column names.
+
+    Returns:
+        pd.DataFrame: DataFrame created from the JSON string.
+
+    Raises:
+        ValueError: If JSON is invalid, missing columns, contains empty values, or invalid inputs.
+    """
+
+    if not isinstance(json_str, str):
+        raise ValueError(f"Invalid JSON input: must be a string, got {type(json_str).__name__}")
+    if not columns or not isinstance(columns, list):
+        raise ValueError("Invalid columns input: must be a non-empty list of column names.")
+
+    try:
+        df = pd.read_json(StringIO(json_str))
+    except ValueError as e:
+        raise ValueError(f"Malformed JSON data or parsing issue: {e}")
+
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns in JSON: {missing}")
+
+    if df[columns].isna().any().any():
+        raise ValueError("Empty/null values found in JSON columns.")
+    
+    # Check for empty strings in object/string columns
+    for col in df[columns].select_dtypes(include=['object']).columns:
+        if (df[col].astype(str).str.strip() == '').any():
+            raise ValueError(f"Empty string values found in column '{col}'.")
+
+def get_bounds_from_offset(
+    min_date: date,
+    end_date: date,
+    interval: str,
+    number_of_intervals: str
+) -> tuple[date, date]:
+    """
+    Calculates the start and end dates based on the given interval and number of intervals.
+
+    Args:
+        min_date (date): The minimum date to consider.
+        end_date (date): The end date for the range.
+        interval (str): The interval of the date range ('YEAR', 'QUARTER', 'MONTH').
+        number_of_intervals (str): The number of intervals to consider.
+                If this value is *, the function returns min_date and end_date.
+
+    Returns:
+        tuple[date, date]: A tuple containing the start date and end date of the range as date objects.
+
+    Raises:
+        ValueError: If interval is invalid or if dates are not datetime objects.
+    """
+
+    if not isinstance(min_date, date):
+        raise ValueError(f"Invalid minimum date value: {min_date}. Must be a datetime.date object.")
+    if not isinstance(end_date, date):
+        raise ValueError(f"Invalid end date value: {end_date}. Must be a datetime.date object.")
+
+    try:
+        interval_def = Constants.INTERVALS[Interval(interval.upper())]
+        end_interval = interval_def.end_interval
+        offset = interval_def.offset
+    except (KeyError, ValueError):
+        valid_intervals = ', '.join(str(i.value) for i in Interval)
+        raise ValueError(f"Invalid interval value: {interval}. Expected one of: {valid_intervals}.")
+    
+    # Convert end_date to Period
+    end_period = pd.Period(end_date, freq=end_interval).to_timestamp(how="end")
+
+    if number_of_intervals == '*':
+        start_date: date = min_date
+    else:
+        try:
+            intervals = int(number_of_intervals)
+        except (ValueError, TypeError):
+            raise ValueError(f"Invalid number of intervals: {number_of_intervals}. Must be an integer.")
+        
+        if intervals <= 0:
+            raise ValueError(f"Invalid number of intervals: {number_of_intervals}. Must be greater than 0.")
+
+        # Subtract offset, and get start date
+        start_date: date = (end_period - offset(intervals)).to_period(end_interval).start_time
+        
+        # Ensure start_date is not earlier than min_date
+        start_date = max(start_date, min_date)
+
+    return start_date.date(), end_period.date()
+
+def generate_date_ranges(
+    start_date: date,
+    end_date: date,
+    interval: str
+) -> pd.DataFrame:
+    """
+    Generates date ranges based on the specified interval.
+
+    Args:
+        start_date (date): The start date for the range.
+        end_date (date): The end date for the range.
+        interval (str): The interval of the date range ('YEAR', 'QUARTER', 'MONTH').
+
+    Returns:
+        pd.DataFrame: DataFrame with 'range_start' and 'range_end' columns as date objects.
+
+    Raises:
+        ValueError: If start_date or end_date are not date/datetime objects, or if interval is invalid.
+    """
+
+    if not isinstance(start_date, date):
+        raise ValueError(f"Invalid start date value: {start_date}. Must be a datetime.date object.")
+    if not isinstance(end_date, date):
+        raise ValueError(f"Invalid end date value: {end_date}. Must be a datetime.date object.")
+    if start_date > end_date:
+        raise ValueError(f"Invalid date range: Start date ({start_date}) must be less than or equal to end date ({end_date}).")
+
+    try:
+        interval_def = Constants.INTERVALS[Interval(interval.upper())]
+        start_interval = interval_def.start_interval
+        end_interval = interval_def.end_interval
+    except (KeyError, ValueError):
+        valid_intervals = ', '.join(str(i.value) for i in Interval)
+        raise ValueError(f"Invalid interval value: {interval}. Expected one of: {valid_intervals}.")
+
+    start_dates = pd.date_range(start_date, end_date, freq=start_interval).date.tolist()
+    end_dates = pd.date_range(start_date, end_date, freq=end_interval).date.tolist()
+
+    # Adding start date or end date if pd.date_range does not include them
+    if start_dates[0] != start_date:
+        start_dates.insert(0, start_date)
+    if end_dates[-1] != end_date:
+        end_dates.append(end_date)
+    
+    return pd.DataFrame({"range_start": start_dates, "range_end": end_dates})
+
+def generate_partition_plan(
+    tables: Sequence[str],
+    first_dates: Sequence[date],
+    end_dates: Sequence[date],
+    intervals: Sequence[str],
+    number_of_intervals: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """
+    Generates the partition ranges and names of several tables in a single vectorized pass.
+
+    For each table, ranges cover the periods of its interval up to the end of the period containing
+    its end date. They start at its first date or, if a number of intervals is given, at the start of
+    the earliest of the last number_of_intervals periods (never before the first date). The result
+    matches get_bounds_from_offset() followed by generate_date_ranges() for every table.
+
+    Args:
+        tables (Sequence[str]): Table names.
+        first_dates (Sequence[date]): Minimum date of each table.
+        end_dates (Sequence[date]): Reference end date of each table.
+        intervals (Sequence[str]): Interval of each table ('YEAR', 'QUARTER', 'MONTH').
+        number_of_intervals (Optional[Sequence[str]]): Number of intervals of each table.
+                If None or *, all periods since the first date are included.
+
+    Returns:
+        pd.DataFrame: DataFrame with 'table_name', 'partition_name', 'range_start' and 'range_end' columns,
+                      with the partitions of each table contiguous and in date order.
+
+    Raises:
+        ValueError: If intervals, number of intervals or dates are invalid.
+    """
+
+    tables = np.asarray(tables, dtype=object)
+    size = len(tables)
+
+    try:
+        first = pd.to_datetime(pd.Series(first_dates)).to_numpy().astype("datetime64[D]")
+        end = pd.to_datetime(pd.Series(end_dates)).to_numpy().astype("datetime64[D]")
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid date values: {e}") from e
+
+    try:
+        months = np.array(
+            [Constants.INTERVALS[Interval(str(i).upper())].months for i in intervals], dtype=np.int64
+        ).reshape(size)
+    except (KeyError, ValueError):
+        valid_intervals = ', '.join(str(i.value) for i in Interval)
+        raise ValueError(f"Invalid interval value in: {list(intervals)}. Expected one of: {valid_intervals}.")
+
+    # Periods are numbered by the months elapsed since 1970-01 divided by the interval length
+    first_period = first.astype("datetime64[M]").astype(np.int64) // months
+    end_period = end.astype("datetime64[M]").astype(np.int64) // months
+    start_period = first_period.copy()
+
+    if number_of_intervals is not None:
+        for position, value in enumerate(number_of_intervals):
+            if str(value) == '*':
+                continue
+            try:
+                intervals_count = int(value)
+            except (ValueError, TypeError):
+                raise ValueError(f"Invalid number of intervals: {value}. Must be an integer.")
+            if intervals_count <= 0:
+                raise ValueError(f"Invalid number of intervals: {value}. Must be greater than 0.")
+            start_period[position] = max(end_period[position] - intervals_count + 1, first_period[position])
+
+    counts = end_period - start_period + 1
+    if size and ((counts <= 0) | (first > end)).any():
+        invalid = tables[(counts <= 0) | (first > end)].tolist()
+        raise ValueError(f"Invalid date range: Start date must be less than or equal to end date for tables: {invalid}")
+
+    # Expand every table into one row per period
+    rows = np.repeat(np.arange(size), counts)
+    offsets = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    periods = np.repeat(start_period, counts) + offsets
+    row_months = months[rows]
+
+    period_start = (periods * row_months).astype("datetime64[M]").astype("datetime64[D]")
+    period_end = ((periods + 1) * row_months).astype("datetime64[M]").astype("datetime64[D]") - np.timedelta64(1, "D")
+    range_start = np.maximum(period_start, first[rows])
+
+    # Generating partitions names like Table_yyyyMMdd_yyyyMMdd
+    start_text = np.char.replace(np.datetime_as_string(range_start, unit="D"), "-", "")
+    end_text = np.char.replace(np.datetime_as_string(period_end, unit="D"), "-", "")
+    table_names = pd.Series(tables[rows], dtype=object)
+
+    return pd.DataFrame({
+        "table_name": table_names,
+        "partition_name": table_names + "_" + start_text.astype(object) + "_" + end_text.astype(object),
+        "range_start": pd.to_datetime(range_start),
+        "range_end": pd.to_datetime(period_end),
+    })
+
+def parse_partition_names(names: Sequence[str]) -> pd.DataFrame:
+    """
+    Parses partition names like Table_yyyyMMdd_yyyyMMdd into their table and date range.
+
+    Args:
+        names (Sequence[str]): Partition names.
+
+    Returns:
+        pd.DataFrame: DataFrame with 'partition_name', 'table_name', 'range_start' and 'range_end' columns.
+                      Names that do not follow the pattern have null table and dates.
+    """
+    names = pd.Series(list(names), dtype=object)
+    parts = names.str.extract(r"^(?P<table_name>.+)_(?P<start>\d{8})_(?P<end>\d{8})$")
+
+    return pd.DataFrame({
+        "partition_name": names,
+        "table_name": parts["table_name"],
+        "range_start": pd.to_datetime(parts["start"], format=Constants.DATE_FORMAT, errors="coerce"),
+        "range_end": pd.to_datetime(parts["end"], format=Constants.DATE_FORMAT, errors="coerce"),
+    })
+
+def compact_partition_plan(
+    plan: pd.DataFrame,
+    intervals: Mapping[str, str],
+    compaction: Mapping[str, Mapping[str, int]],
+    reference_date: date
+) -> pd.DataFrame:
+    """
+    Merges the old periods of a partition plan into coarser periods.
+
+    A compaction rule maps a coarser interval to an age in months, e.g. {"QUARTER": 6, "YEAR": 24}.
+    The periods of a table are merged into a coarser period once the whole coarser period ended at
+    least that many months before the month of the reference date. The coarsest applicable interval
+    wins, so with the rule above months become quarters after 6 months and years after 24 months.
+    Merged partitions keep the Table_yyyyMMdd_yyyyMMdd naming, so the result is stable across runs.
+
+    Args:
+        plan (pd.DataFrame): Plan as returned by generate_partition_plan().
+        intervals (Mapping[str, str]): Interval of each table of the plan.
+        compaction (Mapping[str, Mapping[str, int]]): Compaction rule of each table. Tables without
+                a rule are not compacted.
+        reference_date (date): Date the ages are measured from (usually today).
+
+    Returns:
+        pd.DataFrame: Plan with the same columns, with the partitions of each table contiguous and in date order.
+
+    Raises:
+        ValueError: If a rule has an invalid interval, an interval not coarser than the table's one, or an invalid age.
+    """
+
+    compaction = {table: rule for table, rule in compaction.items() if rule}
+    if plan.empty or not compaction:
+        return plan
+
+    reference_month = np.datetime64(pd.Timestamp(reference_date).date(), "M").astype(np.int64)
+    start_months = plan["range_start"].to_numpy().astype("datetime64[M]").astype(np.int64)
+    tables = plan["table_name"].to_numpy()
+
+    # Coarse period assigned to each row, as (length in months, period number); 0 months means not compacted
+    coarse_months = np.zeros(len(plan), dtype=np.int64)
+    coarse_periods = np.zeros(len(plan), dtype=np.int64)
+
+    for table, rule in compaction.items():
+        rows = tables == table
+        if not rows.any():
+            continue
+
+        base_months = Constants.INTERVALS[Interval(str(intervals[table]).upper())].months
+        tiers = []
+        for interval, age in rule.items():
+            try:
+                months = Constants.INTERVALS[Interval(str(interval).upper())].months
+            except (KeyError, ValueError):
+                valid_intervals = ', '.join(str(i.value) for i in Interval)
+                raise ValueError(f"Invalid compaction interval for table '{table}': {interval}. Expected one of: {valid_intervals}.")
+            if months <= base_months:
+                raise ValueError(f"Compaction interval {interval} of table '{table}' must be coarser than {intervals[table]}.")
+            if not isinstance(age, (int, np.integer)) or age < 0:
+                raise ValueError(f"Invalid compaction age for table '{table}': {age}. Must be a non-negative integer.")
+            tiers.append((months, int(age)))
+
+        # Coarsest intervals first, so they take precedence
+        for months, age in sorted(tiers, reverse=True):
+            periods = start_months // months
+            eligible = rows & (coarse_months == 0) & ((periods + 1) * months <= reference_month - age)
+            coarse_months[eligible] = months
+            coarse_periods[eligible] = periods[eligible]
+
+    compacted = coarse_months > 0
+    if not compacted.any():
+        return plan
+
+    # Merge compacted rows. Merged ranges end with their coarse period, even if the plan ends earlier,
+    # and start with the first planned row, so the first period is still clipped to the first date
+    merged = (
+        plan[compacted]
+        .assign(_months=coarse_months[compacted], _period=coarse_periods[compacted], _order=np.flatnonzero(compacted))
+        .groupby(["table_name", "_months", "_period"], sort=False, as_index=False)
+        .agg(range_start=("range_start", "min"), _order=("_order", "min"))
+    )
+    period_end = ((merged["_period"] + 1) * merged["_months"]).to_numpy().astype("datetime64[M]").astype("datetime64[D]")
+    merged["range_end"] = pd.to_datetime(period_end - np.timedelta64(1, "D"))
+    start_text = merged["range_start"].dt.strftime(Constants.DATE_FORMAT)
+    end_text = merged["range_end"].dt.strftime(Constants.DATE_FORMAT)
+    merged["partition_name"] = merged["table_name"] + "_" + start_text + "_" + end_text
+
+    kept = plan[~compacted].assign(_order=np.flatnonzero(~compacted))
+    result = pd.concat([merged[kept.columns], kept], ignore_index=True)
+
+    return (
+        result.sort_values(["_order"], kind="stable")
+        .drop(columns="_order")
+        .reset_index(drop=True)
+    )[list(plan.columns)]
+
+def get_retention_cutoff(retention: Any, interval: str, reference_date: date) -> Optional[pd.Timestamp]:
+    """
+    Gets the first date kept by a retention setting.
+
+    Args:
+        retention (Any): Number of intervals to keep, including the current one, or cutoff date
+                (format YYYYMMDD). None or empty keeps everything.
+        interval (str): Interval of the table ('YEAR', 'QUARTER', 'MONTH').
+        reference_date (date): Date the intervals are counted from (usually today).
+
+    Returns:
+        Optional[pd.Timestamp]: First kept date, or None if everything is kept.
+
+    Raises:
+        ValueError: If the retention or the interval are invalid.
+    """
+
+    if retention is None or (not isinstance(retention, str) and pd.isna(retention)) or str(retention).strip() == "":
+        return None
+
+    text = str(retention).strip()
+    if text.endswith(".0"):
+        text = text[:-2]
+
+    # Cutoff dates have 8 digits, a number of intervals that large would keep everything anyway
+    if len(text) == 8 and text.isdigit():
+        try:
+            return pd.to_datetime(text, format=Constants.DATE_FORMAT)
+        except ValueError as e:
+            raise ValueError(f"Invalid retention date: {retention}. Expected format YYYYMMDD.") from e
+
+    try:
+        intervals = int(text)
+    except ValueError:
+        raise ValueError(f"Invalid retention: {retention}. Must be a number of intervals or a date (YYYYMMDD).")
+    if intervals <= 0:
+        raise ValueError(f"Invalid retention: {retention}. Number of intervals must be greater than 0.")
+
+    try:
+        months = Constants.INTERVALS[Interval(str(interval).upper())].months
+    except (KeyError, ValueError):
+        valid_intervals = ', '.join(str(i.value) for i in Interval)
+        raise ValueError(f"Invalid interval value: {interval}. Expected one of: {valid_intervals}.")
+
+    current_period = np.datetime64(pd.Timestamp(reference_date).date(), "M").astype(np.int64) // months
+    first_month = (current_period - intervals + 1) * months
+    return pd.Timestamp(np.datetime64(int(first_month), "M").astype("datetime64[D]"))
+
+def apply_retention(plan: pd.DataFrame, cutoffs: Mapping[str, Optional[pd.Timestamp]]) -> pd.DataFrame:
+    """
+    Removes the partitions of a plan that end before the retention cutoff of their table.
+
+    Partitions partially inside the retention window are kept.
+
+    Args:
+        plan (pd.DataFrame): Plan with 'table_name' and 'range_end' columns.
+        cutoffs (Mapping[str, Optional[pd.Timestamp]]): First kept date of each table. Tables
+                without cutoff keep all their partitions.
+
+    Returns:
+        pd.DataFrame: Partitions of the plan inside the retention window.
+    """
+    cutoffs = {table: cutoff for table, cutoff in cutoffs.items() if cutoff is not None}
+    if plan.empty or not cutoffs:
+        return plan
+
+    cutoff = pd.to_datetime(plan["table_name"].map(cutoffs))
+    return plan[cutoff.isna() | (plan["range_end"] >= cutoff)].reset_index(drop=True)
@@ -0,0 +1,327 @@
+"""
+Watermark module for fabtoolkit.
+
+This module provides:
+- Pluggable probes that compute a watermark of the source data of each partition
+- Persistent on-disk store of the watermarks of the last refreshed partitions
+- Selection of the partitions whose source data changed since their last refresh
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Optional
+import uuid
+import numpy as np
+import pandas as pd
+from fabtoolkit.utils import Constants
+
+# ============================================================================
+# PROBES
+# ============================================================================
+
+# Columns of the watermark tables
+WATERMARK_COLUMNS: tuple[str, ...] = ("table", "partition", "watermark", "probed_at")
+
+class WatermarkProbe:
+    """
+    Base class of watermark probes.
+
+    A watermark is any value that changes when the source data of a date range changes,
+    such as the maximum modification timestamp, the row count or a checksum.
+    """
+
+    def probe(self, table: str, ranges: pd.DataFrame) -> pd.Series:
+        """
+        Computes the watermark of each date range of a table.
+
+        Args:
+            table (str): Name of the table.
+            ranges (pd.DataFrame): DataFrame with columns ['partition_name', 'range_start', 'range_end'].
+
+        Returns:
+            pd.Series: Watermark of each range as a string, aligned with ranges. None if unknown.
+        """
+        raise NotImplementedError
+
+class CallableWatermarkProbe(WatermarkProbe):
+    """
+    Watermark probe backed by a function called once per date range.
+
+    Ranges are probed in parallel. A range whose probe fails gets no watermark, so it is always refreshed.
+
+    Args:
+        func (Callable[[str, Any, Any], Any]): Function called with (table, range_start, range_end)
+            that returns the watermark of the range.
+        max_workers (int): Maximum number of ranges probed at the same time.
+    """
+
+    def __init__(self, func: Callable[[str, Any, Any], Any], max_workers: int = 8):
+
+        if not isinstance(max_workers, int) or max_workers <= 0:
+            raise ValueError("Max workers must be a positive integer.")
+
+        self.__func = func
+        self.__max_workers = max_workers
+
+    def _probe_range(self, table: str, range_start: Any, range_end: Any) -> Optional[str]:
+        """Computes the watermark of one range, or None if it cannot be computed."""
+        try:
+            value = self.__func(table, range_start, range_end)
+        except Exception:
+            return None
+        return None if value is None else str(value)
+
+    def probe(self, table: str, ranges: pd.DataFrame) -> pd.Series:
+        """
+        Computes the watermark of each date range of a table.
+
+        Args:
+            table (str): Name of the table.
+            ranges (pd.DataFrame): DataFrame with columns ['partition_name', 'range_start', 'range_end'].
+
+        Returns:
+            pd.Series: Watermark of each range as a string, aligned with ranges. None if unknown.
+        """
+        starts = pd.to_datetime(ranges["range_start"]).dt.date
+        ends = pd.to_datetime(ranges["range_end"]).dt.date
+
+        with ThreadPoolExecutor(max_workers=min(self.__max_workers, max(len(ranges), 1))) as pool:
+            watermarks = list(pool.map(lambda r: self._probe_range(table, *r), zip(starts, ends)))
+
+        return pd.Series(watermarks, index=ranges.index, dtype=object)
+
+class QueryWatermarkProbe(CallableWatermarkProbe):
+    """
+    Watermark probe that runs a query against the source of the table.
+
+    The query is a format string with the placeholders {table}, {start} and {end} (dates formatted
+    as yyyy-MM-dd, both inclusive). The watermark is the first row of the result.
+
+    Example:
+        SELECT MAX(ModifiedAt), COUNT(*) FROM dbo.Sales WHERE OrderDate >= '{start}' AND OrderDate <= '{end}'
+
+    Args:
+        execute (Callable[[str], pd.DataFrame]): Function that runs a query and returns its result.
+        query (str): Query template.
+        max_workers (int): Maximum number of queries running at the same time.
+    """
+
+    def __init__(self, execute: Callable[[str], pd.DataFrame], query: str, max_workers: int = 8):
+
+        if not query or not query.strip():
+            raise ValueError("Watermark query must be provided.")
+
+        def run_query(table: str, range_start: Any, range_end: Any) -> Optional[str]:
+            result = execute(query.format(
+                table=table,
+                start=range_start.strftime(Constants.ISO_DATE_FORMAT),
+                end=range_end.strftime(Constants.ISO_DATE_FORMAT)
+            ))
+            return None if result is None or result.empty else "|".join(map(str, result.iloc[0].tolist()))
+
+        super().__init__(run_query, max_workers)
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class WatermarkStore:
+    """
+    Persistent store of partition watermarks.
+
+    Watermarks probed before a refresh are staged and only committed once the refresh of their
+    partitions completes, so a failed refresh never hides a change from the next run. Watermarks
+    are stored as Parquet files under ``<path>/<dataset_id>.parquet`` (committed) and
+    ``<path>/<dataset_id>.staged.parquet`` (staged).
+
+    Attributes:
+        path (str): Root directory of the store (local path or mounted lakehouse path).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.__path = path or os.path.join(tempfile.gettempdir(), "fabtoolkit", "watermarks")
+        self.__lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        """Root directory of the store."""
+        return self.__path
+
+    def _file(self, dataset_id: str, staged: bool = False) -> str:
+        """Returns the file holding the committed or staged watermarks of a dataset."""
+        return os.path.join(self.__path, f"{dataset_id}.staged.parquet" if staged else f"{dataset_id}.parquet")
+
+    def _read(self, file: str) -> pd.DataFrame:
+        """Reads a watermark file. Missing or unreadable files are empty."""
+        try:
+            return pd.read_parquet(file)
+        except (OSError, ValueError):
+            return pd.DataFrame(columns=list(WATERMARK_COLUMNS))
+
+    def _write(self, frame: pd.DataFrame, file: str) -> None:
+        """Writes a watermark file through a temporary file, so readers never see a partially written file."""
+        os.makedirs(self.__path, exist_ok=True)
+        staging_file = os.path.join(self.__path, f".staging-{uuid.uuid4().hex}.parquet")
+        try:
+            frame.to_parquet(staging_file, index=False)
+            os.replace(staging_file, file)
+        finally:
+            if os.path.exists(staging_file):
+                os.remove(staging_file)
+
+    @staticmethod
+    def _upsert(current: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+        """Replaces the watermarks of the partitions in new and keeps the rest."""
+        new = new[list(WATERMARK_COLUMNS)]
+        if current.empty:
+            frame = new
+        elif new.empty:
+            frame = current
+        else:
+            frame = pd.concat([current, new], ignore_index=True)
+        return frame.drop_duplicates(["table", "partition"], keep="last").reset_index(drop=True)
+
+    def load(self, dataset_id: str) -> pd.DataFrame:
+        """
+        Loads the committed watermarks of a dataset.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+
+        Returns:
+            pd.DataFrame: DataFrame with columns ['table', 'partition', 'watermark', 'probed_at'].
+        """
+        return self._read(self._file(dataset_id))
+
+    def changed(self, dataset_id: str, watermarks: pd.DataFrame) -> np.ndarray:
+        """
+        Checks which partitions changed since their last committed watermark.
+
+        Partitions without a watermark (never refreshed or not probed) are considered changed.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            watermarks (pd.DataFrame): DataFrame with columns ['table', 'partition', 'watermark'].
+
+        Returns:
+            np.ndarray: Boolean array aligned with watermarks, True if the partition changed.
+        """
+        committed = self.load(dataset_id).set_index(["table", "partition"])["watermark"]
+        keys = pd.MultiIndex.from_arrays([watermarks["table"], watermarks["partition"]])
+        previous = committed.reindex(keys).to_numpy()
+        current = watermarks["watermark"].to_numpy()
+
+        return pd.isna(current) | pd.isna(previous) | (current != previous)
+
+    def stage(self, dataset_id: str, watermarks: pd.DataFrame) -> None:
+        """
+        Stages watermarks until the refresh of their partitions completes.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            watermarks (pd.DataFrame): DataFrame with columns ['table', 'partition', 'watermark'].
+
+        Returns:
+            None
+        """
+        watermarks = watermarks[watermarks["watermark"].notna()].assign(probed_at=time.time())
+        if watermarks.empty:
+            return
+
+        with self.__lock:
+            file = self._file(dataset_id, staged=True)
+            self._write(self._upsert(self._read(file), watermarks), file)
+
+    def commit(self, dataset_id: str, partitions: Optional[pd.DataFrame] = None) -> int:
+        """
+        Commits staged watermarks of refreshed partitions.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+            partitions (Optional[pd.DataFrame]): Refreshed partitions with columns ['table', 'partition'].
+                If None, all staged watermarks are committed.
+
+        Returns:
+            int: Number of committed watermarks.
+        """
+        with self.__lock:
+            staged_file = self._file(dataset_id, staged=True)
+            staged = self._read(staged_file)
+            if staged.empty:
+                return 0
+
+            if partitions is None:
+                selected = np.ones(len(staged), dtype=bool)
+            else:
+                refreshed = pd.MultiIndex.from_frame(partitions[["table", "partition"]].astype(str))
+                selected = pd.MultiIndex.from_frame(staged[["table", "partition"]]).isin(refreshed)
+
+            if selected.any():
+                file = self._file(dataset_id)
+                self._write(self._upsert(self._read(file), staged[selected]), file)
+                self._write(staged[~selected], staged_file)
+
+            return int(selected.sum())
+
+    def invalidate(self, dataset_id: str) -> None:
+        """
+        Removes the committed and staged watermarks of a dataset, so all its partitions are refreshed.
+
+        Args:
+            dataset_id (str): Identifier of the dataset.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            for file in (self._file(dataset_id), self._file(dataset_id, staged=True)):
+                if os.path.isfile(file):
+                    os.remove(file)
+
+# ============================================================================
+# CHANGE DETECTION
+# ============================================================================
+
+def select_changed_partitions(
+        dataset_id: str,
+        partitions: pd.DataFrame,
+        probes: dict[str, WatermarkProbe],
+        store: WatermarkStore
+    ) -> pd.DataFrame:
+    """
+    Selects the partitions whose source data changed since their last refresh.
+
+    The watermarks of the selected partitions are staged in the store, and must be committed
+    with WatermarkStore.commit() once their refresh completes. Partitions of tables without
+    a probe are always selected.
+
+    Args:
+        dataset_id (str): Identifier of the dataset.
+        partitions (pd.DataFrame): Partition plan with columns ['table_name', 'partition_name', 'range_start', 'range_end'].
+        probes (dict[str, WatermarkProbe]): Watermark probe of each table.
+        store (WatermarkStore): Store of the watermarks of the last refreshed partitions.
+
+    Returns:
+        pd.DataFrame: The changed partitions of the plan.
+    """
+    probed = partitions["table_name"].isin(list(probes))
+    if not probed.any():
+        return partitions
+
+    watermarks = pd.Series(None, index=partitions.index, dtype=object)
+    for table, ranges in partitions[probed].groupby("table_name", sort=False):
+        watermarks.loc[ranges.index] = probes[table].probe(table, ranges)
+
+    candidates = pd.DataFrame({
+        "table": partitions.loc[probed, "table_name"],
+        "partition": partitions.loc[probed, "partition_name"],
+        "watermark": watermarks[probed]
+    })
+    changed = pd.Series(True, index=partitions.index)
+    changed[probed] = store.changed(dataset_id, candidates)
+
+    store.stage(dataset_id, candidates[changed[probed].to_numpy()])
+    return partitions[changed]
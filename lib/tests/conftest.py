@@ -0,0 +1,40 @@
+"""
+Shared fixtures of the fabtoolkit tests.
+
+Tests run against the in-memory FakeFabric backend, so they need neither sempy nor a live workspace.
+"""
+
+import os
+import sys
+import pytest
+
+# Tests import fabtoolkit from the source tree
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.fake import FakeFabric, FakeModel
+
+@pytest.fixture
+def model() -> FakeModel:
+    """Small star-like model with a few monthly partitioned fact tables."""
+    return FakeModel.generate(tables=12, partitions=48, fact_share=0.25, seed=7)
+
+@pytest.fixture
+def backend(model: FakeModel):
+    """Fake fabric backend of the model, installed for the duration of the test."""
+    fake = FakeFabric(model, seed=7)
+    with fake.install():
+        yield fake
+
+@pytest.fixture
+def dataset(backend: FakeFabric) -> Dataset:
+    """Dataset served by the fake backend."""
+    return Dataset("workspace", "dataset")
+
+@pytest.fixture
+def fact_objects(model: FakeModel):
+    """Partitions of the fact tables as refresh objects with columns ['table', 'partition']."""
+    facts = model.partitions[model.partitions["Table Name"].isin(model.fact_tables)]
+    return facts[["Table Name", "Partition Name"]].rename(
+        columns={"Table Name": "table", "Partition Name": "partition"}
+    ).reset_index(drop=True)
@@ -0,0 +1,19 @@
+"""Smoke tests of the benchmark suite, at sizes small enough for the test run."""
+
+import pytest
+from fabtoolkit.benchmark import BENCHMARKS, run_benchmarks, scaling_report
+
+def test_run_benchmarks_times_every_step_at_every_size():
+    results = run_benchmarks(sizes=[(10, 50), (20, 100)], repeat=1)
+
+    assert len(results) == 2 * len(BENCHMARKS)
+    assert set(results["benchmark"]) == {b.name for b in BENCHMARKS}
+    assert (results["best_seconds"] >= 0).all()
+
+    report = scaling_report(results)
+    assert report["benchmark"].tolist() == [b.name for b in BENCHMARKS]
+    assert report["exponent"].notna().all()
+
+def test_run_benchmarks_rejects_unknown_steps():
+    with pytest.raises(ValueError, match="Unknown benchmarks"):
+        run_benchmarks(sizes=[(10, 50)], benchmarks=["missing"])
@@ -0,0 +1,95 @@
+"""Tests of the metadata snapshot cache."""
+
+import pandas as pd
+import pytest
+from fabtoolkit.cache import MetadataCache, MetadataSnapshot
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.fake import FakeFabric
+
+@pytest.fixture
+def cache(tmp_path) -> MetadataCache:
+    return MetadataCache(str(tmp_path))
+
+def snapshot(version: str) -> MetadataSnapshot:
+    return MetadataSnapshot(
+        workspace_name="Workspace",
+        dataset_name="Model",
+        version=version,
+        tables=pd.DataFrame({"table_name": ["Sales", "Sales"], "column_name": ["Id", "Amount"]}),
+        partitions=pd.DataFrame({"table_name": ["Sales"], "partition_name": ["Sales"], "record_count": [10]}),
+        relationships=None,
+        created_at=1.0,
+    )
+
+def test_cache_round_trips_a_snapshot(cache):
+    cache.put("dataset", snapshot("v1"))
+    loaded = cache.get("dataset", "v1")
+
+    assert loaded is not None
+    assert (loaded.workspace_name, loaded.dataset_name, loaded.version) == ("Workspace", "Model", "v1")
+    pd.testing.assert_frame_equal(loaded.tables, snapshot("v1").tables)
+    pd.testing.assert_frame_equal(loaded.partitions, snapshot("v1").partitions)
+    assert loaded.relationships is None
+
+def test_cache_misses_on_another_version(cache):
+    cache.put("dataset", snapshot("v1"))
+
+    assert cache.get("dataset", "v2") is None
+    assert cache.get("other", "v1") is None
+
+def test_cache_replaces_previous_versions_and_keeps_staging_dirs(cache, tmp_path):
+    cache.put("dataset", snapshot("v1"))
+    # Snapshot being written by another notebook at the same time
+    staging_dir = tmp_path / "dataset" / ".staging-other"
+    staging_dir.mkdir()
+
+    cache.put("dataset", snapshot("v2"))
+
+    assert cache.get("dataset", "v1") is None
+    assert cache.get("dataset", "v2") is not None
+    assert staging_dir.is_dir()
+
+def test_cache_expires_snapshots_after_ttl(tmp_path):
+    cache = MetadataCache(str(tmp_path), ttl=60)
+    cache.put("dataset", snapshot("v1"))
+    assert cache.get("dataset", "v1") is None
+
+def test_dataset_serves_metadata_from_cache_until_the_model_changes(backend: FakeFabric, cache, model, fact_objects):
+    Dataset("workspace", "dataset", cache=cache).prefetch()
+    Dataset("workspace", "dataset", cache=cache).prefetch()
+    assert backend.calls["list_partitions"] == 1
+
+    # A data refresh keeps the cached structure valid
+    backend.refresh_dataset("workspace", "dataset", fact_objects.to_dict(orient="records"))
+    dataset = Dataset("workspace", "dataset", cache=cache)
+    dataset.prefetch()
+    assert backend.calls["list_partitions"] == 1
+
+    # A structural change does not
+    dimension = next(t for t in model.partitions["Table Name"] if t not in model.fact_tables)
+    dataset.delete_default_partition(dimension)
+    Dataset("workspace", "dataset", cache=cache).prefetch()
+    assert backend.calls["list_partitions"] == 2
+
+def test_cached_partitions_leave_out_record_counts(backend: FakeFabric, cache, model, fact_objects):
+    Dataset("workspace", "dataset", cache=cache).prefetch()
+    dataset = Dataset("workspace", "dataset", cache=cache)
+
+    assert "record_count" not in dataset.partitions.columns
+    # Record counts are downloaded once, when sizes are needed
+    sizes = dataset._get_object_sizes(fact_objects)
+    dataset._get_object_sizes(fact_objects)
+    assert backend.calls["list_partitions"] == 2
+    expected = fact_objects.merge(
+        model.partitions, left_on=["table", "partition"], right_on=["Table Name", "Partition Name"]
+    )["Record Count"]
+    assert sizes.tolist() == expected.astype(float).tolist()
+
+def test_dataset_loads_metadata_when_the_cache_cannot_be_written(backend: FakeFabric, tmp_path):
+    cache_path = tmp_path / "cache"
+    cache_path.write_text("not a directory")
+    dataset = Dataset("workspace", "dataset", cache=MetadataCache(str(cache_path)))
+
+    with pytest.warns(UserWarning, match="Failed to store the metadata snapshot"):
+        dataset.prefetch("tables", "partitions")
+    assert not dataset.partitions.empty
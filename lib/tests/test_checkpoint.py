@@ -0,0 +1,96 @@
+"""Tests of the run checkpoint and of refreshes resumed from it."""
+
+import logging
+import pandas as pd
+from fabtoolkit import pipeline
+from fabtoolkit.checkpoint import RunCheckpoint, run_key
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.fake import FakeFabric
+
+PARAMS = {"dataset_id": "dataset", "commit_mode": "partialBatch"}
+
+_logger = logging.getLogger(__name__)
+
+def test_run_key_ignores_parameter_order():
+    assert run_key({"a": 1, "b": "x"}) == run_key({"b": "x", "a": 1})
+    assert run_key({"a": 1}) != run_key({"a": 2})
+
+def test_checkpoint_resumes_steps_values_and_requests(tmp_path, fact_objects):
+    checkpoint = RunCheckpoint.open(str(tmp_path), PARAMS)
+    assert not checkpoint.resumed
+    checkpoint.complete_step("partition", tables=["Sales"])
+    checkpoint.set_value("objects", fact_objects.to_dict(orient="records"))
+    checkpoint.add_request("r1", fact_objects.iloc[:3])
+    checkpoint.add_request("r2", fact_objects.iloc[3:5])
+    checkpoint.finish_request("r2", fact_objects.iloc[3:4])
+
+    resumed = RunCheckpoint.open(str(tmp_path), dict(reversed(PARAMS.items())))
+
+    assert resumed.resumed and resumed.file == checkpoint.file
+    assert resumed.is_step_done("partition") and not resumed.is_step_done("refresh")
+    assert resumed.get_value("objects") == fact_objects.to_dict(orient="records")
+    assert list(resumed.pending_requests()) == ["r1"]
+    pd.testing.assert_frame_equal(resumed.pending_requests()["r1"], fact_objects.iloc[:3].reset_index(drop=True))
+    pd.testing.assert_frame_equal(resumed.completed_objects(), fact_objects.iloc[3:4].reset_index(drop=True))
+
+def test_checkpoint_keeps_table_level_objects_without_partition(tmp_path):
+    objects = pd.DataFrame({"table": ["Sales", "Customer", "Product"], "partition": ["Sales_2024", None, ""]})
+    checkpoint = RunCheckpoint.open(str(tmp_path), PARAMS)
+    checkpoint.add_request("r1", objects)
+    checkpoint.finish_request("r0", objects.iloc[1:])
+
+    resumed = RunCheckpoint.open(str(tmp_path), PARAMS)
+
+    assert resumed.pending_requests()["r1"]["partition"].tolist() == ["Sales_2024", None, None]
+    assert resumed.completed_objects()["partition"].tolist() == [None, None]
+    assert resumed.completed_objects()["table"].tolist() == ["Customer", "Product"]
+
+def test_checkpoint_is_not_resumed_with_other_parameters_or_when_expired(tmp_path, fact_objects):
+    RunCheckpoint.open(str(tmp_path), PARAMS).complete_step("partition")
+
+    assert not RunCheckpoint.open(str(tmp_path), {**PARAMS, "commit_mode": "transactional"}).resumed
+    assert not RunCheckpoint.open(str(tmp_path), PARAMS, max_age=-1).resumed
+    assert RunCheckpoint.open(str(tmp_path), PARAMS, max_age=3600).resumed
+
+def test_checkpoint_is_removed_when_the_run_completes(tmp_path):
+    checkpoint = RunCheckpoint.open(str(tmp_path), PARAMS)
+    checkpoint.complete_step("partition")
+    checkpoint.remove()
+    assert not RunCheckpoint.open(str(tmp_path), PARAMS).resumed
+
+def test_refresh_reattaches_to_pending_requests_and_skips_refreshed_objects(
+        tmp_path, backend: FakeFabric, dataset: Dataset, model, fact_objects
+    ):
+    tables = ",".join(model.fact_tables)
+
+    # The previous run submitted the refresh of the facts and stopped before it finished
+    refresh_request_id = dataset.refresh_objects(fact_objects, "partialBatch", 4)
+    RunCheckpoint.open(str(tmp_path), PARAMS).add_request(refresh_request_id, fact_objects)
+
+    checkpoint = RunCheckpoint.open(str(tmp_path), PARAMS)
+    pipeline.refresh(dataset, tables, None, "partialBatch", 4, logger=_logger, checkpoint=checkpoint)
+
+    # Only the related dimensions are submitted again
+    assert backend.calls["refresh_dataset"] == 2
+    assert checkpoint.pending_requests() == {}
+    refreshed = checkpoint.completed_objects()
+    assert set(map(tuple, fact_objects.values.tolist())) <= set(map(tuple, refreshed.values.tolist()))
+
+    # A run resumed after everything was refreshed submits nothing
+    pipeline.refresh(dataset, tables, None, "partialBatch", 4, refresh_shards=2, logger=_logger,
+                     checkpoint=RunCheckpoint.open(str(tmp_path), PARAMS))
+    assert backend.calls["refresh_dataset"] == 2
+
+def test_resumed_refresh_skips_table_level_objects_refreshed_by_the_previous_run(
+        tmp_path, backend: FakeFabric, dataset: Dataset, model, fact_objects
+    ):
+    tables = pd.DataFrame({"table": model.fact_tables[:2], "partition": None})
+    refresh_request_id = dataset.refresh_objects(tables, "partialBatch", 4)
+    RunCheckpoint.open(str(tmp_path), PARAMS).add_request(refresh_request_id, tables)
+
+    checkpoint = RunCheckpoint.open(str(tmp_path), PARAMS)
+    objects = pd.concat([tables, fact_objects], ignore_index=True)
+    remaining = pipeline._resume_refresh(dataset, objects, checkpoint, "partialBatch", None, _logger)
+
+    pd.testing.assert_frame_equal(remaining, fact_objects)
+    assert checkpoint.completed_objects()["partition"].isna().all()
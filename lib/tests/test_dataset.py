@@ -0,0 +1,132 @@
+"""Tests of the partition catalog, the relationship index and the refresh retries of Dataset."""
+
+import pandas as pd
+import pytest
+from fabtoolkit.dataset import Dataset, PartitionCatalog, RelationshipIndex
+from fabtoolkit.fake import FakeFabric
+from fabtoolkit.refresh import RefreshStatus
+
+# ============================================================================
+# PARTITION CATALOG
+# ============================================================================
+
+@pytest.fixture
+def catalog() -> PartitionCatalog:
+    return PartitionCatalog(pd.DataFrame({
+        "table_name": ["Sales", "Customer", "Sales", "Product", "Sales"],
+        "partition_name": ["Sales_2023", "Customer", "Sales_2024", "Product", "Sales_2025"],
+        "record_count": [10, 20, 30, 40, 50],
+    }))
+
+def test_partition_catalog_groups_partitions_by_table(catalog):
+    assert len(catalog) == 5
+    assert sorted(catalog.table_names) == ["Customer", "Product", "Sales"]
+    assert catalog.get_partition_names("Sales") == ["Sales_2023", "Sales_2024", "Sales_2025"]
+    assert catalog.get_table("Missing").empty
+    assert catalog.has_table("Customer") and not catalog.has_table("Missing")
+
+def test_partition_catalog_looks_up_partitions(catalog):
+    assert ("Sales", "Sales_2024") in catalog
+    assert ("Sales", "Customer") not in catalog
+    assert catalog.get_row("Sales", "Sales_2024")["record_count"] == 30
+    assert catalog.contains(["Sales", "Sales", "Product"], ["Sales_2025", "Sales_2026", "Product"]).tolist() == [True, False, True]
+    with pytest.raises(KeyError):
+        catalog.get_row("Sales", "Sales_2026")
+
+def test_partition_catalog_selects_tables_in_the_given_order(catalog):
+    selected = catalog.select(["Product", "Missing", "Sales", "Product"])
+    assert selected["partition_name"].tolist() == ["Product", "Sales_2023", "Sales_2024", "Sales_2025"]
+
+def test_partition_catalog_requires_table_and_partition_columns():
+    with pytest.raises(ValueError, match="Missing required columns"):
+        PartitionCatalog(pd.DataFrame({"table_name": ["Sales"]}))
+
+# ============================================================================
+# RELATIONSHIP INDEX
+# ============================================================================
+
+@pytest.fixture
+def index() -> RelationshipIndex:
+    # Sales -> Customer -> Geography, Sales -> Product, and a cycle between A and B
+    return RelationshipIndex(pd.DataFrame({
+        "from_table": ["Sales", "Sales", "Customer", "A", "B", "A"],
+        "to_table": ["Customer", "Product", "Geography", "B", "A", "Product"],
+    }))
+
+def test_relationship_index_gets_related_tables(index):
+    assert sorted(index.related(["Sales"])) == ["Customer", "Geography", "Product", "Sales"]
+    assert index.related(["Unrelated"]) == ["Unrelated"]
+
+def test_relationship_index_levels_put_dependencies_first(index):
+    levels = index.levels(["Sales", "Customer", "Geography", "Product", "Unrelated"])
+    position = {table: i for i, level in enumerate(levels) for table in level}
+
+    assert position["Geography"] < position["Customer"] < position["Sales"]
+    assert position["Product"] < position["Sales"]
+    assert all(levels)
+
+def test_relationship_index_levels_keep_cycles_together(index):
+    levels = index.levels(["A", "B", "Product"])
+    assert levels == [["Product"], ["A", "B"]]
+
+def test_relationship_index_levels_ignore_tables_outside_the_selection(index):
+    # Customer depends on Geography, which is not refreshed, so it is ready at once
+    assert index.levels(["Sales", "Customer"]) == [["Customer"], ["Sales"]]
+
+def test_relationship_index_round_trips_through_its_frame(index):
+    loaded = RelationshipIndex.from_frame(index.to_frame())
+    assert loaded.table_names == index.table_names
+    assert loaded.levels(["Sales", "Customer", "Geography"]) == index.levels(["Sales", "Customer", "Geography"])
+
+# ============================================================================
+# REFRESH RETRIES
+# ============================================================================
+
+def test_wait_and_retry_resubmits_only_failed_objects(backend: FakeFabric, dataset: Dataset, fact_objects):
+    # The first request fails its middle object, the retries succeed
+    backend.failures["refresh"] = 1.0
+    refresh_request_id = dataset.refresh_objects(fact_objects, "partialBatch", 4)
+    backend.failures["refresh"] = 0.0
+
+    outcome = dataset.wait_and_retry(refresh_request_id, "partialBatch", 4, max_retries=2, retry_backoff=0)
+
+    assert outcome.status == RefreshStatus.COMPLETED
+    assert len(outcome.refresh_request_ids) == 2
+    assert outcome.failed.empty
+    assert len(outcome.completed) == len(fact_objects)
+    assert sorted(outcome.objects["attempts"].unique().tolist()) == [1, 2]
+    assert (outcome.objects["attempts"] == 2).sum() == 1
+
+def test_wait_and_retry_stops_after_max_retries(backend: FakeFabric, dataset: Dataset, fact_objects):
+    backend.failures["refresh"] = 1.0
+    refresh_request_id = dataset.refresh_objects(fact_objects, "partialBatch", 4)
+
+    outcome = dataset.wait_and_retry(refresh_request_id, "partialBatch", 4, max_retries=2, retry_backoff=0)
+
+    assert outcome.status == RefreshStatus.FAILED
+    assert len(outcome.refresh_request_ids) == 3
+    assert len(outcome.failed) == 1
+    assert outcome.failed["attempts"].tolist() == [3]
+
+def test_wait_and_retry_resubmits_table_level_objects_without_partition(backend: FakeFabric, dataset: Dataset, model):
+    # Whole tables are refreshed: the service reports them with no partition
+    tables = pd.DataFrame({"table": model.fact_tables, "partition": None})
+    backend.failures["refresh"] = 1.0
+    refresh_request_id = dataset.refresh_objects(tables, "partialBatch", 4)
+    backend.failures["refresh"] = 0.0
+
+    outcome = dataset.wait_and_retry(refresh_request_id, "partialBatch", 4, max_retries=1, retry_backoff=0)
+
+    assert outcome.status == RefreshStatus.COMPLETED
+    assert outcome.objects["partition"].tolist() == [""] * len(tables)
+
+def test_refresh_payload_leaves_out_missing_partitions():
+    df = pd.DataFrame({"table": ["Sales", "Customer", "Product"], "partition": ["Sales_2024", "", None]})
+    assert Dataset._refresh_payload(df) == [
+        {"table": "Sales", "partition": "Sales_2024"}, {"table": "Customer"}, {"table": "Product"}
+    ]
+
+def test_wait_and_retry_rejects_retries_of_transactional_refreshes(dataset: Dataset, fact_objects):
+    refresh_request_id = dataset.refresh_objects(fact_objects, "transactional", 4)
+    with pytest.raises(ValueError, match="partialBatch"):
+        dataset.wait_and_retry(refresh_request_id, "transactional", 4, max_retries=1)
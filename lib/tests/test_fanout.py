@@ -0,0 +1,113 @@
+"""Tests of the fan-out over several datasets and of the refresh slots."""
+
+import logging
+import threading
+import time
+import pytest
+from fabtoolkit import pipeline
+from fabtoolkit.fanout import RefreshSlots, fan_out
+from fabtoolkit.refresh import RefreshStatus
+
+_logger = logging.getLogger(__name__)
+
+CONFIGS = [
+    {"workspace_id": "w1", "dataset_id": "d1"},
+    {"workspace_id": "w1", "dataset_id": "d2"},
+    {"workspace_id": "w2", "dataset_id": "d3"},
+]
+
+def test_fan_out_isolates_failing_datasets():
+    finished: list[str] = []
+
+    def run(config):
+        if config["dataset_id"] == "d2":
+            raise RuntimeError("Refresh failed.")
+        return {"refreshed": config["dataset_id"]}
+
+    report = fan_out(CONFIGS, run, max_concurrent_datasets=2, on_result=lambda r: finished.append(r.dataset_id))
+
+    assert report["dataset_id"].tolist() == ["d1", "d2", "d3"]
+    assert report["status"].tolist() == [RefreshStatus.COMPLETED, RefreshStatus.FAILED, RefreshStatus.COMPLETED]
+    assert report.loc[1, "error"] == "Refresh failed."
+    assert report.loc[0, "refreshed"] == "d1" and report.loc[2, "refreshed"] == "d3"
+    assert sorted(finished) == ["d1", "d2", "d3"]
+
+def test_fan_out_keeps_the_report_when_the_result_callback_fails():
+    def on_result(result):
+        raise OSError("Report table is locked.")
+
+    with pytest.warns(UserWarning, match="Report table is locked"):
+        report = fan_out(CONFIGS, lambda config: None, on_result=on_result)
+
+    assert report["status"].tolist() == [RefreshStatus.COMPLETED] * 3
+
+def test_fan_out_validates_configurations():
+    with pytest.raises(ValueError, match="workspace_id and dataset_id"):
+        fan_out([{"workspace_id": "w1"}], lambda config: None)
+    with pytest.raises(ValueError, match="positive integer"):
+        fan_out(CONFIGS, lambda config: None, max_concurrent_datasets=0)
+    assert fan_out([], lambda config: None).empty
+
+def test_refresh_slots_limit_capacity_and_workspace_refreshes():
+    slots = RefreshSlots(max_concurrent_refreshes=3, max_per_workspace=1)
+    running: dict[str, int] = {}
+    peaks: dict[str, int] = {}
+    lock = threading.Lock()
+
+    def refresh(workspace_id: str) -> None:
+        with slots.acquire(workspace_id):
+            with lock:
+                running[workspace_id] = running.get(workspace_id, 0) + 1
+                peaks[workspace_id] = max(peaks.get(workspace_id, 0), running[workspace_id])
+            time.sleep(0.02)
+            with lock:
+                running[workspace_id] -= 1
+
+    threads = [threading.Thread(target=refresh, args=(w,)) for w in ["w1", "w1", "w1", "w2", "w2"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peaks == {"w1": 1, "w2": 1}
+    assert slots.peak == 2
+    assert slots.running == {}
+
+def test_refresh_slots_reserve_several_slots_at_once():
+    slots = RefreshSlots(max_concurrent_refreshes=4, max_per_workspace=3)
+    acquired = threading.Event()
+
+    def refresh() -> None:
+        with slots.acquire("w2"):
+            acquired.set()
+
+    with slots.acquire("w1", slots=5) as waited:
+        # Capped to the limit of the workspace, so the request never waits for slots that do not exist
+        assert waited < 1 and slots.running == {"w1": 3}
+        thread = threading.Thread(target=refresh)
+        thread.start()
+        assert acquired.wait(timeout=5)
+        thread.join()
+        with pytest.raises(ValueError, match="positive integer"):
+            with slots.acquire("w1", slots=0):
+                pass
+
+    assert slots.peak == 4
+    assert slots.running == {}
+
+def test_refresh_holds_a_refresh_slot_per_request(backend, dataset, model):
+    slots = RefreshSlots(max_concurrent_refreshes=2, max_per_workspace=None)
+    held: list[int] = []
+
+    def refresh_slot():
+        held.append(1)
+        return slots.acquire("workspace")
+
+    tables = ",".join(model.fact_tables)
+    pipeline.refresh(dataset, tables, None, "partialBatch", 4, logger=_logger, refresh_slot=refresh_slot)
+    assert len(held) == backend.calls["refresh_dataset"] == 1
+
+    pipeline.refresh(dataset, tables, None, "partialBatch", 4, refresh_shards=3, max_concurrent_refreshes=3,
+                     logger=_logger, refresh_slot=refresh_slot)
+    assert len(held) >= backend.calls["refresh_dataset"] == 4
+    assert slots.peak <= 2 and slots.running == {}
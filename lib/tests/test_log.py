@@ -0,0 +1,64 @@
+"""Tests of the console formatter, lazy log arguments and queued logging."""
+
+from io import StringIO
+import logging
+import pandas as pd
+from fabtoolkit.log import ConsoleLogFormatter, flush_logs, lazy, setup_logger, summarize
+
+def record(message: str, *args, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 1, message, args or None, None)
+
+def test_formatter_truncates_long_messages():
+    formatter = ConsoleLogFormatter(max_message_length=10)
+
+    assert formatter.format(record("short")).endswith("short\x1b[0m")
+    assert "0123456789... [5 more characters]" in formatter.format(record("%s", "012345678901234"))
+    assert "012345678901234" in ConsoleLogFormatter(None).format(record("012345678901234"))
+
+def test_formatter_reuses_one_formatter_per_level():
+    formatter = ConsoleLogFormatter()
+
+    info = formatter.format(record("a"))
+    formatter.format(record("b"))
+    error = formatter.format(record("c", level=logging.ERROR))
+
+    assert info.startswith("\x1b[1;30m[INFO]") and error.startswith("\x1b[31;20m[ERROR]")
+    assert formatter._get_formatter(logging.INFO, "INFO") is formatter._get_formatter(logging.INFO, "INFO")
+
+def test_lazy_arguments_are_only_rendered_when_the_record_is_emitted():
+    stream = StringIO()
+    logger = setup_logger("test_lazy", logging.INFO, stream=stream, queued=False)
+    calls: list[str] = []
+
+    def render(level: str) -> str:
+        calls.append(level)
+        return level
+
+    logger.debug("Objects: %s", lazy(render, "debug"))
+    logger.info("Objects: %s", lazy(render, "info"))
+
+    assert calls == ["info"]
+    assert "Objects: info" in stream.getvalue()
+
+def test_summarize_renders_the_first_items_of_collections():
+    assert str(summarize(list(range(5)), max_items=3)) == "[0, 1, 2] (+2 more)"
+    assert str(summarize({"a": 1, "b": 2}, max_items=1)) == "{'a': 1} (+1 more)"
+    assert str(summarize(pd.Series(["x", "y"]))) == "['x', 'y']"
+    assert str(summarize(pd.DataFrame({"table": ["Sales", "Customer"]}), max_items=1)) == '[{"table":"Sales"}] (+1 more)'
+    assert str(summarize("Sales")) == "Sales"
+
+def test_queued_logger_writes_records_in_a_background_thread():
+    stream = StringIO()
+    logger = setup_logger("test_queued", logging.INFO, stream=stream)
+
+    logger.info("Refreshing %s", summarize(["Sales", "Customer"]))
+    try:
+        raise ValueError("Invalid partition")
+    except ValueError:
+        logger.exception("Refresh failed")
+    flush_logs("test_queued")
+
+    output = stream.getvalue()
+    assert "Refreshing ['Sales', 'Customer']" in output
+    assert "Refresh failed" in output and "ValueError: Invalid partition" in output
+    assert setup_logger("test_queued") is logger and len(logger.handlers) == 1
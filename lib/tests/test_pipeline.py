@@ -0,0 +1,210 @@
+"""Tests of the partition planning, compaction, retention and compiled run plans of the pipeline."""
+
+import json
+import pandas as pd
+import pytest
+from fabtoolkit import pipeline
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.fake import FakeFabric, FakeModel
+from fabtoolkit.plan import PartitionChanges, RunPlan
+from fabtoolkit.utils import parse_partition_names
+
+COMPACTION = {"QUARTER": 3, "YEAR": 12}
+
+@pytest.fixture
+def model() -> FakeModel:
+    """Model with two fact tables of 36 monthly partitions, so they always span a whole year that ended a year ago."""
+    return FakeModel.generate(tables=6, partitions=72, fact_share=1 / 3, seed=7)
+
+@pytest.fixture
+def tmsl_scripts(backend: FakeFabric) -> list[dict]:
+    """TMSL scripts run on the backend, in order."""
+    scripts: list[dict] = []
+    execute_tmsl = backend.execute_tmsl
+
+    def spy(workspace, script):
+        scripts.append(script)
+        return execute_tmsl(workspace, script)
+
+    backend.execute_tmsl = spy
+    return scripts
+
+def compaction_config(model: FakeModel) -> pd.DataFrame:
+    return model.partitions_config().assign(compaction=[COMPACTION] * len(model.fact_tables))
+
+def partition_names(model: FakeModel, table: str) -> list[str]:
+    return model.partitions.loc[model.partitions["Table Name"] == table, "Partition Name"].tolist()
+
+# ============================================================================
+# COMPACTION
+# ============================================================================
+
+def test_plan_partitions_merges_old_months_into_quarters_and_years(model, dataset: Dataset):
+    config = compaction_config(model)
+
+    changes = pipeline.plan_partitions(dataset, config)
+    compactions = changes.compactions
+    merged = parse_partition_names(compactions["partition_name"])
+    months = (merged["range_end"].dt.to_period("M") - merged["range_start"].dt.to_period("M")).map(lambda d: d.n + 1)
+
+    assert changes.created.empty
+    assert set(compactions["table_name"]) == set(model.fact_tables)
+    # Whole years take precedence over their quarters, and the first year starts at the first partition
+    first = ~compactions["table_name"].duplicated().to_numpy()
+    assert set(months[~first]) <= {3, 12} and {3, 12} <= set(months[~first])
+    assert (merged["range_end"].dt.month[first] == 12).all()
+    for table in model.fact_tables:
+        first_name = compactions[compactions["table_name"] == table]["partition_name"].iloc[0]
+        assert first_name.split("_")[1] == partition_names(model, table)[0].split("_")[1]
+
+    # Each merged partition replaces the existing months inside its range, and each month is merged once
+    for row, start, end in zip(compactions.itertuples(), merged["range_start"], merged["range_end"]):
+        originals = parse_partition_names(row.originals)
+        assert (originals["table_name"] == row.table_name).all()
+        assert (originals["range_start"] >= start).all() and (originals["range_end"] <= end).all()
+    originals = [name for names in compactions["originals"] for name in names]
+    assert len(originals) == len(set(originals))
+
+def test_compacted_partitions_keep_their_names_across_runs(model, backend: FakeFabric, dataset: Dataset):
+    config = compaction_config(model)
+    planned = pipeline.plan_partitions(dataset, config).compactions["partition_name"].tolist()
+    assert planned == pipeline.plan_partitions(dataset, config).compactions["partition_name"].tolist()
+
+    pipeline.partition(dataset, config)
+
+    # The merged partitions now exist, so the next run plans nothing
+    for table in model.fact_tables:
+        assert set(planned) & set(partition_names(model, table))
+    changes = pipeline.plan_partitions(Dataset("workspace", "dataset"), config)
+    assert changes.compactions.empty and changes.created.empty and not changes.deleted
+
+def test_compaction_deletes_originals_after_creating_and_refreshing_the_merged_partitions(
+        model, dataset: Dataset, tmsl_scripts
+    ):
+    config = compaction_config(model)
+    compactions = pipeline.plan_partitions(dataset, config).compactions
+
+    pipeline.partition(dataset, config)
+
+    (script,) = tmsl_scripts
+    operations = script["sequence"]["operations"]
+    kinds = [kind for operation in operations for kind in operation]
+    assert kinds == ["create"] * len(compactions) + ["refresh"] + ["delete"] * compactions["originals"].map(len).sum()
+    (refresh,) = [operation["refresh"] for operation in operations if "refresh" in operation]
+    assert [o["partition"] for o in refresh["objects"]] == compactions["partition_name"].tolist()
+
+def test_failed_compaction_keeps_the_original_partitions(model, backend: FakeFabric, dataset: Dataset):
+    config = compaction_config(model)
+    before = model.partitions["Partition Name"].tolist()
+    backend.failures["refresh"] = 1.0
+
+    with pytest.raises(RuntimeError, match="Failed to compact partitions"):
+        pipeline.partition(dataset, config)
+
+    assert model.partitions["Partition Name"].tolist() == before
+
+# ============================================================================
+# RETENTION
+# ============================================================================
+
+def add_partitions(model: FakeModel, table: str, names: list[str]) -> None:
+    """Adds partitions to a table of the model, with the query of its first partition."""
+    query = model.partitions.loc[model.partitions["Table Name"] == table, "Query"].iloc[0]
+    model.partitions = pd.concat([model.partitions, pd.DataFrame({
+        "Table Name": table, "Partition Name": names, "Query": query, "Record Count": 0
+    })], ignore_index=True)
+
+def test_plan_partitions_expires_partitions_before_the_retention_window(model, dataset: Dataset):
+    table = model.fact_tables[0]
+    config = model.partitions_config().assign(retention=["12", None])
+
+    changes = pipeline.plan_partitions(dataset, config)
+
+    # The current month and the 11 before it are kept, and tables without retention keep everything
+    assert [t for t, _ in changes.deleted] == [table] * 24
+    assert [p for _, p in changes.deleted] == partition_names(model, table)[:24]
+
+def test_plan_partitions_never_expires_default_or_unknown_partitions(model, dataset: Dataset):
+    table = model.fact_tables[0]
+    config = model.partitions_config().assign(retention=[pd.Timestamp.today().strftime("%Y%m%d"), None])
+    add_partitions(model, table, [table, f"{table}_Manual", f"{table}_2000"])
+
+    changes = pipeline.plan_partitions(Dataset("workspace", "dataset"), config)
+
+    # Only the default partition is deleted as such, and names without dates are left alone
+    deleted = [p for t, p in changes.deleted if t == table]
+    assert deleted.count(table) == 1
+    assert f"{table}_Manual" not in deleted and f"{table}_2000" not in deleted
+    assert set(deleted) - {table} == set(partition_names(model, table)[:35])
+
+def test_plan_partitions_does_not_expire_partitions_being_compacted(model, dataset: Dataset):
+    # The cutoff falls in the second month of a quarter old enough to be compacted
+    quarter = pd.Timestamp.today().to_period("Q") - 4
+    cutoff = quarter.start_time + pd.DateOffset(months=1, days=14)
+    config = model.partitions_config().assign(
+        compaction=[{"QUARTER": 3}] * len(model.fact_tables),
+        retention=cutoff.strftime("%Y%m%d")
+    )
+
+    changes = pipeline.plan_partitions(dataset, config)
+
+    # The quarter is kept, so its first month is replaced by the merged partition instead of expiring
+    merged = changes.compactions.set_index(["table_name", "partition_name"])["originals"]
+    originals = {(t, p) for (t, _), names in merged.items() for p in names}
+    first_month = parse_partition_names([p for _, p in originals])["range_start"].min()
+    assert first_month == quarter.start_time
+    assert not originals & set(changes.deleted)
+    assert parse_partition_names([p for _, p in changes.deleted])["range_end"].max() < quarter.start_time
+    assert len(changes.deleted) == len(set(changes.deleted))
+
+# ============================================================================
+# RUN PLAN
+# ============================================================================
+
+def test_compiled_run_creates_refreshes_and_deletes_in_one_sequence(model, dataset: Dataset):
+    table = model.fact_tables[0]
+    config = compaction_config(model).assign(retention=["30", None])
+
+    plan = pipeline.compile_run(dataset, config, tables_to_refresh=table, max_parallelism=6)
+    script = plan.to_tmsl()["sequence"]
+    kinds = [kind for operation in script["operations"] for kind in operation]
+
+    assert script["maxParallelism"] == 6
+    assert kinds == sorted(kinds, key=["createOrReplace", "refresh", "delete"].index)
+    assert kinds.count("createOrReplace") == len(plan.changes.added) > 0
+    assert kinds.count("delete") == len(plan.changes.removed) > 0
+
+    # Merged partitions are refreshed, removed partitions are not
+    (refresh,) = [operation["refresh"] for operation in script["operations"] if "refresh" in operation]
+    refreshed = {(o["table"], o["partition"]) for o in refresh["objects"]}
+    merged = set(zip(plan.changes.compactions["table_name"], plan.changes.compactions["partition_name"]))
+    assert merged <= refreshed
+    assert not refreshed & set(plan.changes.removed)
+
+def test_compiled_run_selects_partitions_created_by_the_plan(model, backend: FakeFabric, dataset: Dataset):
+    table = model.fact_tables[0]
+    config = model.partitions_config()
+    first_date = pd.to_datetime(config.loc[0, "first_date"], format="%Y%m%d") - pd.DateOffset(months=2)
+    config.loc[0, "first_date"] = first_date.strftime("%Y%m%d")
+    new_partition = f"{table}_{first_date.strftime('%Y%m%d')}_{(first_date + pd.offsets.MonthEnd(0)).strftime('%Y%m%d')}"
+    selection = json.dumps([{"table": table, "selected_partitions": new_partition}])
+
+    plan = pipeline.compile_run(dataset, config, tables_to_refresh=table, partitions_to_refresh=selection)
+    pipeline.run_plan(dataset, plan)
+
+    assert (table, new_partition) in set(zip(plan.refresh_objects["table"], plan.refresh_objects["partition"]))
+    assert new_partition in partition_names(model, table)
+    assert backend.calls["execute_tmsl"] == 1
+
+def test_run_plan_refreshes_whole_tables_without_a_partition():
+    objects = pd.DataFrame({"table": ["Sales", "Customer", "Product", "Customer"], "partition": ["Sales_1", "", None, None]})
+    plan = RunPlan("Model", PartitionChanges(), refresh_objects=objects)
+
+    (operation,) = plan.to_tmsl()["sequence"]["operations"]
+
+    assert operation["refresh"]["objects"] == [
+        {"database": "Model", "table": "Sales", "partition": "Sales_1"},
+        {"database": "Model", "table": "Customer"},
+        {"database": "Model", "table": "Product"},
+    ]
+    assert "maxParallelism" not in plan.to_tmsl()["sequence"]
@@ -0,0 +1,277 @@
+"""Tests of the sharded refresh handle, the refresh monitor and the progress of refresh requests."""
+
+from io import StringIO
+import asyncio
+import logging
+import threading
+import time
+import pandas as pd
+import pytest
+from fabtoolkit import refresh as refresh_module
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.fake import FakeFabric, FakeRefreshDetails
+from fabtoolkit.fanout import RefreshSlots
+from fabtoolkit.history import RefreshHistory
+from fabtoolkit.log import TaggedLoggerAdapter, log_tag, setup_logger
+from fabtoolkit.refresh import RefreshMonitor, RefreshProgress, RefreshStatus, ShardedRefresh, ShardBy, run_sync, split_refresh_objects
+from fabtoolkit.trace import current_span, set_tracer, span, Tracer
+
+def objects(*tables: str) -> pd.DataFrame:
+    return pd.DataFrame({"table": list(tables), "partition": [f"{t}_1" for t in tables]})
+
+class FakeService:
+    """Submits and waits for refresh requests, failing the requests of the given tables."""
+
+    def __init__(self, failing: tuple[str, ...] = ()):
+        self.failing = set(failing)
+        self.submitted: list[list[str]] = []
+        self.__lock = threading.Lock()
+
+    def submit(self, shard: pd.DataFrame) -> str:
+        with self.__lock:
+            self.submitted.append(shard["table"].tolist())
+            return ",".join(shard["table"])
+
+    def wait_for(self, refresh_request_id: str) -> str:
+        failed = self.failing & set(refresh_request_id.split(","))
+        return RefreshStatus.FAILED if failed else RefreshStatus.COMPLETED
+
+def test_sharded_refresh_submits_shards_after_their_prerequisites():
+    service = FakeService()
+    refresh = ShardedRefresh(
+        [objects("Customer"), objects("Product"), objects("Sales")],
+        service.submit,
+        service.wait_for,
+        max_concurrent_requests=3,
+        prerequisites=[[], [], [0, 1]]
+    )
+
+    assert refresh.wait(timeout=10) == RefreshStatus.COMPLETED
+    assert service.submitted[-1] == ["Sales"]
+    assert [s.status for s in refresh.shards] == [RefreshStatus.COMPLETED] * 3
+
+def test_sharded_refresh_skips_shards_whose_prerequisites_fail():
+    service = FakeService(failing=("Customer",))
+    changes: list[tuple[int, str]] = []
+    refresh = ShardedRefresh(
+        [objects("Customer"), objects("Product"), objects("Sales"), objects("Returns")],
+        service.submit,
+        service.wait_for,
+        max_concurrent_requests=2,
+        prerequisites=[[], [], [0, 1], [2]],
+        on_change=lambda shard: changes.append((shard.index, shard.status))
+    )
+    refresh.wait(timeout=10)
+
+    statuses = [s.status for s in refresh.shards]
+    assert statuses == [RefreshStatus.FAILED, RefreshStatus.COMPLETED, RefreshStatus.SKIPPED, RefreshStatus.SKIPPED]
+    assert ["Sales"] not in service.submitted and ["Returns"] not in service.submitted
+    assert "[0]" in refresh.shards[2].error
+    assert (2, RefreshStatus.SKIPPED) in changes
+    assert refresh.status == RefreshStatus.FAILED
+
+def test_sharded_refresh_rejects_prerequisites_on_later_shards():
+    with pytest.raises(ValueError, match="earlier shards"):
+        ShardedRefresh([objects("A"), objects("B")], str, str, prerequisites=[[1], []])
+
+def test_sharded_refreshes_hold_a_refresh_slot_per_request():
+    slots = RefreshSlots(max_concurrent_refreshes=2, max_per_workspace=None)
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def wait_for(refresh_request_id: str) -> str:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return RefreshStatus.COMPLETED
+
+    # Two datasets, each allowed three refresh requests at the same time, share two slots
+    refreshes = [
+        ShardedRefresh(
+            [objects(f"{dataset}_{i}") for i in range(4)],
+            lambda shard: shard["table"].iloc[0],
+            wait_for,
+            max_concurrent_requests=3,
+            slot=lambda: slots.acquire("w1")
+        )
+        for dataset in ("d1", "d2")
+    ]
+
+    assert [r.wait(timeout=10) for r in refreshes] == [RefreshStatus.COMPLETED] * 2
+    assert peak[0] == 2 and slots.peak == 2
+    assert slots.running == {}
+
+def test_sharded_refresh_releases_its_slot_while_waiting_for_a_conflict(monkeypatch):
+    monkeypatch.setattr(refresh_module, "CONFLICT_RETRY_SECONDS", 0.05)
+    slots = RefreshSlots(max_concurrent_refreshes=1, max_per_workspace=None)
+    attempts: list[str] = []
+    conflicted = threading.Event()
+
+    def submit(shard: pd.DataFrame) -> str:
+        attempts.append(shard["table"].iloc[0])
+        if len(attempts) == 1:
+            conflicted.set()
+            raise RuntimeError("409 Conflict: another refresh is in progress.")
+        return "r1"
+
+    refresh = ShardedRefresh([objects("Sales")], submit, lambda _: RefreshStatus.COMPLETED, slot=lambda: slots.acquire("w1"))
+    assert conflicted.wait(timeout=5)
+
+    # Another dataset gets the only slot while the shard waits, and the shard is resubmitted after it
+    with slots.acquire("w1"):
+        time.sleep(0.1)
+        assert attempts == ["Sales"]
+
+    assert refresh.wait(timeout=10) == RefreshStatus.COMPLETED
+    assert attempts == ["Sales", "Sales"]
+    assert slots.running == {}
+
+def test_sharded_refresh_logs_with_the_tag_of_its_caller():
+    stream = StringIO()
+    logger = TaggedLoggerAdapter(setup_logger("test_tagged_refresh", logging.INFO, stream=stream, queued=False))
+
+    def wait_for(refresh_request_id: str) -> str:
+        logger.info(f"Refresh request {refresh_request_id} completed.")
+        return RefreshStatus.COMPLETED
+
+    with log_tag("d1"):
+        refresh = ShardedRefresh([objects("Sales")], lambda shard: "r1", wait_for)
+    refresh.wait(timeout=10)
+    logger.info("Untagged.")
+
+    lines = stream.getvalue().splitlines()
+    assert "[d1] Refresh request r1 completed." in lines[0]
+    assert "[d1]" not in lines[1] and "Untagged." in lines[1]
+
+def test_run_sync_keeps_the_span_and_log_tag_inside_a_running_event_loop(tmp_path):
+    stream = StringIO()
+    logger = TaggedLoggerAdapter(setup_logger("test_run_sync_tag", logging.INFO, stream=stream, queued=False))
+
+    async def work() -> str:
+        logger.info("Polling.")
+        return current_span().name
+
+    async def notebook() -> str:
+        # Notebooks run their cells inside an event loop, so run_sync falls back to a worker thread
+        return run_sync(work())
+
+    previous = set_tracer(Tracer(str(tmp_path)))
+    try:
+        with log_tag("d1"), span("refresh"):
+            name = asyncio.run(notebook())
+    finally:
+        set_tracer(previous)
+
+    assert name == "refresh"
+    assert "[d1] Polling." in stream.getvalue()
+
+def test_sharded_refresh_awaits_its_requests_in_one_event_loop():
+    threads: set[int] = set()
+    running, peak = [0], [0]
+
+    async def wait_for(refresh_request_id: str) -> str:
+        threads.add(threading.get_ident())
+        running[0] += 1
+        peak[0] = max(peak[0], running[0])
+        await asyncio.sleep(0.02)
+        running[0] -= 1
+        return RefreshStatus.COMPLETED
+
+    refresh = ShardedRefresh(
+        [objects(f"Table{i}") for i in range(6)], lambda shard: shard["table"].iloc[0], wait_for,
+        max_concurrent_requests=3
+    )
+
+    assert refresh.wait(timeout=10) == RefreshStatus.COMPLETED
+    assert len(threads) == 1 and threading.get_ident() not in threads
+    assert peak[0] == 3
+
+def test_refresh_monitor_sleeps_through_the_expected_duration():
+    monitor = RefreshMonitor(lambda _: "Unknown", min_interval=2, max_interval=60)
+
+    # Sleeps through half of the remaining expected time, then backs off from the minimum interval
+    assert monitor._next_interval(elapsed=0, polls=0, expected_duration=100) == 50
+    assert monitor._next_interval(elapsed=98, polls=0, expected_duration=100) == 2
+    assert monitor._next_interval(elapsed=120, polls=2, expected_duration=100) == 2 * 1.5 ** 2
+    assert monitor._next_interval(elapsed=0, polls=0, expected_duration=None) == 2
+
+def test_requests_are_polled_with_the_duration_expected_from_the_history(monkeypatch, tmp_path, backend, fact_objects):
+    history = RefreshHistory(str(tmp_path))
+    history.record("dataset", fact_objects.assign(duration=10.0, refresh_request_id="r0", recorded_at=0.0))
+    dataset = Dataset("workspace", "dataset", history=history)
+
+    hints: list = []
+    wait = RefreshMonitor.wait
+
+    async def spy(self, refresh_request_id, expected_duration=None, callback=None):
+        hints.append(expected_duration)
+        return await wait(self, refresh_request_id, expected_duration, callback)
+
+    # Objects run four at a time, and a request never takes less than its longest object
+    assert dataset._expected_request_duration(fact_objects.iloc[:2], 4) == pytest.approx(10.0)
+    assert dataset._expected_request_duration(pd.DataFrame({"table": ["Other"], "partition": ["Other"]}), 4) is None
+
+    monkeypatch.setattr(RefreshMonitor, "wait", spy)
+    refresh_request_id = dataset.refresh_objects(fact_objects, "partialBatch", 4)
+    assert dataset.check_refresh_status(refresh_request_id, timeout=10) == RefreshStatus.COMPLETED
+    assert hints == [pytest.approx(10.0 * len(fact_objects) / 4)]
+
+@pytest.fixture
+def fast_polling(monkeypatch):
+    """Polls refresh requests every 50 milliseconds."""
+    def refresh_monitor(self: Dataset, timeout: int = 7200) -> RefreshMonitor:
+        return RefreshMonitor(
+            self.get_refresh_status, min_interval=0.05, max_interval=0.05, timeout=timeout, get_details=self.get_refresh_details
+        )
+    monkeypatch.setattr(Dataset, "refresh_monitor", refresh_monitor)
+
+def test_refresh_progress_reports_object_changes_before_the_request():
+    progress = RefreshProgress("r1")
+    objects = pd.DataFrame({"Table": ["Sales", "Customer"], "Partition": ["Sales_1", None], "Status": ["InProgress", "InProgress"]})
+
+    first = progress.update(FakeRefreshDetails("InProgress", None, None, objects))
+    assert [(e.table, e.partition, e.status, e.previous_status) for e in first] == [
+        ("Sales", "Sales_1", "InProgress", None), ("Customer", None, "InProgress", None), (None, None, "InProgress", None),
+    ]
+    assert progress.update(FakeRefreshDetails("InProgress", None, None, objects)) == []
+
+    last = progress.update(FakeRefreshDetails("Failed", None, None, objects.assign(Status=["Completed", "Failed"])))
+    assert [(e.table, e.status) for e in last] == [("Sales", "Completed"), ("Customer", "Failed"), (None, "Failed")]
+    assert last[1].is_failure and last[-1].is_request and progress.finished
+    assert progress.objects()["status"].tolist() == ["Completed", "Failed"]
+
+def test_follow_refresh_yields_each_object_as_it_completes(fast_polling, backend: FakeFabric, dataset: Dataset, fact_objects):
+    backend.refresh_duration = 0.5
+    refresh_request_id = dataset.refresh_objects(fact_objects.iloc[:4], "transactional", 4)
+
+    events = list(dataset.follow_refresh(refresh_request_id, timeout=10))
+
+    completed = [(e.table, e.partition) for e in events if not e.is_request and e.status == "Completed"]
+    assert completed == list(zip(fact_objects["table"][:4], fact_objects["partition"][:4]))
+    assert events[-1].is_request and events[-1].status == RefreshStatus.COMPLETED
+
+def test_failed_object_cancels_the_rest_of_the_refresh(fast_polling, backend: FakeFabric, dataset: Dataset, fact_objects):
+    # The middle object fails halfway through the refresh
+    backend.refresh_duration = 2.0
+    backend.failures["refresh"] = 1.0
+    refresh_request_id = dataset.refresh_objects(fact_objects.iloc[:8], "transactional", 4)
+    events: list = []
+
+    start = time.monotonic()
+    status = dataset.check_refresh_status(refresh_request_id, timeout=10, on_progress=events.append, cancel_on_failure=True)
+
+    assert status == "Cancelled"
+    assert time.monotonic() - start < 2.0
+    assert backend.calls["cancel_dataset_refresh"] == 1
+    assert [e.table for e in events if e.is_failure] == [fact_objects["table"][4]]
+    assert events[-1].status == "Cancelled"
+
+def test_split_refresh_objects_balances_sizes_longest_first():
+    df = objects("A", "B", "C", "D", "E")
+    shards = split_refresh_objects(df, 2, ShardBy.SIZE, pd.Series([8.0, 7.0, 6.0, 5.0, 4.0]))
+
+    loads = sorted(sum({"A": 8, "B": 7, "C": 6, "D": 5, "E": 4}[t] for t in shard["table"]) for shard in shards)
+    assert loads == [13, 17]
@@ -0,0 +1,92 @@
+"""Tests of the tracing spans and their export."""
+
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fabtoolkit import trace
+from fabtoolkit.trace import Tracer, in_current_context, load_spans, span, summarize_spans, traced
+
+@pytest.fixture
+def tracer(tmp_path):
+    """Tracer installed for the duration of the test."""
+    tracer = Tracer(str(tmp_path), attributes={"notebook": "test"})
+    previous = trace.set_tracer(tracer)
+    try:
+        yield tracer
+    finally:
+        trace.set_tracer(previous)
+
+def test_spans_are_nested_and_written_to_the_trace_file(tracer, tmp_path):
+    with span("run", tables=2) as run:
+        with span("run.step") as step:
+            step.set(objects=10)
+        run.set(status="done")
+    tracer.close()
+
+    spans = load_spans(str(tmp_path)).set_index("name")
+
+    assert spans.loc["run.step", "parent_span_id"] == spans.loc["run", "span_id"]
+    assert spans.loc["run.step", "attributes.objects"] == 10
+    assert spans.loc["run", "attributes.tables"] == 2 and spans.loc["run", "attributes.status"] == "done"
+    assert (spans["attributes.notebook"] == "test").all()
+    assert (spans["trace_id"] == tracer.trace_id).all()
+    assert spans.loc["run", "duration"] >= spans.loc["run.step", "duration"]
+
+def test_spans_record_errors(tracer, tmp_path):
+    @traced("step")
+    def step():
+        raise ValueError("Invalid partition")
+
+    with pytest.raises(ValueError):
+        step()
+    tracer.flush()
+
+    (record,) = load_spans(str(tmp_path)).to_dict(orient="records")
+    assert record["status"] == "ERROR"
+    assert record["error"] == "ValueError: Invalid partition"
+
+def test_spans_opened_in_other_threads_keep_their_parent(tracer, tmp_path):
+    def work(i: int) -> None:
+        with span("shard", shard=i):
+            pass
+
+    with span("refresh") as parent, ThreadPoolExecutor(max_workers=3) as pool:
+        for future in [pool.submit(in_current_context(work), i) for i in range(3)]:
+            future.result()
+    tracer.close()
+
+    spans = load_spans(str(tmp_path))
+    assert (spans.loc[spans["name"] == "shard", "parent_span_id"] == parent.span_id).all()
+
+def test_trace_context_lets_a_child_run_join_the_trace(tracer, tmp_path):
+    with span("orchestrator") as parent:
+        context = trace.trace_context()
+    child = Tracer(context["trace_path"], context["trace_id"], context["trace_parent_id"])
+    with child.span("refresher"):
+        pass
+    child.close()
+    tracer.close()
+
+    spans = load_spans(str(tmp_path), [tracer.trace_id]).set_index("name")
+    assert spans.loc["refresher", "parent_span_id"] == parent.span_id
+
+def test_tracing_is_disabled_without_a_tracer(tmp_path):
+    assert not trace.is_enabled()
+    assert trace.trace_context() == {}
+    with span("run") as s:
+        s.set(tables=1)
+        trace.current_span().set(tables=2)
+    assert load_spans(str(tmp_path)).empty
+
+def test_summarize_spans_aggregates_phases_across_runs(tmp_path):
+    for _ in range(2):
+        tracer = Tracer(str(tmp_path))
+        tracer.record("install", 0.0, 2.0)
+        tracer.record("poll", 0.0, 0.5)
+        tracer.record("poll", 1.0, 0.5)
+        tracer.close()
+
+    summary = summarize_spans(load_spans(str(tmp_path))).set_index("name")
+
+    assert summary.index.tolist() == ["install", "poll"]
+    assert summary.loc["poll", "runs"] == 2 and summary.loc["poll", "count"] == 4
+    assert summary.loc["install", "total_seconds"] == pytest.approx(4.0)
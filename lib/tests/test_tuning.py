@@ -0,0 +1,81 @@
+"""Tests of the max parallelism tuner."""
+
+import pandas as pd
+import pytest
+from fabtoolkit.tuning import ParallelismTuner, is_auto_parallelism
+
+def runs(*levels: tuple[int, float, str]) -> pd.DataFrame:
+    """Recorded runs of 10 seconds, in order, from (max parallelism, throughput, status) tuples."""
+    return pd.DataFrame({
+        "refresh_request_id": [f"r{i}" for i in range(len(levels))],
+        "max_parallelism": [level for level, _, _ in levels],
+        "objects": 100,
+        "size": [throughput * 10 for _, throughput, _ in levels],
+        "duration": [10.0 if status == "Completed" else float("nan") for _, _, status in levels],
+        "status": [status for _, _, status in levels],
+        "recorded_at": [float(i) for i in range(len(levels))],
+    })
+
+EQUAL_COSTS = pd.Series([1.0] * 100)
+
+def test_is_auto_parallelism():
+    assert is_auto_parallelism("AUTO") and is_auto_parallelism(" auto ")
+    assert not is_auto_parallelism(4) and not is_auto_parallelism("4")
+
+def test_tuner_doubles_the_fastest_level_up_to_the_ceiling():
+    tuner = ParallelismTuner(ceiling=12, initial=4)
+
+    assert tuner.choose(runs(), EQUAL_COSTS) == 4
+    assert tuner.choose(runs((4, 100, "Completed")), EQUAL_COSTS) == 8
+    assert tuner.choose(runs((4, 100, "Completed"), (8, 180, "Completed")), EQUAL_COSTS) == 12
+
+def test_tuner_bisects_the_gap_above_the_fastest_level():
+    tuner = ParallelismTuner(ceiling=16, initial=4)
+
+    assert tuner.choose(runs((4, 100, "Completed"), (8, 90, "Completed")), EQUAL_COSTS) == 6
+    # The gap is closed, so the fastest level is kept
+    assert tuner.choose(runs((4, 100, "Completed"), (5, 90, "Completed")), EQUAL_COSTS) == 4
+    # A throttled level above the fastest one also bounds the search
+    assert tuner.choose(runs((4, 100, "Completed"), (8, 0, "Failed")), EQUAL_COSTS) == 6
+
+def test_tuner_halves_the_lowest_level_when_every_level_is_throttled():
+    tuner = ParallelismTuner(ceiling=16, initial=4)
+
+    assert tuner.choose(runs((4, 0, "Failed"), (8, 0, "Failed")), EQUAL_COSTS) == 2
+    assert tuner.choose(runs((1, 0, "Failed")), EQUAL_COSTS) == 1
+    # A later completed run clears the mark of its level
+    assert tuner.choose(runs((4, 0, "Failed"), (4, 100, "Completed")), EQUAL_COSTS) == 8
+
+def test_tuner_throttle_mark_expires_after_later_runs():
+    tuner = ParallelismTuner(ceiling=16, initial=4, throttle_expiry=2)
+    history = [(8, 0, "Failed"), (4, 100, "Completed")]
+
+    assert tuner.choose(runs(*history), EQUAL_COSTS) == 6
+    assert tuner.levels(runs(*history))["throttled"].tolist() == [False, True]
+
+    # Two runs after the failure, the failed level is tried again
+    history.append((4, 100, "Completed"))
+    assert tuner.choose(runs(*history), EQUAL_COSTS) == 8
+    assert not tuner.levels(runs(*history))["throttled"].any()
+
+def test_tuner_caps_the_level_to_the_effective_objects():
+    tuner = ParallelismTuner(ceiling=16, initial=8)
+
+    assert ParallelismTuner.effective_objects(pd.Series([1.0, 1.0, 1.0])) == 3
+    assert ParallelismTuner.effective_objects(pd.Series([100.0, 1.0, 1.0, 1.0])) == 2
+    assert ParallelismTuner.effective_objects(pd.Series([0.0, 0.0])) == 2
+    assert tuner.choose(runs(), pd.Series([100.0, 1.0, 1.0, 1.0])) == 2
+
+def test_tuner_levels_summarize_the_runs_of_each_level():
+    levels = ParallelismTuner().levels(runs((4, 100, "Completed"), (4, 120, "Completed"), (8, 0, "Failed")))
+
+    assert levels["max_parallelism"].tolist() == [4, 8]
+    assert levels["runs"].tolist() == [2, 1]
+    assert levels["throughput"].tolist()[0] == pytest.approx(110)
+    assert levels["throttled"].tolist() == [False, True]
+
+def test_tuner_rejects_invalid_settings():
+    with pytest.raises(ValueError, match="ceiling"):
+        ParallelismTuner(ceiling=0)
+    with pytest.raises(ValueError, match="Throttle expiry"):
+        ParallelismTuner(throttle_expiry=0)
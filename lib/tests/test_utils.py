@@ -0,0 +1,139 @@
+"""Tests of the date and partition plan helpers."""
+
+from datetime import date
+import pandas as pd
+import pytest
+from fabtoolkit.utils import (
+    apply_retention,
+    compact_partition_plan,
+    generate_date_ranges,
+    generate_partition_plan,
+    get_bounds_from_offset,
+    get_retention_cutoff
+)
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def legacy_partition_plan(tables, first_dates, end_dates, intervals, number_of_intervals) -> pd.DataFrame:
+    """Partition plan built table by table, as the notebooks did before the vectorized plan."""
+    frames = []
+    for table, first_date, end_date, interval, count in zip(tables, first_dates, end_dates, intervals, number_of_intervals):
+        start, end = get_bounds_from_offset(pd.Timestamp(first_date), pd.Timestamp(end_date), interval, count)
+        ranges = generate_date_ranges(start, end, interval)
+        frames.append(pd.DataFrame({
+            "table_name": table,
+            "partition_name": [
+                f"{table}_{s.strftime('%Y%m%d')}_{e.strftime('%Y%m%d')}"
+                for s, e in zip(ranges["range_start"], ranges["range_end"])
+            ],
+            "range_start": pd.to_datetime(ranges["range_start"]),
+            "range_end": pd.to_datetime(ranges["range_end"]),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+# ============================================================================
+# TESTS
+# ============================================================================
+
+@pytest.mark.parametrize("interval", ["MONTH", "QUARTER", "YEAR"])
+@pytest.mark.parametrize("number_of_intervals", ["*", "1", "3", "40"])
+def test_generate_partition_plan_matches_legacy_plan(interval, number_of_intervals):
+    tables = ["Sales", "Orders", "Stock"]
+    first_dates = [date(2019, 3, 17), date(2021, 1, 1), date(2023, 12, 31)]
+    end_dates = [date(2024, 2, 29), date(2024, 12, 31), date(2024, 1, 1)]
+    intervals = [interval] * len(tables)
+    counts = [number_of_intervals] * len(tables)
+
+    plan = generate_partition_plan(tables, first_dates, end_dates, intervals, counts)
+    expected = legacy_partition_plan(tables, first_dates, end_dates, intervals, counts)
+
+    pd.testing.assert_frame_equal(plan, expected, check_dtype=False)
+
+def test_generate_partition_plan_mixes_intervals_per_table():
+    tables = ["Sales", "Orders"]
+    first_dates = [date(2022, 5, 10), date(2020, 1, 1)]
+    end_dates = [date(2024, 6, 15), date(2024, 6, 15)]
+    intervals = ["MONTH", "YEAR"]
+    counts = ["6", "*"]
+
+    plan = generate_partition_plan(tables, first_dates, end_dates, intervals, counts)
+    expected = legacy_partition_plan(tables, first_dates, end_dates, intervals, counts)
+
+    pd.testing.assert_frame_equal(plan, expected, check_dtype=False)
+
+def test_generate_partition_plan_rejects_invalid_ranges():
+    with pytest.raises(ValueError, match="Invalid date range"):
+        generate_partition_plan(["Sales"], [date(2024, 1, 2)], [date(2024, 1, 1)], ["MONTH"])
+    with pytest.raises(ValueError, match="Invalid interval"):
+        generate_partition_plan(["Sales"], [date(2024, 1, 1)], [date(2024, 2, 1)], ["WEEK"])
+
+def test_compact_partition_plan_prefers_the_coarsest_interval():
+    plan = generate_partition_plan(["Sales"], [date(2022, 2, 15)], [date(2024, 6, 10)], ["MONTH"])
+    rule = {"QUARTER": 3, "YEAR": 12}
+
+    compacted = compact_partition_plan(plan, {"Sales": "MONTH"}, {"Sales": rule}, date(2024, 6, 10))
+
+    # 2022 ended over 12 months ago and 2023 over 3 months ago, and the first year starts at the first date
+    assert compacted["partition_name"].tolist() == [
+        "Sales_20220215_20221231",
+        "Sales_20230101_20230331", "Sales_20230401_20230630", "Sales_20230701_20230930", "Sales_20231001_20231231",
+        "Sales_20240101_20240131", "Sales_20240201_20240229", "Sales_20240301_20240331",
+        "Sales_20240401_20240430", "Sales_20240501_20240531", "Sales_20240601_20240630",
+    ]
+    reversed_rule = dict(reversed(rule.items()))
+    pd.testing.assert_frame_equal(compact_partition_plan(plan, {"Sales": "MONTH"}, {"Sales": reversed_rule}, date(2024, 6, 10)), compacted)
+
+def test_compact_partition_plan_clips_the_first_period_to_the_first_date():
+    plan = generate_partition_plan(["Sales", "Orders"], [date(2022, 2, 15)] * 2, [date(2024, 6, 10)] * 2, ["MONTH"] * 2)
+
+    compacted = compact_partition_plan(plan, {"Sales": "MONTH", "Orders": "MONTH"}, {"Sales": {"QUARTER": 3}}, date(2024, 6, 10))
+    sales = compacted[compacted["table_name"] == "Sales"]
+
+    assert sales["partition_name"].iloc[0] == "Sales_20220215_20220331"
+    assert sales["range_start"].iloc[0] == pd.Timestamp(2022, 2, 15)
+    # Tables without a rule keep their plan
+    pd.testing.assert_frame_equal(
+        compacted[compacted["table_name"] == "Orders"].reset_index(drop=True),
+        plan[plan["table_name"] == "Orders"].reset_index(drop=True)
+    )
+
+def test_compact_partition_plan_rejects_invalid_rules():
+    plan = generate_partition_plan(["Sales"], [date(2024, 1, 1)], [date(2024, 6, 10)], ["QUARTER"])
+    with pytest.raises(ValueError, match="coarser"):
+        compact_partition_plan(plan, {"Sales": "QUARTER"}, {"Sales": {"MONTH": 3}}, date(2024, 6, 10))
+    with pytest.raises(ValueError, match="compaction age"):
+        compact_partition_plan(plan, {"Sales": "QUARTER"}, {"Sales": {"YEAR": -1}}, date(2024, 6, 10))
+
+@pytest.mark.parametrize("retention, interval, expected", [
+    (1, "MONTH", pd.Timestamp(2024, 6, 1)),
+    ("3", "MONTH", pd.Timestamp(2024, 4, 1)),
+    (2.0, "QUARTER", pd.Timestamp(2024, 1, 1)),
+    ("3", "YEAR", pd.Timestamp(2022, 1, 1)),
+    ("20230815", "MONTH", pd.Timestamp(2023, 8, 15)),
+    (20230815, "YEAR", pd.Timestamp(2023, 8, 15)),
+    (None, "MONTH", None),
+    ("", "MONTH", None),
+])
+def test_get_retention_cutoff_counts_intervals_or_reads_a_date(retention, interval, expected):
+    assert get_retention_cutoff(retention, interval, date(2024, 6, 10)) == expected
+
+def test_get_retention_cutoff_rejects_invalid_settings():
+    with pytest.raises(ValueError, match="greater than 0"):
+        get_retention_cutoff("0", "MONTH", date(2024, 6, 10))
+    with pytest.raises(ValueError, match="YYYYMMDD"):
+        get_retention_cutoff("20231345", "MONTH", date(2024, 6, 10))
+    with pytest.raises(ValueError, match="Invalid retention"):
+        get_retention_cutoff("last year", "MONTH", date(2024, 6, 10))
+
+def test_apply_retention_keeps_partitions_partly_inside_the_window():
+    plan = generate_partition_plan(["Sales", "Orders"], [date(2023, 1, 1)] * 2, [date(2024, 6, 10)] * 2, ["QUARTER"] * 2)
+
+    kept = apply_retention(plan, {"Sales": pd.Timestamp(2023, 8, 15), "Orders": None})
+
+    # The quarter containing the cutoff is kept, and tables without cutoff keep everything
+    assert kept[kept["table_name"] == "Sales"]["partition_name"].tolist() == [
+        "Sales_20230701_20230930", "Sales_20231001_20231231", "Sales_20240101_20240331", "Sales_20240401_20240630",
+    ]
+    assert (kept["table_name"] == "Orders").sum() == (plan["table_name"] == "Orders").sum()
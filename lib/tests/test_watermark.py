@@ -0,0 +1,117 @@
+"""Tests of the change detection of partitions through watermarks."""
+
+import logging
+import pandas as pd
+import pytest
+from fabtoolkit import pipeline
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.fake import FakeFabric
+from fabtoolkit.utils import parse_partition_names
+from fabtoolkit.watermark import CallableWatermarkProbe, WatermarkStore, select_changed_partitions
+
+_logger = logging.getLogger(__name__)
+
+class StubSource:
+    """Source data of the partitions: a version per (table, range_start) that tests can change."""
+
+    def __init__(self):
+        self.versions: dict[tuple[str, str], str] = {}
+        self.failing: set[str] = set()
+
+    def watermark(self, table, range_start, range_end):
+        if table in self.failing:
+            raise RuntimeError("Source unavailable.")
+        return self.versions.get((table, str(range_start)), "v1")
+
+@pytest.fixture
+def store(tmp_path) -> WatermarkStore:
+    return WatermarkStore(str(tmp_path))
+
+@pytest.fixture
+def source() -> StubSource:
+    return StubSource()
+
+@pytest.fixture
+def plan(fact_objects) -> pd.DataFrame:
+    """Partition plan of the fact tables with columns ['table_name', 'partition_name', 'range_start', 'range_end']."""
+    return parse_partition_names(fact_objects["partition"])[["table_name", "partition_name", "range_start", "range_end"]]
+
+def probes(tables, source: StubSource) -> dict[str, CallableWatermarkProbe]:
+    return {table: CallableWatermarkProbe(source.watermark) for table in tables}
+
+def pipeline_partitions(objects: pd.DataFrame) -> str:
+    """Partitions to refresh of each table, as the JSON parameter of pipeline.refresh()."""
+    selected = objects.groupby("table", sort=False)["partition"].agg(",".join)
+    return pd.DataFrame({"table": selected.index, "selected_partitions": selected.to_numpy()}).to_json(orient="records")
+
+# ============================================================================
+# CHANGE DETECTION
+# ============================================================================
+
+def test_unchanged_partitions_are_dropped(store, source, plan, model):
+    probed = probes(model.fact_tables, source)
+
+    # Partitions never refreshed are always selected
+    assert len(select_changed_partitions("dataset", plan, probed, store)) == len(plan)
+    store.commit("dataset")
+    assert select_changed_partitions("dataset", plan, probed, store).empty
+
+    changed = plan.iloc[[0, 5]]
+    for table, range_start in zip(changed["table_name"], changed["range_start"]):
+        source.versions[(table, str(range_start.date()))] = "v2"
+
+    selected = select_changed_partitions("dataset", plan, probed, store)
+    assert selected["partition_name"].tolist() == changed["partition_name"].tolist()
+
+def test_partitions_without_watermark_are_always_selected(store, source, plan, model):
+    unprobed, failing = model.fact_tables[0], model.fact_tables[1]
+    probed = probes(model.fact_tables[1:], source)
+    select_changed_partitions("dataset", plan, probed, store)
+    store.commit("dataset")
+
+    source.failing.add(failing)
+    selected = select_changed_partitions("dataset", plan, probed, store)
+
+    assert set(selected["table_name"]) == {unprobed, failing}
+    assert len(selected) == plan["table_name"].isin([unprobed, failing]).sum()
+
+def test_watermarks_are_staged_until_committed(store, source, plan, model):
+    probed = probes(model.fact_tables, source)
+    select_changed_partitions("dataset", plan, probed, store)
+
+    # Nothing was committed, so a failed run hides no change from the next one
+    assert store.load("dataset").empty
+    assert len(select_changed_partitions("dataset", plan, probed, store)) == len(plan)
+
+# ============================================================================
+# COMMIT
+# ============================================================================
+
+def test_commit_watermarks_only_commits_the_given_partitions(store, source, plan, model, dataset: Dataset, fact_objects):
+    select_changed_partitions("dataset", plan, probes(model.fact_tables, source), store)
+
+    pipeline.commit_watermarks(dataset, fact_objects.iloc[:4], store, _logger)
+
+    committed = store.load("dataset")
+    assert sorted(committed["partition"]) == sorted(fact_objects["partition"].iloc[:4])
+
+def test_refresh_commits_watermarks_of_completed_objects_only(
+        store, source, plan, model, backend: FakeFabric, dataset: Dataset, fact_objects
+    ):
+    probed = probes(model.fact_tables, source)
+    select_changed_partitions("dataset", plan, probed, store)
+
+    # Every request fails one object, also after its retry
+    backend.failures["refresh"] = 1.0
+    with pytest.raises(RuntimeError, match="Refresh failed"):
+        pipeline.refresh(
+            dataset, None, pipeline_partitions(fact_objects), "partialBatch", 4,
+            watermark_store=store, logger=_logger, max_retries=1, retry_backoff=0
+        )
+
+    committed = set(store.load("dataset")["partition"])
+    assert len(committed) == len(fact_objects) - 1
+
+    # The next run only refreshes the partition that failed
+    selected = select_changed_partitions("dataset", plan, probed, store)
+    assert len(selected) == 1 and selected["partition_name"].iloc[0] not in committed
@@ -21,7 +21,31 @@ tables_to_refresh: str = ""
 partitions_to_refresh: str = ""
 refresh_commit_mode: str = "transactional"
 refresh_max_parallelism: int = 4
+refresh_auto_parallelism: bool = False
+refresh_max_parallelism_ceiling: int = 16
+refresh_shards: int = 1
+refresh_shard_by: str = "TABLE"
+max_concurrent_refreshes: int = 1
+refresh_waves: bool = False
+refresh_fail_fast: bool = False
+refresh_max_retries: int = 0
+refresh_retry_backoff: int = 60
 notebook_timeout: int = 7200
+metadata_cache_path: str = ""
+metadata_cache_ttl: int = 0
+refresh_history_path: str = ""
+watermark_path: str = ""
+watermark_source: str = ""
+checkpoint_path: str = ""
+checkpoint_max_age: int = 86400
+execution_mode: str = "NOTEBOOK"
+dry_run: bool = False
+datasets_config: str = ""
+max_concurrent_datasets: int = 4
+capacity_max_concurrent_refreshes: int = 4
+workspace_max_concurrent_refreshes: int = 2
+reinstall_fabtoolkit: bool = False
+trace_path: str = ""
 
 # METADATA ********************
 
@@ -32,14 +56,22 @@ notebook_timeout: int = 7200
 
 # CELL ********************
 
+import time
+startup_started: float = time.perf_counter()
 import pandas as pd
 from datetime import datetime
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Callable, Dict, List
 import logging
-import sys
 import notebookutils
 from io import StringIO
+import json
 import uuid
+import threading
+from contextlib import contextmanager, nullcontext
+import importlib.metadata
+import csv
+import zipfile
+base_import_seconds: float = time.perf_counter() - startup_started
 
 # METADATA ********************
 
@@ -52,13 +84,40 @@ import uuid
 
 # Constants
 DEFAULT_LOG_LEVEL = logging.DEBUG
+DEFAULT_LOG_MAX_MESSAGE_LENGTH = 4000
 FABTTOOLKIT_VERSION = "1.0.0"
 PARTITIONER_NOTEBOOK_NAME = "NB_PAR_PARTITIONER"
 REFRESHER_NOTEBOOK_NAME = "NB_PAR_REFRESHER"
 AVAILABLE_COMMIT_MODES = {"transactional", "partialBatch"}
 DEFAULT_REFRESH_COMMIT_MODE = "transactional"
 DEFAULT_REFRESH_MAX_PARALLELISM = 4
+DEFAULT_REFRESH_MAX_PARALLELISM_CEILING = 16
+AVAILABLE_SHARD_STRATEGIES = {"TABLE", "SIZE", "COUNT"}
+DEFAULT_REFRESH_SHARDS = 1
+DEFAULT_REFRESH_SHARD_BY = "TABLE"
+DEFAULT_MAX_CONCURRENT_REFRESHES = 1
+DEFAULT_REFRESH_MAX_RETRIES = 0
+DEFAULT_REFRESH_RETRY_BACKOFF = 60
 DEFAULT_NOTEBOOK_TIMEOUT = 7200
+DEFAULT_CHECKPOINT_MAX_AGE = 86400
+# Parameters that identify a run: a run with the same values resumes from the checkpoint of the previous one
+CHECKPOINT_KEY_PARAMS = [
+    "workspace_id", "dataset_id", "enable_partition", "partitions_config", "enable_refresh",
+    "tables_to_refresh", "partitions_to_refresh", "refresh_commit_mode", "execution_mode"
+]
+DEFAULT_MAX_CONCURRENT_DATASETS = 4
+DEFAULT_CAPACITY_MAX_CONCURRENT_REFRESHES = 4
+DEFAULT_WORKSPACE_MAX_CONCURRENT_REFRESHES = 2
+# Parameters each dataset of datasets_config may set. The rest are shared by all datasets
+DATASET_CONFIG_PARAMS = {
+    "workspace_id", "dataset_id", "enable_partition", "partitions_config", "enable_refresh",
+    "tables_to_refresh", "partitions_to_refresh", "refresh_commit_mode", "refresh_max_parallelism",
+    "refresh_auto_parallelism", "refresh_max_parallelism_ceiling", "refresh_shards", "refresh_shard_by",
+    "max_concurrent_refreshes", "refresh_waves", "refresh_fail_fast", "refresh_max_retries",
+    "refresh_retry_backoff", "watermark_source"
+}
+AVAILABLE_EXECUTION_MODES = {"NOTEBOOK", "IN_PROCESS", "TMSL"}
+DEFAULT_EXECUTION_MODE = "NOTEBOOK"
 
 # METADATA ********************
 
@@ -69,8 +128,48 @@ DEFAULT_NOTEBOOK_TIMEOUT = 7200
 
 # CELL ********************
 
+# The wheel is only installed if the installed modules differ from the modules of the wheel, e.g. on
+# a new session or after the wheel is rebuilt without a version change. fabtoolkit is not imported here,
+# so no module of the previous installation stays loaded after the install
+def is_wheel_installed(wheel_path: str) -> bool:
+    """
+    Checks whether the installed fabtoolkit has the same modules as a wheel, comparing the hashes
+    recorded in the RECORD file of the wheel with those of the installed distribution.
+
+    Args:
+        wheel_path (str): Path of the wheel.
+
+    Returns:
+        bool: True if every module of the wheel is installed with the same content.
+    """
+    try:
+        installed = importlib.metadata.distribution("fabtoolkit")
+        with zipfile.ZipFile(wheel_path) as wheel:
+            record = next(name for name in wheel.namelist() if name.endswith(".dist-info/RECORD"))
+            rows = list(csv.reader(wheel.read(record).decode("utf-8").splitlines()))
+    except (importlib.metadata.PackageNotFoundError, OSError, StopIteration, zipfile.BadZipFile):
+        return False
+
+    expected = {row[0]: row[1] for row in rows if len(row) >= 2 and row[0].endswith(".py")}
+    actual = {
+        str(file): f"{file.hash.mode}={file.hash.value}"
+        for file in installed.files or [] if file.hash is not None and str(file).endswith(".py")
+    }
+    return bool(expected) and expected == actual
+
+install_started: float = time.perf_counter()
 wheel_path = f"builtin/fabtoolkit-{FABTTOOLKIT_VERSION}-py3-none-any.whl"
-%pip install {wheel_path}
+fabtoolkit_installed: bool = reinstall_fabtoolkit or not is_wheel_installed(wheel_path)
+if fabtoolkit_installed:
+    # Dependencies are installed with the first install. A stale install only gets its modules replaced,
+    # as pip skips a wheel whose version is already installed unless it is forced
+    try:
+        importlib.metadata.version("fabtoolkit")
+        pip_options = "--force-reinstall --no-deps"
+    except importlib.metadata.PackageNotFoundError:
+        pip_options = ""
+    %pip install {wheel_path} {pip_options}
+install_seconds: float = time.perf_counter() - install_started
 
 # METADATA ********************
 
@@ -81,14 +180,34 @@ wheel_path = f"builtin/fabtoolkit-{FABTTOOLKIT_VERSION}-py3-none-any.whl"
 
 # CELL ********************
 
+import_started: float = time.perf_counter()
 from fabtoolkit.utils import (
-    get_bounds_from_offset,
-    generate_date_ranges,
+    apply_retention,
+    compact_partition_plan,
+    generate_partition_plan,
+    get_retention_cutoff,
     is_valid_text,
     validate_json,
     Constants
 )
-from fabtoolkit.log import ConsoleLogFormatter
+from fabtoolkit.log import TaggedLoggerAdapter, flush_logs, lazy, log_tag, setup_logger, summarize
+from fabtoolkit.dataset import Dataset
+from fabtoolkit.cache import MetadataCache
+from fabtoolkit.checkpoint import RunCheckpoint
+from fabtoolkit.fanout import DatasetRunResult, RefreshSlots, fan_out
+from fabtoolkit.history import RefreshHistory
+from fabtoolkit.tuning import AUTO_PARALLELISM, ParallelismTuner
+from fabtoolkit import pipeline
+from fabtoolkit.plan import RunPlan
+from fabtoolkit.watermark import QueryWatermarkProbe, WatermarkProbe, WatermarkStore, select_changed_partitions
+from fabtoolkit.startup import StartupTimer
+from fabtoolkit.trace import Tracer, set_tracer, span, trace_context
+
+# Heavy dependencies (sempy, sempy_labs) are imported on first use and added to the report
+startup_timer = StartupTimer()
+startup_timer.add("import base modules", base_import_seconds)
+startup_timer.add("install fabtoolkit" if fabtoolkit_installed else "check fabtoolkit wheel", install_seconds)
+startup_timer.add("import fabtoolkit", time.perf_counter() - import_started)
 
 # METADATA ********************
 
@@ -99,15 +218,10 @@ from fabtoolkit.log import ConsoleLogFormatter
 
 # CELL ********************
 
-logger = logging.getLogger("custom_refresh_orchestrator")
-logger.setLevel(DEFAULT_LOG_LEVEL)
-logger.propagate = False
-
-if not logger.handlers:
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(ConsoleLogFormatter())
-    console_handler.setLevel(DEFAULT_LOG_LEVEL)
-    logger.addHandler(console_handler)
+# Records of a fan-out run are prefixed with the dataset they belong to (see run_fan_out)
+logger = TaggedLoggerAdapter(
+    setup_logger("custom_refresh_orchestrator", DEFAULT_LOG_LEVEL, max_message_length=DEFAULT_LOG_MAX_MESSAGE_LENGTH)
+)
 
 # METADATA ********************
 
@@ -139,7 +253,25 @@ def validate_params(
         partitions_to_refresh: Optional[str],
         refresh_commit_mode: Optional[str],
         refresh_max_parallelism: Optional[int],
-        notebook_timeout: Optional[int]
+        refresh_auto_parallelism: bool,
+        refresh_max_parallelism_ceiling: Optional[int],
+        refresh_shards: Optional[int],
+        refresh_shard_by: Optional[str],
+        max_concurrent_refreshes: Optional[int],
+        refresh_waves: bool,
+        refresh_fail_fast: bool,
+        refresh_max_retries: Optional[int],
+        refresh_retry_backoff: Optional[int],
+        notebook_timeout: Optional[int],
+        metadata_cache_path: Optional[str],
+        metadata_cache_ttl: Optional[int],
+        refresh_history_path: Optional[str],
+        watermark_path: Optional[str],
+        watermark_source: Optional[str],
+        checkpoint_path: Optional[str],
+        checkpoint_max_age: Optional[int],
+        execution_mode: Optional[str],
+        dry_run: bool
 ) -> Dict[str, Any]:
     """
     Validate input parameters.
@@ -154,7 +286,27 @@ def validate_params(
         partitions_to_refresh (Optional[str]): JSON string with explicitly defined partitions to refresh.
         refresh_commit_mode (Optional[str]): Commit mode used for the refresh operation.
         refresh_max_parallelism (Optional[int]): Maximum parallelism used for the refresh operation.
+        refresh_auto_parallelism (bool): Flag to tune the maximum parallelism of each refresh request from the
+            throughput of past runs, starting from refresh_max_parallelism.
+        refresh_max_parallelism_ceiling (Optional[int]): Highest maximum parallelism the tuner may choose.
+        refresh_shards (Optional[int]): Number of refresh requests the refresh is split into.
+        refresh_shard_by (Optional[str]): Strategy used to split the refresh (TABLE, SIZE, COUNT).
+        max_concurrent_refreshes (Optional[int]): Maximum number of refresh requests running at the same time.
+        refresh_waves (bool): Flag to refresh in dependency order, one refresh request per level of the relationships.
+        refresh_fail_fast (bool): Flag to cancel a transactional refresh request as soon as one of its objects fails.
+        refresh_max_retries (Optional[int]): Maximum number of times the failed objects of a partialBatch refresh are resubmitted.
+        refresh_retry_backoff (Optional[int]): Seconds to wait before the first retry, doubled on each retry.
         notebook_timeout (Optional[int]): Timeout for the notebook execution.
+        metadata_cache_path (Optional[str]): Directory of the dataset metadata cache. Empty disables the cache.
+        metadata_cache_ttl (Optional[int]): Maximum age in seconds of cached metadata. 0 disables expiration.
+        refresh_history_path (Optional[str]): Directory of the refresh duration history. Empty disables the history.
+        watermark_path (Optional[str]): Directory of the partition watermarks. Empty disables change detection.
+        watermark_source (Optional[str]): Lakehouse or warehouse where the watermark queries run.
+        checkpoint_path (Optional[str]): Directory of the run checkpoints. Empty disables resuming runs.
+        checkpoint_max_age (Optional[int]): Maximum age in seconds of a checkpoint to resume. 0 disables expiration.
+        execution_mode (Optional[str]): Whether steps run as child notebooks (NOTEBOOK), in this session (IN_PROCESS)
+            or compiled into a single TMSL sequence (TMSL).
+        dry_run (bool): Flag to compile the run into a TMSL sequence and log it without changing the model.
 
     Returns:
         Dict[str, Any]: Dictionary containing validated parameters.
@@ -179,6 +331,9 @@ def validate_params(
         raise ValueError("Invalid enable_refresh parameter.")
     
     # Validate partitions_config JSON
+    if enable_partition and not is_valid_text(partitions_config):
+        logger.error("Partitions configuration is required for partitioning.")
+        raise ValueError("Partitions configuration is required for partitioning.")
     if (enable_partition or enable_refresh) and is_valid_text(partitions_config):
         columns = ["table", "first_date", "partition_by", "interval", "refresh_from", "number_of_intervals"]
         validate_json(partitions_config, columns)
@@ -210,6 +365,57 @@ def validate_params(
     elif not isinstance(refresh_max_parallelism, int) or refresh_max_parallelism <= 0:
         logger.error("Invalid refresh_max_parallelism parameter.")
         raise ValueError("Invalid refresh_max_parallelism parameter.")
+    if not isinstance(refresh_auto_parallelism, bool):
+        logger.error("Invalid refresh_auto_parallelism parameter.")
+        raise ValueError("Invalid refresh_auto_parallelism parameter.")
+    if refresh_max_parallelism_ceiling is None:
+        refresh_max_parallelism_ceiling = DEFAULT_REFRESH_MAX_PARALLELISM_CEILING
+    elif not isinstance(refresh_max_parallelism_ceiling, int) or refresh_max_parallelism_ceiling <= 0:
+        logger.error("Invalid refresh_max_parallelism_ceiling parameter.")
+        raise ValueError("Invalid refresh_max_parallelism_ceiling parameter.")
+    
+    # Validate refresh sharding
+    if refresh_shards is None:
+        refresh_shards = DEFAULT_REFRESH_SHARDS
+    elif not isinstance(refresh_shards, int) or refresh_shards <= 0:
+        logger.error("Invalid refresh_shards parameter.")
+        raise ValueError("Invalid refresh_shards parameter.")
+    if is_valid_text(refresh_shard_by):
+        refresh_shard_by = refresh_shard_by.upper()
+        if refresh_shard_by not in AVAILABLE_SHARD_STRATEGIES:
+            logger.error(f"Invalid refresh_shard_by parameter. Available strategies: {AVAILABLE_SHARD_STRATEGIES}")
+            raise ValueError(f"Invalid refresh_shard_by parameter. Available strategies: {AVAILABLE_SHARD_STRATEGIES}")
+    else:
+        refresh_shard_by = DEFAULT_REFRESH_SHARD_BY
+    if max_concurrent_refreshes is None:
+        max_concurrent_refreshes = DEFAULT_MAX_CONCURRENT_REFRESHES
+    elif not isinstance(max_concurrent_refreshes, int) or max_concurrent_refreshes <= 0:
+        logger.error("Invalid max_concurrent_refreshes parameter.")
+        raise ValueError("Invalid max_concurrent_refreshes parameter.")
+    if not isinstance(refresh_waves, bool):
+        logger.error("Invalid refresh_waves parameter.")
+        raise ValueError("Invalid refresh_waves parameter.")
+    if refresh_waves and refresh_shards > 1:
+        logger.error("refresh_waves and refresh_shards cannot be combined.")
+        raise ValueError("refresh_waves and refresh_shards cannot be combined.")
+    if not isinstance(refresh_fail_fast, bool):
+        logger.error("Invalid refresh_fail_fast parameter.")
+        raise ValueError("Invalid refresh_fail_fast parameter.")
+    
+    # Validate retries of failed objects
+    if refresh_max_retries is None:
+        refresh_max_retries = DEFAULT_REFRESH_MAX_RETRIES
+    elif not isinstance(refresh_max_retries, int) or refresh_max_retries < 0:
+        logger.error("Invalid refresh_max_retries parameter.")
+        raise ValueError("Invalid refresh_max_retries parameter.")
+    if refresh_retry_backoff is None:
+        refresh_retry_backoff = DEFAULT_REFRESH_RETRY_BACKOFF
+    elif not isinstance(refresh_retry_backoff, int) or refresh_retry_backoff < 0:
+        logger.error("Invalid refresh_retry_backoff parameter.")
+        raise ValueError("Invalid refresh_retry_backoff parameter.")
+    if refresh_max_retries > 0 and refresh_commit_mode != "partialBatch":
+        logger.error("refresh_max_retries requires the partialBatch refresh_commit_mode.")
+        raise ValueError("refresh_max_retries requires the partialBatch refresh_commit_mode.")
     
     # Validate notebook_timeout
     if notebook_timeout is None:
@@ -218,6 +424,70 @@ def validate_params(
         logger.error("Invalid notebook_timeout parameter.")
         raise ValueError("Invalid notebook_timeout parameter.")
     
+    # Validate metadata cache
+    if not is_valid_text(metadata_cache_path):
+        metadata_cache_path = ""
+    if metadata_cache_ttl is None:
+        metadata_cache_ttl = 0
+    elif not isinstance(metadata_cache_ttl, int) or metadata_cache_ttl < 0:
+        logger.error("Invalid metadata_cache_ttl parameter.")
+        raise ValueError("Invalid metadata_cache_ttl parameter.")
+    
+    # Validate refresh history
+    if not is_valid_text(refresh_history_path):
+        refresh_history_path = ""
+    if refresh_auto_parallelism and not refresh_history_path:
+        logger.error("refresh_history_path parameter is required for refresh_auto_parallelism.")
+        raise ValueError("refresh_history_path parameter is required for refresh_auto_parallelism.")
+    
+    # Validate change detection
+    if not is_valid_text(watermark_path):
+        watermark_path = ""
+    if not is_valid_text(watermark_source):
+        watermark_source = ""
+    if watermark_path and not watermark_source:
+        logger.error("watermark_source parameter is required for change detection.")
+        raise ValueError("watermark_source parameter is required for change detection.")
+    
+    # Validate run checkpoint
+    if not is_valid_text(checkpoint_path):
+        checkpoint_path = ""
+    if checkpoint_max_age is None:
+        checkpoint_max_age = DEFAULT_CHECKPOINT_MAX_AGE
+    elif not isinstance(checkpoint_max_age, int) or checkpoint_max_age < 0:
+        logger.error("Invalid checkpoint_max_age parameter.")
+        raise ValueError("Invalid checkpoint_max_age parameter.")
+    
+    # Validate execution mode
+    if is_valid_text(execution_mode):
+        execution_mode = execution_mode.upper()
+        if execution_mode not in AVAILABLE_EXECUTION_MODES:
+            logger.error(f"Invalid execution_mode parameter. Available modes: {AVAILABLE_EXECUTION_MODES}")
+            raise ValueError(f"Invalid execution_mode parameter. Available modes: {AVAILABLE_EXECUTION_MODES}")
+    else:
+        execution_mode = DEFAULT_EXECUTION_MODE
+    if not isinstance(dry_run, bool):
+        logger.error("Invalid dry_run parameter.")
+        raise ValueError("Invalid dry_run parameter.")
+    
+    # A TMSL sequence is a single refresh transaction
+    if execution_mode == "TMSL":
+        if refresh_shards > 1 or refresh_waves:
+            logger.error("refresh_shards and refresh_waves cannot be used with the TMSL execution mode.")
+            raise ValueError("refresh_shards and refresh_waves cannot be used with the TMSL execution mode.")
+        if refresh_auto_parallelism:
+            logger.error("refresh_auto_parallelism cannot be used with the TMSL execution mode.")
+            raise ValueError("refresh_auto_parallelism cannot be used with the TMSL execution mode.")
+        if refresh_fail_fast:
+            logger.error("refresh_fail_fast cannot be used with the TMSL execution mode.")
+            raise ValueError("refresh_fail_fast cannot be used with the TMSL execution mode.")
+        if checkpoint_path:
+            logger.error("checkpoint_path cannot be used with the TMSL execution mode.")
+            raise ValueError("checkpoint_path cannot be used with the TMSL execution mode.")
+        if refresh_commit_mode != "transactional":
+            logger.error("The TMSL execution mode only supports the transactional refresh_commit_mode.")
+            raise ValueError("The TMSL execution mode only supports the transactional refresh_commit_mode.")
+    
     return {
         "workspace_id": workspace_id,
         "dataset_id": dataset_id,
@@ -228,8 +498,77 @@ def validate_params(
         "partitions_to_refresh": partitions_to_refresh,
         "refresh_commit_mode": refresh_commit_mode,
         "refresh_max_parallelism": refresh_max_parallelism,
-        "notebook_timeout": notebook_timeout
+        "refresh_auto_parallelism": refresh_auto_parallelism,
+        "refresh_max_parallelism_ceiling": refresh_max_parallelism_ceiling,
+        "refresh_shards": refresh_shards,
+        "refresh_shard_by": refresh_shard_by,
+        "max_concurrent_refreshes": max_concurrent_refreshes,
+        "refresh_waves": refresh_waves,
+        "refresh_fail_fast": refresh_fail_fast,
+        "refresh_max_retries": refresh_max_retries,
+        "refresh_retry_backoff": refresh_retry_backoff,
+        "notebook_timeout": notebook_timeout,
+        "metadata_cache_path": metadata_cache_path,
+        "metadata_cache_ttl": metadata_cache_ttl,
+        "refresh_history_path": refresh_history_path,
+        "watermark_path": watermark_path,
+        "watermark_source": watermark_source,
+        "checkpoint_path": checkpoint_path,
+        "checkpoint_max_age": checkpoint_max_age,
+        "execution_mode": execution_mode,
+        "dry_run": dry_run
+    }
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def apply_compaction(
+        partitions_config: pd.DataFrame,
+        partitions: pd.DataFrame,
+        first_dates: pd.Series,
+        end_dates: pd.Series
+) -> pd.DataFrame:
+    """
+    Replaces the partitions of the refresh window with the partitions created by the partitioner,
+    where old periods are merged according to the compaction rule of each table.
+
+    Args:
+        partitions_config (pd.DataFrame): DataFrame containing the partitions configuration.
+        partitions (pd.DataFrame): Partitions of the refresh window of each table.
+        first_dates (pd.Series): First date of each table.
+        end_dates (pd.Series): End date of the refresh window of each table.
+
+    Returns:
+        pd.DataFrame: Partitions of the compacted plan that overlap the refresh window of each table.
+    """
+
+    rules: Dict[str, Dict[str, int]] = {
+        t: r for t, r in zip(partitions_config["table"], partitions_config["compaction"]) if isinstance(r, dict)
     }
+    if not rules:
+        return partitions
+
+    # Merged partitions span whole coarse periods, so the plan is compacted from each table's first date
+    full_plan: pd.DataFrame = compact_partition_plan(
+        generate_partition_plan(partitions_config["table"], first_dates, end_dates, partitions_config["interval"]),
+        dict(zip(partitions_config["table"], partitions_config["interval"])),
+        rules,
+        datetime.today()
+    )
+
+    window: pd.DataFrame = partitions.groupby("table_name").agg(
+        window_start=("range_start", "min"), window_end=("range_end", "max")
+    )
+    full_plan = full_plan.join(window, on="table_name", how="inner")
+    overlaps: pd.Series = (full_plan["range_end"] >= full_plan["window_start"]) & (full_plan["range_start"] <= full_plan["window_end"])
+
+    return full_plan[overlaps][list(partitions.columns)].reset_index(drop=True)
 
 # METADATA ********************
 
@@ -240,12 +579,23 @@ def validate_params(
 
 # CELL ********************
 
-def generate_partitions_list(partitions_config: pd.DataFrame) -> str:
+def generate_partitions_list(
+        partitions_config: pd.DataFrame,
+        dataset: str,
+        watermark_store: Optional[WatermarkStore] = None,
+        watermark_probes: Optional[Dict[str, WatermarkProbe]] = None
+) -> str:
     """
     Generates a JSON-formatted string representing partition ranges for each table in the input DataFrame.
 
+    If a watermark store and probes are provided, partitions whose source data did not change
+    since their last refresh are left out.
+
     Args:
         partitions_config (pd.DataFrame): DataFrame containing the partitions configuration.
+        dataset (str): Dataset identifier of the watermarks.
+        watermark_store (Optional[WatermarkStore]): Store of the watermarks of the last refreshed partitions.
+        watermark_probes (Optional[Dict[str, WatermarkProbe]]): Watermark probe of each table.
 
     Returns:
         str: JSON-formatted string with partitions separated by commas for each table.
@@ -255,50 +605,58 @@ def generate_partitions_list(partitions_config: pd.DataFrame) -> str:
     """
     
     date_format = Constants.DATE_FORMAT
-    date_ranges = []
+
+    logger.info("Calculating bounds and date ranges for each table...")
     
-    for row in partitions_config.itertuples():
+    try:
+        first_dates: pd.Series = pd.to_datetime(partitions_config["first_date"].astype(str), format=date_format)
+
+        # Determine refresh_from dates
+        refresh_from: pd.Series = partitions_config["refresh_from"].astype(str)
+        refresh_from = refresh_from.where(refresh_from != "TODAY", datetime.today().strftime(date_format))
+        end_dates: pd.Series = pd.to_datetime(refresh_from, format=date_format)
+
+        # Generates date ranges and partition names (Table_yyyyMMdd_yyyyMMdd) for all tables at once
+        partitions: pd.DataFrame = generate_partition_plan(
+            partitions_config["table"],
+            first_dates,
+            end_dates,
+            partitions_config["interval"],
+            partitions_config["number_of_intervals"]
+        )
 
-        logger.info("Calculating bounds for each table...")
-        
+        # Compacted periods are refreshed through the merged partition that overlaps the refresh window
+        if "compaction" in partitions_config.columns:
+            partitions = apply_compaction(partitions_config, partitions, first_dates, end_dates)
+
+        # Partitions before the retention window are deleted by the partitioner, so they are never refreshed
+        if "retention" in partitions_config.columns:
+            today: datetime = datetime.today()
+            partitions = apply_retention(partitions, {
+                row.table: get_retention_cutoff(row.retention, row.interval, today)
+                for row in partitions_config.itertuples()
+            })
+    except Exception as e:
+        logger.error(f"Unable to calculate bounds for partitions: {str(e)}")
+        raise
+
+    if watermark_store is not None and watermark_probes:
         try:
-            first_date: datetime = datetime.strptime(str(row.first_date), date_format)
-
-            # Determine refresh_from date
-            if row.refresh_from == "TODAY":
-                refresh_from: datetime = datetime.today()
-            else:
-                refresh_from: datetime = datetime.strptime(str(row.refresh_from), date_format)
-
-            start_date, end_date = get_bounds_from_offset(
-                first_date,
-                refresh_from,
-                row.interval,
-                row.number_of_intervals
-            )
-            logger.info("Generating date ranges for each table...")
-            
-            # Generates a list of date ranges with the interval used to create table partitions.
-            date_range = generate_date_ranges(start_date, end_date, row.interval).assign(table=row.table)
-            date_ranges.append(date_range)
+            logger.info(f"Probing watermarks for tables: {list(watermark_probes)}...")
+            changed: pd.DataFrame = select_changed_partitions(dataset, partitions, watermark_probes, watermark_store)
+            logger.info(f"Skipping {len(partitions) - len(changed)} unchanged partition(s) out of {len(partitions)}.")
+            partitions = changed
         except Exception as e:
-            logger.error(f"Unable to calculate bounds for partitions: {str(e)}")
+            logger.error(f"Unable to detect changed partitions: {str(e)}")
             raise
 
-    partitions = pd.concat(date_ranges, ignore_index=True)
-    logger.info("Composing partition names to refresh...")
+    logger.info("Aggregating partition names to refresh...")
     
     try:
-        # Generating partitions list like Table_yyyyMMdd_yyyyMM_dd
-        partitions["range_start"] = pd.to_datetime(partitions["range_start"]).dt.strftime(date_format)
-        partitions["range_end"] = pd.to_datetime(partitions["range_end"]).dt.strftime(date_format)
-        partitions["partition"] = partitions.apply(
-            lambda row: f"{row['table']}_{row['range_start']}_{row['range_end']}", axis=1
-        )
-        
         partitions_agg: pd.DataFrame = (
-            partitions.groupby("table", as_index=False)
-            .agg(selected_partitions=("partition", lambda x: ",".join(x)))
+            partitions.groupby("table_name", as_index=False)
+            .agg(selected_partitions=("partition_name", ",".join))
+            .rename(columns={"table_name": "table"})
         )
         
         objects = partitions_agg.to_json(orient="records")
@@ -317,6 +675,44 @@ def generate_partitions_list(partitions_config: pd.DataFrame) -> str:
 
 # CELL ********************
 
+def build_watermark_probes(partitions_config: pd.DataFrame, source: str) -> Dict[str, WatermarkProbe]:
+    """
+    Builds the watermark probe of each table with a watermark query in the partitions configuration.
+
+    Args:
+        partitions_config (pd.DataFrame): DataFrame containing the partitions configuration.
+        source (str): Lakehouse or warehouse where the watermark queries run.
+
+    Returns:
+        Dict[str, WatermarkProbe]: Watermark probe of each table.
+
+    Raises:
+        RuntimeError: If the connection to the source fails.
+    """
+    if "watermark_query" not in partitions_config.columns:
+        return {}
+
+    queries: pd.DataFrame = partitions_config[partitions_config["watermark_query"].map(is_valid_text).astype(bool)]
+    if queries.empty:
+        return {}
+
+    try:
+        connection = notebookutils.data.connect_to_artifact(source)
+    except Exception as e:
+        logger.error(f"Failed to connect to watermark source '{source}': {str(e)}")
+        raise RuntimeError(f"Failed to connect to watermark source '{source}': {str(e)}") from e
+
+    return {row.table: QueryWatermarkProbe(connection.query, row.watermark_query) for row in queries.itertuples()}
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
 def run_notebook(notebook_name: str, timeout: int, params: Dict[str, Any]) -> None:
     """
     Runs a Fabric notebook with specified parameters and timeout.
@@ -334,7 +730,9 @@ def run_notebook(notebook_name: str, timeout: int, params: Dict[str, Any]) -> No
     """
     try:
         logger.info(f"Running notebook '{notebook_name}'...")
-        notebookutils.notebook.run(notebook_name, timeout, params)
+        with span("orchestrator.run_notebook", notebook=notebook_name):
+            # The child notebook appends its spans to the same trace, nested in this span
+            notebookutils.notebook.run(notebook_name, timeout, {**params, **trace_context()})
         logger.info(f"Notebook '{notebook_name}' completed successfully.")
     except Exception as e:
         logger.error(f"Failed to execute '{notebook_name}' notebook: {str(e)}")
@@ -349,43 +747,368 @@ def run_notebook(notebook_name: str, timeout: int, params: Dict[str, Any]) -> No
 
 # CELL ********************
 
-def run():
+def build_dataset(params: Dict[str, Any]) -> Dataset:
     """
-    Orchestrates dataset partitioning and refreshing in Power BI.
-    
+    Builds the dataset shared by the partitioning and refresh steps of an in-process run,
+    so the metadata downloaded to partition the dataset is reused by the refresh.
+
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+
+    Returns:
+        Dataset: Dataset object.
+    """
+    cache: Optional[MetadataCache] = (
+        MetadataCache(params["metadata_cache_path"], params["metadata_cache_ttl"] or None)
+        if params["metadata_cache_path"] else None
+    )
+    history: Optional[RefreshHistory] = (
+        RefreshHistory(params["refresh_history_path"]) if params["refresh_history_path"] else None
+    )
+    tuner: ParallelismTuner = ParallelismTuner(params["refresh_max_parallelism_ceiling"], params["refresh_max_parallelism"])
+    return Dataset(params["workspace_id"], params["dataset_id"], cache, history, tuner)
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def get_refresh_objects(params: Dict[str, Any]) -> Optional[str]:
+    """
+    Gets the partitions to refresh: the explicit list if provided, otherwise the refresh window of each
+    table in the partitions configuration, skipping unchanged partitions if change detection is enabled.
+
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+
+    Returns:
+        Optional[str]: JSON string with the partitions to refresh, '[]' if none changed, or None to refresh all partitions.
+    """
+    objects: Optional[str] = None
+
+    # Check for explicit refresh configuration
+    if is_valid_text(params["partitions_to_refresh"]):
+        objects = params["partitions_to_refresh"]
+        logger.info("Using provided list of partitions to refresh: %s", params["partitions_to_refresh"])
+    # Generate refresh list because refresh configuration not explicitly provided
+    elif is_valid_text(params["partitions_config"]):
+        try:
+            partitions_config_df : pd.DataFrame = pd.read_json(StringIO(params["partitions_config"]))
+            logger.info("Creating a list of partitions to refresh for tables: %s\n", summarize(partitions_config_df["table"]))
+            watermark_store: Optional[WatermarkStore] = None
+            watermark_probes: Dict[str, WatermarkProbe] = {}
+            if params["watermark_path"]:
+                watermark_store = WatermarkStore(params["watermark_path"])
+                watermark_probes = build_watermark_probes(partitions_config_df, params["watermark_source"])
+            with span("orchestrator.generate_partitions_list", tables=len(partitions_config_df)):
+                objects = generate_partitions_list(partitions_config_df, params["dataset_id"], watermark_store, watermark_probes)
+            logger.info("Partitions to refresh:\n%s\n", objects)
+        except Exception as e:
+            logger.error(f"Failed to process refresh configuration: {str(e)}")
+            raise
+    else:
+        logger.warning("No refresh information provided. All partitions will be refreshed.")
+
+    return objects
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def open_checkpoint(params: Dict[str, Any]) -> Optional[RunCheckpoint]:
+    """
+    Opens the checkpoint of the run if checkpoint_path is provided. If a previous run with the same
+    parameters did not complete, the run resumes from its checkpoint.
+
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+
+    Returns:
+        Optional[RunCheckpoint]: The checkpoint of the run, or None if checkpoints are disabled.
+    """
+    if not params["checkpoint_path"]:
+        return None
+
+    checkpoint: RunCheckpoint = RunCheckpoint.open(
+        params["checkpoint_path"],
+        {name: params[name] for name in CHECKPOINT_KEY_PARAMS},
+        params["checkpoint_max_age"] or None
+    )
+    if checkpoint.resumed:
+        logger.info(f"Resuming run from checkpoint '{checkpoint.file}'.")
+    else:
+        logger.info(f"Checkpointing run to '{checkpoint.file}'.")
+    return checkpoint
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def run_tmsl(params: Dict[str, Any]) -> None:
+    """
+    Compiles the whole run (partition creation, deletion, compaction and refresh) into a single TMSL
+    sequence and executes it with one call. In a dry run, the plan is only logged.
+
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+
+    Returns:
+        None
+
     Raises:
-        RuntimeError: If any notebook execution fails
+        RuntimeError: If the plan fails. No change is applied in that case.
     """
+    dataset: Dataset = build_dataset(params)
+    refresh: bool = params["enable_refresh"]
+    objects: Optional[str] = get_refresh_objects(params) if refresh else None
+
+    # Nothing to refresh if no partition changed since the last refresh
+    if objects == "[]":
+        logger.info("No changes detected in the source data. Refresh skipped.")
+        refresh = False
+
+    plan: RunPlan = pipeline.compile_run(
+        dataset,
+        params["partitions_config"] if params["enable_partition"] else None,
+        params["tables_to_refresh"],
+        objects,
+        params["refresh_max_parallelism"],
+        refresh,
+        logger
+    )
 
-    # Validate input parameters
-    params = validate_params(
-        workspace_id,
-        dataset_id,
-        enable_partition,
-        partitions_config,
-        enable_refresh,
-        tables_to_refresh,
-        partitions_to_refresh,
-        refresh_commit_mode,
-        refresh_max_parallelism,
-        notebook_timeout
+    if params["dry_run"]:
+        logger.info(f"Dry run. The model is not changed.\n{plan.describe()}")
+        return
+
+    pipeline.run_plan(
+        dataset,
+        plan,
+        WatermarkStore(params["watermark_path"]) if params["watermark_path"] else None,
+        logger
     )
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def refresh_dataset(
+        params: Dict[str, Any],
+        dataset: Optional[Dataset],
+        objects: Optional[str],
+        checkpoint: Optional[RunCheckpoint],
+        refresh_slot: Optional[Callable[[], Any]] = None
+) -> None:
+    """
+    Refreshes the dataset, in this session (execution_mode IN_PROCESS) or in the refresher notebook.
+
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+        dataset (Optional[Dataset]): Dataset shared with the partitioning step of an in-process run.
+        objects (Optional[str]): JSON string with the partitions to refresh, or None to refresh all partitions.
+        checkpoint (Optional[RunCheckpoint]): Checkpoint of the run.
+        refresh_slot (Optional[Callable[[], Any]]): Function that returns a context manager held by each refresh
+            request of an in-process refresh (see per_request_refresh_slot()).
+
+    Returns:
+        None
+
+    Raises:
+        RuntimeError: If the refresh fails.
+    """
+    if dataset is not None:
+        pipeline.refresh(
+            dataset,
+            params["tables_to_refresh"],
+            objects,
+            params["refresh_commit_mode"],
+            AUTO_PARALLELISM if params["refresh_auto_parallelism"] else params["refresh_max_parallelism"],
+            params["refresh_shards"],
+            params["refresh_shard_by"],
+            params["max_concurrent_refreshes"],
+            WatermarkStore(params["watermark_path"]) if params["watermark_path"] else None,
+            logger,
+            params["refresh_waves"],
+            params["refresh_fail_fast"],
+            params["refresh_max_retries"],
+            params["refresh_retry_backoff"],
+            checkpoint,
+            refresh_slot
+        )
+    else:
+        run_notebook(
+            REFRESHER_NOTEBOOK_NAME,
+            params["notebook_timeout"],
+            {
+                "workspace_id": params["workspace_id"], "dataset_id": params["dataset_id"], 
+                "tables_to_refresh": params["tables_to_refresh"], "partitions_to_refresh": objects,
+                "commit_mode": params["refresh_commit_mode"], "max_parallelism": params["refresh_max_parallelism"],
+                "auto_parallelism": params["refresh_auto_parallelism"],
+                "max_parallelism_ceiling": params["refresh_max_parallelism_ceiling"],
+                "refresh_shards": params["refresh_shards"], "refresh_shard_by": params["refresh_shard_by"],
+                "max_concurrent_refreshes": params["max_concurrent_refreshes"], "refresh_waves": params["refresh_waves"],
+                "fail_fast": params["refresh_fail_fast"],
+                "max_retries": params["refresh_max_retries"], "retry_backoff": params["refresh_retry_backoff"],
+                "metadata_cache_path": params["metadata_cache_path"], "metadata_cache_ttl": params["metadata_cache_ttl"],
+                "refresh_history_path": params["refresh_history_path"], "watermark_path": params["watermark_path"],
+                "checkpoint_file": checkpoint.file if checkpoint is not None else ""
+            }
+        )
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def acquire_refresh_slot(refresh_slots: Optional[RefreshSlots], workspace_id: str, slots: int = 1):
+    """
+    Waits for free refresh slots of the workspace and of the capacity in a fan-out run.
+
+    Args:
+        refresh_slots (Optional[RefreshSlots]): Limits shared by the datasets of a fan-out. None does not wait.
+        workspace_id (str): Workspace of the refresh.
+        slots (int): Number of refresh requests that may run at the same time while the slots are held.
+
+    Returns:
+        Context manager that holds the slots and yields the seconds waited for them.
+    """
+    return refresh_slots.acquire(workspace_id, slots) if refresh_slots is not None else nullcontext(0.0)
+
+def per_request_refresh_slot(
+        refresh_slots: Optional[RefreshSlots],
+        workspace_id: str,
+        outcome: Dict[str, Any]
+) -> Optional[Callable[[], Any]]:
+    """
+    Builds the function that holds a refresh slot for each refresh request of an in-process refresh.
+
+    The seconds waited for the slots are added to the 'refresh_wait' of the outcome of the run.
+
+    Args:
+        refresh_slots (Optional[RefreshSlots]): Limits shared by the datasets of a fan-out. None does not wait.
+        workspace_id (str): Workspace of the refresh.
+        outcome (Dict[str, Any]): Outcome of the run of the dataset.
+
+    Returns:
+        Optional[Callable[[], Any]]: Function that returns a context manager holding a slot, or None without limits.
+    """
+    if refresh_slots is None:
+        return None
+    lock: threading.Lock = threading.Lock()
+
+    @contextmanager
+    def refresh_slot():
+        with refresh_slots.acquire(workspace_id) as waited:
+            with lock:
+                outcome["refresh_wait"] += waited
+            yield waited
+
+    return refresh_slot
+
+def refresh_request_slots(params: Dict[str, Any]) -> int:
+    """
+    Gets the number of refresh requests a refresh may run at the same time.
+
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+
+    Returns:
+        int: max_concurrent_refreshes for a sharded or wave refresh, and 1 otherwise.
+    """
+    return params["max_concurrent_refreshes"] if params["refresh_waves"] or params["refresh_shards"] > 1 else 1
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def run_dataset(params: Dict[str, Any], refresh_slots: Optional[RefreshSlots] = None) -> Dict[str, Any]:
+    """
+    Orchestrates the partitioning and refreshing of a dataset in Power BI.
+    
+    Steps run as child notebooks by default. With execution_mode IN_PROCESS they run in this
+    session on a single Dataset, avoiding the start-up of a notebook session per step. With
+    execution_mode TMSL, or in a dry run, the whole run is compiled into a single TMSL sequence.
+    
+    With checkpoint_path, the progress of the run is recorded in a checkpoint, and a run with the
+    same parameters that follows a failed or interrupted one skips the completed steps, reattaches
+    to the refresh requests still running and only refreshes the objects not refreshed yet.
+    
+    Args:
+        params (Dict[str, Any]): Validated parameters.
+        refresh_slots (Optional[RefreshSlots]): Limits shared by the datasets of a fan-out. Each refresh request
+            waits for a free slot of its workspace and of the capacity.
+
+    Returns:
+        Dict[str, Any]: Outcome of the refresh step ('refresh') and seconds waited for refresh slots ('refresh_wait').
+
+    Raises:
+        RuntimeError: If any notebook execution fails
+    """
+    outcome: Dict[str, Any] = {"refresh": "Disabled", "refresh_wait": 0.0}
+
+    if params["execution_mode"] == "TMSL" or params["dry_run"]:
+        # The TMSL sequence holds a refresh slot as a whole, as it refreshes the model in the same command
+        holds_slot: bool = params["enable_refresh"] and not params["dry_run"]
+        with acquire_refresh_slot(refresh_slots if holds_slot else None, params["workspace_id"]) as waited:
+            outcome["refresh_wait"] = waited
+            run_tmsl(params)
+        if params["enable_refresh"]:
+            outcome["refresh"] = "Planned" if params["dry_run"] else "Completed"
+        return outcome
+
+    in_process: bool = params["execution_mode"] == "IN_PROCESS"
+    dataset: Optional[Dataset] = build_dataset(params) if in_process else None
+    checkpoint: Optional[RunCheckpoint] = open_checkpoint(params)
     
     # Create partitions if enable_partition flag is enabled
-    if params["enable_partition"]:
+    if params["enable_partition"] and checkpoint is not None and checkpoint.is_step_done("partition"):
+        logger.info("Partitions were created by the previous run. Partition creation skipped.")
+    elif params["enable_partition"]:
         
         logger.info("Partition dataset is enabled.")
-
-        if not is_valid_text(params["partitions_config"]):
-            logger.error("Partitions configuration is required for partitioning.")
-            raise ValueError("Partitions configuration is required for partitioning.")
         
         # Create partitions
-        run_notebook(
-            PARTITIONER_NOTEBOOK_NAME,
-            params["notebook_timeout"],
-            {"workspace_id": params["workspace_id"], "dataset_id": params["dataset_id"], "partitions_config": params["partitions_config"]}
-        )
+        if in_process:
+            pipeline.partition(dataset, params["partitions_config"], logger)
+        else:
+            run_notebook(
+                PARTITIONER_NOTEBOOK_NAME,
+                params["notebook_timeout"],
+                {
+                    "workspace_id": params["workspace_id"], "dataset_id": params["dataset_id"], "partitions_config": params["partitions_config"],
+                    "metadata_cache_path": params["metadata_cache_path"], "metadata_cache_ttl": params["metadata_cache_ttl"]
+                }
+            )
+        if checkpoint is not None:
+            checkpoint.complete_step("partition", tables=pd.read_json(StringIO(params["partitions_config"]))["table"].tolist())
     else:
         logger.info("Partition creation is disabled.")
     
@@ -393,38 +1116,339 @@ def run():
     if params["enable_refresh"]:
         
         logger.info("Refresh dataset is enabled.")
-        objects: Optional[str] = None
-
-        # Check for explicit refresh configuration
-        if is_valid_text(params["partitions_to_refresh"]):
-            objects = params["partitions_to_refresh"]
-            logger.info(f"Using provided list of partitions to refresh: {params['partitions_to_refresh']}")
-        # Generate refresh list because refresh configuration not explicitly provided
-        elif is_valid_text(params["partitions_config"]):
-            try:
-                partitions_config_df : pd.DataFrame = pd.read_json(StringIO(params["partitions_config"]))
-                logger.info(f"Creating a list of partitions to refresh for tables: {partitions_config_df['table'].tolist()}\n")
-                objects = generate_partitions_list(partitions_config_df)
-                logger.info(f"Partitions to refresh:\n{objects}\n")
-            except Exception as e:
-                logger.error(f"Failed to process refresh configuration: {str(e)}")
-                raise
+        
+        # A resumed run refreshes the objects chosen by the previous run, as change detection would now skip the refreshed ones
+        if checkpoint is not None and checkpoint.has_value("refresh_objects"):
+            objects: Optional[str] = checkpoint.get_value("refresh_objects")
+            logger.info("Using the partitions to refresh of the previous run: %s", objects or "all partitions")
         else:
-            logger.warning("No refresh information provided. All partitions will be refreshed.")
+            objects = get_refresh_objects(params)
+            if checkpoint is not None:
+                checkpoint.set_value("refresh_objects", objects)
+
+        # Nothing to refresh if no partition changed since the last refresh
+        if objects == "[]":
+            logger.info("No changes detected in the source data. Refresh skipped.")
+            if checkpoint is not None:
+                checkpoint.remove()
+            outcome["refresh"] = "Skipped"
+            return outcome
             
-        # Run notebook to refresh dataset
-        run_notebook(
-            REFRESHER_NOTEBOOK_NAME,
-            params["notebook_timeout"],
-            {
-                "workspace_id": params["workspace_id"], "dataset_id": params["dataset_id"], 
-                "tables_to_refresh": params["tables_to_refresh"], "partitions_to_refresh": objects,
-                "commit_mode": params["refresh_commit_mode"], "max_parallelism": params["refresh_max_parallelism"]
-            }
-        )
+        # Refresh dataset. In this session each refresh request holds a slot while it runs. The refresher
+        # notebook runs in another session, so it holds as many slots as requests it may run at the same time
+        if in_process:
+            refresh_dataset(params, dataset, objects, checkpoint, per_request_refresh_slot(refresh_slots, params["workspace_id"], outcome))
+        else:
+            with acquire_refresh_slot(refresh_slots, params["workspace_id"], refresh_request_slots(params)) as waited:
+                outcome["refresh_wait"] = waited
+                refresh_dataset(params, dataset, objects, checkpoint)
+        outcome["refresh"] = "Completed"
         logger.info("Dataset refresh completed successfully.")
     else:
         logger.info("Refresh dataset is disabled.")
+    
+    # The next run starts from the beginning
+    if checkpoint is not None:
+        checkpoint.remove()
+    return outcome
+
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def validate_datasets_config(datasets_config: str, notebook_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Validates the datasets of a fan-out run.
+
+    Each dataset is a JSON object with its workspace_id and dataset_id, and optionally any other parameter
+    of DATASET_CONFIG_PARAMS. Parameters not set by a dataset take the value of the notebook parameter.
+    partitions_config and partitions_to_refresh may be given as JSON arrays.
+
+    Args:
+        datasets_config (str): JSON array with the configuration of each dataset.
+        notebook_params (Dict[str, Any]): Notebook parameters, shared by all datasets.
+
+    Returns:
+        List[Dict[str, Any]]: Validated parameters of each dataset.
+    """
+    try:
+        configs: Any = json.loads(datasets_config)
+    except ValueError as e:
+        logger.error(f"Invalid datasets_config parameter: {str(e)}")
+        raise ValueError("Invalid datasets_config parameter.") from e
+    if not isinstance(configs, list) or not configs or not all(isinstance(config, dict) for config in configs):
+        logger.error("datasets_config parameter must be a non-empty JSON array of objects.")
+        raise ValueError("datasets_config parameter must be a non-empty JSON array of objects.")
+
+    datasets: List[Dict[str, Any]] = []
+    for config in configs:
+        unknown: set = set(config) - DATASET_CONFIG_PARAMS
+        if unknown:
+            logger.error(f"Invalid datasets_config parameter. Unknown dataset parameters: {unknown}")
+            raise ValueError(f"Invalid datasets_config parameter. Unknown dataset parameters: {unknown}")
+        config = {
+            name: json.dumps(value) if name in ("partitions_config", "partitions_to_refresh") and isinstance(value, list) else value
+            for name, value in config.items()
+        }
+        datasets.append(validate_params(**{**notebook_params, **config}))
+
+    # Two runs of the same dataset would compete for its single refresh operation
+    dataset_ids: pd.Series = pd.Series([params["dataset_id"].lower() for params in datasets])
+    if dataset_ids.duplicated().any():
+        logger.error(f"Duplicated datasets in datasets_config parameter: {dataset_ids[dataset_ids.duplicated()].tolist()}")
+        raise ValueError("Duplicated datasets in datasets_config parameter.")
+
+    return datasets
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def validate_fan_out_limits(
+        max_concurrent_datasets: Optional[int],
+        capacity_max_concurrent_refreshes: Optional[int],
+        workspace_max_concurrent_refreshes: Optional[int]
+) -> Dict[str, int]:
+    """
+    Validate the concurrency limits of a fan-out run.
+
+    Args:
+        max_concurrent_datasets (Optional[int]): Maximum number of datasets processed at the same time.
+        capacity_max_concurrent_refreshes (Optional[int]): Maximum number of refresh requests running at the same
+            time across the capacity.
+        workspace_max_concurrent_refreshes (Optional[int]): Maximum number of refresh requests running at the same
+            time in each workspace.
+
+    Returns:
+        Dict[str, int]: Dictionary containing validated limits.
+    """
+    if max_concurrent_datasets is None:
+        max_concurrent_datasets = DEFAULT_MAX_CONCURRENT_DATASETS
+    elif not isinstance(max_concurrent_datasets, int) or max_concurrent_datasets <= 0:
+        logger.error("Invalid max_concurrent_datasets parameter.")
+        raise ValueError("Invalid max_concurrent_datasets parameter.")
+    if capacity_max_concurrent_refreshes is None:
+        capacity_max_concurrent_refreshes = DEFAULT_CAPACITY_MAX_CONCURRENT_REFRESHES
+    elif not isinstance(capacity_max_concurrent_refreshes, int) or capacity_max_concurrent_refreshes <= 0:
+        logger.error("Invalid capacity_max_concurrent_refreshes parameter.")
+        raise ValueError("Invalid capacity_max_concurrent_refreshes parameter.")
+    if workspace_max_concurrent_refreshes is None:
+        workspace_max_concurrent_refreshes = DEFAULT_WORKSPACE_MAX_CONCURRENT_REFRESHES
+    elif not isinstance(workspace_max_concurrent_refreshes, int) or workspace_max_concurrent_refreshes <= 0:
+        logger.error("Invalid workspace_max_concurrent_refreshes parameter.")
+        raise ValueError("Invalid workspace_max_concurrent_refreshes parameter.")
+
+    return {
+        "max_concurrent_datasets": max_concurrent_datasets,
+        "capacity_max_concurrent_refreshes": capacity_max_concurrent_refreshes,
+        "workspace_max_concurrent_refreshes": workspace_max_concurrent_refreshes
+    }
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def run_fan_out(
+        datasets_config: str,
+        notebook_params: Dict[str, Any],
+        max_concurrent_datasets: Optional[int],
+        capacity_max_concurrent_refreshes: Optional[int],
+        workspace_max_concurrent_refreshes: Optional[int]
+) -> pd.DataFrame:
+    """
+    Orchestrates the partitioning and refreshing of the datasets of datasets_config at the same time.
+
+    At most max_concurrent_datasets datasets are processed at the same time. Their refresh requests
+    share capacity_max_concurrent_refreshes slots across the capacity and workspace_max_concurrent_refreshes
+    slots per workspace, so the capacity is filled without overloading it. A failing dataset does not stop
+    the others. The log records of each dataset are prefixed with its dataset_id.
+
+    Args:
+        datasets_config (str): JSON array with the configuration of each dataset.
+        notebook_params (Dict[str, Any]): Notebook parameters, shared by all datasets.
+        max_concurrent_datasets (Optional[int]): Maximum number of datasets processed at the same time.
+        capacity_max_concurrent_refreshes (Optional[int]): Maximum number of refresh requests running at the same
+            time across the capacity.
+        workspace_max_concurrent_refreshes (Optional[int]): Maximum number of refresh requests running at the same
+            time in each workspace.
+
+    Returns:
+        pd.DataFrame: Report with the status, error, duration, refresh outcome and seconds waited for a refresh slot of each dataset.
+
+    Raises:
+        RuntimeError: If the run of any dataset fails.
+    """
+    with span("orchestrator.validate_params"):
+        datasets: List[Dict[str, Any]] = validate_datasets_config(datasets_config, notebook_params)
+        limits: Dict[str, int] = validate_fan_out_limits(
+            max_concurrent_datasets,
+            capacity_max_concurrent_refreshes,
+            workspace_max_concurrent_refreshes
+        )
+
+    refresh_slots: RefreshSlots = RefreshSlots(
+        limits["capacity_max_concurrent_refreshes"], limits["workspace_max_concurrent_refreshes"]
+    )
+    logger.info(
+        f"Running {len(datasets)} dataset(s), {limits['max_concurrent_datasets']} at a time, with at most "
+        f"{limits['capacity_max_concurrent_refreshes']} refresh request(s) across the capacity and "
+        f"{limits['workspace_max_concurrent_refreshes']} per workspace..."
+    )
+
+    def run_one(params: Dict[str, Any]) -> Dict[str, Any]:
+        with log_tag(params["dataset_id"]):
+            logger.info(f"Starting run of dataset '{params['dataset_id']}' in workspace '{params['workspace_id']}'.")
+            with span("orchestrator.run_dataset", workspace_id=params["workspace_id"], dataset_id=params["dataset_id"]):
+                return run_dataset(params, refresh_slots)
+
+    def log_result(result: DatasetRunResult) -> None:
+        if result.error is None:
+            logger.info(f"Run of dataset '{result.dataset_id}' completed in {result.duration:.1f} seconds.")
+        else:
+            logger.error(f"Run of dataset '{result.dataset_id}' failed after {result.duration:.1f} seconds: {result.error}")
+
+    with span("orchestrator.fan_out", datasets=len(datasets)):
+        report: pd.DataFrame = fan_out(datasets, run_one, limits["max_concurrent_datasets"], log_result)
+
+    logger.info("Fan-out report (peak of %d concurrent refresh requests):\n%s", refresh_slots.peak, lazy(report.to_string, index=False))
+
+    failed: pd.DataFrame = report[report["status"] != "Completed"]
+    if not failed.empty:
+        raise RuntimeError(f"Run failed for {len(failed)} of {len(report)} dataset(s): {failed['dataset_id'].tolist()}")
+    return report
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def run():
+    """
+    Orchestrates dataset partitioning and refreshing in Power BI, for the dataset of workspace_id and
+    dataset_id or, with datasets_config, for several datasets at the same time (see run_fan_out()).
+
+    Raises:
+        RuntimeError: If any notebook execution fails, or the run of any dataset fails.
+    """
+    notebook_params: Dict[str, Any] = {
+        "workspace_id": workspace_id,
+        "dataset_id": dataset_id,
+        "enable_partition": enable_partition,
+        "partitions_config": partitions_config,
+        "enable_refresh": enable_refresh,
+        "tables_to_refresh": tables_to_refresh,
+        "partitions_to_refresh": partitions_to_refresh,
+        "refresh_commit_mode": refresh_commit_mode,
+        "refresh_max_parallelism": refresh_max_parallelism,
+        "refresh_auto_parallelism": refresh_auto_parallelism,
+        "refresh_max_parallelism_ceiling": refresh_max_parallelism_ceiling,
+        "refresh_shards": refresh_shards,
+        "refresh_shard_by": refresh_shard_by,
+        "max_concurrent_refreshes": max_concurrent_refreshes,
+        "refresh_waves": refresh_waves,
+        "refresh_fail_fast": refresh_fail_fast,
+        "refresh_max_retries": refresh_max_retries,
+        "refresh_retry_backoff": refresh_retry_backoff,
+        "notebook_timeout": notebook_timeout,
+        "metadata_cache_path": metadata_cache_path,
+        "metadata_cache_ttl": metadata_cache_ttl,
+        "refresh_history_path": refresh_history_path,
+        "watermark_path": watermark_path,
+        "watermark_source": watermark_source,
+        "checkpoint_path": checkpoint_path,
+        "checkpoint_max_age": checkpoint_max_age,
+        "execution_mode": execution_mode,
+        "dry_run": dry_run
+    }
+
+    if is_valid_text(datasets_config):
+        run_fan_out(
+            datasets_config,
+            notebook_params,
+            max_concurrent_datasets,
+            capacity_max_concurrent_refreshes,
+            workspace_max_concurrent_refreshes
+        )
+        return
+
+    # Validate input parameters
+    with span("orchestrator.validate_params"):
+        params = validate_params(**notebook_params)
+
+    run_dataset(params)
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def start_tracing() -> Optional[Tracer]:
+    """
+    Starts tracing the run if trace_path is provided. The install and import steps, timed before
+    tracing started, are recorded as the first spans of the trace.
+
+    Returns:
+        Optional[Tracer]: The tracer of the run, or None if tracing is disabled.
+    """
+    if not is_valid_text(trace_path):
+        return None
+
+    tracer: Tracer = Tracer(trace_path, attributes={"notebook": "NB_PAR_ORCHESTRATOR"})
+    set_tracer(tracer)
+
+    # Startup steps ran back to back from the start of the session
+    started_at: float = time.time() - (time.perf_counter() - startup_started)
+    for row in startup_timer.report().itertuples():
+        tracer.record("orchestrator.startup", started_at, row.seconds, stage=row.stage)
+        started_at += row.seconds
+
+    logger.info(f"Tracing run '{tracer.trace_id}' to '{tracer.file}'.")
+    return tracer
+
+# METADATA ********************
+
+# META {
+# META   "language": "python",
+# META   "language_group": "jupyter_python"
+# META }
+
+# CELL ********************
+
+def log_startup_report() -> None:
+    """
+    Logs the time spent installing and importing dependencies, including the modules
+    imported on first use during the run.
+
+    Returns:
+        None
+    """
+    if not fabtoolkit_installed:
+        logger.info(f"fabtoolkit {FABTTOOLKIT_VERSION} already installed with the same modules as the wheel. Installation skipped.")
+    logger.info(f"Startup timings:\n{startup_timer.report().to_string(index=False)}")
 
 # METADATA ********************
 
@@ -436,7 +1460,15 @@ def run():
 # CELL ********************
 
 if __name__ == "__main__":
-    run()
+    tracer: Optional[Tracer] = start_tracing()
+    try:
+        with span("orchestrator.run", dataset_id=dataset_id, execution_mode=execution_mode, dry_run=dry_run):
+            run()
+    finally:
+        log_startup_report()
+        if tracer is not None:
+            tracer.close()
+        flush_logs()
 
 # METADATA ********************
 
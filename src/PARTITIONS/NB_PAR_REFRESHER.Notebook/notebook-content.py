@@ -18,6 +18,23 @@ tables_to_refresh: str = ""
 partitions_to_refresh: str = ""
 commit_mode: str = ""
 max_parallelism: int = 4
+auto_parallelism: bool = False
+max_parallelism_ceiling: int = 16
+refresh_shards: int = 1
+refresh_shard_by: str = "TABLE"
+max_concurrent_refreshes: int = 1
+refresh_waves: bool = False
+fail_fast: bool = False
+max_retries: int = 0
+retry_backoff: int = 60
+metadata_cache_path: str = ""
+metadata_cache_ttl: int = 0
+refresh_history_path: str = ""
+watermark_path: str = ""
+checkpoint_file: str = ""
+trace_path: str = ""
+trace_id: str = ""
+trace_parent_id: str = ""
 
 # METADATA ********************
 
@@ -28,14 +45,18 @@ max_parallelism: int = 4
 
 # CELL ********************
 
-import pandas as pd
 import logging
-import sys
-from typing import List, Optional
-from io import StringIO
+from typing import Optional
 from fabtoolkit.utils import is_valid_text
-from fabtoolkit.log import ConsoleLogFormatter
+from fabtoolkit.log import flush_logs, setup_logger
 from fabtoolkit.dataset import Dataset
+from fabtoolkit.cache import MetadataCache
+from fabtoolkit.checkpoint import RunCheckpoint
+from fabtoolkit.history import RefreshHistory
+from fabtoolkit.tuning import AUTO_PARALLELISM, ParallelismTuner
+from fabtoolkit.watermark import WatermarkStore
+from fabtoolkit import pipeline
+from fabtoolkit.trace import Tracer, set_tracer, span
 
 # METADATA ********************
 
@@ -48,6 +69,7 @@ from fabtoolkit.dataset import Dataset
 
 # Constants
 DEFAULT_LOG_LEVEL = logging.DEBUG
+DEFAULT_LOG_MAX_MESSAGE_LENGTH = 4000
 
 # METADATA ********************
 
@@ -58,155 +80,7 @@ DEFAULT_LOG_LEVEL = logging.DEBUG
 
 # CELL ********************
 
-logger = logging.getLogger("refresher")
-logger.setLevel(DEFAULT_LOG_LEVEL)
-logger.propagate = False
-
-if not logger.handlers:
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setFormatter(ConsoleLogFormatter())
-    console_handler.setLevel(DEFAULT_LOG_LEVEL)
-    logger.addHandler(console_handler)
-
-# METADATA ********************
-
-# META {
-# META   "language": "python",
-# META   "language_group": "jupyter_python"
-# META }
-
-# CELL ********************
-
-def get_tables(dataset: Dataset, tables_to_refresh: Optional[str]) -> pd.DataFrame:
-    """
-    Gets the list of tables to refresh. 
-    If tables parameter is provided, parse it into a list and get related tables. 
-    If not provided, retrieve all tables from the dataset.
-
-    Args:
-        dataset (Dataset): Dataset object.
-        tables_to_refresh (Optional[str]): Comma-separated string of table names to refresh.
-
-    Returns:
-        pd.DataFrame: DataFrame containing table names to refresh.
-
-    Raises:
-        ValueError: If no tables to refresh are found or invalid table names are provided.
-    """
-    
-    available_tables: List[str] = dataset.tables["table_name"].unique().tolist()
-    
-    if is_valid_text(tables_to_refresh):
-        table_list: List[str] = [t.strip() for t in tables_to_refresh.split(',') if t.strip()]
-        logger.info(f"Tables to refresh provided: {table_list}")
-        
-        # Check if the provided tables exist in the dataset
-        invalid_tables: List[str] = list(set(table_list) - set(available_tables))
-        if invalid_tables:
-            raise ValueError(f"Invalid table names provided: {invalid_tables}")
-        
-        # Get related tables
-        tables: pd.DataFrame = dataset.get_related_tables(table_list)
-        logger.info(f"Tables to refresh: {tables['table_name'].tolist()}")
-        return tables
-    else:
-        logger.info("No tables to refresh provided. Retrieving all tables...")
-        return pd.DataFrame({"table_name": available_tables})
-
-# METADATA ********************
-
-# META {
-# META   "language": "python",
-# META   "language_group": "jupyter_python"
-# META }
-
-# CELL ********************
-
-def get_partitions(dataset: Dataset, tables: pd.DataFrame, partitions_to_refresh: str) -> pd.DataFrame:
-    """
-    Gets the list of partitions to refresh.
-    If partitions parameter is provided, parse it, validate, and filter the partitions to refresh.
-    If not provided, retrieve all partitions from the dataset.
-
-    Args:
-        dataset (Dataset): Dataset object.
-        tables (pd.DataFrame): DataFrame of tables to refresh.
-        partitions_to_refresh (str): JSON string specifying tables and their partitions to refresh.
-    
-    Returns:
-        pd.DataFrame: Partitions to refresh.
-    
-    Raises:
-        ValueError: If invalid partitions are specified.
-    """
-
-    # Get partitions for each table to refresh
-    available_partitions: pd.DataFrame = tables.merge(
-        dataset.partitions,
-        left_on=["table_name"],
-        right_on=["table_name"],
-        how="inner"
-    )[["table_name", "partition_name"]]
-
-    if not is_valid_text(partitions_to_refresh):
-        logger.info("No explicit partitions to refresh. Refreshing all partitions...")
-        return available_partitions
-    else:
-        # Merge tables to identify tables with selected partitions for refresh
-        selected_tables: pd.DataFrame = pd.read_json(StringIO(partitions_to_refresh)).merge(
-            available_partitions,
-            left_on=["table"],
-            right_on=["table_name"],
-            how="left",
-            indicator=True
-        )
-
-        # If any of the tables with selected partitions are not available
-        invalid_tables = selected_tables[selected_tables["_merge"] == "left_only"]
-        if not invalid_tables.empty:
-            logger.warning(f"The following tables, for which partitions were selected, are not available: {invalid_tables['table'].tolist()}")
-        
-        # Tables with selected partitions
-        tables_with_selected_part = selected_tables[selected_tables["_merge"] == "both"]
-
-        if tables_with_selected_part.empty:
-            return available_partitions
-
-        # Parse and explode selected partitions
-        selected_partitions: pd.DataFrame = (
-            tables_with_selected_part[["table_name", "selected_partitions"]].drop_duplicates()
-            .assign(partition_name=lambda x: x['selected_partitions'].str.split(','))
-            .explode('partition_name', ignore_index=True)
-            .assign(partition_name=lambda x: x['partition_name'].str.strip())
-        )
-    
-        # Merge current partitions with selected partitions to determine which to refresh
-        valid_partitions: pd.DataFrame = selected_partitions[["table_name", "partition_name"]].merge(
-            tables_with_selected_part[["table_name", "partition_name"]],
-            left_on=["table_name", "partition_name"],
-            right_on=["table_name", "partition_name"],
-            how="left",
-            indicator=True
-        )
-
-        # If any of the selected partitions do not match the available partitions for the table
-        invalid_partitions = valid_partitions[valid_partitions["_merge"] == "left_only"]
-        if not invalid_partitions.empty:
-            raise ValueError(f"Invalid partitions found:\n{invalid_partitions[['table_name', 'partition_name']].to_json(orient='records')}")
-
-        # Partitions to be refreshed not explicitly selected (related tables)
-        table_partitions_no_selected: pd.DataFrame = selected_tables[selected_tables["_merge"] == "left_only"]
-        # Partitions to be refreshed explicitly selected
-        table_partitions_selected: pd.DataFrame = (
-            valid_partitions[valid_partitions["_merge"] == "both"]
-        )
-
-        partitions: pd.DataFrame = pd.concat(
-            [table_partitions_no_selected[["table_name", "partition_name"]], table_partitions_selected[["table_name", "partition_name"]]], 
-            ignore_index=True
-        )
-        logger.info(f"Partitions to refresh: {partitions.to_json(orient='records')}")
-        return partitions
+logger = setup_logger("refresher", DEFAULT_LOG_LEVEL, max_message_length=DEFAULT_LOG_MAX_MESSAGE_LENGTH)
 
 # METADATA ********************
 
@@ -227,39 +101,34 @@ def refresh() -> None:
         Exception: If dataset operations fail.
     """
     
-    dataset: Dataset = Dataset(workspace_id, dataset_id)
-
-    logger.info(f"Refreshing the '{dataset.dataset_name}' dataset in workspace '{dataset.workspace_name}'...")
-    
-    try:
-        logger.info("Getting tables to refresh...")
-        tables: pd.DataFrame = get_tables(dataset, tables_to_refresh)
-
-        logger.info("Getting partitions to refresh...")
-        partitions: pd.DataFrame = (
-            get_partitions(dataset, tables, partitions_to_refresh)
-            .rename(columns={"table_name": "table", "partition_name": "partition"})
-        )
-    except Exception as e:
-        logger.error(f"Failed to retrieve tables and partitions: {str(e)}")
-        raise
-
-    try:
-        logger.info(f"Requesting refresh for objects: {partitions.to_json(orient='records')}")
-        
-        refresh_request_id: str = dataset.refresh_objects(partitions, commit_mode, max_parallelism)
-        if not refresh_request_id:
-            raise ValueError("Refresh request is invalid.")
-        
-        logger.info(f"Refresh request ID: {refresh_request_id}")
-        
-        if dataset.check_refresh_status(refresh_request_id) != "Completed":
-            raise RuntimeError("Refresh failed. Check refresh history for more details.")
-            
-        logger.info("Refresh completed successfully.")
-    except Exception as e:
-        logger.error(f"Unexpected error during refresh: {str(e)}")
-        raise
+    cache: Optional[MetadataCache] = (
+        MetadataCache(metadata_cache_path, metadata_cache_ttl or None) if is_valid_text(metadata_cache_path) else None
+    )
+    # Durations of completed refreshes are recorded to submit the slowest objects first on later runs
+    history: Optional[RefreshHistory] = RefreshHistory(refresh_history_path) if is_valid_text(refresh_history_path) else None
+    # With auto_parallelism, max_parallelism is only the starting point of the tuner
+    tuner: ParallelismTuner = ParallelismTuner(max_parallelism_ceiling, max_parallelism)
+    dataset: Dataset = Dataset(workspace_id, dataset_id, cache, history, tuner)
+
+    # Refresh logic lives in fabtoolkit.pipeline, shared with the in-process mode of the orchestrator
+    pipeline.refresh(
+        dataset,
+        tables_to_refresh,
+        partitions_to_refresh,
+        commit_mode,
+        AUTO_PARALLELISM if auto_parallelism else max_parallelism,
+        refresh_shards,
+        refresh_shard_by,
+        max_concurrent_refreshes,
+        WatermarkStore(watermark_path) if is_valid_text(watermark_path) else None,
+        logger,
+        refresh_waves,
+        fail_fast,
+        max_retries,
+        retry_backoff,
+        # Refresh requests are recorded in the checkpoint of the orchestrator run, so a new run can resume them
+        RunCheckpoint.load(checkpoint_file) if is_valid_text(checkpoint_file) else None
+    )
 
 # METADATA ********************
 
@@ -271,7 +140,19 @@ def refresh() -> None:
 # CELL ********************
 
 if __name__ == "__main__":
-    refresh()
+    # Spans join the trace of the orchestrator when it passes its trace identifiers
+    tracer: Optional[Tracer] = (
+        Tracer(trace_path, trace_id or None, trace_parent_id or None, attributes={"notebook": "NB_PAR_REFRESHER"})
+        if is_valid_text(trace_path) else None
+    )
+    set_tracer(tracer)
+    try:
+        with span("refresher.refresh"):
+            refresh()
+    finally:
+        if tracer is not None:
+            tracer.close()
+        flush_logs()
 
 # METADATA ********************
 